@@ -1,13 +1,27 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 import base64
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime
+import inspect
 import re
+import time
+import uuid
 
 import ml_report as ml
 import os
+import report_bundle as rbundle
+import report_cache as rcache
+import report_copies as rcopies
+import report_dtypes as rdtypes
+import report_entities as rentities
+import report_history as rhistory
+import report_ingest as ringest
+import report_memory as rmemory
+import report_shared as rshared
+import report_validation as rvalidation
 import liquid_glass_components as lgc
 import sales_funnel as sf
 import marketplace_config as mkt
@@ -59,105 +73,57 @@ def fmt_int_br(x):
 # -------------------------
 # Estoque (opcional)
 # -------------------------
-def _digits_only(s) -> str:
-    s = "" if s is None else str(s)
-    return re.sub(r"\D", "", s)
+# A leitura do arquivo de estoque fica em ml_report.load_estoque (roda no pool da ingestão)
+load_stock_file = ml.load_estoque
 
-def _norm_sku(s) -> str:
-    if s is None or (isinstance(s, float) and pd.isna(s)):
-        return ""
-    return str(s).strip().upper()
-
-def load_stock_file(file) -> pd.DataFrame:
-    """
-    Lê o arquivo de estoque enviado pelo usuário.
-
-    Arquivo base (Anuncios-....xlsx):
-    - Aba: "Anúncios"
-    - Coluna B: ITEM_ID (MLB)
-    - Coluna D: SKU
-    - Coluna G: QUANTITY (Estoque)
-
-    Observação: esse arquivo costuma ter linhas de cabeçalho antes da tabela,
-    por isso usamos skiprows para alinhar corretamente as colunas.
-    """
-    # Mantemos dtype=str para evitar conversões quebradas logo na leitura
-    df = pd.read_excel(file, sheet_name="Anúncios", skiprows=4, dtype=str)
-
-    # Preferência por nomes de coluna (mais seguro que posição)
-    expected = {"ITEM_ID", "SKU", "QUANTITY"}
-    if not expected.issubset(set(df.columns)):
-        # fallback por posição (B, D, G) caso o ML mude o cabeçalho
-        if df.shape[1] < 7:
-            raise ValueError("Arquivo de estoque não tem colunas suficientes (precisa ter pelo menos até a coluna G).")
-        df = df.iloc[:, [1, 3, 6]].copy()
-        df.columns = ["ITEM_ID", "SKU", "QUANTITY"]
-
-    df = df[["ITEM_ID", "SKU", "QUANTITY"]].copy()
-
-    # Filtra linhas válidas
-    df["ITEM_ID"] = df["ITEM_ID"].astype(str).str.strip()
-    df = df[df["ITEM_ID"].str.contains("MLB", na=False)]
-
-    # Normaliza chaves
-    df["MLB_key"] = df["ITEM_ID"].map(_digits_only)
-    df["SKU_key"] = df["SKU"].map(_norm_sku)
-
-    # Estoque como inteiro
-    df["Estoque"] = pd.to_numeric(df["QUANTITY"], errors="coerce").fillna(0).astype(int)
-
-    # Dedup: mantém o maior estoque por MLB
-    df = df.sort_values("Estoque", ascending=False).drop_duplicates(subset=["MLB_key"], keep="first")
-
-    return df[["MLB_key", "SKU_key", "Estoque"]]
-
-def enrich_with_stock(df: pd.DataFrame, stock_df: pd.DataFrame) -> pd.DataFrame:
+def enrich_with_stock(df: pd.DataFrame, stock_df: pd.DataFrame, entidades=None) -> pd.DataFrame:
     """
     Enriquecimento por:
     1) MLB (preferência)
     2) SKU (fallback)
+    As chaves casam pelos códigos do índice de entidades da execução (report_entities).
     """
     if df is None or df.empty:
         return df
     if stock_df is None or stock_df.empty:
-        out = df.copy()
+        out = df.copy(deep=False)
         if "Estoque" not in out.columns:
             out["Estoque"] = pd.NA
         return out
 
-    out = df.copy()
+    out = df.copy(deep=False)
 
     # Chaves no dataframe principal
     # Preferimos Codigo_MLB (MLBxxxxxxxx) e depois ID
     if "Codigo_MLB" in out.columns:
-        out["MLB_key"] = out["Codigo_MLB"].map(_digits_only)
+        out["MLB_key"] = rentities.normalize_keys(out["Codigo_MLB"], "mlb").to_numpy()
     elif "ID" in out.columns:
-        out["MLB_key"] = out["ID"].map(_digits_only)
+        out["MLB_key"] = rentities.normalize_keys(out["ID"], "mlb").to_numpy()
     else:
         out["MLB_key"] = ""
 
     if "SKU" in out.columns:
-        out["SKU_key"] = out["SKU"].map(_norm_sku)
+        out["SKU_key"] = rentities.normalize_keys(out["SKU"], "sku").to_numpy()
     else:
         out["SKU_key"] = ""
 
-    # 1) Merge por MLB_key
-    out = out.merge(
-        stock_df[["MLB_key", "Estoque"]].drop_duplicates("MLB_key"),
-        how="left",
-        on="MLB_key",
+    # 1) Junção por MLB_key
+    out = rentities.left_join(
+        out,
+        stock_df[["MLB_key", "Estoque"]],
+        "MLB_key",
+        "MLB_key",
+        "mlb",
+        entidades,
         suffixes=("", "_stk"),
+        primeira=True,
     )
 
-    # 2) Fallback por SKU_key para quem ficou sem estoque
-    miss = out["Estoque"].isna()
+    # 2) Fallback por SKU_key para quem ficou sem estoque (primeira linha de cada SKU)
+    miss = out["Estoque"].isna().to_numpy()
     if miss.any():
-        sku_map = (
-            stock_df[stock_df["SKU_key"].astype(str).str.len() > 0]
-            .drop_duplicates(subset=["SKU_key"])
-            .set_index("SKU_key")["Estoque"]
-        )
-        out.loc[miss, "Estoque"] = out.loc[miss, "SKU_key"].map(sku_map)
+        pos = (entidades or rentities.EntityIndex()).lookup("sku", out.loc[miss, "SKU_key"], stock_df["SKU_key"])
+        out.loc[miss, "Estoque"] = rentities.take_rows(stock_df["Estoque"], pos).to_numpy()
 
     out["Estoque"] = pd.to_numeric(out["Estoque"], errors="coerce")
     return out
@@ -189,7 +155,7 @@ def apply_stock_rules(enter_df: pd.DataFrame, scale_df: pd.DataFrame, acos_df: p
     def _add_status(df):
         if df is None or df.empty:
             return df
-        df2 = df.copy()
+        df2 = df.copy(deep=False)
         if "Estoque" not in df2.columns:
             df2["Estoque"] = pd.NA
         df2["Estoque_Status"] = df2["Estoque"].map(_stock_value).map(_status)
@@ -205,15 +171,15 @@ def apply_stock_rules(enter_df: pd.DataFrame, scale_df: pd.DataFrame, acos_df: p
         v = enter2["Estoque"].map(_stock_value)
         mask_block = v.notna() & (v < float(estoque_min_ads))
         if mask_block.any():
-            blocked = enter2.loc[mask_block].copy()
+            blocked = enter2.loc[mask_block]
             blocked["Motivo_Estoque"] = "Estoque abaixo do minimo para entrar em Ads"
-            enter2 = enter2.loc[~mask_block].copy()
+            enter2 = enter2.loc[~mask_block]
 
     # Marcar freio nas tabelas de escala/ROAS se estoque baixo/critico
     def _mark_freio(df):
         if df is None or df.empty or "Estoque" not in df.columns:
             return df
-        df3 = df.copy()
+        df3 = df.copy(deep=False)
         v = df3["Estoque"].map(_stock_value)
         mask_crit = v.notna() & (v <= float(estoque_critico))
         mask_low  = v.notna() & (v > float(estoque_critico)) & (v <= float(estoque_baixo))
@@ -336,7 +302,7 @@ def prepare_df_for_view(df: pd.DataFrame, *, drop_cpi_cols: bool = True, drop_ro
     if df is None or not isinstance(df, pd.DataFrame) or df.empty:
         return df
 
-    out = df.copy()
+    out = df.copy(deep=False)
 
     if drop_cpi_cols:
         out = _drop_cols_by_norm(out, targets_norm={"cpi_share", "cpi_cum", "cpi_80"})
@@ -521,7 +487,7 @@ def replace_acos_obj_with_roas_obj(df: pd.DataFrame) -> pd.DataFrame:
     if df is None or not isinstance(df, pd.DataFrame) or df.empty:
         return df
 
-    df2 = df.copy()
+    df2 = df.copy(deep=False)
     renames = {}
 
     for col in list(df2.columns):
@@ -553,7 +519,7 @@ def format_table_br(df: pd.DataFrame) -> pd.DataFrame:
     if df is None or not isinstance(df, pd.DataFrame) or df.empty:
         return df
 
-    df_fmt = df.copy()
+    df_fmt = df.copy(deep=False)
 
     for col in df_fmt.columns:
         lc = str(col).strip().lower()
@@ -615,7 +581,7 @@ def render_pareto_chart(df):
     if df is None or df.empty or "Receita" not in df.columns:
         return
     
-    df_sorted = df.sort_values("Receita", ascending=False).copy()
+    df_sorted = df.sort_values("Receita", ascending=False)
     df_sorted["Receita_Cum_Pct"] = 100 * df_sorted["Receita"].cumsum() / df_sorted["Receita"].sum()
     
     fig = go.Figure()
@@ -654,7 +620,7 @@ def render_treemap_chart(df):
     if df is None or df.empty or "Investimento" not in df.columns:
         return
     
-    df_plot = df[df["Investimento"] > 0].copy()
+    df_plot = df[df["Investimento"] > 0]
     
     # Preparar dados para o Treemap
     df_plot["ROAS_Real"] = pd.to_numeric(df_plot.get("ROAS_Real", 0), errors="coerce").fillna(0)
@@ -732,8 +698,240 @@ def render_funnel_chart(kpis):
     
     st.plotly_chart(fig, use_container_width=True)
 
+def render_ingest_summary(ingest: dict, marketplace_key: str):
+    """Erros por arquivo e tempos de leitura da ingestão (report_ingest.load_reports)."""
+    labels = {
+        r["key"]: r["label"]
+        for r in mkt.get_required_reports(marketplace_key) + mkt.get_optional_reports(marketplace_key)
+    }
+    for key, msg in ingest["erros"].items():
+        st.error(f"Erro ao ler {labels.get(key, key)}: {msg}")
+
+    leitura_pat = getattr(ingest["dados"].get("patrocinados"), "attrs", {}).get("leitura", {})
+    if leitura_pat.get("modo") == "streaming":
+        st.caption(
+            f"Patrocinados lido em streaming: {leitura_pat['linhas']} linhas em {leitura_pat['blocos']} blocos, "
+            f"arquivo de {leitura_pat['arquivo_mb']:.1f} MB, pico de memória de {leitura_pat['pico_memoria_mb']:.1f} MB."
+        )
+
+    cache_info = rcache.get_cache().summary()
+    shared_info = rshared.get_store().summary()
+    origem_txt = {
+        "compartilhado": "compartilhado entre sessões",
+        "cache": "cache",
+        "processo": "processo paralelo",
+        "local": "processo principal",
+    }
+    with st.expander(f"Leitura dos arquivos ({ingest['tempo_total']:.2f}s)", expanded=False):
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {"Arquivo": labels.get(k, k), "Origem": origem_txt.get(ingest["origem"][k], ingest["origem"][k]), "Tempo (s)": round(t, 3)}
+                    for k, t in ingest["tempos"].items()
+                ]
+            ),
+            hide_index=True,
+            use_container_width=True,
+        )
+        st.caption(
+            f"Cache de relatórios: {cache_info['hits']} hits / {cache_info['misses']} misses "
+            f"({cache_info['arquivos']} arquivos, {cache_info['tamanho_mb']:.1f} de {cache_info['limite_mb']:.0f} MB)."
+        )
+        st.caption(
+            f"Relatórios compartilhados: {shared_info['arquivos']} arquivos Arrow ({shared_info['tamanho_mb']:.1f} MB) "
+            f"mapeados por {shared_info['sessoes']} sessões."
+        )
+        plano = ingest.get("orcamento")
+        if plano:
+            orcamento = f"{plano['orcamento_mb']:.0f} MB" if plano["orcamento_mb"] is not None else "sem limite"
+            st.caption(
+                f"Orçamento de memória: pico estimado de {plano['estimativa_mb']:.0f} MB para {orcamento} "
+                f"(leitura {plano['decisao']})."
+            )
+        memoria = ingest.get("memoria") or []
+        if memoria:
+            st.caption(
+                "Memória com tipos compactos: "
+                + "; ".join(
+                    f"{labels.get(m['frame'], m['frame'])} {m['antes_mb']:.1f} → {m['depois_mb']:.1f} MB"
+                    for m in memoria
+                )
+                + "."
+            )
+
+def render_validation_errors(validacao: dict, marketplace_key: str) -> bool:
+    """Mostra os erros da validação (report_validation) por arquivo; True se algum arquivo foi recusado."""
+    labels = {
+        r["key"]: r["label"]
+        for r in mkt.get_required_reports(marketplace_key) + mkt.get_optional_reports(marketplace_key)
+    }
+    recusados = {k: v for k, v in validacao.items() if not v["ok"]}
+    for key, v in recusados.items():
+        st.error(f"{labels.get(key, key)}: " + "; ".join(v["erros"]))
+    if recusados:
+        st.info("Corrija os arquivos acima e gere o relatório de novo (nenhum relatório foi processado).")
+    return bool(recusados)
+
+def render_bundle_picker(marketplace_key: str) -> dict:
+    """Upload de um .zip com vários relatórios; devolve {chave do relatório: arquivo} da conta escolhida."""
+    pacote = st.file_uploader(
+        "Pacote .zip com vários relatórios (opcional)",
+        type=["zip"],
+        help="Cada arquivo é identificado pelo conteúdo; cada pasta do .zip é tratada como uma conta.",
+    )
+    if pacote is None:
+        return {}
+    try:
+        scan = rbundle.scan_bundle(pacote)
+    except Exception as e:
+        st.error(f"Não foi possível abrir o pacote: {e}")
+        return {}
+
+    contas = sorted({r["conta"] for r in scan if r["marketplace"] == marketplace_key})
+    if not contas:
+        st.warning("Nenhum relatório deste marketplace foi reconhecido no pacote.")
+        return {}
+    conta = contas[0]
+    if len(contas) > 1:
+        conta = st.selectbox("Conta do pacote", contas, format_func=rbundle.conta_label)
+
+    labels = {
+        r["key"]: r["label"]
+        for r in mkt.get_required_reports(marketplace_key) + mkt.get_optional_reports(marketplace_key)
+    }
+    with st.expander(f"Arquivos do pacote ({len(scan)})", expanded=False):
+        st.dataframe(
+            pd.DataFrame(
+                [
+                    {
+                        "Arquivo": r["arquivo"],
+                        "Conta": rbundle.conta_label(r["conta"]),
+                        "Relatório": labels.get(r["relatorio"], r["relatorio"]) if r["marketplace"] == marketplace_key
+                        else (r["erro"] or ("outro marketplace" if r["marketplace"] else "não reconhecido")),
+                    }
+                    for r in scan
+                ]
+            ),
+            hide_index=True,
+            use_container_width=True,
+        )
+    uploads = rbundle.bundle_uploads(scan, conta, marketplace_key)
+    # Identidade estável entre reruns (id do pacote + caminho no .zip), usada na chave da etapa
+    for arquivo in uploads.values():
+        arquivo.file_id = f"{getattr(pacote, 'file_id', pacote.name)}/{conta}/{arquivo.name}"
+    return uploads
+
+# Faixas dos limiares na calibração: (rótulo, mínimo, máximo, faixa inicial, passo)
+SWEEP_RANGES = {
+    "roas_mina": ("ROAS mín. para escalar", 1.0, 20.0, (4.0, 10.0), 0.5),
+    "lost_budget_mina": ("Perda por orçamento mín. p/ escalar (%)", 0.0, 100.0, (20.0, 60.0), 5.0),
+    "lost_rank_gigante": ("Perda por classificação mín. p/ competitividade (%)", 0.0, 100.0, (30.0, 70.0), 5.0),
+    "roas_hemorragia": ("ROAS abaixo do qual é hemorragia", 0.5, 10.0, (2.0, 4.0), 0.5),
+}
+
+
+def render_strategy_sweep(camp_strat: pd.DataFrame, fixos: dict = None, regras=None, chave=None):
+    """
+    Calibração: quadrantes e investimento em risco para uma grade de limiares (ml_report.strategy_sweep).
+
+    ``fixos`` e ``regras`` são os limiares e as regras do relatório em uso; o resultado
+    fica na sessão (com ``chave`` = arquivos enviados) para que trocar eixo ou métrica
+    não exija rodar a varredura de novo.
+    """
+    fixos = dict(fixos or {})
+    with st.expander("Calibrar limiares de quadrante (sensibilidade)", expanded=False):
+        if camp_strat is None or camp_strat.empty:
+            st.info("Sem campanhas ativas para calibrar.")
+            return
+        st.caption("Cada combinação dos limiares é avaliada sobre as campanhas ativas de uma vez, sem rodar o relatório de novo.")
+        faixas = {}
+        cols = st.columns(2)
+        for i, (param, (rotulo, lo, hi, inicial, passo)) in enumerate(SWEEP_RANGES.items()):
+            with cols[i % 2]:
+                faixas[param] = st.slider(rotulo, min_value=lo, max_value=hi, value=inicial, step=passo, key=f"sweep_{param}")
+        pontos = st.number_input("Valores por limiar", min_value=2, max_value=20, value=8, step=1, key="sweep_pontos")
+
+        # resultado guardado vale enquanto os arquivos, os limiares e as regras forem os mesmos
+        chave_sweep = (chave, tuple(sorted(fixos.items())), repr(regras))
+        if st.button("Rodar varredura", key="sweep_rodar"):
+            grade = {p: np.unique(np.round(np.linspace(lo, hi, int(pontos)), 4)) for p, (lo, hi) in faixas.items()}
+            try:
+                res = ml.strategy_sweep(camp_strat, grade, regras=regras, **fixos)
+            except Exception as e:
+                st.warning(f"Não consegui rodar a varredura: {e}")
+                return
+            st.session_state["sweep_resultado"] = {"chave": chave_sweep, "res": res}
+        guardado = st.session_state.get("sweep_resultado")
+        if guardado is None or guardado["chave"] != chave_sweep:
+            return
+        res = guardado["res"]
+        st.caption(f"{res['cenarios']:,} cenários x {res['campanhas']:,} campanhas em {res['tempo_s']:.2f}s.".replace(",", "."))
+
+        rotulos = {p: SWEEP_RANGES[p][0] for p in res["parametros"]}
+        c1, c2, c3 = st.columns(3)
+        eixo_x = c1.selectbox("Eixo X", res["parametros"], index=0, format_func=rotulos.get, key="sweep_x")
+        eixo_y = c2.selectbox("Eixo Y", res["parametros"], index=len(res["parametros"]) - 1, format_func=rotulos.get, key="sweep_y")
+        metricas = ["Investimento em risco"] + [f"Campanhas em {q}" for q in res["quadrantes"]]
+        metrica = c3.selectbox("Métrica", metricas, key="sweep_metrica")
+
+        cubo = res["investimento_em_risco"] if metrica == metricas[0] else res["contagem"][..., metricas.index(metrica) - 1]
+        # os outros limiares ficam no valor mais perto do usado no relatório
+        padroes = inspect.signature(ml.add_strategy_fields).parameters
+        corte = []
+        for p in res["parametros"]:
+            if p in (eixo_x, eixo_y):
+                corte.append(slice(None))
+            else:
+                corte.append(int(np.abs(res["valores"][p] - fixos.get(p, padroes[p].default)).argmin()))
+        plano = cubo[tuple(corte)]
+        if eixo_x == eixo_y:
+            st.info("Escolha limiares diferentes para os eixos.")
+        else:
+            if res["parametros"].index(eixo_x) < res["parametros"].index(eixo_y):
+                plano = plano.T
+            fig = px.imshow(
+                plano,
+                x=[f"{v:g}" for v in res["valores"][eixo_x]],
+                y=[f"{v:g}" for v in res["valores"][eixo_y]],
+                labels={"x": rotulos[eixo_x], "y": rotulos[eixo_y], "color": metrica},
+                aspect="auto",
+                color_continuous_scale="RdYlGn_r",
+                origin="lower",
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+        tabela = ml.sweep_frame(res).rename(columns=rotulos)
+        st.dataframe(tabela, use_container_width=True, hide_index=True)
+
+
+def upload_id(arquivo):
+    """Identidade do upload sem ler o conteúdo: ``file_id`` do Streamlit ou, sem ele, nome + tamanho."""
+    file_id = getattr(arquivo, "file_id", None)
+    if file_id:
+        return file_id
+    return getattr(arquivo, "name", None), getattr(arquivo, "size", None)
+
+
+def upload_fingerprint(uploaded_files: dict, historico_file=None, conta_historico=None) -> tuple:
+    """
+    Identidade de cada arquivo enviado + conta do histórico: chave da etapa guardada na sessão.
+
+    Roda a cada rerun do Streamlit, então não lê os bytes; o hash do conteúdo só
+    acontece quando o relatório é gerado (chave do cache em disco).
+    """
+    arquivos = dict(uploaded_files, historico=historico_file)
+    partes = tuple((rel, upload_id(f)) for rel, f in sorted(arquivos.items()) if f is not None)
+    return partes + (conta_historico,)
+
+
 def main():
     st.set_page_config(page_title="AdsEngine", layout="wide", initial_sidebar_state="expanded")
+    # Pipeline sem cópias defensivas: no pandas 2 o copy-on-write precisa ser ligado (report_copies)
+    rcopies.enable_copy_on_write()
+
+    # Id da sessão para os relatórios compartilhados (report_shared); cada rerun renova as marcas
+    sessao_id = st.session_state.setdefault("sessao_id", uuid.uuid4().hex)
+    rshared.get_store().renew(sessao_id)
 
     # Carregar CSS customizado
     try:
@@ -880,11 +1078,19 @@ def main():
         patrocinados_file = None
         campanhas_file = None
         camp_agg = pd.DataFrame()
+        historico_file = None
+        conta_historico = None
+        # Estoque e frames da Shopee só existem em parte dos caminhos
+        usar_estoque = False
+        estoque_file = None
+        stock_df = None
+        df_shopee_geral = df_shopee_protecao = df_shopee_conversoes = df_shopee_keywords = None
         
         if selected_marketplace == "mercado_livre":
-            organico_file = st.file_uploader("Relatorio de Desempenho de Anúncios (Excel)", type=["xlsx"])
-            patrocinados_file = st.file_uploader("Relatorio Anuncios Patrocinados (Excel)", type=["xlsx"])
-            campanhas_file = st.file_uploader("Relatorio de Campanha (Excel)", type=["xlsx"])
+            # CSV/Parquet do armazem entram direto (formato detectado pelo conteudo)
+            organico_file = st.file_uploader("Relatorio de Desempenho de Anúncios (Excel, CSV ou Parquet)", type=["xlsx", "csv", "parquet"])
+            patrocinados_file = st.file_uploader("Relatorio Anuncios Patrocinados (Excel, CSV ou Parquet)", type=["xlsx", "csv", "parquet"])
+            campanhas_file = st.file_uploader("Relatorio de Campanha (Excel, CSV ou Parquet)", type=["xlsx", "csv", "parquet"])
             uploaded_files = {
                 "vendas": organico_file,
                 "patrocinados": patrocinados_file,
@@ -914,6 +1120,14 @@ def main():
             usar_estoque = st.checkbox("Ativar visão de estoque", value=False)
             estoque_file = st.file_uploader("Arquivo de estoque (Excel)", type=["xlsx"], disabled=not usar_estoque)
             uploaded_files["estoque"] = estoque_file if usar_estoque else None
+
+            # Historico diario: cada envio grava so os dias novos/revisados (report_history)
+            historico_file = st.file_uploader(
+                "Relatório de Campanha diário (histórico incremental)",
+                type=["xlsx", "csv", "parquet"],
+                help="Export diário de campanhas; os dias já gravados não são reprocessados e a série diária vem do histórico da conta.",
+            )
+            conta_historico = st.text_input("Conta do histórico diário", value="principal")
             
             if usar_estoque:
                 cA, cB, cC = st.columns(3)
@@ -938,6 +1152,20 @@ def main():
             )
             uploaded_files["palavras_chave"] = palavras_chave_file
 
+        # Pacote .zip: preenche só os relatórios que não foram enviados individualmente
+        st.divider()
+        st.subheader("🗂️ Pacote de Relatórios")
+        for rel, arquivo in render_bundle_picker(selected_marketplace).items():
+            if rel == "estoque" and not usar_estoque:
+                continue
+            if not uploaded_files.get(rel):
+                uploaded_files[rel] = arquivo
+        if selected_marketplace == "mercado_livre":
+            organico_file = uploaded_files.get("vendas")
+            patrocinados_file = uploaded_files.get("patrocinados")
+            campanhas_file = uploaded_files.get("campanha")
+            estoque_file = uploaded_files.get("estoque")
+
         st.divider()
         st.subheader("Filtros de regra")
 
@@ -964,6 +1192,14 @@ def main():
             format="%.2f",
         )
 
+        lista_limite = st.number_input(
+            "Listas: máximo de linhas exibidas (0 = todas)",
+            min_value=0,
+            value=500,
+            step=100,
+            help="Vale para 'Entrar em Ads' e o painel geral de campanhas. O Excel do relatório traz sempre a lista completa.",
+        )
+
         # IMPORTANTE: Conv_Visitas_Vendas e CVR chegam em pontos percentuais (ex.: 1,82 vira 1.82).
         enter_conv_min = enter_conv_min_pct
         pause_cvr_max = pause_cvr_max_pct
@@ -1007,43 +1243,140 @@ def main():
             st.info("Envie os 3 arquivos na barra lateral para liberar o relatório.")
             return
 
-    if not executar:
+    # Etapa pesada do Mercado Livre (leitura, campanhas com estratégia, painel de
+    # anúncios sem a classificação) guardada na sessão: com os mesmos arquivos, mudar
+    # um filtro da barra lateral só reaplica os limiares (ml_report.apply_thresholds)
+    etapa_base = None
+    if selected_marketplace == "mercado_livre":
+        chave_base = upload_fingerprint(uploaded_files, historico_file, conta_historico)
+        etapa_base = st.session_state.get("ml_etapa_base")
+        if etapa_base is not None and etapa_base["chave"] != chave_base:
+            etapa_base = st.session_state["ml_etapa_base"] = None
+
+    if not executar and etapa_base is None:
         st.warning("Quando estiver pronto, clique em Gerar relatório.")
         return
 
+    # Conferência rápida das primeiras linhas de cada arquivo antes da leitura completa
+    if etapa_base is None:
+        validacao = rvalidation.validate_uploads(
+            {k: f for k, f in uploaded_files.items() if k != "snapshot"}, selected_marketplace
+        )
+        if render_validation_errors(validacao, selected_marketplace):
+            return
+
+    # Pico de memória estimado pelos metadados dos arquivos, antes do parse
+    plano_memoria = None
+    if selected_marketplace == "mercado_livre" and etapa_base is None:
+        plano_memoria = rmemory.plan_ingest(
+            {k: uploaded_files.get(k) for k in ("vendas", "patrocinados", "campanha", "estoque")}
+        )
+        if plano_memoria["decisao"] == "recusado":
+            st.error(f"❌ {plano_memoria['mensagem']}")
+            return
+        if plano_memoria["decisao"] == "reduzido":
+            st.warning(f"⚠️ {plano_memoria['mensagem']}")
+
+    # Série diária da conta (aba SERIE_DIARIA do Excel); só o Mercado Livre com histórico preenche
+    daily = None
     try:
         # Processamento condicional baseado no marketplace
         if selected_marketplace == "mercado_livre":
-            # Processa arquivos do Mercado Livre
-            org = ml.load_organico(uploaded_files["vendas"])
-            pat = ml.load_patrocinados(uploaded_files["patrocinados"])
-
-            # Modo unico: consolidado
-            camp_raw = ml.load_campanhas_consolidado(uploaded_files["campanha"])
-            camp_agg = ml.build_campaign_agg(camp_raw, modo="consolidado")
-
-            kpis, pause, enter, scale, acos, camp_strat, ads_panel, ads_pausar, ads_vencedores, ads_otim_fotos, ads_otim_keywords, ads_otim_oferta = ml.build_tables(
-            org=org,
-            camp_agg=camp_agg,
-            pat=pat,
+            if etapa_base is None:
+                # Processa arquivos do Mercado Livre
+                # Leitura paralela de todos os arquivos enviados; os 3 relatórios passam
+                # pelo cache em disco (mesmo arquivo reenviado não é reprocessado).
+                # No modo reduzido do orçamento de memória: streaming e um arquivo por vez.
+                leitura_kw = plano_memoria["kwargs"]
+                ingest_ml = ringest.load_reports(
+                    {
+                        "vendas": (ml.load_organico, uploaded_files["vendas"], leitura_kw.get("vendas")),
+                        "patrocinados": (ml.load_patrocinados, uploaded_files["patrocinados"], leitura_kw.get("patrocinados")),
+                        "campanha": (ml.load_campanhas_consolidado, uploaded_files["campanha"]),
+                        "estoque": (ml.load_estoque, uploaded_files.get("estoque")),
+                        "snapshot": (ml.load_snapshot_v2, uploaded_files.get("snapshot")),
+                    },
+                    cache=rcache.get_cache(),
+                    cache_keys=["vendas", "patrocinados", "campanha"],
+                    parallel=plano_memoria["parallel"],
+                    shared=rshared.get_store(),
+                    holder=sessao_id,
+                )
+                ingest_ml["orcamento"] = plano_memoria
+                # Tipos compactos logo apos a leitura (o build_tables restaura o que usa)
+                compactos, ingest_ml["memoria"] = rdtypes.compact_frames(
+                    {k: df for k, df in ingest_ml["dados"].items() if k in ("vendas", "patrocinados", "campanha")}
+                )
+                # Uma copia so por servidor: as outras sessoes com os mesmos arquivos mapeiam o mesmo Arrow
+                ingest_ml["dados"].update(rshared.get_store().publish_frames(compactos, ingest_ml["chaves"], sessao_id))
+                rshared.get_store().release_holder(sessao_id, keep=ingest_ml["chaves"].values())
+                render_ingest_summary(ingest_ml, selected_marketplace)
+                if any(k in ingest_ml["erros"] for k in ("vendas", "patrocinados", "campanha")):
+                    return
+
+                # Serie diaria lida do historico da conta (sem reler os exports antigos)
+                if conta_historico:
+                    historico = rhistory.CampaignHistory(conta_historico)
+                    if historico_file is not None:
+                        try:
+                            info_hist = historico.ingest(historico_file)
+                            st.caption(
+                                f"Histórico diário ({conta_historico}): {info_hist['dias_novos']} dias novos, "
+                                f"{info_hist['dias_atualizados']} revisados, {info_hist['dias_ignorados']} já gravados "
+                                f"({info_hist['tempo_s']:.2f}s)."
+                            )
+                        except Exception as e:
+                            st.warning(f"Não consegui atualizar o histórico diário: {e}")
+                    if historico.days():
+                        daily = historico.daily()
+
+                org = ingest_ml["dados"]["vendas"]
+                pat = ingest_ml["dados"]["patrocinados"]
+                # Modo unico: consolidado
+                camp_raw = ingest_ml["dados"]["campanha"]
+                camp_agg = ml.build_campaign_agg(camp_raw, modo="consolidado")
+                etapa_base = {
+                    "chave": chave_base,
+                    "ingest": ingest_ml,
+                    "daily": daily,
+                    "camp_agg": camp_agg,
+                    "base": ml.prepare_tables(org, camp_agg, pat, estoque=ingest_ml["dados"].get("estoque")),
+                }
+                st.session_state["ml_etapa_base"] = etapa_base
+                reaproveitado = False
+            else:
+                ingest_ml, daily, camp_agg = etapa_base["ingest"], etapa_base["daily"], etapa_base["camp_agg"]
+                reaproveitado = True
+
+            t0 = time.perf_counter()
+            # limiares da barra lateral (a calibração de quadrantes parte dos mesmos)
+            limiares = dict(
             enter_visitas_min=int(enter_visitas_min),
             enter_conv_min=float(enter_conv_min),
             pause_invest_min=float(pause_invest_min),
             pause_cvr_max=float(pause_cvr_max),
-            ads_min_imp=int(ads_min_imp) if ('ads_min_imp' in locals()) else 500,
-            ads_min_clk=int(ads_min_clk) if ('ads_min_clk' in locals()) else 10,
-            ads_ctr_min_abs=float(ads_ctr_min_abs) if ('ads_ctr_min_abs' in locals()) else 0.10,
-            ads_cvr_min=float(ads_cvr_min) if ('ads_cvr_min' in locals()) else 0.80,
-                ads_pause_invest_min=float(ads_pause_invest_min) if ('ads_pause_invest_min' in locals()) else 20.0,
+            ads_min_imp=int(ads_min_imp),
+            ads_min_clk=int(ads_min_clk),
+            ads_ctr_min_abs=float(ads_ctr_min_abs),
+            ads_cvr_min=float(ads_cvr_min),
+            ads_pause_invest_min=float(ads_pause_invest_min),
             )
+            tabelas = ml.apply_thresholds(etapa_base["base"], enter_limite=int(lista_limite) or None, **limiares)
+            kpis, pause, enter, scale, acos, camp_strat, ads_panel, ads_pausar, ads_vencedores, ads_otim_fotos, ads_otim_keywords, ads_otim_oferta = tabelas
+            if reaproveitado:
+                st.caption(
+                    f"Mesmos arquivos já processados nesta sessão: só os filtros de regra foram reaplicados "
+                    f"({time.perf_counter() - t0:.2f}s)."
+                )
 
             # -------------------------
             # Snapshot V2 - Carregamento e Comparação
             # -------------------------
-            camp_snap, anuncio_snap, kpis_snap = ml.load_snapshot_v2(uploaded_files.get("snapshot"))
+            camp_snap, anuncio_snap, kpis_snap = ingest_ml["dados"].get("snapshot") or ml.load_snapshot_v2(None)
         
-            camp_strat_comp = ml.compare_snapshots_campanha(camp_strat, camp_snap)
-            ads_panel_comp = ml.compare_snapshots_anuncio(ads_panel, anuncio_snap)
+            entidades = etapa_base["base"]["entidades"]
+            camp_strat_comp = ml.compare_snapshots_campanha(camp_strat, camp_snap, entidades)
+            ads_panel_comp = ml.compare_snapshots_anuncio(ads_panel, anuncio_snap, entidades)
             
         elif selected_marketplace == "shopee":
             # Processa arquivos da Shopee
@@ -1113,15 +1446,17 @@ def main():
         if selected_marketplace == "mercado_livre":
             blocked_stock = pd.DataFrame()
         pause_disp, enter_disp, scale_disp, acos_disp = pause, enter, scale, acos
-        camp_strat_disp = camp_strat_comp.copy()
-        ads_panel_disp = ads_panel_comp.copy()
-        if "usar_estoque" in locals() and usar_estoque and estoque_file is not None:
+        camp_strat_disp = camp_strat_comp.copy(deep=False)
+        ads_panel_disp = ads_panel_comp.copy(deep=False)
+        if usar_estoque and estoque_file is not None:
             try:
-                stock_df = load_stock_file(estoque_file)
-                pause_disp = enrich_with_stock(pause_disp, stock_df)
-                enter_disp = enrich_with_stock(enter_disp, stock_df)
-                scale_disp = enrich_with_stock(scale_disp, stock_df)
-                acos_disp  = enrich_with_stock(acos_disp, stock_df)
+                if "estoque" in ingest_ml["erros"]:
+                    raise ValueError(ingest_ml["erros"]["estoque"])
+                stock_df = ingest_ml["dados"]["estoque"]
+                pause_disp = enrich_with_stock(pause_disp, stock_df, entidades)
+                enter_disp = enrich_with_stock(enter_disp, stock_df, entidades)
+                scale_disp = enrich_with_stock(scale_disp, stock_df, entidades)
+                acos_disp  = enrich_with_stock(acos_disp, stock_df, entidades)
                 enter_disp, scale_disp, acos_disp, pause_disp, blocked_stock = apply_stock_rules(
                     enter_disp, scale_disp, acos_disp, pause_disp,
                     estoque_min_ads=int(estoque_min_ads),
@@ -1372,7 +1707,7 @@ def main():
         
         # Tabela de Campanhas com Proteção
         with st.expander("🛡️ Campanhas Elegíveis para Proteção de ROAS", expanded=True):
-            df_elegiveis = df_shopee_protecao[df_shopee_protecao['Elegível Proteção']].copy()
+            df_elegiveis = df_shopee_protecao[df_shopee_protecao["Elegível Proteção"]]
             
             if len(df_elegiveis) > 0:
                 # Seleciona colunas relevantes
@@ -1486,7 +1821,7 @@ def main():
     # -------------------------
     if selected_marketplace == "mercado_livre":
         with st.expander("Painel Geral de Campanhas", expanded=True):
-            panel_raw = ml.build_control_panel(camp_strat)
+            panel_raw = ml.build_control_panel(camp_strat, limite=int(lista_limite) or None)
             panel_raw = replace_acos_obj_with_roas_obj(panel_raw)
             panel_view = prepare_df_for_view(panel_raw, drop_cpi_cols=True, drop_roas_generic=False)
             st.dataframe(format_table_br(panel_view), use_container_width=True)
@@ -1505,6 +1840,8 @@ def main():
             cpi_view = prepare_df_for_view(cpi_raw, drop_cpi_cols=True, drop_roas_generic=True)
             st.dataframe(format_table_br(cpi_view), use_container_width=True)
 
+        render_strategy_sweep(camp_strat, fixos=limiares, regras=etapa_base["base"]["regras"], chave=chave_base)
+
         st.divider()
     with st.expander("Análise Tática por Anúncio", expanded=False):
         if ads_panel is None or (hasattr(ads_panel, "empty") and ads_panel.empty):
@@ -1617,6 +1954,8 @@ def main():
     with tab_entrar:
         st.subheader("Oportunidades para entrar em Ads")
         st.info("Anúncios orgânicos com alta conversão que ainda não estão em Ads.")
+        if lista_limite and len(enter) >= lista_limite:
+            st.caption(f"Mostrando os {int(lista_limite)} melhores anúncios. O Excel do relatório traz a lista completa.")
         st.dataframe(enter_fmt, use_container_width=True)
 
     with tab_escalar:
@@ -1632,7 +1971,7 @@ def main():
     # -------------------------
     # Visão de Estoque (opcional)
     # -------------------------
-    if "usar_estoque" in locals() and usar_estoque and estoque_file is not None:
+    if usar_estoque and estoque_file is not None:
         with st.expander("📦 Visão de Estoque", expanded=False):
             if not blocked_stock.empty:
                 st.subheader("Bloqueados por estoque (iriam para Ads, mas não têm quantidade mínima)")
@@ -1643,7 +1982,7 @@ def main():
             # Risco de ruptura dentro das ações
             risco = pd.concat([pause_disp, scale_disp, acos_disp], ignore_index=True)
             if "Estoque_Status" in risco.columns:
-                risco = risco[risco["Estoque_Status"].isin(["ZERADO", "CRITICO", "BAIXO"])].copy()
+                risco = risco[risco["Estoque_Status"].isin(["ZERADO", "CRITICO", "BAIXO"])]
             if not risco.empty:
                 st.subheader("Risco de ruptura nas ações")
                 risco_view = prepare_df_for_view(replace_acos_obj_with_roas_obj(risco), drop_cpi_cols=True, drop_roas_generic=False)
@@ -1658,14 +1997,10 @@ def main():
         try:
             from engine_integration import render_engine_features
             # Garantir que usamos o stock_df carregado se disponível
-            current_stock_df = None
-            if "usar_estoque" in locals() and usar_estoque and "stock_df" in locals():
-                current_stock_df = stock_df
-                
             render_engine_features(
                 camp_strat=camp_strat,
-                stock_df=current_stock_df,
-                usar_estoque=usar_estoque if "usar_estoque" in locals() else False,
+                stock_df=stock_df if usar_estoque else None,
+                usar_estoque=usar_estoque,
                 fmt_money_br_func=fmt_money_br,
                 fmt_int_br_func=fmt_int_br
             )
@@ -1682,18 +2017,21 @@ def main():
     
     if selected_marketplace == "mercado_livre":
         try:
-            excel_bytes = ml.gerar_excel(
-                kpis=kpis,
-                camp_agg=camp_agg,
-                pause=pause,
-                enter=enter,
-                scale=scale,
-                acos=acos,
-                camp_strat=camp_strat,
-                ads_panel=ads_panel,
-                camp_strat_comp=camp_strat_comp,
-                daily=None,
-            )
+            # Gerado só no clique (o Streamlit chama a função): o ranking completo do
+            # "Entrar em Ads" (tabelas.enter_completo) não é calculado sem exportação.
+            def excel_bytes():
+                return ml.gerar_excel(
+                    kpis=kpis,
+                    camp_agg=camp_agg,
+                    pause=pause,
+                    enter=tabelas.enter_completo,
+                    scale=scale,
+                    acos=acos,
+                    camp_strat=camp_strat,
+                    ads_panel=ads_panel,
+                    camp_strat_comp=camp_strat_comp,
+                    daily=daily,
+                )
 
             st.download_button(
                 "Baixar Excel do relatório",
@@ -1716,19 +2054,19 @@ def main():
                 kpis_df.to_excel(writer, sheet_name='KPIs_Gerais', index=False)
                 
                 # Aba de Dados Gerais
-                if 'df_shopee_geral' in locals():
+                if df_shopee_geral is not None:
                     df_shopee_geral.to_excel(writer, sheet_name='Dados_Gerais', index=False)
                 
                 # Aba de Proteção de ROAS
-                if 'df_shopee_protecao' in locals():
+                if df_shopee_protecao is not None:
                     df_shopee_protecao.to_excel(writer, sheet_name='Protecao_ROAS', index=False)
                 
                 # Aba de Conversões
-                if 'df_shopee_conversoes' in locals():
+                if df_shopee_conversoes is not None:
                     df_shopee_conversoes.to_excel(writer, sheet_name='Analise_Conversoes', index=False)
                 
                 # Aba de Palavras-chave
-                if 'df_shopee_keywords' in locals() and df_shopee_keywords is not None:
+                if df_shopee_keywords is not None:
                     df_shopee_keywords.to_excel(writer, sheet_name='Palavras_Chave', index=False)
             
             excel_data = output.getvalue()
@@ -1843,4 +2181,12 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    if rcopies.tracking_enabled():
+        # ML_REPORT_COPY_STATS=1: cópias de DataFrame por etapa desta execução vão para o log
+        with rcopies.track_copies(rcopies.limit_mb()) as copias:
+            try:
+                main()
+            finally:
+                rcopies.log_copies(copias)
+    else:
+        main()
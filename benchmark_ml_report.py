@@ -0,0 +1,660 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Script de benchmark do ml_report (tempos e memoria).
+
+A equivalencia com as implementacoes anteriores fica nos testes (``python -m pytest``);
+os dados sinteticos e as referencias vem de ``tests/fixtures.py`` e ``tests/legacy.py``.
+
+Uso:
+    python benchmark_ml_report.py            # roda tudo
+    python benchmark_ml_report.py numerico   # apenas o parser pt-BR
+    python benchmark_ml_report.py streaming  # leitura do Patrocinados em streaming
+    python benchmark_ml_report.py backends   # calamine x openpyxl nos loaders
+    python benchmark_ml_report.py cache      # cache em disco (miss x hit)
+    python benchmark_ml_report.py projecao   # loaders so com as colunas do pipeline
+"""
+
+import os
+import sys
+import time
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+import excel_reader
+import ml_report as ml
+import shopee_report as shopee
+from tests import legacy
+from tests.fixtures import (
+    FORMAT_LOADERS,
+    LIMIARES,
+    build_tables_from,
+    make_ads_camp_strat,
+    make_ads_frame,
+    make_bundle,
+    make_campaign_table,
+    make_campanha_diario_xlsx,
+    make_campanha_xlsx,
+    make_catalogo_fora_ads,
+    make_estoque_para,
+    make_estoque_xlsx,
+    make_organico_xlsx,
+    make_painel_com_sku,
+    make_patrocinados_xlsx,
+    make_shopee_frame,
+    pipeline_completo,
+    report_loaders,
+    sem_campanha,
+    tabelas_catalogo,
+)
+
+
+def _timeit(fn, repeat=3):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return best
+
+
+# -------------------------
+# Parser numerico pt-BR
+# -------------------------
+def _synthetic_ptbr_column(n: int, seed: int = 0) -> pd.Series:
+    rng = np.random.default_rng(seed)
+    vals = rng.uniform(0, 50_000, size=n).round(2)
+    txt = pd.Series(vals).map(lambda v: f"R$ {v:,.2f}".replace(",", "X").replace(".", ",").replace("X", "."))
+    txt = txt.astype(object)
+    txt[rng.random(n) < 0.05] = ""
+    txt[rng.random(n) < 0.05] = np.nan
+    return txt
+
+
+def bench_numeric_ptbr(sizes=(10_000, 100_000, 1_000_000)):
+    print(f"{'linhas':>10} | {'apply (s)':>10} | {'vetorizado (s)':>14} | {'ganho':>6}")
+    for n in sizes:
+        s = _synthetic_ptbr_column(n)
+        repeat = 1 if n >= 1_000_000 else 3
+        t_old = _timeit(lambda: legacy.ptbr_reference(s), repeat=repeat)
+        t_new = _timeit(lambda: ml._coerce_series_numeric_ptbr(s), repeat=repeat)
+        print(f"{n:>10,} | {t_old:>10.3f} | {t_new:>14.3f} | {t_old / max(t_new, 1e-9):>5.1f}x")
+
+
+# -------------------------
+# Leitura em streaming do Patrocinados
+# -------------------------
+def _peak_mb(fn):
+    import tracemalloc
+
+    tracemalloc.start()
+    try:
+        t0 = time.perf_counter()
+        fn()
+        dt = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return dt, peak / 1e6
+
+
+def bench_streaming_patrocinados(sizes=(10_000, 40_000)):
+    print(f"{'linhas':>10} | {'arquivo MB':>10} | {'completo s / MB':>16} | {'streaming s / MB':>17}")
+    for n in sizes:
+        arq = make_patrocinados_xlsx(n)
+        t_full, m_full = _peak_mb(lambda: ml.load_patrocinados(arq, streaming=False))
+        t_str, m_str = _peak_mb(lambda: ml.load_patrocinados(arq, streaming=True))
+        mb = arq.getbuffer().nbytes / 1e6
+        print(f"{n:>10,} | {mb:>10.1f} | {t_full:>7.2f} / {m_full:>6.0f} | {t_str:>8.2f} / {m_str:>6.0f}")
+
+
+# -------------------------
+# Backends de leitura do xlsx (calamine x openpyxl)
+# -------------------------
+def bench_backends(sizes=(5_000, 50_000)):
+    engines = excel_reader.available_engines()
+    print(f"{'relatorio':>12} | {'linhas':>8} | " + " | ".join(f"{e + ' (s)':>14}" for e in engines))
+    for n in sizes:
+        for nome, (arq, loader) in report_loaders(n).items():
+            tempos = [_timeit(lambda: loader(arq, engine=e), repeat=1 if n >= 50_000 else 3) for e in engines]
+            print(f"{nome:>12} | {n:>8,} | " + " | ".join(f"{t:>14.3f}" for t in tempos))
+
+
+# -------------------------
+# Cache em disco dos loaders
+# -------------------------
+def bench_report_cache(n: int = 20_000):
+    import tempfile
+
+    import report_cache
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = report_cache.ReportCache(cache_dir=tmp, version=ml.LOADER_VERSION)
+        print(f"{'loader':>28} | {'miss (s)':>9} | {'hit (ms)':>9}")
+        for arq, loader in [
+            (make_organico_xlsx(n), ml.load_organico),
+            (make_patrocinados_xlsx(n), ml.load_patrocinados),
+            (make_campanha_xlsx(max(n // 50, 10)), ml.load_campanhas_consolidado),
+        ]:
+            t0 = time.perf_counter()
+            cache.load(loader, arq)
+            t_miss = time.perf_counter() - t0
+            t_hit = _timeit(lambda: cache.load(loader, arq))
+            print(f"{loader.__name__:>28} | {t_miss:>9.3f} | {t_hit * 1000:>9.1f}")
+        print(cache.summary())
+
+
+# -------------------------
+# Projecao de colunas nos loaders
+# -------------------------
+def bench_projection(n: int = 30_000, extra_cols=(0, 20)):
+    print(f"{'loader':>18} | {'extras':>6} | {'keep_raw s / MB':>16} | {'projecao s / MB':>16}")
+    for extra in extra_cols:
+        for nome, arq, loader in [
+            ("load_organico", make_organico_xlsx(n, extra_cols=extra), ml.load_organico),
+            ("load_patrocinados", make_patrocinados_xlsx(n, extra_cols=extra), ml.load_patrocinados),
+        ]:
+            linha = []
+            for keep_raw in (True, False):
+                t = _timeit(lambda: loader(arq, keep_raw=keep_raw), repeat=2)
+                mb = loader(arq, keep_raw=keep_raw).memory_usage(deep=True).sum() / 1e6
+                linha.append(f"{t:>7.2f} / {mb:>6.1f}")
+            print(f"{nome:>18} | {extra:>6} | {linha[0]:>16} | {linha[1]:>16}")
+
+
+# -------------------------
+# Tipos compactos apos a leitura
+# -------------------------
+def _build_tables_peak_mb(org_data: bytes, pat_data: bytes, camp_data: bytes, compactar: bool):
+    """Memoria dos frames de entrada e pico de RSS do build_tables (12 saidas) acima deles (processo novo)."""
+    import gc
+
+    import report_dtypes
+
+    org, pat = ml.load_organico(BytesIO(org_data)), ml.load_patrocinados(BytesIO(pat_data))
+    camp = ml.load_campanhas_consolidado(BytesIO(camp_data))
+    if compactar:
+        frames, _ = report_dtypes.compact_frames({"vendas": org, "patrocinados": pat, "campanha": camp})
+        org, pat, camp = frames["vendas"], frames["patrocinados"], frames["campanha"]
+    build_tables_from(org.head(100), pat.head(100), camp)
+    gc.collect()
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    antes = _status_mb("VmRSS")
+    build_tables_from(org, pat, camp)
+    return sum(report_dtypes.memory_mb(df) for df in (org, pat, camp)), _status_mb("VmHWM") - antes
+
+
+def bench_compact_peak(n: int = 100_000, repeticoes: int = 2):
+    """Frames parados + pico do build_tables com os tipos do loader e com os tipos compactos."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    dados = (make_organico_xlsx(n).getvalue(), make_patrocinados_xlsx(n).getvalue(), make_campanha_xlsx(max(n // 50, 10)).getvalue())
+    # alocadores que devolvem a memoria liberada: o RSS acompanha o que esta vivo
+    alocadores = {"MALLOC_MMAP_THRESHOLD_": "65536", "MALLOC_TRIM_THRESHOLD_": "0", "MALLOC_ARENA_MAX": "1", "ARROW_DEFAULT_MEMORY_POOL": "system"}
+    anterior = {k: os.environ.get(k) for k in alocadores}
+    os.environ.update(alocadores)
+    medidas = {False: [], True: []}
+    try:
+        for _ in range(repeticoes):
+            for compactar in (False, True):
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                    medidas[compactar].append(pool.submit(_build_tables_peak_mb, *dados, compactar).result())
+    finally:
+        for k, v in anterior.items():
+            if v is None:
+                os.environ.pop(k, None)
+            else:
+                os.environ[k] = v
+    total = {c: max(f + p for f, p in m) for c, m in medidas.items()}
+    for c, rotulo in ((False, "tipos do loader"), (True, "tipos compactos")):
+        f, p = max(medidas[c], key=lambda fp: fp[0] + fp[1])
+        print(f"{n:,} linhas, {rotulo:>15}: frames {f:.1f} MB + pico do build_tables {p:.1f} MB = {total[c]:.1f} MB")
+    print(f"tipos compactos: {total[False] - total[True]:.1f} MB a menos que os tipos do loader no total")
+
+
+def bench_compact(n: int = 50_000):
+    import report_dtypes
+
+    frames = {
+        "vendas": ml.load_organico(make_organico_xlsx(n)),
+        "patrocinados": ml.load_patrocinados(make_patrocinados_xlsx(n)),
+        "campanha": ml.load_campanhas_consolidado(make_campanha_xlsx(max(n // 50, 10))),
+    }
+    t0 = time.perf_counter()
+    compactos, relatorio = report_dtypes.compact_frames(frames)
+    t_compact = time.perf_counter() - t0
+    t_restore = _timeit(lambda: [report_dtypes.restore_frame(df) for df in compactos.values()])
+    print(f"{'frame':>14} | {'linhas':>7} | {'antes MB':>9} | {'depois MB':>9} | {'reducao':>7}")
+    for r in relatorio:
+        print(f"{r['frame']:>14} | {r['linhas']:>7} | {r['antes_mb']:>9.2f} | {r['depois_mb']:>9.2f} | {r['reducao_pct']:>6.0f}%")
+        for c, tipos in r["colunas_compactadas"].items():
+            print(f"{'':>14}   {c!r}: {tipos}")
+    print(f"compactar {t_compact:.3f}s | restaurar {t_restore:.3f}s")
+
+
+# -------------------------
+# Validacao rapida dos uploads
+# -------------------------
+def bench_validation(n: int = 100_000):
+    import report_validation
+
+    for rel, arq, loader in [
+        ("vendas", make_organico_xlsx(n), ml.load_organico),
+        ("patrocinados", make_patrocinados_xlsx(n), ml.load_patrocinados),
+        ("estoque", make_estoque_xlsx(n), ml.load_estoque),
+    ]:
+        t_val = _timeit(lambda: report_validation.validate_upload(rel, arq))
+        t_load = _timeit(lambda: loader(arq), repeat=1)
+        print(f"{rel:>14} ({n} linhas): validacao {t_val * 1000:>6.1f} ms | leitura completa {t_load:.2f}s")
+
+
+# -------------------------
+# Historico diario incremental de campanhas
+# -------------------------
+def bench_history(n_campanhas: int = 200, meses: int = 6):
+    import tempfile
+
+    import report_history
+
+    dias_total = meses * 30
+    with tempfile.TemporaryDirectory() as d:
+        hist = report_history.CampaignHistory("bench", base_dir=d)
+        inicio = pd.Timestamp("2026-01-01")
+        # historico ja montado com os exports anteriores (janelas de 30 dias)
+        for k in range(0, dias_total - 30 + 1, 30):
+            hist.ingest(make_campanha_diario_xlsx(n_campanhas, 30, (inicio + pd.Timedelta(days=k)).strftime("%Y-%m-%d")))
+        hoje = make_campanha_diario_xlsx(n_campanhas, 30, (inicio + pd.Timedelta(days=dias_total - 29)).strftime("%Y-%m-%d"))
+        periodo = make_campanha_diario_xlsx(n_campanhas, dias_total + 1, inicio.strftime("%Y-%m-%d"))
+
+        t_full = _timeit(lambda: ml.build_daily_from_diario(ml.load_campanhas_diario(periodo)), repeat=1)
+        t_janela = _timeit(lambda: ml.load_campanhas_diario(hoje), repeat=1)
+        t0 = time.perf_counter()
+        info = hist.ingest(hoje)
+        t_inc = time.perf_counter() - t0
+        t_hist = _timeit(lambda: hist.daily())
+    print(f"{n_campanhas} campanhas, {dias_total + 1} dias no historico")
+    print(f"releitura do periodo inteiro (xlsx) + serie diaria: {t_full:.3f}s")
+    print(f"export de hoje, leitura completa: {t_janela:.3f}s | incremental: {t_inc:.3f}s "
+          f"({info['dias_novos']} novo, {info['dias_ignorados']} ignorados)")
+    print(f"serie diaria lida do historico: {t_hist:.3f}s")
+
+
+# -------------------------
+# Relatorios compartilhados entre sessoes (Arrow IPC mapeado)
+# -------------------------
+def _private_mb() -> float:
+    """Memoria privada do processo (Private_Clean + Private_Dirty); paginas mapeadas de /dev/shm nao entram."""
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            return sum(int(l.split()[1]) for l in f if l.startswith(("Private_Clean", "Private_Dirty"))) / 1024
+    except OSError:
+        return float("nan")
+
+
+def _shared_session(base_dir: str, key: str, holder: str, copiar: bool) -> float:
+    """Uma "sessao" em outro processo: abre o relatorio publicado e le todas as colunas numericas."""
+    import report_shared
+
+    antes = _private_mb()
+    df = report_shared.SharedFrameStore(base_dir=base_dir).get(key, holder)
+    if copiar:
+        df = df.copy(deep=True)
+    for c in df.columns:
+        if pd.api.types.is_numeric_dtype(df[c]):
+            np.asarray(df[c]).sum()
+    return _private_mb() - antes
+
+
+def bench_shared(n: int = 100_000, sessoes: int = 3):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    import report_dtypes
+    import report_shared
+
+    df = report_dtypes.compact_frame(ml.load_patrocinados(make_patrocinados_xlsx(n)))
+    base = report_shared.DEFAULT_SHARED_DIR + "_bench"
+    store = report_shared.SharedFrameStore(base_dir=base)
+    store.publish(f"bench_{n}", df, "bench")
+    print(f"patrocinados {n} linhas: {report_dtypes.memory_mb(df):.1f} MB em memoria | {store.summary()['tamanho_mb']:.1f} MB em {base}")
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=sessoes, mp_context=ctx) as pool:
+        for copiar, nome in ((True, "copia propria"), (False, "arquivo mapeado")):
+            deltas = list(pool.map(_shared_session, [base] * sessoes, [f"bench_{n}"] * sessoes,
+                                   [f"s{i}" for i in range(sessoes)], [copiar] * sessoes))
+            print(f"{nome:>16}: memoria privada por sessao {np.mean(deltas):>6.1f} MB ({sessoes} sessoes)")
+    for i in range(sessoes):
+        store.release(f"bench_{n}", f"s{i}")
+    store.release(f"bench_{n}", "bench")
+    print(f"apos soltar todas as sessoes: {store.summary()['arquivos']} arquivos")
+
+
+# -------------------------
+# Entrada em CSV e Parquet
+# -------------------------
+def bench_formats(n: int = 50_000):
+    print(f"{'loader':>28} | {'xlsx (s)':>9} | {'csv (s)':>9} | {'parquet (s)':>11}")
+    for nome, make, loader in FORMAT_LOADERS[:3]:
+        k = n if "campanha" not in nome else max(n // 50, 10)
+        tempos = [_timeit(lambda: loader(arq), repeat=2) for arq in (make(k), make(k, fmt="csv"), make(k, fmt="parquet"))]
+        print(f"{nome:>28} | {tempos[0]:>9.3f} | {tempos[1]:>9.3f} | {tempos[2]:>11.3f}")
+
+
+# -------------------------
+# Leitura paralela do lote
+# -------------------------
+def bench_ingest(n: int = 20_000):
+    import report_ingest
+
+    tasks = {
+        "vendas": (ml.load_organico, make_organico_xlsx(n)),
+        "patrocinados": (ml.load_patrocinados, make_patrocinados_xlsx(n)),
+        "campanha": (ml.load_campanhas_consolidado, make_campanha_xlsx(max(n // 50, 10))),
+        "estoque": (ml.load_estoque, make_estoque_xlsx(n)),
+    }
+    seq = report_ingest.load_reports(tasks, parallel=False)
+    report_ingest.load_reports(tasks, parallel=True)  # aquece o pool (spawn + imports)
+    par = report_ingest.load_reports(tasks, parallel=True)
+    assert not seq["erros"] and not par["erros"], (seq["erros"], par["erros"])
+    print(f"workers={report_ingest.MAX_WORKERS} | sequencial {seq['tempo_total']:.3f}s | paralelo {par['tempo_total']:.3f}s")
+    for k in tasks:
+        print(f"{k:>14} | {seq['tempos'][k]:>7.3f}s | {par['tempos'][k]:>7.3f}s ({par['origem'][k]})")
+
+
+def bench_bundle(n: int = 20_000):
+    import report_bundle
+
+    pacote = make_bundle(n)
+    t0 = time.perf_counter()
+    report_bundle.scan_bundle(pacote)
+    t_scan = time.perf_counter() - t0
+    seq = report_bundle.load_bundle(pacote, parallel=False)
+    report_bundle.load_bundle(pacote, parallel=True)  # aquece o pool
+    par = report_bundle.load_bundle(pacote, parallel=True)
+    print(
+        f"{len(pacote.getvalue()) / 1e6:.1f} MB zipados | identificação {t_scan:.3f}s | "
+        f"sequencial {seq['ingestao']['tempo_total']:.3f}s | paralelo {par['ingestao']['tempo_total']:.3f}s"
+    )
+
+
+# -------------------------
+# Orcamento de memoria (estimativa antes do parse)
+# -------------------------
+def _status_mb(campo: str) -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(campo + ":"):
+                return int(line.split()[1]) / 1024
+    return float("nan")
+
+
+def _loader_peak_mb(loader, data: bytes, kwargs, aquecimento: bytes) -> float:
+    """Pico de RSS acima do processo ja carregado (roda em um processo novo por medicao)."""
+    import gc
+
+    # arquivo pequeno antes: imports e caches do leitor ja estao feitos no app
+    loader(BytesIO(aquecimento), **kwargs)
+    gc.collect()
+    # zera o pico (VmHWM) herdado do processo pai
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    antes = _status_mb("VmRSS")
+    loader(BytesIO(data), **kwargs)
+    return _status_mb("VmHWM") - antes
+
+
+def _pipeline_peak_mb(org_data: bytes, pat_data: bytes, camp_data: bytes) -> float:
+    import gc
+
+    org, pat = ml.load_organico(BytesIO(org_data)), ml.load_patrocinados(BytesIO(pat_data))
+    camp = ml.load_campanhas_consolidado(BytesIO(camp_data))
+    build_tables_from(org.head(100), pat.head(100), camp)
+    gc.collect()
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+    antes = _status_mb("VmRSS")
+    build_tables_from(org, pat, camp)
+    return _status_mb("VmHWM") - antes
+
+
+def bench_memory(n: int = 30_000):
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    import report_memory
+
+    casos = [
+        ("vendas", make_organico_xlsx, {}, ml.load_organico, {}),
+        ("vendas", make_organico_xlsx, {}, ml.load_organico, {"streaming": True}),
+        ("patrocinados", make_patrocinados_xlsx, {}, ml.load_patrocinados, {"streaming": False}),
+        ("patrocinados", make_patrocinados_xlsx, {}, ml.load_patrocinados, {"streaming": True}),
+        ("patrocinados", make_patrocinados_xlsx, {"fmt": "csv"}, ml.load_patrocinados, {}),
+        ("patrocinados", make_patrocinados_xlsx, {"fmt": "parquet"}, ml.load_patrocinados, {}),
+        ("estoque", make_estoque_xlsx, {}, ml.load_estoque, {}),
+    ]
+    print(f"{'relatorio':>14} {'modo':>10} | {'estimativa ms':>13} | {'estimado MB':>11} | {'medido MB':>9}")
+    for rel, make, make_kw, loader, kw in casos:
+        arq, aquecimento = make(n, **make_kw), make(200, **make_kw).getvalue()
+        t0 = time.perf_counter()
+        est = report_memory.estimate_file(rel, arq)
+        dt = time.perf_counter() - t0
+        modo = "streaming" if kw.get("streaming") else est["formato"]
+        estimado = est["leitura_streaming_mb"] if kw.get("streaming") else est["leitura_mb"]
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+            medido = pool.submit(_loader_peak_mb, loader, arq.getvalue(), kw, aquecimento).result()
+        print(f"{rel:>14} {modo:>10} | {dt * 1000:>13.1f} | {estimado:>11.0f} | {medido:>9.0f}")
+
+    arquivos = {"vendas": make_organico_xlsx(n), "patrocinados": make_patrocinados_xlsx(n), "campanha": make_campanha_xlsx(max(n // 50, 10))}
+    t0 = time.perf_counter()
+    plano = report_memory.plan_ingest(arquivos, budget=1e6)
+    dt = time.perf_counter() - t0
+    estimado = plano["estimativa_mb"] - plano["rss_mb"]
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+        medido = pool.submit(_pipeline_peak_mb, *(a.getvalue() for a in arquivos.values())).result()
+    print(f"{'build_tables':>14} {'':>10} | {dt * 1000:>13.1f} | {estimado:>11.0f} | {medido:>9.0f}")
+
+
+# -------------------------
+# Regras de estrategia das campanhas (add_strategy_fields, conjunto "campanha" do report_rules)
+# -------------------------
+def bench_strategy(sizes=(1_000, 10_000, 50_000)):
+    print(f"{'campanhas':>10} | {'linha a linha s':>15} | {'regras s':>12} | {'ganho':>6}")
+    for n in sizes:
+        camp = make_campaign_table(n)
+        t_old = _timeit(lambda: legacy.add_strategy_fields_linha(camp), repeat=1)
+        t_new = _timeit(lambda: ml.add_strategy_fields(camp))
+        print(f"{n:>10,} | {t_old:>15.3f} | {t_new:>12.4f} | {t_old / t_new:>5.0f}x")
+
+
+# -------------------------
+# Classificador de anuncios (build_ads_panel)
+# -------------------------
+def bench_ads_panel(sizes=(10_000, 100_000)):
+    camp_strat = make_ads_camp_strat()
+    print(f"{'anuncios':>10} | {'linha a linha s':>15} | {'vetorizado s':>12} | {'ganho':>6}")
+    for n in sizes:
+        pat = make_ads_frame(n)
+        t_old = _timeit(lambda: legacy.build_ads_panel_linha(pat, camp_strat), repeat=1)
+        t_new = _timeit(lambda: ml.build_ads_panel(pat, camp_strat))
+        print(f"{n:>10,} | {t_old:>15.2f} | {t_new:>12.3f} | {t_old / t_new:>5.0f}x")
+
+
+# -------------------------
+# Consolidado por campanha do painel de anuncios (codigos inteiros, sem merge)
+# -------------------------
+def bench_campaign_rollup(sizes=(100_000, 1_000_000)):
+    print(f"{'anuncios':>10} | {'campanhas':>9} | {'merge s':>8} | {'codigos s':>9} | {'ganho':>6}")
+    for n in sizes:
+        for n_camp in (300, 20_000):
+            camp_strat = make_ads_camp_strat(n_camp)
+            # so o trecho do consolidado: a base antes dele vem pronta nos dois lados
+            sem = sem_campanha(make_ads_frame(n, n_campanhas=n_camp))
+            t_old = _timeit(lambda: legacy.campanha_por_merge(sem, camp_strat))
+            t_new = _timeit(lambda: ml._campaign_rollup(sem, camp_strat))
+            print(f"{n:>10,} | {n_camp:>9,} | {t_old:>8.3f} | {t_new:>9.3f} | {t_old / t_new:>5.1f}x")
+
+
+# -------------------------
+# Indice de entidades (report_entities): juncoes por codigo inteiro
+# -------------------------
+def bench_entity_index(n: int = 200_000):
+    import app
+    import report_entities
+
+    painel = make_painel_com_sku(n)
+    estoque = make_estoque_para(painel)
+    snap = painel.sample(frac=0.8, random_state=3)[["ID", "Investimento", "Receita", "ROAS_Real"]]
+    t_idx = _timeit(lambda: report_entities.build_entity_index(pat=painel, estoque=estoque))
+    entidades = report_entities.build_entity_index(pat=painel, estoque=estoque)
+    t_old = _timeit(lambda: legacy.enrich_with_stock_merge(painel, estoque))
+    t_new = _timeit(lambda: app.enrich_with_stock(painel, estoque, entidades))
+    print(f"{len(painel):,} anuncios | indice {t_idx:.3f}s (uma vez por execucao)")
+    print(f"  estoque (MLB + SKU): texto {t_old:.3f}s | codigos {t_new:.3f}s ({t_old / t_new:.1f}x)")
+    snap_ren = snap.rename(columns={"Investimento": "Investimento_Snap", "Receita": "Receita_Snap", "ROAS_Real": "ROAS_Real_Snap"})
+    t_old = _timeit(lambda: painel.assign(ID=painel["ID"].astype(str).str.strip()).merge(
+        snap_ren.assign(ID=snap_ren["ID"].astype(str).str.strip()), on="ID", how="left", suffixes=("_Atual", "_Snap")))
+    t_new = _timeit(lambda: report_entities.left_join(painel, snap_ren, "ID", "ID", "mlb", entidades, suffixes=("_Atual", "_Snap")))
+    print(f"  snapshot de anuncios: texto {t_old:.3f}s | codigos {t_new:.3f}s ({t_old / t_new:.1f}x)")
+
+
+# -------------------------
+# Tabelas de regras (report_rules)
+# -------------------------
+def bench_rules(sizes=(10_000, 100_000)):
+    print(f"{'campanhas':>10} | {'shopee por linha s':>18} | {'tabela s':>9} | {'ganho':>6}")
+    for n in sizes:
+        df = make_shopee_frame(n)
+        t_old = _timeit(lambda: legacy.gerar_recomendacoes_shopee_linha(df, {}), repeat=1)
+        t_new = _timeit(lambda: shopee.gerar_recomendacoes_shopee(df, {}))
+        print(f"{n:>10,} | {t_old:>18.3f} | {t_new:>9.4f} | {t_old / t_new:>5.0f}x")
+
+
+# -------------------------
+# Etapa sem limiares + etapa dos limiares (prepare_tables / apply_thresholds)
+# -------------------------
+def bench_threshold_stage(n: int = 100_000):
+    org = ml.load_organico(make_organico_xlsx(n))
+    pat = ml.load_patrocinados(make_patrocinados_xlsx(n, n_campanhas=300))
+    camp = ml.load_campanhas_consolidado(make_campanha_xlsx(300))
+
+    def _completo():
+        tuple(ml.build_tables(org=org, camp_agg=ml.build_campaign_agg(camp, modo="consolidado"), pat=pat, **LIMIARES[1]))
+
+    base = ml.prepare_tables(org, ml.build_campaign_agg(camp, modo="consolidado"), pat)
+    t_full = _timeit(_completo, repeat=2)
+    t_thr = _timeit(lambda: tuple(ml.apply_thresholds(base, **LIMIARES[1])))
+    print(f"{n:,} anuncios: pipeline completo (sem leitura) {t_full:.3f}s | so limiares {t_thr:.3f}s ({t_full / t_thr:.0f}x)")
+
+
+# -------------------------
+# Saidas sob demanda do build_tables (ReportTables)
+# -------------------------
+def bench_lazy_tables(n: int = 100_000):
+    org = ml.load_organico(make_organico_xlsx(n))
+    pat = ml.load_patrocinados(make_patrocinados_xlsx(n, n_campanhas=300))
+    camp = ml.load_campanhas_consolidado(make_campanha_xlsx(300))
+    base = ml.prepare_tables(org, ml.build_campaign_agg(camp, modo="consolidado"), pat)
+    kw = LIMIARES[2]
+    t_old = _timeit(lambda: legacy.apply_thresholds_tupla(base, **kw))
+    t_all = _timeit(lambda: tuple(ml.apply_thresholds(base, **kw)))
+    t_camp = _timeit(lambda: (lambda t: (t.pause, t.scale, t.acos))(ml.apply_thresholds(base, **kw)))
+    t_ads = _timeit(lambda: (lambda t: (t.ads_pausar, t.ads_vencedores))(ml.apply_thresholds(base, **kw)))
+    print(f"{n:,} anuncios | anterior (12 saidas) {t_old:.3f}s | ReportTables 12 saidas {t_all:.3f}s "
+          f"| so campanhas {t_camp:.4f}s | so pausar+vencedores {t_ads:.3f}s")
+
+
+# -------------------------
+# Listas de oportunidade por selecao parcial (top-k)
+# -------------------------
+def bench_top_k(sizes=(100_000, 1_000_000), limite: int = 500):
+    for n in sizes:
+        org = make_catalogo_fora_ads(n)
+        t_full = _timeit(lambda: tabelas_catalogo(org).enter)
+        t_top = _timeit(lambda: tabelas_catalogo(org, enter_limite=limite).enter)
+        t_exp = _timeit(lambda: tabelas_catalogo(org, enter_limite=limite).enter_completo)
+        print(f"{n:,} anuncios fora de Ads | Entrar em Ads ordenado inteiro {t_full:.3f}s "
+              f"| top {limite} {t_top:.3f}s ({t_full / t_top:.1f}x) | exportacao (ranking completo) {t_exp:.3f}s")
+
+
+# -------------------------
+# Copy-on-write sem copias defensivas (report_copies)
+# -------------------------
+def bench_copies(n: int = 100_000):
+    import report_copies
+
+    org = ml.load_organico(make_organico_xlsx(n))
+    pat = ml.load_patrocinados(make_patrocinados_xlsx(n, n_campanhas=300))
+    camp_agg = ml.build_campaign_agg(ml.load_campanhas_consolidado(make_campanha_xlsx(300)), modo="consolidado")
+    entrada_mb = sum(float(f.memory_usage(deep=False).sum()) for f in (org, pat, camp_agg)) / 1e6
+    with report_copies.track_copies() as copias:
+        pipeline_completo(org, pat, camp_agg)
+    t = _timeit(lambda: pipeline_completo(org, pat, camp_agg), repeat=2)
+    rel = report_copies.copy_report(copias)
+    print(f"{n:,} anuncios: pipeline {t:.3f}s | entradas {entrada_mb:.1f} MB | copiado {rel['MB'].sum():.1f} MB "
+          f"({rel['Copias'].sum()} profundas, {rel['Rasas'].sum()} rasas)")
+    print(rel.head(8).to_string(index=False))
+
+
+# -------------------------
+# Varredura de limiares do quadrante (strategy_sweep)
+# -------------------------
+def bench_strategy_sweep(n: int = 2_000, pontos: int = 10):
+    camp_strat = ml.add_strategy_fields(make_campaign_table(n, 22))
+    grade = {
+        "roas_mina": np.linspace(3.0, 12.0, pontos),
+        "lost_budget_mina": np.linspace(0.0, 80.0, pontos),
+        "lost_rank_gigante": np.linspace(10.0, 90.0, pontos),
+        "roas_hemorragia": np.linspace(1.0, 5.0, pontos),
+    }
+    t_um = _timeit(lambda: ml.add_strategy_fields(make_campaign_table(n, 22)))
+    res = ml.strategy_sweep(camp_strat, grade)
+    t_sweep = _timeit(lambda: ml.strategy_sweep(camp_strat, grade))
+    print(
+        f"{n:,} campanhas, {res['cenarios']:,} cenarios: varredura {t_sweep:.2f}s | "
+        f"uma execucao por cenario ~{t_um * res['cenarios']:.0f}s ({t_um * res['cenarios'] / t_sweep:.0f}x)"
+    )
+
+
+BENCHMARKS = {
+    "numerico": [bench_numeric_ptbr],
+    "streaming": [bench_streaming_patrocinados],
+    "backends": [bench_backends],
+    "cache": [bench_report_cache],
+    "projecao": [bench_projection],
+    "ingestao": [bench_ingest],
+    "tipos": [bench_compact_peak, bench_compact],
+    "formatos": [bench_formats],
+    "pacote": [bench_bundle],
+    "compartilhado": [bench_shared],
+    "historico": [bench_history],
+    "validacao": [bench_validation],
+    "memoria": [bench_memory],
+    "estrategia": [bench_strategy],
+    "anuncios": [bench_ads_panel],
+    "regras": [bench_rules],
+    "limiares": [bench_threshold_stage],
+    "varredura": [bench_strategy_sweep],
+    "tabelas": [bench_lazy_tables],
+    "copias": [bench_copies],
+    "consolidado": [bench_campaign_rollup],
+    "entidades": [bench_entity_index],
+    "topk": [bench_top_k],
+}
+
+
+if __name__ == "__main__":
+    import report_copies
+
+    report_copies.enable_copy_on_write()
+    selecionados = sys.argv[1:] or list(BENCHMARKS)
+    for nome in selecionados:
+        print("=" * 60)
+        print(nome.upper())
+        print("=" * 60)
+        for fn in BENCHMARKS[nome]:
+            fn()
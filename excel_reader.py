@@ -0,0 +1,685 @@
+"""
+Leitura de planilhas dos relatórios (xlsx)
+Abre cada upload uma única vez e serve nomes de abas, cabeçalho e DataFrame
+a partir das mesmas células já lidas.
+"""
+
+import csv
+import importlib.util
+import os
+import re
+import sys
+import tracemalloc
+from collections import Counter
+from io import BytesIO
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.io.parsers import TextParser
+
+
+def _safe_seek(x, pos=0):
+    try:
+        x.seek(pos)
+    except Exception:
+        pass
+
+
+# -------------------------
+# Backends de leitura (do mais rápido para o mais lento)
+# -------------------------
+READER_ENGINES = ("calamine", "openpyxl")
+
+# None = automático (calamine quando instalado, senão openpyxl)
+DEFAULT_ENGINE: Optional[str] = None
+
+
+def _engine_installed(engine: str) -> bool:
+    if engine == "calamine":
+        # python-calamine (Rust) + pandas >= 2.2, que traz o leitor "calamine"
+        return (
+            importlib.util.find_spec("python_calamine") is not None
+            and importlib.util.find_spec("pandas.io.excel._calamine") is not None
+        )
+    return importlib.util.find_spec(engine) is not None
+
+
+def available_engines() -> List[str]:
+    return [e for e in READER_ENGINES if _engine_installed(e)]
+
+
+def resolve_engine(engine: Optional[str] = None) -> str:
+    """Backend efetivo: o pedido (ou DEFAULT_ENGINE) ou o mais rápido disponível."""
+    engine = engine or DEFAULT_ENGINE
+    if engine is None:
+        engines = available_engines()
+        return engines[0] if engines else "openpyxl"
+    if engine not in READER_ENGINES:
+        raise ValueError(f"Backend de leitura desconhecido: {engine!r} (opções: {', '.join(READER_ENGINES)})")
+    return engine
+
+
+class WorkbookSession:
+    """
+    Sessão de leitura de um arquivo Excel.
+
+    - o arquivo é aberto uma vez (pd.ExcelFile) e cada aba é lida uma vez;
+    - as células cruas ficam em cache e alimentam tanto a busca do
+      cabeçalho quanto a montagem do DataFrame final;
+    - ``frame`` reproduz o resultado de ``pd.read_excel(..., header=N, dtype=...)``;
+    - ``engine`` escolhe o backend ("calamine" ou "openpyxl"); os dois entregam as
+      mesmas células, então o DataFrame final não depende do backend.
+    """
+
+    def __init__(self, file, engine: Optional[str] = None):
+        self.file = file
+        self.engine = resolve_engine(engine)
+        _safe_seek(file, 0)
+        try:
+            self._xls = pd.ExcelFile(file, engine=self.engine)
+        except Exception:
+            # No modo automático, um arquivo que o calamine recusa ainda passa pelo openpyxl
+            if engine or DEFAULT_ENGINE or self.engine == "openpyxl":
+                raise
+            self.engine = "openpyxl"
+            _safe_seek(file, 0)
+            self._xls = pd.ExcelFile(file, engine=self.engine)
+        self.sheet_names: List[str] = list(self._xls.sheet_names)
+        self._cells: Dict[str, List[List[Any]]] = {}
+
+    @classmethod
+    def open(cls, file, engine: Optional[str] = None):
+        """
+        Reaproveita a sessão (ou leitor em streaming) se o chamador já passou uma.
+
+        CSV e Parquet (detectados pelo conteúdo) abrem uma ``TableSession``, que tem
+        a mesma interface; ``engine`` só vale para Excel.
+        """
+        if isinstance(file, (WorkbookSession, StreamingWorkbook, TableSession)):
+            return file
+        fmt = detect_format(file)
+        if fmt in TABLE_FORMATS:
+            return TableSession(file, fmt=fmt)
+        return cls(file, engine=engine)
+
+    def cells(self, sheet: str, max_rows: Optional[int] = None) -> List[List[Any]]:
+        """Células da aba como lista de linhas (mesmo formato que o read_excel usa internamente)."""
+        if sheet not in self._cells:
+            if sheet not in self.sheet_names:
+                raise ValueError(f"Worksheet named '{sheet}' not found")
+            grid = self._xls.parse(sheet, header=None, dtype=object, na_filter=False)
+            self._cells[sheet] = grid.values.tolist()
+        return self._cells[sheet] if max_rows is None else self._cells[sheet][:max_rows]
+
+    def find_header_row(
+        self,
+        sheet: str,
+        is_header: Callable[[List[Any]], bool],
+        max_rows: int = 40,
+        default: Optional[int] = None,
+    ) -> Optional[int]:
+        """Primeira linha (0-based) entre as ``max_rows`` iniciais aceita por ``is_header``."""
+        for i, row in enumerate(self.cells(sheet)[:max_rows]):
+            if is_header(row):
+                return i
+        return default
+
+    def frame(
+        self,
+        sheet: str,
+        header_row: int = 0,
+        dtype=None,
+        usecols: Optional[Callable[[str], bool]] = None,
+    ) -> pd.DataFrame:
+        """
+        Monta o DataFrame da aba usando ``header_row`` como cabeçalho.
+
+        ``usecols`` recebe o nome de cada coluna e decide se ela entra no
+        DataFrame; as demais não são convertidas nem ocupam memória. Se
+        nenhuma coluna passar no filtro, a aba é montada inteira.
+        """
+        cells = self.cells(sheet)
+        kwargs = {}
+        if usecols is not None:
+            header = cells[header_row] if header_row < len(cells) else []
+            keep = [i for i, name in enumerate(_header_names(header)) if usecols(name)]
+            if keep:
+                kwargs["usecols"] = keep
+        parser = TextParser(
+            cells,
+            header=header_row,
+            dtype=dtype,
+            skip_blank_lines=False,
+            **kwargs,
+        )
+        return parser.read()
+
+
+# -------------------------
+# CSV e Parquet
+# -------------------------
+# Assinaturas dos primeiros bytes; o que não casa com nenhuma é tratado como CSV
+_MAGIC = ((b"PK\x03\x04", "xlsx"), (b"\xd0\xcf\x11\xe0", "xls"), (b"PAR1", "parquet"))
+TABLE_FORMATS = ("csv", "parquet")
+
+# Separadores aceitos no CSV (o pt-BR costuma usar ";" porque "," é a vírgula decimal)
+_CSV_DELIMITERS = (";", ",", "\t", "|")
+
+# Trecho inicial do CSV usado para achar separador, codificação e cabeçalho
+_CSV_HEAD_BYTES = 256 * 1024
+
+
+def file_bytes(file) -> bytes:
+    """Conteúdo do upload (UploadedFile, BytesIO, caminho ou arquivo aberto)."""
+    if isinstance(file, (bytes, bytearray)):
+        return bytes(file)
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as fh:
+            return fh.read()
+    getvalue = getattr(file, "getvalue", None)
+    if getvalue is not None:
+        return getvalue()
+    pos = file.tell()
+    file.seek(0)
+    data = file.read()
+    file.seek(pos)
+    return data
+
+
+def _head_bytes(file, n: int) -> bytes:
+    if isinstance(file, (bytes, bytearray)):
+        return bytes(file[:n])
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as fh:
+            return fh.read(n)
+    getbuffer = getattr(file, "getbuffer", None)
+    if getbuffer is not None:
+        return bytes(getbuffer()[:n])
+    pos = file.tell()
+    file.seek(0)
+    head = file.read(n)
+    file.seek(pos)
+    return head
+
+
+def detect_format(file) -> str:
+    """Formato do upload ("xlsx", "xls", "parquet" ou "csv") pelo conteúdo, não pelo nome."""
+    if isinstance(file, (WorkbookSession, StreamingWorkbook)):
+        return "xlsx"
+    if isinstance(file, TableSession):
+        return file.format
+    head = _head_bytes(file, 8)
+    for magic, fmt in _MAGIC:
+        if head.startswith(magic):
+            return fmt
+    return "csv"
+
+
+def _arrow_csv_available() -> bool:
+    return importlib.util.find_spec("pyarrow") is not None
+
+
+def _csv_encoding(lines: List[bytes]) -> str:
+    # Exportações do ML vêm em UTF-8 (às vezes com BOM); planilhas salvas no Excel, em cp1252
+    try:
+        for line in lines:
+            line.decode("utf-8")
+    except UnicodeDecodeError:
+        return "cp1252"
+    return "utf-8"
+
+
+def _pick_delimiter(rows_for: Callable[..., List[Tuple[List[str], int]]]) -> str:
+    """Separador que divide as linhas iniciais no mesmo número de campos (o maior, no empate)."""
+    best, best_score = _CSV_DELIMITERS[0], (0, 0)
+    for delim in _CSV_DELIMITERS:
+        counts = Counter(len(row) for row, _ in rows_for(40, delimiter=delim) if len(row) > 1)
+        if not counts:
+            continue
+        width, n_lines = counts.most_common(1)[0]
+        if (n_lines, width) > best_score:
+            best, best_score = delim, (n_lines, width)
+    return best
+
+
+class TableSession:
+    """
+    Relatório em CSV ou Parquet com a mesma interface da WorkbookSession.
+
+    O arquivo é uma tabela só, então qualquer aba pedida pelos loaders aponta
+    para ela. No CSV, separador e codificação saem do conteúdo e o cabeçalho é
+    procurado nas primeiras linhas (como no xlsx, pode haver linhas de título
+    antes); o corpo é lido pelo leitor CSV do pyarrow a partir do cabeçalho, com
+    todas as colunas como texto, para o parser pt-BR dos loaders converter os
+    números. No Parquet o cabeçalho são os nomes das colunas e os tipos do
+    arquivo são mantidos.
+    """
+
+    def __init__(self, file, fmt: Optional[str] = None):
+        self.file = file
+        self.format = fmt or detect_format(file)
+        if self.format not in TABLE_FORMATS:
+            raise ValueError(f"Formato não suportado pela TableSession: {self.format}")
+        self.engine = "pyarrow" if _arrow_csv_available() else "c"
+        self._data = file_bytes(file)
+        name = getattr(file, "name", None) if not isinstance(file, (str, os.PathLike)) else file
+        self.sheet_names: List[str] = [os.path.splitext(os.path.basename(str(name)))[0] if name else self.format]
+        self._lines: List[bytes] = []
+        if self.format == "csv":
+            head = self._data[:_CSV_HEAD_BYTES]
+            self._lines = head.splitlines(keepends=True)
+            if len(self._data) > len(head) and self._lines:
+                self._lines.pop()  # só linhas completas (o trecho pode cortar a última no meio)
+            self.encoding = _csv_encoding(self._lines)
+            self.delimiter = _pick_delimiter(self._csv_rows)
+
+    def _csv_rows(self, max_rows: int, delimiter: Optional[str] = None) -> List[Tuple[List[str], int]]:
+        """Linhas iniciais do CSV como células + posição (em bytes) do fim de cada uma."""
+        consumed = 0
+
+        def _text():
+            nonlocal consumed
+            for i, raw in enumerate(self._lines):
+                consumed += len(raw)
+                yield raw.decode("utf-8-sig" if i == 0 and self.encoding == "utf-8" else self.encoding, errors="replace")
+
+        rows = []
+        # o leitor csv junta as linhas de um campo entre aspas (cabeçalhos com quebra de linha)
+        for row in csv.reader(_text(), delimiter=delimiter or self.delimiter):
+            rows.append((row, consumed))
+            if len(rows) >= max_rows:
+                break
+        return rows
+
+    def cells(self, sheet: Optional[str] = None, max_rows: int = 40) -> List[List[Any]]:
+        """Linhas iniciais como células (no Parquet, os nomes das colunas e as primeiras linhas em texto)."""
+        if self.format == "parquet":
+            import pyarrow.parquet as pq
+
+            pf = pq.ParquetFile(BytesIO(self._data))
+            rows = [list(pf.schema_arrow.names)]
+            if max_rows is not None and max_rows <= 1:
+                return rows[:max_rows]
+            batch = next(pf.iter_batches(batch_size=(max_rows - 1) if max_rows else 65536), None)
+            if batch is not None:
+                cols = [
+                    ["" if v is None else (v if isinstance(v, str) else str(v)) for v in c.to_pylist()]
+                    for c in batch.columns
+                ]
+                rows.extend([list(r) for r in zip(*cols)])
+            return rows
+        # como nas células do xlsx (na_filter=False), vazio continua ""
+        return [row for row, _ in self._csv_rows(max_rows)]
+
+    def find_header_row(
+        self,
+        sheet: Optional[str],
+        is_header: Callable[[List[Any]], bool],
+        max_rows: int = 40,
+        default: Optional[int] = None,
+    ) -> Optional[int]:
+        if self.format == "parquet":
+            return 0  # os nomes das colunas são o cabeçalho
+        for i, row in enumerate(self.cells(sheet, max_rows=max_rows)):
+            if is_header(row):
+                return i
+        return default
+
+    def frame(
+        self,
+        sheet: Optional[str] = None,
+        header_row: int = 0,
+        dtype=None,
+        usecols: Optional[Callable[[str], bool]] = None,
+    ) -> pd.DataFrame:
+        if self.format == "parquet":
+            return self._parquet_frame(dtype, usecols)
+        return self._csv_frame(header_row, usecols)
+
+    def _parquet_frame(self, dtype, usecols) -> pd.DataFrame:
+        names = self.cells()[0]
+        keep = [n for n in names if usecols is None or usecols(str(n))] or None
+        df = pd.read_parquet(BytesIO(self._data), columns=keep)
+        df.columns = _header_names(df.columns)
+        if dtype is str:
+            # Mesmo contrato do dtype=str no xlsx para texto e inteiros (IDs); floats
+            # continuam numéricos e passam direto pela conversão pt-BR
+            for c in df.columns:
+                if not pd.api.types.is_float_dtype(df[c].dtype):
+                    df[c] = df[c].where(df[c].isna(), df[c].astype(str))
+        return df
+
+    def _split_header(self, header_row: int) -> Tuple[List[str], int]:
+        rows = self._csv_rows(header_row + 1)
+        if header_row >= len(rows):
+            return [], len(self._data)
+        header, end = rows[header_row]
+        return _header_names(header), end
+
+    def _csv_frame(self, header_row: int, usecols) -> pd.DataFrame:
+        names, offset = self._split_header(header_row)
+        if not names:
+            raise ValueError(f"Linha de cabeçalho {header_row} não encontrada no CSV")
+        keep = [n for n in names if usecols is None or usecols(n)] or names
+        body = memoryview(self._data)[offset:]
+        if self.engine == "pyarrow":
+            import pyarrow as pa
+            from pyarrow import csv as pa_csv
+
+            table = pa_csv.read_csv(
+                pa.BufferReader(pa.py_buffer(body)),
+                read_options=pa_csv.ReadOptions(column_names=names, encoding=self.encoding),
+                parse_options=pa_csv.ParseOptions(delimiter=self.delimiter),
+                convert_options=pa_csv.ConvertOptions(
+                    include_columns=keep,
+                    column_types={n: pa.string() for n in keep},
+                    strings_can_be_null=True,
+                ),
+            )
+            df = table.to_pandas()
+        else:
+            df = pd.read_csv(
+                BytesIO(bytes(body)),
+                sep=self.delimiter,
+                header=None,
+                names=names,
+                usecols=keep,
+                dtype=str,
+                encoding=self.encoding,
+            )
+        return df[keep]
+
+
+# -------------------------
+# Leitura em streaming (arquivos grandes)
+# -------------------------
+def file_size_bytes(file) -> Optional[int]:
+    """Tamanho do upload em bytes (UploadedFile, BytesIO, caminho ou arquivo aberto)."""
+    size = getattr(file, "size", None)
+    if isinstance(size, int):
+        return size
+    if isinstance(file, (str, os.PathLike)):
+        try:
+            return os.path.getsize(file)
+        except OSError:
+            return None
+    getbuffer = getattr(file, "getbuffer", None)
+    if getbuffer is not None:
+        try:
+            return getbuffer().nbytes
+        except Exception:
+            pass
+    try:
+        pos = file.tell()
+        end = file.seek(0, os.SEEK_END)
+        file.seek(pos)
+        return end
+    except Exception:
+        return None
+
+
+_DIMENSION_RE = re.compile(rb"<(?:\w+:)?dimension\s+ref=\"([A-Z]+)(\d+)(?::([A-Z]+)(\d+))?\"")
+_SHEET_RE = re.compile(rb"<(?:\w+:)?sheet\b[^>]*?\bname=\"([^\"]*)\"[^>]*?\br:id=\"([^\"]*)\"")
+_REL_RE = re.compile(rb"<Relationship\b[^>]*?\bId=\"([^\"]*)\"[^>]*?\bTarget=\"([^\"]*)\"")
+
+
+def _count_row_tags(buf: bytes) -> int:
+    return buf.count(b"<row ") + buf.count(b"<row>") + buf.count(b":row ") + buf.count(b":row>")
+
+
+def _col_number(letters: bytes) -> int:
+    n = 0
+    for ch in letters:
+        n = n * 26 + (ch - 64)
+    return n
+
+
+def sheet_dimensions(file) -> Dict[str, Dict[str, Any]]:
+    """
+    Linhas e colunas de cada aba de um xlsx sem abrir a planilha.
+
+    Lê só a tag ``<dimension>`` do começo de cada XML de aba; quando ela falta (ou
+    vem como uma única célula), as linhas são contadas pelas tags ``<row>`` no XML
+    descompactado em blocos e as colunas ficam None. Retorna
+    {aba: {"linhas", "colunas", "fonte": "dimension" | "contagem"}}.
+    """
+    import html
+    import posixpath
+    import zipfile
+
+    src = BytesIO(file) if isinstance(file, (bytes, bytearray)) else file
+    _safe_seek(src, 0)
+    out: Dict[str, Dict[str, Any]] = {}
+    with zipfile.ZipFile(src) as zf:
+        targets = {rid.decode(): t.decode() for rid, t in _REL_RE.findall(zf.read("xl/_rels/workbook.xml.rels"))}
+        for name, rid in _SHEET_RE.findall(zf.read("xl/workbook.xml")):
+            target = targets.get(rid.decode())
+            if target is None:
+                continue
+            path = target.lstrip("/") if target.startswith("/") else posixpath.normpath(posixpath.join("xl", target))
+            with zf.open(path) as fh:
+                head = fh.read(4096)
+                m = _DIMENSION_RE.search(head)
+                if m and m.group(3):
+                    rows, cols, fonte = int(m.group(4)), _col_number(m.group(3)), "dimension"
+                else:
+                    # sem dimensão confiável: conta as linhas percorrendo o XML (sem montar células)
+                    rows, tail, chunk = 0, b"", head
+                    while chunk:
+                        buf = tail + chunk
+                        # tags inteiras no fim do pedaço anterior já foram contadas
+                        rows += _count_row_tags(buf) - _count_row_tags(tail)
+                        tail = buf[-8:]
+                        chunk = fh.read(1 << 20)
+                    cols, fonte = None, "contagem"
+            out[html.unescape(name.decode("utf-8"))] = {"linhas": rows, "colunas": cols, "fonte": fonte}
+    _safe_seek(src, 0)
+    return out
+
+
+def _header_names(cells: Iterable[Any]) -> List[str]:
+    """Nomes de coluna no mesmo padrão do pandas (vazio vira "Unnamed: i", repetido ganha ".1")."""
+    names, seen = [], {}
+    for i, v in enumerate(cells):
+        name = f"Unnamed: {i}" if v is None or v == "" else str(v)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        seen.setdefault(name, 0)
+        names.append(name)
+    return names
+
+
+# Pico de memória da leitura em streaming: por padrão o RSS do processo, amostrado
+# a cada bloco (barato); com a variável ligada, tracemalloc (só alocações Python,
+# várias vezes mais lento), para depuração
+TRACE_MEMORY_ENV = "ML_REPORT_TRACE_MEMORY"
+
+
+def _trace_memory() -> bool:
+    return os.environ.get(TRACE_MEMORY_ENV, "").strip().lower() in ("1", "true", "sim", "yes")
+
+
+def _rss_bytes() -> int:
+    """RSS atual do processo (/proc); sem /proc, o pico do processo (getrusage); 0 se nenhum existir."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:
+        return 0
+    # ru_maxrss vem em KB no Linux e em bytes no macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss if sys.platform == "darwin" else maxrss * 1024
+
+
+def _excel_text_cell(v):
+    # Mesma conversão do leitor do pandas: vazio vira NaN e float inteiro vira int
+    if v is None or v == "":
+        return np.nan
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    return v
+
+
+class StreamingWorkbook:
+    """
+    Leitor em streaming (openpyxl read_only) com a mesma interface da WorkbookSession.
+
+    As linhas são percorridas uma vez, em blocos de ``chunk_rows``, e gravadas em
+    arrays colunares pré-alocados: float64 para as colunas numéricas (convertidas
+    bloco a bloco por ``coerce``) e object para o resto. O workbook completo nunca
+    é materializado, então o pico de memória acompanha as colunas mantidas.
+    """
+
+    def __init__(self, file, chunk_rows: int = 5_000):
+        from openpyxl import load_workbook
+
+        self.file = file
+        self.chunk_rows = int(chunk_rows)
+        _safe_seek(file, 0)
+        self._wb = load_workbook(file, read_only=True, data_only=True, keep_links=False)
+        self.sheet_names: List[str] = list(self._wb.sheetnames)
+        self.stats: Dict[str, Any] = {}
+        self._est_rows: Dict[str, int] = {}
+        self._rss_pico = 0
+
+    def _sheet(self, sheet: str):
+        ws = self._wb[sheet]
+        if sheet not in self._est_rows:
+            # A tag <dimension> serve só de estimativa para pré-alocar; como o pandas,
+            # zeramos as dimensões para não truncar arquivos com tag errada.
+            self._est_rows[sheet] = int(ws.max_row or 0)
+            ws.reset_dimensions()
+        return ws
+
+    def close(self):
+        try:
+            self._wb.close()
+        except Exception:
+            pass
+
+    def cells(self, sheet: str, max_rows: int = 40) -> List[List[Any]]:
+        """Primeiras ``max_rows`` linhas da aba (só elas são lidas do arquivo)."""
+        ws = self._sheet(sheet)
+        return [
+            [_excel_text_cell(v) if v is not None else "" for v in row]
+            for row in ws.iter_rows(max_row=max_rows, values_only=True)
+        ]
+
+    def find_header_row(
+        self,
+        sheet: str,
+        is_header: Callable[[List[Any]], bool],
+        max_rows: int = 40,
+        default: Optional[int] = None,
+    ) -> Optional[int]:
+        for i, row in enumerate(self.cells(sheet, max_rows=max_rows)):
+            if is_header(row):
+                return i
+        return default
+
+    def frame(
+        self,
+        sheet: str,
+        header_row: int = 0,
+        numeric_cols: Iterable[str] = (),
+        coerce: Optional[Callable[[pd.Series], pd.Series]] = None,
+        usecols: Optional[Callable[[str], bool]] = None,
+        dtype=None,
+    ) -> pd.DataFrame:
+        trace = _trace_memory()
+        # Se alguém já mede a memória (tracemalloc ativo) o pico dele é preservado
+        started_here = trace and not tracemalloc.is_tracing()
+        if started_here:
+            tracemalloc.start()
+        if trace:
+            base_mem, _ = tracemalloc.get_traced_memory()
+        else:
+            base_mem = self._rss_pico = _rss_bytes()
+        try:
+            df, n_chunks = self._read_columns(sheet, header_row, set(numeric_cols), coerce, usecols, dtype)
+            if trace:
+                _, peak = tracemalloc.get_traced_memory()
+            else:
+                peak = max(self._rss_pico, _rss_bytes())
+        finally:
+            if started_here:
+                tracemalloc.stop()
+            self.close()
+
+        self.stats = {
+            "modo": "streaming",
+            "linhas": int(len(df)),
+            "colunas": int(df.shape[1]),
+            "blocos": n_chunks,
+            "arquivo_mb": (file_size_bytes(self.file) or 0) / 1e6,
+            "pico_memoria_mb": max(0, peak - base_mem) / 1e6,
+            "medicao_memoria": "tracemalloc" if trace else "rss",
+        }
+        df.attrs["leitura"] = dict(self.stats)
+        return df
+
+    def _read_columns(self, sheet, header_row, numeric_cols, coerce, usecols, dtype=None):
+        ws = self._sheet(sheet)
+        rows = ws.iter_rows(min_row=header_row + 1, values_only=True)
+        names = _header_names(next(rows, ()))
+        keep = [i for i, n in enumerate(names) if usecols is None or usecols(n)]
+        num_pos = [k for k, i in enumerate(keep) if names[i] in numeric_cols]
+        txt_pos = [k for k, i in enumerate(keep) if names[i] not in numeric_cols]
+
+        capacity = max(self._est_rows[sheet] - header_row - 1, self.chunk_rows)
+        arrays = [
+            np.full(capacity, np.nan, dtype="float64") if k in num_pos else np.full(capacity, np.nan, dtype=object)
+            for k in range(len(keep))
+        ]
+
+        filled, last_data_row, n_chunks = 0, -1, 0
+        chunk: List[tuple] = []
+
+        def _flush():
+            nonlocal arrays, capacity, filled, n_chunks
+            k_rows = len(chunk)
+            if filled + k_rows > capacity:
+                capacity = max(capacity * 2, filled + k_rows)
+                arrays = [np.concatenate([a, np.full(capacity - len(a), np.nan, dtype=a.dtype)]) for a in arrays]
+            cols = list(zip(*chunk))
+            for k in num_pos:
+                vals = pd.Series(cols[k], dtype=object)
+                vals = coerce(vals) if coerce is not None else pd.to_numeric(vals, errors="coerce")
+                arrays[k][filled:filled + k_rows] = pd.to_numeric(vals, errors="coerce").to_numpy(dtype="float64")
+            for k in txt_pos:
+                arrays[k][filled:filled + k_rows] = [_excel_text_cell(v) for v in cols[k]]
+            filled += k_rows
+            n_chunks += 1
+            chunk.clear()
+            self._rss_pico = max(self._rss_pico, _rss_bytes())
+
+        width = len(names)
+        for row in rows:
+            if any(v is not None and v != "" for v in row):
+                last_data_row = filled + len(chunk)
+            row = tuple(row[:width]) + (None,) * (width - len(row))
+            chunk.append(tuple(row[i] for i in keep))
+            if len(chunk) >= self.chunk_rows:
+                _flush()
+        if chunk:
+            _flush()
+
+        # Como no read_excel: linhas vazias no fim são descartadas
+        n = last_data_row + 1
+        data = {names[i]: arrays[k][:n] for k, i in enumerate(keep)}
+        df = pd.DataFrame(data)
+        for k in txt_pos:
+            col = names[keep[k]]
+            # dtype=str como no TextParser da WorkbookSession; vazio continua NaN (no
+            # pandas 2 o astype(str) escreveria "nan", por isso a máscara)
+            s = df[col]
+            df[col] = s.astype(dtype).where(s.notna()) if dtype is not None else s.infer_objects()
+        return df, n_chunks
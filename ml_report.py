@@ -4,11 +4,19 @@ import pandas as pd
 import numpy as np
 import re
 from datetime import datetime
-from typing import Any, Dict, List, Tuple
+import inspect
+import time
+from functools import cached_property
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import xlsxwriter
-import unicodedata
 import re
 
+from excel_reader import StreamingWorkbook, TableSession, WorkbookSession, detect_format, file_size_bytes
+import report_entities as rentities
+import report_rules as rrules
+from report_dtypes import restore_frame
+from report_schema import get_schema, norm_key
+
 EMOJI_GREEN = '🟢'   # green circle
 EMOJI_YELLOW = '🟡'  # yellow circle
 EMOJI_BLUE = '🔵'    # blue circle
@@ -19,21 +27,26 @@ EMOJI_RED = '🔴'     # red circle
 
 
 
-def _safe_seek(x, pos=0):
-    try:
-        x.seek(pos)
-    except Exception:
-        pass
+# Abas de cada relatorio (chaves do marketplace_config). Os loaders escolhem a aba
+# com estes nomes/termos e a deteccao de tipo dos pacotes .zip (report_bundle) usa
+# os mesmos criterios.
+REPORT_SHEETS = {
+    "vendas": {"preferred_names": ["Relatório"], "must_have_terms": ["relatorio"]},
+    "patrocinados": {
+        "preferred_names": ["Relatório Anúncios patrocinados", "Relatorio Anuncios patrocinados", "Relatório de anúncios patrocinados", "Relatorio de anuncios patrocinados"],
+        "must_have_terms": ["relatorio", "anuncio"],
+    },
+    "campanha": {"preferred_names": ["Relatório de campanha", "Relatorio de campanha"], "must_have_terms": ["relatorio", "campanha"]},
+    "estoque": {"preferred_names": ["Anúncios"], "must_have_terms": ["anuncios"]},
+    "snapshot": {"preferred_names": ["Campanhas_Snapshot"], "must_have_terms": ["campanhas", "snapshot"]},
+}
 
 
-def _pick_sheet(excel_file, preferred_names=None, must_have_terms=None):
+def _match_sheet(sheets, preferred_names=None, must_have_terms=None):
+    """Aba com nome preferido ou com todos os termos (normalizados); None se nenhuma casa."""
     preferred_names = preferred_names or []
     must_have_terms = must_have_terms or []
 
-    _safe_seek(excel_file, 0)
-    xls = pd.ExcelFile(excel_file)
-    sheets = list(xls.sheet_names)
-
     # match direto por nome preferido
     for p in preferred_names:
         if p in sheets:
@@ -51,98 +64,58 @@ def _pick_sheet(excel_file, preferred_names=None, must_have_terms=None):
                 break
         if ok:
             return s
+    return None
+
+
+def _pick_sheet(excel_file, preferred_names=None, must_have_terms=None):
+    sheets = list(WorkbookSession.open(excel_file).sheet_names)
+    sheet = _match_sheet(sheets, preferred_names, must_have_terms)
 
     # fallback
-    return sheets[0] if sheets else None
+    if sheet is None:
+        return sheets[0] if sheets else None
+    return sheet
 
-def _norm_col_key(s: str) -> str:
-    s = "" if s is None else str(s)
-    s = s.strip().lower().replace("\n", " ").replace("\r", " ")
-    s = unicodedata.normalize("NFKD", s)
-    s = "".join(ch for ch in s if not unicodedata.combining(ch))
-    s = re.sub(r"\s+", " ", s)
-    s = re.sub(r"[^a-z0-9]+", "_", s)
-    return s.strip("_")
+def _row_has_key(keys) -> Callable[[list], bool]:
+    """Predicado de cabecalho: a linha tem alguma celula cuja chave normalizada esta em ``keys``."""
+    keys = {_norm_col_key(k) for k in keys}
 
+    def _match(row) -> bool:
+        return any(_norm_col_key(v) in keys for v in row if isinstance(v, str))
 
-def _standardize_cols_by_candidates(df: pd.DataFrame, candidates_map: dict) -> pd.DataFrame:
-    if df is None or df.empty:
-        return df
+    return _match
 
-    col_keys = {_norm_col_key(c): c for c in df.columns}
-    ren = {}
 
-    for canonical, cands in candidates_map.items():
-        for cand in cands:
-            k = _norm_col_key(cand)
-            if k in col_keys:
-                ren[col_keys[k]] = canonical
-                break
+def _norm_col_key(s: str) -> str:
+    # mesma chave do registro de colunas (report_schema), memoizada e sem regex
+    return norm_key(s)
 
-    if ren:
-        df = df.rename(columns=ren)
 
-    return df
+# Colunas de cada relatorio vem do registro declarativo (report_schema.REPORT_SCHEMAS)
+_SCHEMA_VENDAS = get_schema("mercado_livre", "vendas")
+_SCHEMA_PATROCINADOS = get_schema("mercado_livre", "patrocinados")
+_SCHEMA_CAMPANHA = get_schema("mercado_livre", "campanha")
+_SCHEMA_ESTOQUE = get_schema("mercado_livre", "estoque")
 
 
-_CAMPAIGN_COL_CANDIDATES = {
-    "Nome": ["Nome", "Nome da campanha", "Campanha", "Campaign"],
-    "Status": ["Status", "Status atual"],
-    "Orçamento": [
-        "Orçamento",
-        "Orcamento",
-        "Orçamento diário",
-        "Orcamento diario",
-        "Orçamento (Moeda local)",
-        "Orcamento (Moeda local)",
-    ],
-    "ACOS Objetivo": ["ACOS Objetivo", "ACOS objetivo", "ACOS alvo", "ACOS target"],
-    "Impressões": ["Impressões", "Impressoes", "Impressions"],
-    "Cliques": ["Cliques", "Clicks"],
-    "Receita\n(Moeda local)": [
-        "Receita\n(Moeda local)",
-        "Receita (Moeda local)",
-        "Receita (moeda local)",
-        "Receita",
-    ],
-    "Investimento\n(Moeda local)": [
-        "Investimento\n(Moeda local)",
-        "Investimento (Moeda local)",
-        "Investimento (moeda local)",
-        "Gasto",
-        "Spend",
-        "Investimento",
-    ],
-    "Vendas por publicidade\n(Diretas + Indiretas)": [
-        "Vendas por publicidade\n(Diretas + Indiretas)",
-        "Vendas por publicidade (Diretas + Indiretas)",
-        "Vendas por publicidade",
-        "Vendas por ads",
-        "Sales from ads",
-    ],
-    "ROAS\n(Receitas / Investimento)": [
-        "ROAS\n(Receitas / Investimento)",
-        "ROAS (Receitas / Investimento)",
-        "ROAS",
-    ],
-    "CVR\n(Conversion rate)": [
-        "CVR\n(Conversion rate)",
-        "CVR (Conversion rate)",
-        "CVR",
-        "Taxa de conversão",
-    ],
-    "% de impressões perdidas por orçamento": [
-        "% de impressões perdidas por orçamento",
-        "% de impressoes perdidas por orcamento",
-        "% de impressões perdidas por orçamento (IS lost budget)",
-    ],
-    "% de impressões perdidas por classificação": [
-        "% de impressões perdidas por classificação",
-        "% de impressoes perdidas por classificacao",
-        "% de impressões perdidas por classificação (IS lost rank)",
-    ],
-    "Desde": ["Desde", "Data", "Date"],
-}
+def _projection(schema, keep_raw: bool = False, extra_terms=()) -> Optional[Callable[[str], bool]]:
+    """Filtro de colunas (usecols) dos loaders: so o que o pipeline usa.
+
+    ``extra_terms`` mantem tambem cabecalhos desconhecidos cuja chave tem todos os
+    termos de algum grupo (usado pelos fallbacks que procuram coluna por termo).
+    ``keep_raw=True`` desliga a projecao (todas as colunas, para depuracao).
+    """
+    if keep_raw:
+        return None
+    needed = set(schema.names(pipeline=True))
+
+    def _use(header: str) -> bool:
+        if schema.resolve(header) in needed:
+            return True
+        k = norm_key(header)
+        return any(all(t in k for t in terms) for terms in extra_terms)
+
+    return _use
 
 def _is_active_status(val) -> bool:
     """Retorna True para status 'Ativa/Ativo/Active' (ignorando caixa e acentos)."""
@@ -204,58 +177,163 @@ def _to_number_ptbr(val):
         return None
 
 
+# Caminho vetorizado do parser pt-BR: as celulas de texto sao unidas em um unico
+# buffer de bytes e limpas com uma so chamada de bytes.translate (em C):
+# remove milhar ".", troca decimal "," por "." e descarta tudo que nao for digito/sinal.
+_PTBR_SEP = b"\x00"
+_PTBR_KEEP = set(b"0123456789+-,") | set(_PTBR_SEP)
+_PTBR_DELETE = bytes(c for c in range(128) if c not in _PTBR_KEEP)
+_PTBR_TABLE = bytes.maketrans(b",", b".")
+_PTBR_IS_NUM_TYPE = np.frompyfunc(frozenset({float, int, bool, np.float64}).__contains__, 1, 1)
+
+
+def _float_or_nan(b: bytes) -> float:
+    try:
+        return float(b)
+    except ValueError:
+        return np.nan
+
+
+def _parse_ptbr_texts(texts: list) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Converte uma lista de str com a mesma regra de _to_number_ptbr.
+
+    Retorna (valores, ok, fallback): ``ok`` marca as celulas que viraram float e
+    ``fallback`` as que precisam do parser escalar (texto nao ASCII, NUL interno).
+    """
+    n = len(texts)
+    values = np.full(n, np.nan, dtype="float64")
+    fallback = np.zeros(n, dtype=bool)
+
+    raw = _PTBR_SEP.decode().join(texts).replace("\xa0", " ").encode("utf-8", "surrogatepass")
+    pieces = raw.translate(_PTBR_TABLE, _PTBR_DELETE).split(_PTBR_SEP)
+    if len(pieces) != n:
+        fallback[:] = True
+        return values, np.zeros(n, dtype=bool), fallback
+
+    lens = np.fromiter(map(len, pieces), dtype=np.int64, count=n)
+    if not raw.isascii():
+        fallback = ~np.fromiter(map(bytes.isascii, pieces), dtype=bool, count=n)
+    cand = (lens > 0) & ~fallback
+
+    pos = np.flatnonzero(cand)
+    sel = [pieces[i] for i in pos]
+    try:
+        parsed = np.fromiter(map(float, sel), dtype="float64", count=len(sel))
+    except ValueError:
+        parsed = np.fromiter(map(_float_or_nan, sel), dtype="float64", count=len(sel))
+    values[pos] = parsed
+    ok = np.zeros(n, dtype=bool)
+    ok[pos] = ~np.isnan(parsed)
+    return values, ok, fallback
+
+
 def _coerce_series_numeric_ptbr(series: pd.Series) -> pd.Series:
+    """Versao vetorizada de ``series.apply(_to_number_ptbr)`` (mesma saida, celula a celula).
+
+    - colunas ja numericas (int/float) viram float64 direto;
+    - celulas float/int/bool seguem ``float(val)``;
+    - textos ASCII sao limpos em lote (_parse_ptbr_texts);
+    - o resto (pd.NA, tipos numpy, texto com acento) cai no parser escalar.
+    """
     if series is None:
         return series
-    return series.apply(_to_number_ptbr)
-
+    n = len(series)
+    if n == 0:
+        return series.apply(_to_number_ptbr)
+
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in "iuf":
+        return pd.Series(series.to_numpy(dtype="float64"), index=series.index, name=series.name)
+
+    values = series.to_numpy(dtype=object)
+    types = np.fromiter(map(type, values), dtype=object, count=n)
+    is_num = _PTBR_IS_NUM_TYPE(types).astype(bool)
+    is_str = types == str
+
+    out = np.full(n, np.nan, dtype="float64")
+    produced = is_num.copy()
+    if is_num.any():
+        out[is_num] = np.asarray(values[is_num], dtype="float64")
+
+    fallback = ~(is_num | is_str)
+    if is_str.any():
+        str_pos = np.flatnonzero(is_str)
+        parsed, ok, str_fallback = _parse_ptbr_texts(values[is_str].tolist())
+        out[str_pos[ok]] = parsed[ok]
+        produced[str_pos[ok]] = True
+        fallback[str_pos[str_fallback]] = True
+
+    for pos in np.flatnonzero(fallback):
+        v = _to_number_ptbr(values[pos])
+        if v is not None:
+            out[pos] = v
+            produced[pos] = True
+
+    # apply() so devolve object quando nenhuma celula virou float (todas None)
+    if not produced.any():
+        return pd.Series([None] * n, index=series.index, name=series.name, dtype=object)
+    return pd.Series(out, index=series.index, name=series.name)
+
+
+# Versao da saida dos loaders; incrementar quando o DataFrame devolvido mudar
+# (faz parte da chave do cache em disco, ver report_cache.py)
+LOADER_VERSION = 2
+
+
+# Acima deste tamanho o Patrocinados e lido em streaming (memoria limitada)
+STREAMING_MIN_MB = 15.0
+
+
+def _use_streaming(file, streaming, streaming_min_mb: float) -> bool:
+    if isinstance(file, (WorkbookSession, StreamingWorkbook, TableSession)):
+        return isinstance(file, StreamingWorkbook)
+    if detect_format(file) != "xlsx":
+        # CSV/Parquet ja sao lidos por colunas (pyarrow); o streaming e do xlsx
+        return False
+    if streaming is not None:
+        return bool(streaming)
+    size = file_size_bytes(file)
+    return size is not None and size >= streaming_min_mb * 1e6
 
 
-def load_organico(organico_file) -> pd.DataFrame:
+def load_organico(
+    organico_file,
+    engine: Optional[str] = None,
+    keep_raw: bool = False,
+    streaming=False,
+) -> pd.DataFrame:
     # Relatorio de desempenho de publicacoes (Excel exportado do Mercado Livre)
     # Problema recorrente: a coluna "Vendas brutas" pode vir como numero (float)
     # quando o Excel/pandas interpreta "3.144" como 3.144, mas no padrao pt-BR isso
     # significa 3.144,00 (tres mil cento e quarenta e quatro).
     # Para evitar isso, lemos como texto e convertemos com parser pt-BR.
 
-    # Descobre automaticamente a linha de cabecalho (onde aparece "ID do anúncio")
-    preview = pd.read_excel(organico_file, sheet_name="Relatório", header=None, nrows=40)
-    header_row = None
-    for i in range(len(preview)):
-        row = preview.iloc[i].astype(str)
-        if row.str.contains(r"\bID do anúncio\b", case=False, na=False).any():
-            header_row = i
-            break
-    if header_row is None:
-        # fallback historico
-        header_row = 4
-
-    org = pd.read_excel(organico_file, sheet_name="Relatório", header=header_row, dtype=str)
-
-    # Normaliza nomes esperados
-    rename_map = {
-        "ID do anúncio": "ID",
-        "Anúncio": "Titulo",
-        "Status atual": "Status",
-        "Variação": "Variacao",
-        "SKU": "SKU",
-        "Visitas únicas": "Visitas",
-        "Quantidade de vendas": "Qtd_Vendas",
-        "Compradores únicos": "Compradores",
-        "Unidades vendidas": "Unidades",
-        "Vendas brutas (BRL)": "Vendas_Brutas",
-        "% de participação": "Participacao",
-        "Conversão de visitas em vendas": "Conv_Visitas_Vendas",
-        "Conversão de visitas em compradores": "Conv_Visitas_Compradores",
-    }
-    org = org.rename(columns={k: v for k, v in rename_map.items() if k in org.columns})
+    # Descobre automaticamente a linha de cabecalho (onde aparece "ID do anúncio"),
+    # usando as mesmas celulas que depois viram o DataFrame (arquivo lido uma vez).
+    # Streaming (memoria limitada, bem mais lento) so quando pedido, ex.: pelo
+    # report_memory quando a leitura completa nao cabe no orcamento; None = pelo tamanho.
+    if _use_streaming(organico_file, streaming, STREAMING_MIN_MB):
+        book = organico_file if isinstance(organico_file, StreamingWorkbook) else StreamingWorkbook(organico_file)
+    else:
+        book = WorkbookSession.open(organico_file, engine=engine)
+    id_re = re.compile(r"\bID do anúncio\b", re.IGNORECASE)
+    header_row = book.find_header_row(
+        "Relatório",
+        lambda row: any(id_re.search(str(v)) for v in row),
+        max_rows=40,
+        default=4,  # fallback historico
+    )
+
+    org = book.frame("Relatório", header_row=header_row, dtype=str, usecols=_projection(_SCHEMA_VENDAS, keep_raw))
+
+    # Normaliza nomes esperados (aliases do registro de colunas)
+    org = _SCHEMA_VENDAS.standardize(org)
 
     # remove linhas repetidas de cabecalho, se existirem
     if "ID" in org.columns:
-        org = org[org["ID"].astype(str).str.strip().str.lower() != "id do anúncio"].copy()
+        org = org[org["ID"].astype(str).str.strip().str.lower() != "id do anúncio"]
 
-    for c in ["Visitas","Qtd_Vendas","Compradores","Unidades","Vendas_Brutas",
-              "Participacao","Conv_Visitas_Vendas","Conv_Visitas_Compradores"]:
+    for c in _SCHEMA_VENDAS.names(tipo="numero"):
         if c in org.columns:
             org[c] = _coerce_series_numeric_ptbr(org[c])
 
@@ -299,14 +377,14 @@ def save_snapshot_v2(df_campanha_estrategica, df_anuncio_estrategico, snapshot_p
         "Quadrante", "Acao_Recomendada", "Confianca_Dado", "Motivo",
         "% de impressões perdidas por orçamento", "% de impressões perdidas por classificação"
     ]
-    camp_snap = df_campanha_estrategica[[c for c in camp_cols if c in df_campanha_estrategica.columns]].copy()
+    camp_snap = df_campanha_estrategica[[c for c in camp_cols if c in df_campanha_estrategica.columns]]
 
     # Colunas essenciais para o snapshot de anúncios
     anuncio_cols = [
         "ID", "Titulo", "Campanha", "Investimento", "Receita", "ROAS_Real", "CVR_pct",
         "Status_Anuncio", "Acao_Anuncio", "Confianca_Anuncio", "Motivo_Anuncio", "Refino_Campanha"
     ]
-    anuncio_snap = df_anuncio_estrategico[[c for c in anuncio_cols if c in df_anuncio_estrategico.columns]].copy()
+    anuncio_snap = df_anuncio_estrategico[[c for c in anuncio_cols if c in df_anuncio_estrategico.columns]]
 
     # Salva em abas separadas
     with pd.ExcelWriter(snapshot_path, engine='xlsxwriter') as writer:
@@ -349,13 +427,14 @@ def load_snapshot_v2(snapshot_file) -> tuple[pd.DataFrame, pd.DataFrame, dict]:
         return None, None, None
 
 
-def compare_snapshots_campanha(df_atual: pd.DataFrame, df_snapshot: pd.DataFrame) -> pd.DataFrame:
+def compare_snapshots_campanha(df_atual: pd.DataFrame, df_snapshot: pd.DataFrame, entidades=None) -> pd.DataFrame:
     """
     Compara o DataFrame de campanhas atual com o snapshot anterior.
     Adiciona colunas de variação (delta) e migração de quadrante.
+    ``entidades``: índice da execução (report_entities) usado para casar as campanhas.
     """
     if df_snapshot is None or df_snapshot.empty:
-        df_out = df_atual.copy()
+        df_out = df_atual.copy(deep=False)
         df_out["Delta_Investimento"] = 0.0
         df_out["Delta_Receita"] = 0.0
         df_out["Delta_ROAS"] = 0.0
@@ -371,12 +450,9 @@ def compare_snapshots_campanha(df_atual: pd.DataFrame, df_snapshot: pd.DataFrame
     }
     df_snapshot_renamed = df_snapshot.rename(columns=snap_cols_map)
 
-    # Merge pelo nome da campanha
-    df_merged = df_atual.merge(
-        df_snapshot_renamed,
-        on="Nome",
-        how="left",
-        suffixes=("_Atual", "_Snap")
+    # Junção pelo nome da campanha (códigos do índice de entidades)
+    df_merged = rentities.left_join(
+        df_atual, df_snapshot_renamed, "Nome", "Nome", "campanha", entidades, suffixes=("_Atual", "_Snap")
     )
 
     # Cálculo das variações (Delta)
@@ -399,13 +475,14 @@ def compare_snapshots_campanha(df_atual: pd.DataFrame, df_snapshot: pd.DataFrame
     return df_merged
 
 
-def compare_snapshots_anuncio(df_atual: pd.DataFrame, df_snapshot: pd.DataFrame) -> pd.DataFrame:
+def compare_snapshots_anuncio(df_atual: pd.DataFrame, df_snapshot: pd.DataFrame, entidades=None) -> pd.DataFrame:
     """
     Compara o DataFrame de anúncios atual com o snapshot anterior.
     Adiciona colunas de variação (delta) e migração de status.
+    ``entidades``: índice da execução (report_entities) usado para casar os anúncios.
     """
     if df_snapshot is None or df_snapshot.empty:
-        df_out = df_atual.copy()
+        df_out = df_atual.copy(deep=False)
         df_out["Delta_Investimento"] = 0.0
         df_out["Delta_Receita"] = 0.0
         df_out["Delta_ROAS"] = 0.0
@@ -421,18 +498,9 @@ def compare_snapshots_anuncio(df_atual: pd.DataFrame, df_snapshot: pd.DataFrame)
     }
     df_snapshot_renamed = df_snapshot.rename(columns=snap_cols_map)
 
-    # Padroniza ID para string para evitar erro de merge entre object e int64
-    df_atual = df_atual.copy()
-    df_snapshot_renamed = df_snapshot_renamed.copy()
-    df_atual["ID"] = df_atual["ID"].astype(str).str.strip()
-    df_snapshot_renamed["ID"] = df_snapshot_renamed["ID"].astype(str).str.strip()
-
-    # Merge pelo ID do anúncio (MLB)
-    df_merged = df_atual.merge(
-        df_snapshot_renamed,
-        on="ID",
-        how="left",
-        suffixes=("_Atual", "_Snap")
+    # Junção pelo ID do anúncio (MLB normalizado: texto, número do Excel ou com prefixo casam igual)
+    df_merged = rentities.left_join(
+        df_atual, df_snapshot_renamed, "ID", "ID", "mlb", entidades, suffixes=("_Atual", "_Snap")
     )
 
     # Cálculo das variações (Delta)
@@ -455,15 +523,44 @@ def compare_snapshots_anuncio(df_atual: pd.DataFrame, df_snapshot: pd.DataFrame)
     return df_merged
 
 
-def load_patrocinados(patrocinados_file) -> pd.DataFrame:
-    _safe_seek(patrocinados_file, 0)
-    sheet = _pick_sheet(
-        patrocinados_file,
-        preferred_names=["Relatório Anúncios patrocinados", "Relatorio Anuncios patrocinados", "Relatório de anúncios patrocinados", "Relatorio de anuncios patrocinados"],
-        must_have_terms=["relatorio", "anuncio"],
-    )
-    _safe_seek(patrocinados_file, 0)
-    pat = pd.read_excel(patrocinados_file, sheet_name=sheet, header=1)
+# Colunas numericas do relatorio de Anuncios Patrocinados (nomes exportados pelo ML)
+_PATROCINADOS_NUM_COLS = _SCHEMA_PATROCINADOS.names(tipo="numero")
+
+def load_patrocinados(
+    patrocinados_file,
+    streaming=None,
+    streaming_min_mb: float = STREAMING_MIN_MB,
+    engine: Optional[str] = None,
+    keep_raw: bool = False,
+) -> pd.DataFrame:
+    """Le o relatorio de Anuncios Patrocinados.
+
+    ``streaming=None`` liga a leitura em streaming automaticamente para arquivos
+    a partir de ``streaming_min_mb``; o resumo da leitura (linhas, blocos, pico de
+    memoria) fica em ``pat.attrs["leitura"]``. ``engine`` escolhe o backend da
+    leitura completa (ver ``excel_reader.READER_ENGINES``). Por padrao so as colunas
+    usadas pelo pipeline sao materializadas; ``keep_raw=True`` mantem todas.
+    """
+    if _use_streaming(patrocinados_file, streaming, streaming_min_mb):
+        book = patrocinados_file if isinstance(patrocinados_file, StreamingWorkbook) else StreamingWorkbook(patrocinados_file)
+    else:
+        book = WorkbookSession.open(patrocinados_file, engine=engine)
+    sheet = _pick_sheet(book, **REPORT_SHEETS["patrocinados"])
+    header_row = book.find_header_row(sheet, _row_has_key(["Código do anúncio"]), default=1)
+    # fallbacks do ID e da campanha procuram colunas por termo; elas ficam na projecao
+    usecols = _projection(_SCHEMA_PATROCINADOS, keep_raw, extra_terms=[("codigo", "anuncio"), ("campanha",)])
+    if isinstance(book, StreamingWorkbook):
+        # numeros ja saem convertidos bloco a bloco; a coercao abaixo vira no-op (float64)
+        pat = book.frame(
+            sheet,
+            header_row=header_row,
+            numeric_cols=_PATROCINADOS_NUM_COLS,
+            coerce=_coerce_series_numeric_ptbr,
+            usecols=usecols,
+        )
+    else:
+        pat = book.frame(sheet, header_row=header_row, usecols=usecols)
+    pat = _SCHEMA_PATROCINADOS.standardize(pat)
 
     if "Código do anúncio" in pat.columns:
         pat["ID"] = pat["Código do anúncio"].astype(str).str.replace("MLB", "", regex=False).str.replace(r"\.0$", "", regex=True)
@@ -479,21 +576,7 @@ def load_patrocinados(patrocinados_file) -> pd.DataFrame:
             cand = pat.columns[0]
         pat["ID"] = pat[cand].astype(str).str.replace("MLB", "", regex=False).str.replace(r"\.0$", "", regex=True)
 
-    cols_num = [
-        "Impressões",
-        "Cliques",
-        "CPC \n(Custo por clique)",
-        "CTR\n(Click Through Rate)",
-        "CVR\n(Conversion rate)",
-        "Receita\n(Moeda local)",
-        "Investimento\n(Moeda local)",
-        "ACOS\n (Investimento / Receitas)",
-        "ROAS\n(Receitas / Investimento)",
-        "Vendas diretas",
-        "Vendas indiretas",
-        "Vendas por publicidade\n(Diretas + Indiretas)",
-    ]
-    for c in cols_num:
+    for c in _PATROCINADOS_NUM_COLS:
         if c in pat.columns:
             pat[c] = _coerce_series_numeric_ptbr(pat[c])
 
@@ -504,59 +587,124 @@ def _coerce_campaign_numeric(df: pd.DataFrame) -> pd.DataFrame:
     if df is None or df.empty:
         return df
 
-    cols_num = [
-        "Impressões",
-        "Cliques",
-        "Receita\n(Moeda local)",
-        "Investimento\n(Moeda local)",
-        "Vendas por publicidade\n(Diretas + Indiretas)",
-        "ROAS\n(Receitas / Investimento)",
-        "CVR\n(Conversion rate)",
-        "% de impressões perdidas por orçamento",
-        "% de impressões perdidas por classificação",
-        "Orçamento",
-        "ACOS Objetivo",
-    ]
-    for c in cols_num:
+    for c in _SCHEMA_CAMPANHA.names(tipo="numero"):
         if c in df.columns:
             df[c] = _coerce_series_numeric_ptbr(df[c])
     return df
 
 
-def load_campanhas_diario(campanhas_file) -> pd.DataFrame:
-    _safe_seek(campanhas_file, 0)
-    sheet = _pick_sheet(
-        campanhas_file,
-        preferred_names=["Relatório de campanha", "Relatorio de campanha"],
-        must_have_terms=["relatorio", "campanha"],
-    )
-    _safe_seek(campanhas_file, 0)
-    camp = pd.read_excel(campanhas_file, sheet_name=sheet, header=1)
+def _read_campaign_sheet(campanhas_file, engine: Optional[str] = None, keep_raw: bool = False) -> pd.DataFrame:
+    book = WorkbookSession.open(campanhas_file, engine=engine)
+    sheet = _pick_sheet(book, **REPORT_SHEETS["campanha"])
+    header_row = book.find_header_row(sheet, _row_has_key(_SCHEMA_CAMPANHA.keys("Nome")), default=1)
+    return book.frame(sheet, header_row=header_row, usecols=_projection(_SCHEMA_CAMPANHA, keep_raw))
+
 
-    camp = _standardize_cols_by_candidates(camp, _CAMPAIGN_COL_CANDIDATES)
+def read_campanhas_diario_raw(campanhas_file, engine: Optional[str] = None, keep_raw: bool = False) -> pd.DataFrame:
+    """Relatorio diario com colunas padronizadas e "Desde" em data, metricas ainda em texto."""
+    camp = _read_campaign_sheet(campanhas_file, engine=engine, keep_raw=keep_raw)
+
+    camp = _SCHEMA_CAMPANHA.standardize(camp)
 
     if "Desde" in camp.columns:
         camp["Desde"] = pd.to_datetime(camp["Desde"], errors="coerce")
+    return camp
 
+
+def load_campanhas_diario(campanhas_file, engine: Optional[str] = None, keep_raw: bool = False) -> pd.DataFrame:
+    # a conversao das metricas e celula a celula: o historico incremental (report_history)
+    # aplica so nas linhas dos dias novos
+    camp = read_campanhas_diario_raw(campanhas_file, engine=engine, keep_raw=keep_raw)
     camp = _coerce_campaign_numeric(camp)
     return camp
 
 
-def load_campanhas_consolidado(campanhas_file) -> pd.DataFrame:
-    _safe_seek(campanhas_file, 0)
-    sheet = _pick_sheet(
-        campanhas_file,
-        preferred_names=["Relatório de campanha", "Relatorio de campanha"],
-        must_have_terms=["relatorio", "campanha"],
-    )
-    _safe_seek(campanhas_file, 0)
-    camp = pd.read_excel(campanhas_file, sheet_name=sheet, header=1)
-    camp = _standardize_cols_by_candidates(camp, _CAMPAIGN_COL_CANDIDATES)
+def load_campanhas_consolidado(campanhas_file, engine: Optional[str] = None, keep_raw: bool = False) -> pd.DataFrame:
+    camp = _read_campaign_sheet(campanhas_file, engine=engine, keep_raw=keep_raw)
+    camp = _SCHEMA_CAMPANHA.standardize(camp)
     camp = _coerce_campaign_numeric(camp)
     return camp
 
 
+def _digits_only(s) -> str:
+    s = "" if s is None else str(s)
+    return re.sub(r"\D", "", s)
+
+
+def _norm_sku(s) -> str:
+    if s is None or (isinstance(s, float) and pd.isna(s)):
+        return ""
+    return str(s).strip().upper()
+
+
+def load_estoque(estoque_file, engine: Optional[str] = None) -> pd.DataFrame:
+    """
+    Lê o arquivo de estoque enviado pelo usuário.
+
+    Arquivo base (Anuncios-....xlsx):
+    - Aba: "Anúncios"
+    - Coluna B: ITEM_ID (MLB)
+    - Coluna D: SKU
+    - Coluna G: QUANTITY (Estoque)
+
+    Observação: esse arquivo costuma ter linhas de cabeçalho antes da tabela,
+    por isso localizamos a linha do cabeçalho antes de montar as colunas.
+    """
+    # Mantemos dtype=str para evitar conversões quebradas logo na leitura.
+    # O cabeçalho é localizado pela célula ITEM_ID nas mesmas células lidas (fallback: linha 5).
+    book = WorkbookSession.open(estoque_file, engine=engine)
+    header_row = book.find_header_row(
+        "Anúncios",
+        lambda row: any(str(v).strip() == "ITEM_ID" for v in row),
+        default=4,
+    )
+    df = book.frame("Anúncios", header_row=header_row, dtype=str)
+
+    # Preferência por nomes de coluna (mais seguro que posição)
+    df = _SCHEMA_ESTOQUE.standardize(df)
+    expected = set(_SCHEMA_ESTOQUE.names())
+    if not expected.issubset(set(df.columns)):
+        # fallback por posição (B, D, G) caso o ML mude o cabeçalho
+        if df.shape[1] < 7:
+            raise ValueError("Arquivo de estoque não tem colunas suficientes (precisa ter pelo menos até a coluna G).")
+        df = df.iloc[:, [1, 3, 6]]
+        df.columns = ["ITEM_ID", "SKU", "QUANTITY"]
+
+    df = df[["ITEM_ID", "SKU", "QUANTITY"]]
+
+    # Filtra linhas válidas
+    df["ITEM_ID"] = df["ITEM_ID"].astype(str).str.strip()
+    df = df[df["ITEM_ID"].str.contains("MLB", na=False)]
+
+    # Normaliza chaves
+    df["MLB_key"] = rentities.normalize_keys(df["ITEM_ID"], "mlb")
+    df["SKU_key"] = rentities.normalize_keys(df["SKU"], "sku")
+
+    # Estoque como inteiro
+    df["Estoque"] = pd.to_numeric(df["QUANTITY"], errors="coerce").fillna(0).astype(int)
+
+    # Dedup: mantém o maior estoque por MLB
+    df = df.sort_values("Estoque", ascending=False).drop_duplicates(subset=["MLB_key"], keep="first")
+
+    return df[["MLB_key", "SKU_key", "Estoque"]]
+
+
+# Colunas do relatorio de campanhas lidas pelo consolidado e pela serie diaria
+# (entradas compactadas so restauram estas; ver report_dtypes)
+_CAMP_AGG_FONTE = (
+    "Nome", "Status", "Orçamento", "ACOS Objetivo", "Impressões", "Cliques",
+    "Receita\n(Moeda local)", "Investimento\n(Moeda local)", "Vendas por publicidade\n(Diretas + Indiretas)",
+    "ROAS\n(Receitas / Investimento)", "CVR\n(Conversion rate)",
+    "% de impressões perdidas por orçamento", "% de impressões perdidas por classificação",
+)
+_DAILY_FONTE = (
+    "Desde", "Investimento\n(Moeda local)", "Receita\n(Moeda local)",
+    "Vendas por publicidade\n(Diretas + Indiretas)", "Cliques", "Impressões",
+)
+
+
 def build_daily_from_diario(camp_diario: pd.DataFrame) -> pd.DataFrame:
+    camp_diario = restore_frame(camp_diario, columns=_DAILY_FONTE)
     daily = camp_diario.groupby("Desde", as_index=False).agg(
         Investimento=("Investimento\n(Moeda local)", "sum"),
         Receita=("Receita\n(Moeda local)", "sum"),
@@ -568,6 +716,8 @@ def build_daily_from_diario(camp_diario: pd.DataFrame) -> pd.DataFrame:
 
 
 def build_campaign_agg(camp: pd.DataFrame, modo: str) -> pd.DataFrame:
+    # entradas compactadas (report_dtypes): so as colunas lidas voltam aos tipos do loader
+    camp = restore_frame(camp, columns=_CAMP_AGG_FONTE)
     if modo == "diario":
         camp_agg = camp.groupby("Nome", as_index=False).agg(
             Status=("Status", "last"),
@@ -595,7 +745,7 @@ def build_campaign_agg(camp: pd.DataFrame, modo: str) -> pd.DataFrame:
         "CVR\n(Conversion rate)": "CVR",
         "% de impressões perdidas por orçamento": "Perdidas_Orc",
         "% de impressões perdidas por classificação": "Perdidas_Class",
-    }).copy()
+    })
 
     needed = [
         "Nome","Status","Orçamento","ACOS Objetivo",
@@ -606,7 +756,7 @@ def build_campaign_agg(camp: pd.DataFrame, modo: str) -> pd.DataFrame:
         if col not in camp_agg.columns:
             camp_agg[col] = pd.NA
 
-    return camp_agg[needed].copy()
+    return camp_agg[needed]
 
 
 def _safe_div(a, b) -> float:
@@ -618,6 +768,19 @@ def _safe_div(a, b) -> float:
     return 0.0
 
 
+def _num_col(df: pd.DataFrame, col: str, default: float = 0.0) -> np.ndarray:
+    """Coluna como float64 (texto invalido vira NaN); ``default`` quando a coluna nao existe."""
+    if col not in df.columns:
+        return np.full(len(df), default, dtype="float64")
+    return pd.to_numeric(df[col], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+
+def _safe_div_cols(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """``_safe_div`` elemento a elemento: divisor 0 vira 0.0 (NaN continua NaN)."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(b != 0, a / np.where(b != 0, b, 1.0), 0.0)
+
+
 def add_strategy_fields(
     camp_agg: pd.DataFrame,
     acos_over_pct: float = 0.30,
@@ -631,8 +794,10 @@ def add_strategy_fields(
     comp_sales_min: int = 2,
     hiper_roas_mult: float = 1.50,
     impacto_factor: float = 0.30,
+    regras=None,
 ) -> pd.DataFrame:
-    df = camp_agg.copy()
+    """Quadrante, motivo e acao por campanha; ``regras`` = ajustes do cliente (report_rules.load_rules)."""
+    df = camp_agg.copy(deep=False)
 
     def _reorder_action_block(d: pd.DataFrame) -> pd.DataFrame:
         """Padroniza leitura: Acao_Recomendada antes de Confianca_Dado e Motivo.
@@ -669,11 +834,11 @@ def add_strategy_fields(
         if c in df.columns:
             df[c] = _coerce_series_numeric_ptbr(df[c])
 
-    df["ROAS_Real"] = df.apply(lambda r: _safe_div(r.get("Receita", 0), r.get("Investimento", 0)), axis=1)
-    df["ACOS_Real"] = df.apply(lambda r: _safe_div(r.get("Investimento", 0), r.get("Receita", 0)), axis=1)
+    df["ROAS_Real"] = _safe_div_cols(_num_col(df, "Receita"), _num_col(df, "Investimento"))
+    df["ACOS_Real"] = _safe_div_cols(_num_col(df, "Investimento"), _num_col(df, "Receita"))
 
     if "ACOS Objetivo" in df.columns:
-        df["ACOS_Objetivo_N"] = df["ACOS Objetivo"].copy()
+        df["ACOS_Objetivo_N"] = df["ACOS Objetivo"]
         df.loc[df["ACOS_Objetivo_N"] > 1.5, "ACOS_Objetivo_N"] = df.loc[
             df["ACOS_Objetivo_N"] > 1.5, "ACOS_Objetivo_N"
         ] / 100.0
@@ -699,107 +864,136 @@ def add_strategy_fields(
     df["CPI_Cum"] = df["CPI_Share"].cumsum()
     df["CPI_80"] = df["CPI_Cum"] <= 0.80
 
-    # Confianca de dado (nao muda o calculo, apenas blinda recomendacao)
-    def _confidence(row):
-        invest = float(row.get("Investimento", 0) or 0)
-        clicks = float(row.get("Cliques", 0) or 0)
-        sales = float(row.get("Vendas", 0) or 0)
-        if (invest >= 300.0) or (clicks >= 200) or (sales >= 5):
-            return "ALTA"
-        if (invest >= 100.0) or (clicks >= 80) or (sales >= 2):
-            return "MEDIA"
-        return "BAIXA"
-
-    df["Confianca_Dado"] = df.apply(_confidence, axis=1)
-
-    def _impacto_estimado(row):
-        receita = float(row.get("Receita", 0) or 0)
-        lost_b = float(row.get("Perdidas_Orc", 0) or 0)
-        if lost_b <= 0:
-            return 0.0
-        return receita * (lost_b / 100.0) * float(impacto_factor)
-
-    df["Impacto_Estimado_R$"] = df.apply(_impacto_estimado, axis=1)
+    # Confianca, quadrante, motivo e acao saem das tabelas de regras (report_rules,
+    # conjunto "campanha"), avaliadas sobre as colunas inteiras. Nulos seguem a regra
+    # antiga: NaN nao passa em nenhuma comparacao, coluna ausente vale 0.
+    df = rrules.apply_rules(
+        df,
+        "campanha",
+        {
+            "acos_over_pct": acos_over_pct,
+            "roas_mina": roas_mina,
+            "lost_budget_mina": lost_budget_mina,
+            "lost_rank_gigante": lost_rank_gigante,
+            "roas_hemorragia": roas_hemorragia,
+            "comp_invest_min": comp_invest_min,
+            "comp_clicks_min": comp_clicks_min,
+            "comp_sales_min": comp_sales_min,
+            "hiper_roas_mult": float(hiper_roas_mult),
+            "receita_relevante": receita_relevante,
+        },
+        regras=regras,
+    )
 
-    def classify(row):
-        roas = float(row.get("ROAS_Real", 0) or 0)
-        lost_b = float(row.get("Perdidas_Orc", 0) or 0)
-        lost_r = float(row.get("Perdidas_Class", 0) or 0)
-        receita = float(row.get("Receita", 0) or 0)
-        acos_real = float(row.get("ACOS_Real", 0) or 0)
-        roas_obj = row.get("ROAS_Objetivo", pd.NA)
-        invest = float(row.get("Investimento", 0) or 0)
-        clicks = int(float(row.get("Cliques", 0) or 0))
-        sales = int(float(row.get("Vendas", 0) or 0))
-
-        if (roas >= roas_mina) and (lost_b >= lost_budget_mina):
-            return "ESCALA_ORCAMENTO"
-
-        # Competitividade (Rank) com trava de elasticidade
-        if (receita >= receita_relevante) and (lost_r >= lost_rank_gigante):
-            volume_ok = (invest >= comp_invest_min) and ((clicks >= comp_clicks_min) or (sales >= comp_sales_min))
-            if volume_ok and pd.notna(roas_obj) and float(roas_obj) > 0:
-                # Se estiver hiper eficiente vs objetivo, manter estavel
-                if roas > (float(roas_obj) * float(hiper_roas_mult)):
-                    return "ESTAVEL"
-                return "COMPETITIVIDADE"
-
-        hem = (roas > 0 and roas < roas_hemorragia)
-        acos_obj_n = row.get("ACOS_Objetivo_N", pd.NA)
-        if pd.notna(acos_obj_n) and acos_obj_n and float(acos_obj_n) > 0:
-            if acos_real > (float(acos_obj_n) * (1.0 + acos_over_pct)):
-                hem = True
-        if hem:
-            return "HEMORRAGIA"
-
-        return "ESTAVEL"
-
-    df["Quadrante"] = df.apply(classify, axis=1)
-
-    def motivo(row):
-        q = row.get("Quadrante")
-        if q == "ESCALA_ORCAMENTO":
-            return "ROAS forte com perda por orcamento alta"
-        if q == "COMPETITIVIDADE":
-            return "Receita relevante com perda por classificacao alta e ROAS perto do objetivo"
-        if q == "HEMORRAGIA":
-            acos_obj_n = row.get("ACOS_Objetivo_N", pd.NA)
-            acos_real = float(row.get("ACOS_Real", 0) or 0)
-            if pd.notna(acos_obj_n) and float(acos_obj_n) > 0 and acos_real > (float(acos_obj_n) * (1.0 + acos_over_pct)):
-                return "ACOS real acima do objetivo"
-            return "ROAS abaixo do minimo"
-        return "Sem sinal claro de escala ou risco"
-
-    df["Motivo"] = df.apply(motivo, axis=1)
-
-    def action(row):
-        q = row.get("Quadrante")
-        conf = row.get("Confianca_Dado")
-
-        # Baixa confianca, nunca empurra ajuste. Mantem como lista de atencao.
-        if conf == "BAIXA":
-            return f"{EMOJI_BLUE} Manter"
-
-        if q == "ESCALA_ORCAMENTO":
-            return f"{EMOJI_GREEN} Aumentar orcamento"
-        if q == "COMPETITIVIDADE":
-            return f"{EMOJI_YELLOW} Baixar ROAS objetivo"
-        if q == "HEMORRAGIA":
-            return f"{EMOJI_RED} Revisar/pausar"
-        return f"{EMOJI_BLUE} Manter"
-
-    df["Acao_Recomendada"] = df.apply(action, axis=1)
-
-    # Se confianca baixa, registra motivo claro
-    df.loc[df["Confianca_Dado"] == "BAIXA", "Motivo"] = "Baixo volume, manter coletando dado"
+    lost_b = _num_col(df, "Perdidas_Orc")
+    with np.errstate(invalid="ignore"):
+        df["Impacto_Estimado_R$"] = np.where(lost_b <= 0, 0.0, _num_col(df, "Receita") * (lost_b / 100.0) * float(impacto_factor))
 
     # Garante ordem de leitura em todas as visoes que usam camp_strat
     df = _reorder_action_block(df)
     return df
 
 
+# Limiares do add_strategy_fields que as regras do conjunto "campanha" recebem
+_STRATEGY_RULE_PARAMS = (
+    "acos_over_pct", "roas_mina", "lost_budget_mina", "lost_rank_gigante", "roas_hemorragia",
+    "comp_invest_min", "comp_clicks_min", "comp_sales_min", "hiper_roas_mult",
+)
+
+# Limiares varridos por padrao na calibracao (strategy_sweep)
+SWEEP_PARAMS = ("roas_mina", "lost_budget_mina", "lost_rank_gigante", "roas_hemorragia")
+
+
+def strategy_sweep(
+    camp_strat: pd.DataFrame,
+    grade: Dict[str, Any],
+    regras=None,
+    quadrantes_risco=("HEMORRAGIA",),
+    max_celulas: int = 4_000_000,
+    **fixos,
+) -> Dict[str, Any]:
+    """
+    Sensibilidade dos quadrantes a uma grade de limiares do add_strategy_fields.
+
+    ``camp_strat`` e a saida do add_strategy_fields (ja tem ROAS/ACOS real e
+    objetivo); ``grade`` = {limiar: valores} e os cenarios sao o produto cartesiano.
+    Os limiares fora da grade valem ``fixos`` ou o padrao da funcao. As regras do
+    quadrante (report_rules, inclusive as do cliente) sao avaliadas para varios
+    cenarios de uma vez, com os limiares em arrays (cenarios x campanhas), em
+    blocos de ate ``max_celulas``.
+
+    Retorna {"parametros", "valores", "quadrantes", "contagem", "investimento",
+    "investimento_em_risco", "campanhas", "cenarios", "tempo_s"}: ``contagem`` e
+    ``investimento`` tem forma (len de cada limiar..., quadrantes) e
+    ``investimento_em_risco`` (len de cada limiar...) soma o investimento das
+    campanhas em ``quadrantes_risco``.
+    """
+    t0 = time.perf_counter()
+    nomes = list(grade)
+    valores = [np.asarray(grade[k], dtype="float64").ravel() for k in nomes]
+    forma = tuple(len(v) for v in valores)
+    if 0 in forma:
+        raise ValueError(f"grade sem valores para {[k for k, v in zip(nomes, valores) if not len(v)]}")
+    cenarios = [g.ravel() for g in np.meshgrid(*valores, indexing="ij")]
+    n_cen = int(np.prod(forma)) if forma else 1
+
+    padroes = inspect.signature(add_strategy_fields).parameters
+    params = {k: fixos.get(k, padroes[k].default) for k in _STRATEGY_RULE_PARAMS}
+    params["hiper_roas_mult"] = float(params["hiper_roas_mult"])
+    # mesma receita relevante do add_strategy_fields (5% da receita, minimo 500)
+    params["receita_relevante"] = max(500.0, float(pd.to_numeric(camp_strat.get("Receita"), errors="coerce").fillna(0).sum()) * 0.05)
+
+    n = len(camp_strat)
+    invest = np.nan_to_num(_num_col(camp_strat, "Investimento"))
+    bloco = max(1, max_celulas // max(n, 1))
+    quadrantes: List[str] = []
+    contagem = investimento = None
+    for i in range(0, n_cen, bloco):
+        j = min(n_cen, i + bloco)
+        p = dict(params)
+        for k, g in zip(nomes, cenarios):
+            p[k] = g[i:j, None]
+        saidas = rrules.evaluate_rules(camp_strat, "campanha", p, regras=regras, ate="quadrante")
+        rotulos, vencedora = saidas["Quadrante"]
+        if contagem is None:
+            quadrantes = list(dict.fromkeys(rotulos))
+            contagem = np.zeros((n_cen, len(quadrantes)), dtype="int64")
+            investimento = np.zeros((n_cen, len(quadrantes)), dtype="float64")
+        q = len(quadrantes)
+        codigo = np.array([quadrantes.index(r) for r in rotulos])[np.broadcast_to(vencedora, (j - i, n))]
+        # contagem e investimento por (cenario, quadrante) num bincount so
+        idx = (codigo + q * np.arange(j - i)[:, None]).ravel()
+        contagem[i:j] = np.bincount(idx, minlength=(j - i) * q).reshape(j - i, q)
+        investimento[i:j] = np.bincount(idx, weights=np.broadcast_to(invest, (j - i, n)).ravel(), minlength=(j - i) * q).reshape(j - i, q)
+
+    risco = [k for k, quad in enumerate(quadrantes) if quad in quadrantes_risco]
+    return {
+        "parametros": nomes,
+        "valores": dict(zip(nomes, valores)),
+        "quadrantes": quadrantes,
+        "contagem": contagem.reshape(forma + (len(quadrantes),)),
+        "investimento": investimento.reshape(forma + (len(quadrantes),)),
+        "investimento_em_risco": investimento[:, risco].sum(axis=1).reshape(forma),
+        "campanhas": n,
+        "cenarios": n_cen,
+        "tempo_s": time.perf_counter() - t0,
+    }
+
+
+def sweep_frame(resultado: Dict[str, Any]) -> pd.DataFrame:
+    """Uma linha por cenario do strategy_sweep: limiares, campanhas por quadrante e investimento em risco."""
+    nomes = resultado["parametros"]
+    grades = np.meshgrid(*[resultado["valores"][k] for k in nomes], indexing="ij")
+    out = pd.DataFrame({k: g.ravel() for k, g in zip(nomes, grades)})
+    contagem = resultado["contagem"].reshape(resultado["cenarios"], -1)
+    for k, quad in enumerate(resultado["quadrantes"]):
+        out[f"Campanhas_{quad}"] = contagem[:, k]
+    out["Investimento_em_risco"] = resultado["investimento_em_risco"].ravel()
+    return out
+
+
 def build_executive_diagnosis(camp_agg_strat: pd.DataFrame, daily: pd.DataFrame = None) -> dict:
-    df = camp_agg_strat.copy()
+    df = camp_agg_strat
 
     invest = float(pd.to_numeric(df["Investimento"], errors="coerce").fillna(0).sum())
     receita = float(pd.to_numeric(df["Receita"], errors="coerce").fillna(0).sum())
@@ -810,7 +1004,7 @@ def build_executive_diagnosis(camp_agg_strat: pd.DataFrame, daily: pd.DataFrame
     trend = {"cpc_proxy_up": None, "ticket_down": None, "roas_down": None}
 
     if daily is not None and len(daily) >= 14 and "Desde" in daily.columns:
-        d = daily.copy().sort_values("Desde")
+        d = daily.sort_values("Desde")
         last7 = d.tail(7)
         prev7 = d.tail(14).head(7)
 
@@ -864,19 +1058,46 @@ def build_executive_diagnosis(camp_agg_strat: pd.DataFrame, daily: pd.DataFrame
     }
 
 
+def _top_k(df: pd.DataFrame, by, ascending=False, k: Optional[int] = None) -> pd.DataFrame:
+    """
+    ``df.sort_values(by, ascending, kind="stable").head(k)`` sem ordenar a tabela
+    inteira: uma selecao parcial (np.partition) na primeira chave acha o valor da
+    k-esima linha, e so as linhas ate esse corte (empates inclusive) sao ordenadas
+    por todas as chaves. ``k=None`` ordena tudo; primeira chave nao numerica
+    tambem cai na ordenacao completa.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    ascending = [ascending] * len(by) if isinstance(ascending, bool) else list(ascending)
+    if k is not None:
+        if k <= 0:
+            return df.iloc[:0]
+        chave = df[by[0]]
+        if k < len(df) and pd.api.types.is_numeric_dtype(chave.dtype) and not pd.api.types.is_bool_dtype(chave.dtype):
+            v = chave.to_numpy(dtype="float64", na_value=np.nan)
+            if not ascending[0]:
+                v = -v
+            validos = v[~np.isnan(v)]
+            # com k valores validos, nenhum NaN (que vai para o fim) entra no resultado
+            if len(validos) >= k:
+                corte = np.partition(validos, k - 1)[k - 1]
+                df = df[v <= corte]
+    out = df.sort_values(by, ascending=ascending, kind="stable")
+    return out if k is None else out.head(k)
+
+
 def build_opportunity_highlights(camp_agg_strat: pd.DataFrame) -> dict:
-    df = camp_agg_strat.copy()
+    df = camp_agg_strat
 
-    locomotivas = df[(df["CPI_80"] == True) & (df["Quadrante"] == "COMPETITIVIDADE")].copy()
-    locomotivas = locomotivas.sort_values("Receita", ascending=False).head(5)
+    locomotivas = df[(df["CPI_80"] == True) & (df["Quadrante"] == "COMPETITIVIDADE")]
+    locomotivas = _top_k(locomotivas, "Receita", k=5)
 
-    minas = df[df["Quadrante"] == "ESCALA_ORCAMENTO"].copy()
+    minas = df[df["Quadrante"] == "ESCALA_ORCAMENTO"]
     # Prioriza impacto estimado e depois perda por orcamento
     sort_cols = [c for c in ["Impacto_Estimado_R$", "Perdidas_Orc", "ROAS_Real"] if c in minas.columns]
     if sort_cols:
-        minas = minas.sort_values(sort_cols, ascending=[False] * len(sort_cols)).head(5)
+        minas = _top_k(minas, sort_cols, k=5)
     else:
-        minas = minas.sort_values(["ROAS_Real", "Perdidas_Orc"], ascending=[False, False]).head(5)
+        minas = _top_k(minas, ["ROAS_Real", "Perdidas_Orc"], k=5)
 
     def proj(row):
         receita = float(row.get("Receita", 0) or 0)
@@ -895,13 +1116,13 @@ def build_15_day_plan(camp_agg_strat: pd.DataFrame) -> pd.DataFrame:
     if camp_agg_strat.empty or "Quadrante" not in camp_agg_strat.columns:
         return pd.DataFrame()
         
-    df = camp_agg_strat.copy()
+    df = camp_agg_strat
 
     # --- SEMANA 1: AJUSTES ---
     cols_base = ["Nome", "Acao_Recomendada", "Confianca_Dado"]
     
     # Dia 1: Escala e Hemorragia (Urgente)
-    d1 = df[df["Quadrante"].isin(["ESCALA_ORCAMENTO", "HEMORRAGIA"])].copy()
+    d1 = df[df["Quadrante"].isin(["ESCALA_ORCAMENTO", "HEMORRAGIA"])]
     d1["Dia"] = "Dia 01"
     d1["Fase"] = "Semana 1: Ajustes"
     d1["Tarefa"] = d1["Quadrante"].map({
@@ -910,7 +1131,7 @@ def build_15_day_plan(camp_agg_strat: pd.DataFrame) -> pd.DataFrame:
     })
 
     # Dia 3: Competitividade
-    d3 = df[df["Quadrante"] == "COMPETITIVIDADE"].copy()
+    d3 = df[df["Quadrante"] == "COMPETITIVIDADE"]
     d3["Dia"] = "Dia 03"
     d3["Fase"] = "Semana 1: Ajustes"
     d3["Tarefa"] = "Reduzir ROAS objetivo em 1 ou 2 pontos"
@@ -923,7 +1144,7 @@ def build_15_day_plan(camp_agg_strat: pd.DataFrame) -> pd.DataFrame:
     d8["Tarefa"] = "APRENDIZADO: Não alterar. Apenas monitorar ROAS e CPC."
 
     # Dia 15: Reavaliação Final
-    d15 = d8[d8["Dia"] == "Dia 08"].copy()
+    d15 = d8[d8["Dia"] == "Dia 08"]
     d15["Dia"] = "Dia 15"
     d15["Fase"] = "Semana 2: Aprendizado"
     d15["Tarefa"] = "Fim do ciclo. Se ROAS estabilizou, planejar novo ajuste."
@@ -944,75 +1165,74 @@ def build_7_day_plan(camp_agg_strat: pd.DataFrame) -> pd.DataFrame:
     return build_15_day_plan(camp_agg_strat)
 
 
-def build_control_panel(camp_agg_strat: pd.DataFrame) -> pd.DataFrame:
-    df = camp_agg_strat.copy()
+def build_control_panel(camp_agg_strat: pd.DataFrame, limite: Optional[int] = None) -> pd.DataFrame:
+    """Painel de controle das campanhas por receita; ``limite`` = so as N primeiras (None = todas)."""
+    df = camp_agg_strat
     base_cols = [
         "Nome","Orçamento","ACOS Objetivo","ROAS_Objetivo","ROAS_Real",
         "Perdidas_Orc","Perdidas_Class","Acao_Recomendada","Confianca_Dado","Motivo","Impacto_Estimado_R$"
     ]
     cols = [c for c in base_cols if c in df.columns]
-    panel = df[cols].copy()
+    panel = df[cols]
 
     if "Receita" in df.columns:
-        panel = panel.join(df[["Nome","Receita"]].set_index("Nome"), on="Nome")
-        panel = panel.sort_values("Receita", ascending=False).drop(columns=["Receita"])
+        # a receita da propria linha (o join por Nome repetia a campanha de nome repetido)
+        panel = _top_k(panel.assign(Receita=df["Receita"]), "Receita", k=limite).drop(columns=["Receita"])
+    elif limite is not None:
+        panel = panel.head(limite)
 
     return panel
 
 
-def build_tables(
+# Colunas de vendas que seguem para a lista "Entrar em Ads" (org_fora_ads)
+ORG_ENTER_COLS = ("ID", "Titulo", "Conv_Visitas_Vendas", "Visitas", "Qtd_Vendas", "Vendas_Brutas")
+
+
+def prepare_tables(
     org: pd.DataFrame,
     camp_agg: pd.DataFrame,
     pat: pd.DataFrame,
-    enter_visitas_min: int = 50,
-    enter_conv_min: float = 0.05,
-    pause_invest_min: float = 100.0,
-    pause_cvr_max: float = 0.01,
-    **kwargs
-):
+    regras=None,
+    estoque: pd.DataFrame = None,
+) -> Dict[str, Any]:
+    """
+    Etapa do build_tables que nao depende dos filtros da barra lateral: campanhas
+    com estrategia (add_strategy_fields), KPIs, anuncios ativos e o painel de
+    anuncios com metricas e dados da campanha (sem a classificacao).
+
+    O resultado vai para ``apply_thresholds``; trocar um limiar reaplica so as
+    mascaras e os filtros sobre ele. ``entidades`` (report_entities) e o indice
+    de anuncios, SKUs e campanhas da execucao, com as chaves do ``estoque`` se vier.
+    """
+    # Entradas compactadas (report_dtypes): o indice de entidades, o filtro de
+    # anuncios em Ads e a contagem de IDs leem direto os IDs inteiros e as
+    # categorias; so as colunas que entram em contas ou nas saidas voltam ao tipo
+    # do loader (e, no org_fora_ads, so as linhas que sobram). As saidas sao as
+    # mesmas com ou sem a compactacao.
+    camp_agg = restore_frame(camp_agg)
+
     # KPIs devem considerar TODAS as campanhas (ativas e inativas).
-    camp_agg_all = camp_agg.copy() if camp_agg is not None else camp_agg
+    camp_agg_all = camp_agg
 
     # Tabelas de ação consideram apenas campanhas ATIVAS
     camp_agg_active = camp_agg
     if camp_agg_active is not None and not camp_agg_active.empty and "Status" in camp_agg_active.columns:
-        camp_agg_active = camp_agg_active[camp_agg_active["Status"].map(_is_active_status)].copy()
-    camp_strat = add_strategy_fields(camp_agg_active)
+        camp_agg_active = camp_agg_active[camp_agg_active["Status"].map(_is_active_status)]
+    camp_strat = add_strategy_fields(camp_agg_active, regras=regras)
 
-    pause = camp_strat[
-        (camp_strat["Investimento"] > pause_invest_min) &
-        ((camp_strat["Vendas"] <= 0) | (camp_strat["CVR"] < pause_cvr_max) | (camp_strat["Quadrante"] == "HEMORRAGIA"))
-    ].copy()
-    pause["Ação"] = "PAUSAR/REVISAR"
-    pause = pause.sort_values("Investimento", ascending=False)
+    # Chaves de anúncio, SKU e campanha de todos os relatórios como inteiros
+    entidades = rentities.build_entity_index(org=org, pat=pat, camp_agg=camp_agg, estoque=estoque)
 
-    ads_ids = set(pat["ID"].dropna().astype(str).unique())
     # Considerar apenas anúncios ATIVOS para recomendação de entrada em Ads
     org_active = org
     if org is not None and not org.empty and "Status" in org.columns:
-        org_active = org[org["Status"].map(_is_active_status)].copy()
-
-    enter = org_active[
-        (org_active["Visitas"] >= enter_visitas_min) &
-        (org_active["Conv_Visitas_Vendas"] > enter_conv_min) &
-        (~org_active["ID"].astype(str).isin(ads_ids))
-    ].copy()
-    enter["Codigo_MLB"] = "MLB" + enter["ID"].astype(str)
-    enter["Ação"] = "INSERIR EM ADS"
-    enter = enter.sort_values(["Conv_Visitas_Vendas","Visitas"], ascending=[False, False])
-    enter = enter[["ID","Codigo_MLB","Titulo","Conv_Visitas_Vendas","Visitas","Qtd_Vendas","Vendas_Brutas","Ação"]]
-
-    scale = camp_strat[camp_strat["Quadrante"] == "ESCALA_ORCAMENTO"].copy()
-    scale["Ação"] = "AUMENTAR ORCAMENTO"
-    if "Impacto_Estimado_R$" in scale.columns:
-        scale = scale.sort_values(["Impacto_Estimado_R$","Perdidas_Orc"], ascending=[False, False])
-    elif "Perdidas_Orc" in scale.columns:
-        scale = scale.sort_values("Perdidas_Orc", ascending=False)
-
-    acos = camp_strat[camp_strat["Quadrante"] == "COMPETITIVIDADE"].copy()
-    acos["Ação"] = "BAIXAR ROAS OBJETIVO"
-    if "Perdidas_Class" in acos.columns:
-        acos = acos.sort_values(["Perdidas_Class","Receita"], ascending=[False, False])
+        ativos = restore_frame(org, columns=["Status"])["Status"].map(_is_active_status)
+        org_active = org[ativos.to_numpy(dtype=bool)]
+    em_ads = np.zeros(len(entidades.chaves["mlb"]) + 1, dtype=bool)
+    em_ads[entidades.codes("mlb", pat["ID"])] = True
+    em_ads[-1] = False  # código -1: ID vazio
+    org_active = org_active[~em_ads[entidades.codes("mlb", org_active["ID"])]]
+    org_active = restore_frame(org_active, columns=ORG_ENTER_COLS)
 
     invest_total = float(pd.to_numeric(camp_agg_all["Investimento"], errors="coerce").fillna(0).sum())
     receita_total = float(pd.to_numeric(camp_agg_all["Receita"], errors="coerce").fillna(0).sum())
@@ -1021,7 +1241,8 @@ def build_tables(
 
     # TACOS = Investimento Ads / Faturamento total da conta.
     # Faturamento total da conta vem do relatorio organico (publicacoes), coluna Vendas_Brutas.
-    faturamento_total = float(pd.to_numeric(org.get("Vendas_Brutas"), errors="coerce").fillna(0).sum())
+    vendas_brutas = restore_frame(org, columns=["Vendas_Brutas"]).get("Vendas_Brutas")
+    faturamento_total = float(pd.to_numeric(vendas_brutas, errors="coerce").fillna(0).sum())
     tacos = (invest_total / faturamento_total) if faturamento_total else 0.0
 
     kpis = {
@@ -1036,32 +1257,239 @@ def build_tables(
         "Impressões Totais": float(pd.to_numeric(camp_agg_all["Impressões"], errors="coerce").fillna(0).sum()),
         "Cliques Totais": float(pd.to_numeric(camp_agg_all["Cliques"], errors="coerce").fillna(0).sum()),
     }
-    ads_panel = build_ads_panel(
-        pat,
-        camp_strat=camp_strat,
-        ads_min_imp=int(kwargs.get("ads_min_imp", 500)),
-        ads_min_clk=int(kwargs.get("ads_min_clk", 10)),
-        ads_ctr_min_abs=float(kwargs.get("ads_ctr_min_abs", 0.60)),
-        ads_cvr_min=float(kwargs.get("ads_cvr_min", 1.00)),
-        ads_pause_invest_min=float(kwargs.get("ads_pause_invest_min", 20.0)),
+
+    return {
+        "kpis": kpis,
+        "camp_strat": camp_strat,
+        # anúncios ativos fora de Ads (candidatos a entrar)
+        "org_fora_ads": org_active,
+        "ads_base": _ads_panel_base(pat, camp_strat, entidades),
+        "regras": regras,
+        "entidades": entidades,
+    }
+
+
+# Subconjuntos do painel de anuncios: nome -> (coluna, valor)
+ADS_SUBSETS = {
+    "ads_pausar": ("Acao_Anuncio", "Pausar anúncio"),
+    "ads_vencedores": ("Status_Anuncio", "Vencedor"),
+    "ads_otim_fotos": ("Acao_Anuncio", "Revisar Fotos e Clips"),
+    "ads_otim_keywords": ("Acao_Anuncio", "Otimizar Palavras-chave"),
+    "ads_otim_oferta": ("Acao_Anuncio", "Revisar Oferta"),
+}
+
+
+class ReportTables:
+    """
+    Saidas do build_tables / apply_thresholds, calculadas no primeiro acesso.
+
+    Cada tabela e um atributo (``kpis``, ``pause``, ``enter``, ``scale``, ``acos``,
+    ``camp_strat``, ``ads_panel`` e os subconjuntos de ``ADS_SUBSETS``) e fica
+    guardada depois de calculada. Os subconjuntos de anuncios saem de uma unica
+    particao (groupby) por coluna do painel. O objeto ainda se comporta como a
+    tupla de 12 saidas de antes: ``kpis, pause, ... = build_tables(...)`` e
+    ``tabelas[i]`` continuam valendo (desempacotar calcula tudo).
+
+    Com o limiar ``enter_limite``, ``enter`` traz so os N melhores anuncios (selecao
+    parcial, sem ordenar o catalogo) e ``enter_completo``, fora da tupla, o ranking
+    inteiro para a exportacao.
+    """
+
+    CAMPOS = (
+        "kpis", "pause", "enter", "scale", "acos", "camp_strat", "ads_panel",
+        "ads_pausar", "ads_vencedores", "ads_otim_fotos", "ads_otim_keywords", "ads_otim_oferta",
     )
 
-    ads_pausar = pd.DataFrame()
-    ads_vencedores = pd.DataFrame()
-    ads_otim_fotos = pd.DataFrame()
-    ads_otim_keywords = pd.DataFrame()
-    ads_otim_oferta = pd.DataFrame()
+    def __init__(self, base: Dict[str, Any], limiares: Dict[str, Any]):
+        self._base = base
+        self._limiares = limiares
+
+    # --- compatibilidade com a tupla ---
+    def __iter__(self):
+        return (getattr(self, c) for c in self.CAMPOS)
+
+    def __len__(self) -> int:
+        return len(self.CAMPOS)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return tuple(getattr(self, c) for c in self.CAMPOS[i])
+        return getattr(self, self.CAMPOS[i])
+
+    def __repr__(self) -> str:
+        return f"ReportTables(calculadas={self.calculadas()})"
+
+    def calculadas(self) -> List[str]:
+        """Tabelas ja calculadas, na ordem da tupla."""
+        return [c for c in self.CAMPOS if c in self.__dict__]
+
+    # --- tabelas de campanha e de entrada em Ads ---
+    @cached_property
+    def kpis(self) -> Dict[str, Any]:
+        return dict(self._base["kpis"])
+
+    @cached_property
+    def camp_strat(self) -> pd.DataFrame:
+        return self._base["camp_strat"].copy(deep=False)
+
+    @cached_property
+    def pause(self) -> pd.DataFrame:
+        camp_strat = self._base["camp_strat"]
+        pause = camp_strat[
+            (camp_strat["Investimento"] > self._limiares["pause_invest_min"]) &
+            ((camp_strat["Vendas"] <= 0) | (camp_strat["CVR"] < self._limiares["pause_cvr_max"]) | (camp_strat["Quadrante"] == "HEMORRAGIA"))
+        ]
+        pause["Ação"] = "PAUSAR/REVISAR"
+        return pause.sort_values("Investimento", ascending=False)
+
+    @cached_property
+    def _enter_candidatos(self) -> pd.DataFrame:
+        org_fora_ads = self._base["org_fora_ads"]
+        return org_fora_ads[
+            (org_fora_ads["Visitas"] >= self._limiares["enter_visitas_min"]) &
+            (org_fora_ads["Conv_Visitas_Vendas"] > self._limiares["enter_conv_min"])
+        ]
+
+    def _ranking_enter(self, k: Optional[int]) -> pd.DataFrame:
+        enter = _top_k(self._enter_candidatos, ["Conv_Visitas_Vendas","Visitas"], k=k)
+        enter["Codigo_MLB"] = "MLB" + enter["ID"].astype(str)
+        enter["Ação"] = "INSERIR EM ADS"
+        return enter[["ID","Codigo_MLB","Titulo","Conv_Visitas_Vendas","Visitas","Qtd_Vendas","Vendas_Brutas","Ação"]]
+
+    @cached_property
+    def enter(self) -> pd.DataFrame:
+        return self._ranking_enter(self._limiares.get("enter_limite"))
+
+    @cached_property
+    def enter_completo(self) -> pd.DataFrame:
+        """Ranking inteiro do "Entrar em Ads" (sem ``enter_limite`` e o proprio ``enter``)."""
+        if self._limiares.get("enter_limite") is None:
+            return self.enter
+        return self._ranking_enter(None)
+
+    @cached_property
+    def scale(self) -> pd.DataFrame:
+        camp_strat = self._base["camp_strat"]
+        scale = camp_strat[camp_strat["Quadrante"] == "ESCALA_ORCAMENTO"]
+        scale["Ação"] = "AUMENTAR ORCAMENTO"
+        if "Impacto_Estimado_R$" in scale.columns:
+            scale = scale.sort_values(["Impacto_Estimado_R$","Perdidas_Orc"], ascending=[False, False])
+        elif "Perdidas_Orc" in scale.columns:
+            scale = scale.sort_values("Perdidas_Orc", ascending=False)
+        return scale
+
+    @cached_property
+    def acos(self) -> pd.DataFrame:
+        camp_strat = self._base["camp_strat"]
+        acos = camp_strat[camp_strat["Quadrante"] == "COMPETITIVIDADE"]
+        acos["Ação"] = "BAIXAR ROAS OBJETIVO"
+        if "Perdidas_Class" in acos.columns:
+            acos = acos.sort_values(["Perdidas_Class","Receita"], ascending=[False, False])
+        return acos
+
+    # --- painel de anuncios e subconjuntos ---
+    @cached_property
+    def _painel(self) -> pd.DataFrame:
+        kw = self._limiares
+        return classify_ads_panel(
+            self._base["ads_base"],
+            ads_min_imp=int(kw.get("ads_min_imp", 500)),
+            ads_min_clk=int(kw.get("ads_min_clk", 10)),
+            ads_ctr_min_abs=float(kw.get("ads_ctr_min_abs", 0.60)),
+            ads_cvr_min=float(kw.get("ads_cvr_min", 1.00)),
+            ads_pause_invest_min=float(kw.get("ads_pause_invest_min", 20.0)),
+            regras=kw.get("regras", self._base["regras"]),
+        )
+
+    @cached_property
+    def ads_panel(self) -> pd.DataFrame:
+        # copia rasa: quem escrever no painel nao muda os subconjuntos ainda nao calculados
+        return self._painel.copy(deep=False)
+
+    @cached_property
+    def _particoes(self) -> Dict[str, Dict[Any, np.ndarray]]:
+        """Posicoes das linhas do painel por valor de cada coluna de ADS_SUBSETS (um groupby por coluna)."""
+        panel = self._painel
+        if panel is None or panel.empty:
+            return {}
+        colunas = dict.fromkeys(col for col, _ in ADS_SUBSETS.values() if col in panel.columns)
+        return {col: panel.groupby(col, sort=False, dropna=True).indices for col in colunas}
+
+    def _subconjunto(self, nome: str) -> pd.DataFrame:
+        col, valor = ADS_SUBSETS[nome]
+        particao = self._particoes.get(col)
+        if particao is None:
+            return pd.DataFrame()
+        pos = particao.get(valor)
+        return self._painel.take(pos) if pos is not None else self._painel.iloc[:0]
+
+    @cached_property
+    def ads_pausar(self) -> pd.DataFrame:
+        return self._subconjunto("ads_pausar")
+
+    @cached_property
+    def ads_vencedores(self) -> pd.DataFrame:
+        return self._subconjunto("ads_vencedores")
+
+    @cached_property
+    def ads_otim_fotos(self) -> pd.DataFrame:
+        return self._subconjunto("ads_otim_fotos")
+
+    @cached_property
+    def ads_otim_keywords(self) -> pd.DataFrame:
+        return self._subconjunto("ads_otim_keywords")
+
+    @cached_property
+    def ads_otim_oferta(self) -> pd.DataFrame:
+        return self._subconjunto("ads_otim_oferta")
+
+
+def apply_thresholds(
+    base: Dict[str, Any],
+    enter_visitas_min: int = 50,
+    enter_conv_min: float = 0.05,
+    pause_invest_min: float = 100.0,
+    pause_cvr_max: float = 0.01,
+    enter_limite: Optional[int] = None,
+    **kwargs
+) -> ReportTables:
+    """
+    Etapa do build_tables que depende dos limiares: filtros de campanha/anuncio e a
+    classificacao dos anuncios. Nada e calculado aqui; cada tabela sai no primeiro
+    acesso ao ``ReportTables``. ``enter_limite`` corta a lista "Entrar em Ads" nos
+    N melhores (None = todos).
+    """
+    limiares = dict(
+        kwargs,
+        enter_visitas_min=enter_visitas_min,
+        enter_conv_min=enter_conv_min,
+        pause_invest_min=pause_invest_min,
+        pause_cvr_max=pause_cvr_max,
+        enter_limite=enter_limite,
+    )
+    return ReportTables(base, limiares)
 
-    if ads_panel is not None and not ads_panel.empty:
-        if "Acao_Anuncio" in ads_panel.columns:
-            ads_pausar = ads_panel[ads_panel["Acao_Anuncio"] == "Pausar anúncio"].copy()
-            ads_otim_fotos = ads_panel[ads_panel["Acao_Anuncio"] == "Revisar Fotos e Clips"].copy()
-            ads_otim_keywords = ads_panel[ads_panel["Acao_Anuncio"] == "Otimizar Palavras-chave"].copy()
-            ads_otim_oferta = ads_panel[ads_panel["Acao_Anuncio"] == "Revisar Oferta"].copy()
-        if "Status_Anuncio" in ads_panel.columns:
-            ads_vencedores = ads_panel[ads_panel["Status_Anuncio"] == "Vencedor"].copy()
 
-    return kpis, pause, enter, scale, acos, camp_strat, ads_panel, ads_pausar, ads_vencedores, ads_otim_fotos, ads_otim_keywords, ads_otim_oferta
+def build_tables(
+    org: pd.DataFrame,
+    camp_agg: pd.DataFrame,
+    pat: pd.DataFrame,
+    enter_visitas_min: int = 50,
+    enter_conv_min: float = 0.05,
+    pause_invest_min: float = 100.0,
+    pause_cvr_max: float = 0.01,
+    **kwargs
+) -> ReportTables:
+    """``prepare_tables`` + ``apply_thresholds`` (a app guarda a primeira etapa entre execucoes)."""
+    base = prepare_tables(org, camp_agg, pat, regras=kwargs.get("regras"))
+    return apply_thresholds(
+        base,
+        enter_visitas_min=enter_visitas_min,
+        enter_conv_min=enter_conv_min,
+        pause_invest_min=pause_invest_min,
+        pause_cvr_max=pause_cvr_max,
+        **kwargs,
+    )
 
 
 def _write_sheet_with_formatting(writer: pd.ExcelWriter, df: pd.DataFrame, sheet_name: str, formats: Dict[str, xlsxwriter.format.Format]):
@@ -1278,14 +1706,14 @@ def gerar_excel(kpis, camp_agg, pause, enter, scale, acos, camp_strat, ads_panel
     out.seek(0)
     return out.read()
 
-def compare_snapshots(df_current: pd.DataFrame, df_reference: pd.DataFrame) -> pd.DataFrame:
+def compare_snapshots(df_current: pd.DataFrame, df_reference: pd.DataFrame, entidades=None) -> pd.DataFrame:
     """Compara o estado atual das campanhas com um snapshot de referência."""
     if df_current is None or df_reference is None:
         return pd.DataFrame()
     
     # Garantir que temos as colunas necessárias
     cols_ref = ["Nome", "ROAS_Real", "Investimento", "Receita", "Quadrante"]
-    df_ref_sub = df_reference[[c for c in cols_ref if c in df_reference.columns]].copy()
+    df_ref_sub = df_reference[[c for c in cols_ref if c in df_reference.columns]]
     
     # Renomear colunas de referência para evitar conflito
     df_ref_sub = df_ref_sub.rename(columns={
@@ -1295,8 +1723,8 @@ def compare_snapshots(df_current: pd.DataFrame, df_reference: pd.DataFrame) -> p
         "Quadrante": "Quadrante_Ref"
     })
     
-    # Merge com os dados atuais
-    comparison = pd.merge(df_current, df_ref_sub, on="Nome", how="inner")
+    # Junção com os dados atuais (só as campanhas presentes nos dois)
+    comparison = rentities.left_join(df_current, df_ref_sub, "Nome", "Nome", "campanha", entidades, how="inner")
     
     # Calcular variações
     comparison["Delta_ROAS"] = comparison["ROAS_Real"] - comparison["ROAS_Ref"]
@@ -1325,6 +1753,7 @@ def build_ads_panel(
     ads_pause_invest_min: float = 20.0,
     share_prejudicial_min: float = 0.25,
     roas_bad_mult: float = 0.70,
+    regras=None,
 ) -> pd.DataFrame:
     """Painel tático por anúncio (patrocinados).
 
@@ -1332,19 +1761,100 @@ def build_ads_panel(
     - Campanha continua sendo unidade de controle.
     - Anúncio vira unidade de diagnóstico e refinamento da ação.
     - Sem CPC como alavanca (não é controlável no ML).
+    - ``regras``: ajustes do cliente às tabelas padrão (report_rules.load_rules).
     """
+    return classify_ads_panel(
+        _ads_panel_base(pat, camp_strat),
+        ads_min_imp=ads_min_imp,
+        ads_min_clk=ads_min_clk,
+        ads_ctr_min_abs=ads_ctr_min_abs,
+        ads_cvr_min=ads_cvr_min,
+        ads_pause_invest_min=ads_pause_invest_min,
+        share_prejudicial_min=share_prejudicial_min,
+        roas_bad_mult=roas_bad_mult,
+        regras=regras,
+    )
+
+
+def _campaign_rollup(out: pd.DataFrame, camp_strat: pd.DataFrame | None = None, entidades=None) -> pd.DataFrame:
+    """
+    Colunas da campanha em cada anúncio do painel: somas, ROAS/CVR, participação e
+    estratégia (camp_strat). ROAS objetivo, quadrante e ação da campanha ocupam as
+    colunas ``*_Campanha`` (o merge por nome de antes as deixava em ``_x``/``_y``, e
+    o ROAS_Ref e o refino nunca as viam).
+    """
+    out = out.copy(deep=False)
+    if entidades is None:
+        entidades = rentities.build_entity_index(pat=out[["Campanha"]], camp_agg=camp_strat)
+
+    # métricas por campanha a partir do próprio patrocinado, num passo só sobre o código
+    # inteiro da campanha (-1 = anúncio sem campanha): as somas do grupo voltam linha a linha
+    camp_codes, camp_nomes = pd.factorize(out["Campanha"])
+    sem_campanha = camp_codes < 0
+    somas = out[["Investimento", "Receita", "Cliques", "Vendas"]].groupby(camp_codes, sort=False).transform("sum").to_numpy()
+    somas[sem_campanha] = np.nan
+    inv_c, rec_c, clk_c, vendas_c = somas.T
+    out["Invest_Campanha"] = inv_c
+    out["Receita_Campanha"] = rec_c
+    out["Cliques_Campanha"] = clk_c
+    out["Vendas_Campanha"] = vendas_c
+    out["ROAS_Campanha"] = _safe_div_cols(rec_c, inv_c)
+    out["CVR_Campanha_pct"] = _safe_div_cols(vendas_c, clk_c) * 100
+    # anúncio sem campanha: Invest_Campanha NaN, participação NaN
+    out["Pct_Invest_Campanha"] = _safe_div_cols(_num_col(out, "Investimento"), inv_c) * 100.0
+
+    # puxa ROAS objetivo da campanha (se disponível)
+    out["ROAS_Objetivo_Campanha"] = pd.NA
+    out["Quadrante_Campanha"] = pd.NA
+    out["Acao_Campanha"] = pd.NA
+
+    if camp_strat is not None and not camp_strat.empty and "Nome" in camp_strat.columns:
+        pares = [
+            (origem, destino)
+            for origem, destino in (
+                ("ROAS_Objetivo", "ROAS_Objetivo_Campanha"),
+                ("Quadrante", "Quadrante_Campanha"),
+                ("Acao_Recomendada", "Acao_Campanha"),
+            )
+            if origem in camp_strat.columns
+        ]
+        nomes = camp_strat["Nome"]
+        if not nomes.is_unique or nomes.hasnans or (nomes == "").any():
+            # nome repetido, nulo ou vazio: o merge multiplica/casa linhas, fica o merge
+            camp_pick = camp_strat[["Nome"] + [o for o, _ in pares]].rename(columns={"Nome": "Campanha", **dict(pares)})
+            out = out.merge(camp_pick, on="Campanha", how="left", suffixes=("", "_camp"))
+            for _, destino in pares:
+                out[destino] = out.pop(destino + "_camp")
+            return out
+        # linha do camp_strat de cada campanha do painel pelo índice de entidades (só os
+        # nomes distintos), levada a cada anúncio pelo código (-1 = sem campanha ou fora
+        # do camp_strat)
+        linha_camp = np.append(entidades.lookup("campanha", camp_nomes, nomes), -1)
+        linha = linha_camp[camp_codes]
+        for origem, destino in pares:
+            out[destino] = camp_strat[origem].array.take(linha, allow_fill=True)
+    return out
 
-    # Normalização de limiares: aceita valores em fração (0.022) ou em percentual (2.2)
-    # Internamente, CTR_pct e CVR_pct estão em percentual (0 a 100).
-    if 0 < ads_ctr_min_abs < 0.05:
-        ads_ctr_min_abs *= 100
-    if 0 < ads_cvr_min < 0.05:
-        ads_cvr_min *= 100
 
+# Métricas do Patrocinados somadas por anúncio no _ads_panel_base
+_ADS_AGG_MAP = {
+    "Impressões": "sum",
+    "Cliques": "sum",
+    "Receita\n(Moeda local)": "sum",
+    "Investimento\n(Moeda local)": "sum",
+    "Vendas por publicidade\n(Diretas + Indiretas)": "sum",
+}
+
+
+def _ads_panel_base(pat: pd.DataFrame, camp_strat: pd.DataFrame | None = None, entidades=None) -> pd.DataFrame:
+    """Parte do painel de anúncios que não depende dos limiares: agregação, métricas e dados da campanha."""
     if pat is None or pat.empty:
         return pd.DataFrame()
 
-    df = pat.copy()
+    # entradas compactadas (report_dtypes): só as colunas lidas aqui voltam ao tipo do loader
+    lidas = {"ID", "Codigo_MLB", "Titulo", "Título do anúncio patrocinado", "Campanha", "Status", *_ADS_AGG_MAP}
+    lidas.update(c for c in pat.columns if "campanha" in _norm_col_key(c))
+    df = restore_frame(pat, columns=lidas).copy(deep=False)
 
     # cria Codigo_MLB e Titulo se existirem colunas conhecidas
     if "Codigo_MLB" not in df.columns:
@@ -1369,19 +1879,11 @@ def build_ads_panel(
         df["Status"] = pd.NA
 
     # agregação (tolerante a nomes com \n)
-    agg_map = {
-        "Impressões": "sum",
-        "Cliques": "sum",
-        "Receita\n(Moeda local)": "sum",
-        "Investimento\n(Moeda local)": "sum",
-        "Vendas por publicidade\n(Diretas + Indiretas)": "sum",
-    }
-
     agg_dict = {}
     for c in ["Campanha", "Codigo_MLB", "Titulo", "Status"]:
         if c in df.columns:
             agg_dict[c] = "first"
-    for c, fn in agg_map.items():
+    for c, fn in _ADS_AGG_MAP.items():
         if c in df.columns:
             agg_dict[c] = fn
 
@@ -1399,114 +1901,63 @@ def build_ads_panel(
             out[c] = 0.0
         out[c] = pd.to_numeric(out[c], errors="coerce").fillna(0.0)
 
-    # métricas por anúncio
-    out["CTR_pct"] = out.apply(lambda r: (r["Cliques"] / r["Impressoes"] * 100) if r["Impressoes"] else 0.0, axis=1)
-    out["CVR_pct"] = out.apply(lambda r: (r["Vendas"] / r["Cliques"] * 100) if r["Cliques"] else 0.0, axis=1)
-    out["ROAS_Real"] = out.apply(lambda r: (r["Receita"] / r["Investimento"]) if r["Investimento"] else 0.0, axis=1)
-    out["ACOS_Real_pct"] = out.apply(lambda r: (r["Investimento"] / r["Receita"] * 100) if r["Receita"] else 0.0, axis=1)
-
-    # métricas por campanha a partir do próprio patrocinado
-    camp_base = out.groupby("Campanha", as_index=False).agg(
-        Invest_Campanha=("Investimento", "sum"),
-        Receita_Campanha=("Receita", "sum"),
-        Cliques_Campanha=("Cliques", "sum"),
-        Vendas_Campanha=("Vendas", "sum"),
-    )
-    camp_base["ROAS_Campanha"] = camp_base.apply(
-        lambda r: (r["Receita_Campanha"] / r["Invest_Campanha"]) if r["Invest_Campanha"] else 0.0, axis=1
-    )
-    camp_base["CVR_Campanha_pct"] = camp_base.apply(
-        lambda r: (r["Vendas_Campanha"] / r["Cliques_Campanha"] * 100) if r["Cliques_Campanha"] else 0.0, axis=1
-    )
-
-    out = out.merge(camp_base, on="Campanha", how="left")
-    out["Pct_Invest_Campanha"] = out.apply(
-        lambda r: (r["Investimento"] / r["Invest_Campanha"]) if r.get("Invest_Campanha") else 0.0, axis=1
-    ) * 100.0
-
-    # puxa ROAS objetivo da campanha (se disponível)
-    out["ROAS_Objetivo_Campanha"] = pd.NA
-    out["Quadrante_Campanha"] = pd.NA
-    out["Acao_Campanha"] = pd.NA
+    # métricas por anúncio (colunas inteiras; divisor zero vira 0.0)
+    imp, clk = _num_col(out, "Impressoes"), _num_col(out, "Cliques")
+    rec, inv, vendas = _num_col(out, "Receita"), _num_col(out, "Investimento"), _num_col(out, "Vendas")
+    out["CTR_pct"] = _safe_div_cols(clk, imp) * 100
+    out["CVR_pct"] = _safe_div_cols(vendas, clk) * 100
+    out["ROAS_Real"] = _safe_div_cols(rec, inv)
+    out["ACOS_Real_pct"] = _safe_div_cols(inv, rec) * 100
 
-    if camp_strat is not None and not camp_strat.empty:
-        cols_need = [c for c in ["Nome", "ROAS_Objetivo", "Quadrante", "Acao_Recomendada"] if c in camp_strat.columns]
-        if "Nome" in cols_need:
-            camp_pick = camp_strat[cols_need].copy()
-            camp_pick = camp_pick.rename(columns={
-                "Nome": "Campanha",
-                "ROAS_Objetivo": "ROAS_Objetivo_Campanha",
-                "Quadrante": "Quadrante_Campanha",
-                "Acao_Recomendada": "Acao_Campanha",
-            })
-            out = out.merge(camp_pick, on="Campanha", how="left")
+    out = _campaign_rollup(out, camp_strat, entidades)
 
     # fallback do objetivo: se não tem objetivo, usa o ROAS real da campanha como referência
-    def _roas_ref(r):
-        ro = r.get("ROAS_Objetivo_Campanha")
-        try:
-            if pd.notna(ro) and float(ro) > 0:
-                return float(ro)
-        except Exception:
-            pass
-        return float(r.get("ROAS_Campanha") or 0.0)
-
-    out["ROAS_Ref"] = out.apply(_roas_ref, axis=1)
-
-    def _classificar(r):
-        imp = float(r.get("Impressoes") or 0)
-        clk = float(r.get("Cliques") or 0)
-        inv = float(r.get("Investimento") or 0)
-        rec = float(r.get("Receita") or 0)
-        roas = float(r.get("ROAS_Real") or 0)
-        ctr = float(r.get("CTR_pct") or 0)
-        cvr = float(r.get("CVR_pct") or 0)
-        cvr_camp = float(r.get("CVR_Campanha_pct") or 0)
-        share = float(r.get("Pct_Invest_Campanha") or 0)
-        roas_ref = float(r.get("ROAS_Ref") or 0)
-
-        if imp < ads_min_imp or clk < ads_min_clk:
-            return "Neutro", "Manter", "BAIXA", "Pouco volume, coletar mais dados"
-
-        if inv >= ads_pause_invest_min and rec <= 0:
-            return "Prejudicial", "Pausar anúncio", "ALTA", "Gasto sem retorno"
-
-        if inv >= ads_pause_invest_min and roas_ref > 0 and roas < (roas_ref * roas_bad_mult):
-            conf = "ALTA" if share >= (share_prejudicial_min * 100) else "MEDIA"
-            return "Prejudicial", "Pausar anúncio", conf, "ROAS abaixo do alvo da campanha"
-
-        if ctr < ads_ctr_min_abs:
-            return "Neutro", "Revisar Fotos e Clips", "MEDIA", "Baixa atratividade, revisar Fotos e Clips"
-
-        if cvr < ads_cvr_min:
-            if cvr_camp > 0 and cvr < (cvr_camp * 0.75):
-                if ctr < (ads_ctr_min_abs * 2):
-                    return "Neutro", "Otimizar Palavras-chave", "MEDIA", "Tráfego desalinhado, otimizar palavras-chave"
-                return "Neutro", "Revisar Oferta", "MEDIA", "Oferta pouco competitiva ou possível movimento de concorrência"
-            return "Neutro", "Manter", "MEDIA", "Conversão baixa no contexto da campanha, monitorar"
-
-        if roas_ref > 0 and roas >= roas_ref and cvr >= max(ads_cvr_min, cvr_camp):
-            return "Vencedor", "Manter", "ALTA", "Acima do alvo da campanha, preservar"
-
-        return "Neutro", "Manter", "MEDIA", "Dentro do esperado, monitorar"
-
-    tmp = out.apply(lambda r: pd.Series(_classificar(r), index=["Status_Anuncio", "Acao_Anuncio", "Confianca_Anuncio", "Motivo_Anuncio"]), axis=1)
-    out = pd.concat([out, tmp], axis=1)
-
-    def _acao_cruzada(r):
-        quad = str(r.get("Quadrante_Campanha") or "")
-        status = str(r.get("Status_Anuncio") or "")
-        acao = str(r.get("Acao_Anuncio") or "")
-
-        if ("ESCALA" in quad) and (status == "Prejudicial" or acao == "Pausar anúncio"):
-            return "Pausar anúncio, preservar campanha para escala"
+    roas_obj = _num_col(out, "ROAS_Objetivo_Campanha", default=np.nan)
+    out["ROAS_Ref"] = np.where(roas_obj > 0, roas_obj, _num_col(out, "ROAS_Campanha"))
+    return out
 
-        if (("HEMORRAGIA" in quad) or ("PAUSAR" in quad)) and (status == "Vencedor"):
-            return "Preservar vencedor, revisar fracos antes de pausar campanha"
 
-        return ""
+def classify_ads_panel(
+    base: pd.DataFrame,
+    ads_min_imp: int = 500,
+    ads_min_clk: int = 10,
+    ads_ctr_min_abs: float = 0.60,
+    ads_cvr_min: float = 1.00,
+    ads_pause_invest_min: float = 20.0,
+    share_prejudicial_min: float = 0.25,
+    roas_bad_mult: float = 0.70,
+    regras=None,
+) -> pd.DataFrame:
+    """Classificação dos anúncios (status, ação, confiança, motivo, refino) sobre o ``_ads_panel_base``."""
+    # Normalização de limiares: aceita valores em fração (0.022) ou em percentual (2.2)
+    # Internamente, CTR_pct e CVR_pct estão em percentual (0 a 100).
+    if 0 < ads_ctr_min_abs < 0.05:
+        ads_ctr_min_abs *= 100
+    if 0 < ads_cvr_min < 0.05:
+        ads_cvr_min *= 100
 
-    out["Refino_Campanha"] = out.apply(_acao_cruzada, axis=1)
+    if base is None or base.empty:
+        return pd.DataFrame()
+    out = base.copy(deep=False)
+
+    # Árvore de decisão do anúncio e refino cruzado campanha x anúncio: tabelas de
+    # regras (report_rules, conjunto "anuncio") avaliadas sobre as colunas inteiras;
+    # a primeira regra verdadeira vence. NaN (anúncio sem campanha) não passa em
+    # nenhuma comparação.
+    out = rrules.apply_rules(
+        out,
+        "anuncio",
+        {
+            "ads_min_imp": ads_min_imp,
+            "ads_min_clk": ads_min_clk,
+            "ads_ctr_min_abs": ads_ctr_min_abs,
+            "ads_cvr_min": ads_cvr_min,
+            "ads_pause_invest_min": ads_pause_invest_min,
+            "share_prejudicial_min": share_prejudicial_min,
+            "roas_bad_mult": roas_bad_mult,
+        },
+        regras=regras,
+    )
 
     out = out.sort_values(["Status_Anuncio", "Investimento"], ascending=[True, False]).reset_index(drop=True)
     return out
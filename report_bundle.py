@@ -0,0 +1,278 @@
+"""
+Pacotes .zip com vários relatórios
+Cada arquivo do pacote é identificado pelo conteúdo (nomes das abas e linha de
+cabeçalho, nunca pelo nome do arquivo) e encaminhado ao loader do seu relatório.
+Os membros são descompactados um a um, em memória e só quando lidos; a leitura
+roda no pool de report_ingest à medida que cada arquivo sai do .zip.
+"""
+
+import posixpath
+import time
+import zipfile
+from io import BytesIO
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import ml_report as ml
+import report_ingest
+import shopee_report as shopee
+from excel_reader import StreamingWorkbook, TableSession, detect_format
+from report_schema import get_schema, norm_key
+
+# Linhas iniciais lidas de cada aba/arquivo para achar o cabeçalho
+HEADER_SCAN_ROWS = 40
+
+# Trecho lido de um CSV para identificá-lo (o resto só é descompactado na leitura)
+CSV_SCAN_BYTES = 256 * 1024
+
+# Assinatura de cada relatório, na ordem de teste (o primeiro que casa vence):
+# - "abas": critérios do _pick_sheet (ml_report.REPORT_SHEETS); só vale para Excel;
+# - "schema": registro usado para resolver os cabeçalhos (None = nome exato);
+# - "colunas": colunas canônicas que a linha de cabeçalho precisa ter;
+# - "termos": grupos de termos que alguma célula do cabeçalho precisa conter.
+# Patrocinados vem antes de campanha (o cabeçalho dele também tem "Campanha") e
+# palavras-chave antes de dados gerais (mesmas métricas + a coluna da palavra).
+REPORT_FINGERPRINTS = [
+    {
+        "marketplace": "mercado_livre",
+        "relatorio": "snapshot",
+        "abas": ml.REPORT_SHEETS["snapshot"],
+        "schema": None,
+        "colunas": ["Nome", "Quadrante", "Acao_Recomendada"],
+    },
+    {
+        "marketplace": "mercado_livre",
+        "relatorio": "vendas",
+        "abas": ml.REPORT_SHEETS["vendas"],
+        "schema": ("mercado_livre", "vendas"),
+        "colunas": ["ID", "Visitas", "Qtd_Vendas"],
+    },
+    {
+        "marketplace": "mercado_livre",
+        "relatorio": "patrocinados",
+        "abas": ml.REPORT_SHEETS["patrocinados"],
+        "schema": ("mercado_livre", "patrocinados"),
+        "colunas": ["Código do anúncio", "Campanha", "Impressões"],
+    },
+    {
+        "marketplace": "mercado_livre",
+        "relatorio": "campanha",
+        "abas": ml.REPORT_SHEETS["campanha"],
+        "schema": ("mercado_livre", "campanha"),
+        "colunas": ["Nome", "Impressões", "Investimento\n(Moeda local)"],
+    },
+    {
+        "marketplace": "mercado_livre",
+        "relatorio": "estoque",
+        "abas": ml.REPORT_SHEETS["estoque"],
+        "schema": ("mercado_livre", "estoque"),
+        "colunas": ["ITEM_ID", "SKU", "QUANTITY"],
+    },
+    {
+        "marketplace": "shopee",
+        "relatorio": "palavras_chave",
+        "abas": None,
+        "schema": ("shopee", "dados_gerais"),
+        "colunas": ["Impressões", "Cliques", "Despesas"],
+        "termos": [("palavra",)],
+    },
+    {
+        "marketplace": "shopee",
+        "relatorio": "dados_gerais",
+        "abas": None,
+        "schema": ("shopee", "dados_gerais"),
+        "colunas": ["Nome do Anúncio", "Impressões", "Despesas"],
+    },
+]
+
+# Loader de cada relatório (mesmas funções dos uploads individuais)
+BUNDLE_LOADERS: Dict[Tuple[str, str], Callable] = {
+    ("mercado_livre", "vendas"): ml.load_organico,
+    ("mercado_livre", "patrocinados"): ml.load_patrocinados,
+    ("mercado_livre", "campanha"): ml.load_campanhas_consolidado,
+    ("mercado_livre", "estoque"): ml.load_estoque,
+    ("mercado_livre", "snapshot"): ml.load_snapshot_v2,
+    ("shopee", "dados_gerais"): shopee.load_dados_gerais,
+    ("shopee", "palavras_chave"): shopee.load_dados_gerais,
+}
+
+# Relatórios que passam pelo cache em disco (os mesmos do upload individual)
+_CACHED_REPORTS = {("mercado_livre", "vendas"), ("mercado_livre", "patrocinados"), ("mercado_livre", "campanha")}
+
+
+class BundleMember:
+    """Arquivo dentro do pacote; os bytes só são descompactados quando alguém lê."""
+
+    def __init__(self, archive: zipfile.ZipFile, info: zipfile.ZipInfo):
+        self._archive = archive
+        self.info = info
+        self.path = info.filename
+        self.name = posixpath.basename(info.filename)
+        self.size = info.file_size
+        # Conta = pasta do arquivo dentro do pacote ("" = raiz)
+        self.conta = posixpath.dirname(info.filename.rstrip("/"))
+
+    def head(self, n: int) -> bytes:
+        with self._archive.open(self.info) as fh:
+            return fh.read(n)
+
+    def getvalue(self) -> bytes:
+        with self._archive.open(self.info) as fh:
+            return fh.read()
+
+    def to_upload(self) -> BytesIO:
+        """Cópia em memória com ``name`` e ``size`` (o que os uploads do Streamlit entregam)."""
+        buf = BytesIO(self.getvalue())
+        buf.name = self.name
+        buf.size = self.size
+        return buf
+
+
+# -------------------------
+# Identificação pelo conteúdo
+# -------------------------
+def _header_matches(row: List[Any], rule: Dict[str, Any]) -> bool:
+    cells = [v for v in row if isinstance(v, str) and v.strip()]
+    if rule["schema"] is not None:
+        schema = get_schema(*rule["schema"])
+        found = {schema.resolve(v) for v in cells}
+    else:
+        found = {v.strip() for v in cells}
+    if not set(rule["colunas"]).issubset(found):
+        return False
+    keys = [norm_key(v) for v in cells]
+    return all(any(all(t in k for t in terms) for k in keys) for terms in rule.get("termos", []))
+
+
+def _open_for_scan(member: BundleMember):
+    """Leitor só do começo do arquivo: abas + primeiras linhas (nunca o arquivo todo convertido)."""
+    fmt = detect_format(member.head(8))
+    if fmt == "csv":
+        head = member.head(CSV_SCAN_BYTES)
+        return TableSession(head, fmt="csv"), fmt
+    data = BytesIO(member.getvalue())
+    if fmt == "parquet":
+        return TableSession(data, fmt="parquet"), fmt
+    if fmt == "xlsx":
+        return StreamingWorkbook(data), fmt
+    return None, fmt
+
+
+def identify_book(book, fmt: str) -> Tuple[Optional[str], Optional[str]]:
+    """(marketplace, relatório) de um arquivo já aberto (só as linhas iniciais são lidas)."""
+    rows_by_sheet: Dict[str, List[List[Any]]] = {}
+    for rule in REPORT_FINGERPRINTS:
+        if fmt in ("xlsx", "xls"):
+            if rule["abas"] is None:
+                continue
+            sheet = ml._match_sheet(book.sheet_names, **rule["abas"])
+            if sheet is None:
+                continue
+        else:
+            sheet = book.sheet_names[0]
+        if sheet not in rows_by_sheet:
+            rows_by_sheet[sheet] = book.cells(sheet, max_rows=HEADER_SCAN_ROWS)
+        if any(_header_matches(row, rule) for row in rows_by_sheet[sheet]):
+            return rule["marketplace"], rule["relatorio"]
+    return None, None
+
+
+def identify(member: BundleMember) -> Tuple[Optional[str], Optional[str]]:
+    """(marketplace, relatório) do arquivo, ou (None, None) se não é um relatório conhecido."""
+    book, fmt = _open_for_scan(member)
+    if book is None:
+        return None, None
+    try:
+        return identify_book(book, fmt)
+    finally:
+        if isinstance(book, StreamingWorkbook):
+            book.close()
+
+
+def _members(archive: zipfile.ZipFile) -> Iterator[BundleMember]:
+    for info in archive.infolist():
+        base = posixpath.basename(info.filename)
+        if info.is_dir() or not base or base.startswith((".", "~$")) or info.filename.startswith("__MACOSX/"):
+            continue
+        yield BundleMember(archive, info)
+
+
+def scan_bundle(zip_file) -> List[Dict[str, Any]]:
+    """
+    Identifica cada arquivo do pacote sem ler os dados.
+
+    Retorna uma linha por arquivo: {"arquivo", "conta", "marketplace", "relatorio",
+    "membro", "erro"}; marketplace/relatório ficam None quando o arquivo não é
+    reconhecido.
+    """
+    if hasattr(zip_file, "seek"):
+        zip_file.seek(0)
+    archive = zipfile.ZipFile(zip_file)
+    rows = []
+    for member in _members(archive):
+        row = {"arquivo": member.path, "conta": member.conta, "marketplace": None, "relatorio": None, "membro": member, "erro": None}
+        try:
+            row["marketplace"], row["relatorio"] = identify(member)
+        except Exception as e:
+            row["erro"] = f"{type(e).__name__}: {e}"
+        rows.append(row)
+    return rows
+
+
+def bundle_uploads(scan: List[Dict[str, Any]], conta: str, marketplace: str) -> Dict[str, Any]:
+    """Arquivos de uma conta no formato dos uploads da barra lateral ({chave do relatório: arquivo})."""
+    out = {}
+    for row in scan:
+        if row["conta"] == conta and row["marketplace"] == marketplace and row["relatorio"] not in out:
+            out[row["relatorio"]] = row["membro"].to_upload()
+    return out
+
+
+# -------------------------
+# Leitura do pacote inteiro
+# -------------------------
+def load_bundle(zip_file, cache=None, parallel: Optional[bool] = None) -> Dict[str, Any]:
+    """
+    Identifica e lê todos os relatórios do pacote.
+
+    Os arquivos são descompactados um a um e entram no pool de leitura assim que
+    saem do .zip. Retorna {"arquivos": linhas do ``scan_bundle``, "contas":
+    {conta: {marketplace: {relatório: dados}}}, "ingestao": resultado do
+    ``report_ingest.load_reports`` (chave = caminho no pacote), "avisos": [...]}.
+    """
+    t0 = time.perf_counter()
+    scan = scan_bundle(zip_file)
+    known = [r for r in scan if r["relatorio"] is not None]
+
+    avisos, seen = [], set()
+    for r in known:
+        slot = (r["conta"], r["marketplace"], r["relatorio"])
+        if slot in seen:
+            avisos.append(f"{r['arquivo']}: {r['relatorio']} repetido na conta {r['conta'] or '(raiz)'}, ignorado")
+            r["relatorio"] = None
+        seen.add(slot)
+    known = [r for r in known if r["relatorio"] is not None]
+
+    if parallel is None:
+        parallel = report_ingest.should_parallelize(len(known), sum(r["membro"].size for r in known))
+
+    def _tasks():
+        for r in known:
+            yield r["arquivo"], (BUNDLE_LOADERS[(r["marketplace"], r["relatorio"])], r["membro"])
+
+    ingest = report_ingest.load_reports(
+        _tasks(),
+        cache=cache,
+        cache_keys=[r["arquivo"] for r in known if (r["marketplace"], r["relatorio"]) in _CACHED_REPORTS],
+        parallel=parallel,
+    )
+
+    contas: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for r in known:
+        if r["arquivo"] in ingest["dados"]:
+            contas.setdefault(r["conta"], {}).setdefault(r["marketplace"], {})[r["relatorio"]] = ingest["dados"][r["arquivo"]]
+    ingest["tempo_total"] = time.perf_counter() - t0
+    return {"arquivos": scan, "contas": contas, "ingestao": ingest, "avisos": avisos}
+
+
+def conta_label(conta: str) -> str:
+    return conta or "(raiz do pacote)"
@@ -0,0 +1,249 @@
+"""
+Cache em disco dos relatórios já lidos
+A chave é o SHA-256 dos bytes enviados + loader + versão dos loaders; o
+DataFrame fica gravado em Parquet e o reenvio do mesmo arquivo volta em
+milissegundos, sem reabrir o xlsx.
+"""
+
+import hashlib
+import os
+import tempfile
+import time
+from typing import Any, Callable, Dict, Optional
+
+import pandas as pd
+
+from excel_reader import file_bytes
+
+# Diretório do cache (pode ser trocado pela variável de ambiente)
+CACHE_DIR_ENV = "ML_REPORT_CACHE_DIR"
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "ml_report_cache")
+
+# Tamanho máximo do cache em disco; acima disso os itens menos usados saem primeiro
+CACHE_MAX_MB_ENV = "ML_REPORT_CACHE_MAX_MB"
+DEFAULT_MAX_MB = 512.0
+
+# Parâmetros que mudam só a forma de ler, não o DataFrame resultante
+_READER_ONLY_KWARGS = {"engine", "streaming", "streaming_min_mb"}
+
+# Colunas object são gravadas como tipo Arrow; a lista volta junto para restaurar o dtype
+OBJECT_COLS_ATTR = "cache_colunas_object"
+
+# Conteúdo de coluna object que volta igual do Parquet/Arrow (``infer_dtype`` sem os nulos;
+# em "mixed-integer-float" o int volta como float de mesmo valor). Texto misturado com
+# número ("mixed", "mixed-integer", ...) voltaria todo como texto e não entra no cache
+ARROW_OBJECT_KINDS = {"empty", "string", "bytes", "boolean", "integer", "floating", "mixed-integer-float"}
+
+
+def _parquet_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def content_key(data: bytes, loader: Callable, kwargs: Optional[Dict[str, Any]] = None, version: Any = None) -> str:
+    """SHA-256 dos bytes + loader + parâmetros que mudam o resultado + versão dos loaders."""
+    params = sorted((k, repr(v)) for k, v in (kwargs or {}).items() if k not in _READER_ONLY_KWARGS)
+    h = hashlib.sha256()
+    h.update(hashlib.sha256(data).digest())
+    h.update(f"|{loader.__module__}.{loader.__qualname__}|{version}|{params}".encode("utf-8"))
+    return h.hexdigest()
+
+
+def restore_object_cols(df: pd.DataFrame, cols) -> pd.DataFrame:
+    """Volta para object as colunas ``cols`` lidas do Parquet/Arrow (lista gravada em ``OBJECT_COLS_ATTR``)."""
+    for c in cols:
+        if c in df.columns and df[c].dtype != object:
+            s = df[c].astype(object)
+            # coluna toda nula volta como None (mesmo valor que o loader produz)
+            df[c] = s.where(s.notna(), None) if s.isna().all() else s
+    return df
+
+
+def arrow_frame(df: pd.DataFrame) -> Optional[pd.DataFrame]:
+    """
+    Cópia rasa de ``df`` pronta para Parquet/Arrow (sem ``attrs["leitura"]``, com a
+    lista das colunas object em ``OBJECT_COLS_ATTR``); None se alguma coluna não
+    voltaria igual (nome não-texto ou repetido, coluna object com tipos misturados).
+    """
+    if not df.columns.is_unique or not all(isinstance(c, str) for c in df.columns):
+        return None
+    cols = [c for c in df.columns if df[c].dtype == object]
+    if any(pd.api.types.infer_dtype(df[c], skipna=True) not in ARROW_OBJECT_KINDS for c in cols):
+        return None
+    out = df.copy(deep=False)
+    out.attrs = {k: v for k, v in df.attrs.items() if k != "leitura"}
+    out.attrs[OBJECT_COLS_ATTR] = cols
+    return out
+
+
+class ReportCache:
+    """
+    Cache endereçado por conteúdo dos DataFrames dos loaders.
+
+    - ``load(loader, file, **kwargs)`` devolve o DataFrame do cache ou chama o loader;
+    - cada item é um arquivo ``<chave>.parquet``; um hit atualiza o mtime do arquivo
+      e a remoção (LRU por tamanho) começa pelo mtime mais antigo;
+    - ``stats`` acumula hits/misses do processo (mostrados na interface).
+
+    Qualquer falha do cache (disco, pyarrow ausente, coluna que o Parquet não
+    representa, ver ``arrow_frame``) cai na leitura normal: o cache nunca impede o
+    relatório.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_mb: Optional[float] = None, version: Any = None):
+        self.cache_dir = cache_dir or os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR
+        if max_mb is None:
+            max_mb = float(os.environ.get(CACHE_MAX_MB_ENV) or DEFAULT_MAX_MB)
+        self.max_bytes = int(max_mb * 1e6)
+        self.version = version
+        self.enabled = _parquet_available()
+        self.stats: Dict[str, int] = {"hits": 0, "misses": 0, "gravados": 0, "ignorados": 0, "removidos": 0}
+
+    # -------------------------
+    # Chave
+    # -------------------------
+    def key(self, data: bytes, loader: Callable, kwargs: Optional[Dict[str, Any]] = None) -> str:
+        return content_key(data, loader, kwargs, self.version)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.parquet")
+
+    # -------------------------
+    # Leitura com cache
+    # -------------------------
+    def load(self, loader: Callable[..., pd.DataFrame], file, **kwargs) -> pd.DataFrame:
+        if not self.enabled:
+            return loader(file, **kwargs)
+
+        try:
+            key = self.key(file_bytes(file), loader, kwargs)
+        except Exception:
+            self.stats["ignorados"] += 1
+            return loader(file, **kwargs)
+
+        df = self.get(key)
+        if df is None:
+            df = loader(file, **kwargs)
+            self.put(key, df)
+        return df
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """DataFrame guardado na chave (conta hit/miss); None se não está no cache."""
+        if not self.enabled:
+            return None
+        t0 = time.perf_counter()
+        df = self._read(key)
+        if df is None:
+            self.stats["misses"] += 1
+            return None
+        self.stats["hits"] += 1
+        df.attrs["leitura"] = {"modo": "cache", "tempo_ms": (time.perf_counter() - t0) * 1000, "chave": key[:12]}
+        return df
+
+    def put(self, key: str, df: pd.DataFrame) -> None:
+        if self.enabled and isinstance(df, pd.DataFrame):
+            self._write(key, df)
+
+    def _read(self, key: str) -> Optional[pd.DataFrame]:
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        try:
+            df = pd.read_parquet(path, engine="pyarrow")
+            os.utime(path)  # marca como usado (LRU)
+        except Exception:
+            self._remove(path)
+            return None
+        cols = df.attrs.pop(OBJECT_COLS_ATTR, [])
+        return restore_object_cols(df, cols)
+
+    def _write(self, key: str, df: pd.DataFrame) -> None:
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        out = arrow_frame(df)
+        if out is None:
+            self.stats["ignorados"] += 1
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            out.to_parquet(tmp, engine="pyarrow")
+            os.replace(tmp, path)
+            self.stats["gravados"] += 1
+        except Exception:
+            self.stats["ignorados"] += 1
+            self._remove(tmp)
+            return
+        self.evict()
+
+    # -------------------------
+    # Manutenção
+    # -------------------------
+    def _entries(self):
+        try:
+            names = [n for n in os.listdir(self.cache_dir) if n.endswith(".parquet")]
+        except OSError:
+            return []
+        entries = []
+        for n in names:
+            p = os.path.join(self.cache_dir, n)
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, p))
+        return entries
+
+    def _remove(self, path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def evict(self) -> int:
+        """Remove os itens menos usados até o cache caber em ``max_bytes``."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+                removed += 1
+        self.stats["removidos"] += removed
+        return removed
+
+    def clear(self) -> None:
+        for _, _, path in self._entries():
+            self._remove(path)
+
+    def summary(self) -> Dict[str, Any]:
+        entries = self._entries()
+        return {
+            **self.stats,
+            "arquivos": len(entries),
+            "tamanho_mb": sum(size for _, size, _ in entries) / 1e6,
+            "limite_mb": self.max_bytes / 1e6,
+            "diretorio": self.cache_dir,
+        }
+
+
+_default_cache: Optional[ReportCache] = None
+
+
+def get_cache() -> ReportCache:
+    """Cache padrão do processo (contadores compartilhados entre os reruns do Streamlit)."""
+    global _default_cache
+    if _default_cache is None:
+        import ml_report
+
+        _default_cache = ReportCache(version=ml_report.LOADER_VERSION)
+    return _default_cache
+
+
+def cached_load(loader: Callable[..., pd.DataFrame], file, **kwargs) -> pd.DataFrame:
+    return get_cache().load(loader, file, **kwargs)
@@ -0,0 +1,121 @@
+"""
+Cópias de DataFrame no pipeline do relatório
+O pipeline roda com copy-on-write: no pandas 3 é sempre assim e no pandas 2 os
+pontos de entrada (``main`` da app, processos do pool de leitura, benchmark e
+testes) chamam ``enable_copy_on_write`` uma vez. Com isso
+um filtro, uma seleção de colunas ou um ``df.copy(deep=False)`` só duplicam os
+dados quando alguém escreve numa coluna compartilhada, e as funções não
+precisam mais de ``df = x.copy()`` para proteger a entrada.
+
+Para medir o que sobrou, ``track_copies`` conta as chamadas de
+``DataFrame.copy`` por etapa (a função do projeto que fez a cópia) com o tamanho
+copiado. Na app, ``ML_REPORT_COPY_STATS=1`` liga a contagem na geração do
+relatório e ``ML_REPORT_COPY_LIMIT_MB`` avisa no log quando uma etapa copia
+mais do que o limite.
+"""
+
+import logging
+import os
+import sys
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+COPY_STATS_ENV = "ML_REPORT_COPY_STATS"
+COPY_LIMIT_ENV = "ML_REPORT_COPY_LIMIT_MB"
+
+# Módulos que não contam como etapa (a cópia é atribuída a quem chamou o pandas)
+_SKIP_MODULES = ("pandas", "numpy", __name__, "contextlib")
+
+# Contagens ativas (uma por ``track_copies`` aberto) e o DataFrame.copy original
+_ACTIVE: list = []
+_ORIGINAL_COPY = pd.DataFrame.copy
+
+
+def enable_copy_on_write() -> bool:
+    """Liga o copy-on-write no pandas 2 (no pandas 3 não dá para desligar). True se está ativo."""
+    if int(pd.__version__.split(".")[0]) >= 3:
+        return True
+    try:
+        pd.set_option("mode.copy_on_write", True)
+    except (KeyError, pd.errors.OptionError):
+        return False
+    return True
+
+
+def tracking_enabled() -> bool:
+    return os.environ.get(COPY_STATS_ENV, "").strip().lower() in ("1", "true", "sim", "yes")
+
+
+def limit_mb() -> Optional[float]:
+    env = os.environ.get(COPY_LIMIT_ENV)
+    return float(env) if env else None
+
+
+def _stage() -> str:
+    """Primeira função fora do pandas na pilha de chamadas (módulo.função)."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        mod = frame.f_globals.get("__name__", "")
+        if mod.split(".")[0] not in _SKIP_MODULES:
+            return f"{mod}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return "?"
+
+
+def _counting_copy(self, deep=True):
+    if _ACTIVE:
+        stage = _stage()
+        size = int(self.memory_usage(index=True, deep=False).sum()) if deep else 0
+        for stats in _ACTIVE:
+            s = stats.setdefault(stage, {"copias": 0, "rasas": 0, "bytes": 0})
+            s["copias" if deep else "rasas"] += 1
+            s["bytes"] += size
+    return _ORIGINAL_COPY(self, deep=deep)
+
+
+@contextmanager
+def track_copies(limite_mb: Optional[float] = None) -> Iterator[Dict[str, Dict[str, Any]]]:
+    """
+    Conta as cópias de DataFrame feitas dentro do bloco.
+
+    Entrega {etapa: {"copias", "rasas", "bytes"}}: ``copias`` são as profundas
+    (com ``bytes`` copiados) e ``rasas`` as ``copy(deep=False)``, que no
+    copy-on-write não copiam dados. Ao sair, as etapas acima de ``limite_mb``
+    vão para o log como aviso.
+    """
+    stats: Dict[str, Dict[str, Any]] = {}
+    if not _ACTIVE:
+        pd.DataFrame.copy = _counting_copy
+    _ACTIVE.append(stats)
+    try:
+        yield stats
+    finally:
+        _ACTIVE.remove(stats)
+        if not _ACTIVE:
+            pd.DataFrame.copy = _ORIGINAL_COPY
+        if limite_mb is not None:
+            for stage, s in stats.items():
+                if s["bytes"] > limite_mb * 1e6:
+                    logger.warning("copias: %s copiou %.1f MB em %d copias (limite %.0f MB)", stage, s["bytes"] / 1e6, s["copias"], limite_mb)
+
+
+def copy_report(stats: Dict[str, Dict[str, Any]]) -> pd.DataFrame:
+    """Tabela das contagens do ``track_copies``, da etapa que mais copiou para a que menos copiou."""
+    rows = [{"Etapa": k, "Copias": v["copias"], "Rasas": v["rasas"], "MB": v["bytes"] / 1e6} for k, v in stats.items()]
+    out = pd.DataFrame(rows, columns=["Etapa", "Copias", "Rasas", "MB"])
+    return out.sort_values(["MB", "Copias"], ascending=False, ignore_index=True)
+
+
+def log_copies(stats: Dict[str, Dict[str, Any]], label: str = "relatorio") -> None:
+    total = sum(v["bytes"] for v in stats.values())
+    logger.info(
+        "copias (%s): %d profundas, %.1f MB; %s",
+        label,
+        sum(v["copias"] for v in stats.values()),
+        total / 1e6,
+        ", ".join(f"{k}={v['copias']}/{v['bytes'] / 1e6:.1f}MB" for k, v in sorted(stats.items(), key=lambda kv: -kv[1]["bytes"])),
+    )
@@ -0,0 +1,236 @@
+"""
+Tipos compactos para os DataFrames dos relatórios
+Logo depois da leitura, cada coluna troca para a representação mais enxuta que
+volta exatamente ao valor original: IDs numéricos viram int64, rótulos repetidos
+(Status, Campanha) viram category, textos únicos ficam em string Arrow e métricas
+que cabem em float32 sem perda são reduzidas.
+
+Os tipos originais ficam em ``df.attrs`` e ``restore_frame`` devolve o DataFrame
+exatamente como o loader entregou. O pipeline lê IDs inteiros e categorias direto
+quando o resultado não muda (índice de entidades, filtro de anúncios em Ads) e
+restaura só as colunas que entram em contas ou nas saídas, então as saídas de
+``build_tables`` não mudam.
+"""
+
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Tipos originais das colunas compactadas ({coluna: dtype em texto})
+DTYPES_ATTR = "dtypes_originais"
+
+# Maior ID que ainda cabe em int64 (18 dígitos)
+_MAX_ID_DIGITS = 18
+
+
+def _arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def memory_mb(df: Optional[pd.DataFrame]) -> float:
+    """Memória do DataFrame (inclui o conteúdo dos textos)."""
+    if df is None or not isinstance(df, pd.DataFrame):
+        return 0.0
+    return float(df.memory_usage(deep=True, index=True).sum()) / 1e6
+
+
+def _is_text(s: pd.Series) -> bool:
+    return s.dtype == object or isinstance(s.dtype, pd.StringDtype)
+
+
+def _restore_series(s: pd.Series, original: str) -> pd.Series:
+    dtype = pd.api.types.pandas_dtype(original)
+    if pd.api.types.is_integer_dtype(s.dtype) and not pd.api.types.is_numeric_dtype(dtype):
+        # ID guardado como inteiro volta como o texto de dígitos original
+        if isinstance(dtype, pd.StringDtype) and dtype.storage == "pyarrow":
+            # direto no Arrow (pandas 3): sem um str do Python por linha no meio do caminho
+            import pyarrow as pa
+            import pyarrow.compute as pc
+
+            texto = pc.cast(pa.array(s.to_numpy()), pa.large_string())
+            return pd.Series(pd.array(texto, dtype=dtype), index=s.index, name=s.name)
+        return s.astype(str).astype(dtype)
+    return s.astype(dtype)
+
+
+def _same(restored: pd.Series, original: pd.Series) -> bool:
+    if not restored.equals(original):
+        return False
+    if original.dtype != object:
+        return True
+    # equals nao distingue None de NaN/pd.NA em object; str() e o snapshot distinguem
+    nulls = original.isna().to_numpy()
+    if not nulls.any():
+        return True
+    kinds = lambda s: [type(v) for v in s.to_numpy()[nulls]]  # noqa: E731
+    return kinds(restored) == kinds(original)
+
+
+# -------------------------
+# Candidatos por coluna
+# -------------------------
+def _as_int_ids(s: pd.Series) -> Optional[pd.Series]:
+    # só dígitos, sem zero à esquerda e sem nulos: o texto volta igual com astype(str)
+    if s.isna().any():
+        return None
+    txt = s.astype(str)
+    lens = txt.str.len()
+    if not txt.str.isdigit().all() or lens.max() > _MAX_ID_DIGITS or ((lens > 1) & txt.str.startswith("0")).any():
+        return None
+    return pd.Series(txt.to_numpy(dtype=object).astype(np.int64), index=s.index, name=s.name)
+
+
+def _as_float(s: pd.Series) -> Optional[pd.Series]:
+    # coluna object só com números (ex.: conversões recalculadas com pd.NA)
+    try:
+        return pd.to_numeric(s, errors="raise").astype("float64")
+    except (TypeError, ValueError):
+        return None
+
+
+def _as_float32(s: pd.Series) -> Optional[pd.Series]:
+    s32 = s.astype("float32")
+    if not np.array_equal(s32.to_numpy(dtype="float64"), s.to_numpy(dtype="float64"), equal_nan=True):
+        return None
+    return s32
+
+
+def _as_category(s: pd.Series) -> Optional[pd.Series]:
+    try:
+        return s.astype("category")
+    except (TypeError, ValueError):
+        return None
+
+
+def _candidates(s: pd.Series) -> List[pd.Series]:
+    out = []
+    if _is_text(s):
+        out.append(_as_int_ids(s) if len(s) else None)
+        out.append(_as_category(s))
+        if s.dtype == object and _arrow_available():
+            out.append(s.astype("string[pyarrow]"))
+        if s.dtype == object:
+            num = _as_float(s)
+            if num is not None:
+                out.append(num)
+                f32 = _as_float32(num)
+                if f32 is not None:
+                    out.append(f32)
+    elif s.dtype == "float64":
+        f32 = _as_float32(s)
+        if f32 is not None:
+            out.append(f32)
+    return [c for c in out if c is not None]
+
+
+def _compact_series(s: pd.Series) -> Tuple[pd.Series, bool]:
+    """Menor representação de ``s`` que restaura exatamente (``equals``, inclusive o dtype)."""
+    best, best_mb = s, s.memory_usage(deep=True, index=False)
+    for cand in _candidates(s):
+        size = cand.memory_usage(deep=True, index=False)
+        if size >= best_mb:
+            continue
+        try:
+            same = _same(_restore_series(cand, str(s.dtype)), s)
+        except (TypeError, ValueError):
+            same = False
+        if same:
+            best, best_mb = cand, size
+    return best, best is not s
+
+
+# -------------------------
+# API
+# -------------------------
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Versão compacta de ``df``; os tipos originais vão para ``attrs[DTYPES_ATTR]``.
+
+    Cada coluna só muda de tipo se a volta (``restore_frame``) reproduz a coluna
+    original, valor a valor e com o mesmo dtype.
+    """
+    if df is None or not isinstance(df, pd.DataFrame) or df.empty or DTYPES_ATTR in df.attrs:
+        return df
+    if not df.columns.is_unique:
+        return df
+    cols, originals = {}, {}
+    for c in df.columns:
+        s, changed = _compact_series(df[c])
+        cols[c] = s
+        if changed:
+            originals[c] = str(df[c].dtype)
+    if not originals:
+        return df
+    out = pd.DataFrame(cols, index=df.index)
+    out.attrs = dict(df.attrs)
+    out.attrs[DTYPES_ATTR] = originals
+    return out
+
+
+def is_compact(df: Optional[pd.DataFrame]) -> bool:
+    return isinstance(df, pd.DataFrame) and bool(df.attrs.get(DTYPES_ATTR))
+
+
+def restore_frame(df: pd.DataFrame, columns: Optional[Iterable[Any]] = None) -> pd.DataFrame:
+    """
+    DataFrame com os tipos que o loader entregou (sem alterar ``df``).
+
+    ``columns`` limita a saída às colunas que o chamador vai ler (as que não
+    existem são ignoradas). Sem compactação, devolve ``df`` (ou a projeção).
+    """
+    if df is None or not isinstance(df, pd.DataFrame):
+        return df
+    if columns is not None:
+        wanted = set(columns)
+        df = df[[c for c in df.columns if c in wanted]]
+    originals = df.attrs.get(DTYPES_ATTR)
+    if not originals:
+        return df
+    out = df.copy(deep=False)
+    for c, original in originals.items():
+        if c in out.columns:
+            out[c] = _restore_series(out[c], original)
+    out.attrs = {k: v for k, v in df.attrs.items() if k != DTYPES_ATTR}
+    return out
+
+
+def compact_frames(frames: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Compacta os DataFrames do lote ({chave: df}); outros objetos passam direto.
+
+    Retorna (frames, relatório) com memória antes/depois por DataFrame; o
+    relatório também sai no log.
+    """
+    out, report = {}, []
+    for key, df in frames.items():
+        if not isinstance(df, pd.DataFrame):
+            out[key] = df
+            continue
+        before = memory_mb(df)
+        compact = compact_frame(df)
+        after = memory_mb(compact)
+        out[key] = compact
+        row = {
+            "frame": key,
+            "linhas": int(len(df)),
+            "antes_mb": before,
+            "depois_mb": after,
+            "reducao_pct": (1 - after / before) * 100 if before else 0.0,
+            "colunas_compactadas": {
+                c: f"{orig} -> {compact[c].dtype}" for c, orig in compact.attrs.get(DTYPES_ATTR, {}).items()
+            } if compact is not df else {},
+        }
+        report.append(row)
+        logger.info(
+            "memoria %s: %.2f MB -> %.2f MB (%.0f%%, %d linhas)",
+            key, before, after, -row["reducao_pct"], row["linhas"],
+        )
+    return out, report
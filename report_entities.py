@@ -0,0 +1,180 @@
+"""
+Índice de entidades da execução
+Anúncios (MLB), SKUs e campanhas aparecem em vários relatórios e eram casados
+por texto a cada junção: merge/isin/map sobre chaves normalizadas de novo em
+cada etapa (``_digits_only`` linha a linha, ``astype(str).str.strip()``...).
+
+O ``EntityIndex`` é montado uma vez por execução (``ml_report.prepare_tables``)
+com as chaves de vendas, Patrocinados, campanhas e estoque. Cada chave vira um
+inteiro denso, a posição dela no dicionário ordenado da entidade (-1 = vazia ou
+desconhecida), e uma junção vira indexação de arrays: código do lado esquerdo ->
+primeira linha do lado direito com o mesmo código. O dicionário de anúncios
+guarda o número do MLB (int64), não o texto: ID lido como número do Excel (o
+snapshot, por exemplo) casa sem passar por string.
+
+Normalização das chaves:
+- "mlb": só os dígitos, sem o ``.0`` de número lido do Excel (``MLB123``, ``123``
+  e ``123.0`` são o mesmo anúncio);
+- "sku": sem espaços nas pontas, em maiúsculas;
+- "campanha": o nome como está.
+"""
+
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+TIPOS = ("mlb", "sku", "campanha")
+
+# Chave vazia de cada entidade no dicionário (nunca casa)
+_VAZIA = {"mlb": -1, "sku": "", "campanha": ""}
+
+# MLB com mais dígitos que isso não cabe em int64 e fica como chave vazia
+_MLB_MAX_DIGITOS = 18
+
+
+def normalize_keys(values, tipo: str) -> pd.Series:
+    """Chaves normalizadas como texto ("" = vazia), vetorizado (a regra do ``_digits_only``/``_norm_sku``)."""
+    s = pd.Series(values, copy=False)
+    if tipo not in TIPOS:
+        raise ValueError(f"tipo de entidade desconhecido: {tipo!r} (use {', '.join(TIPOS)})")
+    # nulo vira "" antes do texto: no pandas 2 o astype("str") escreve "nan"/"None"
+    nulos = s.isna()
+    s = s.astype("str")
+    if nulos.any():
+        s = s.mask(nulos, "")
+    if tipo == "mlb":
+        return s.str.replace(r"\.0$|\D", "", regex=True)
+    if tipo == "sku":
+        return s.str.strip().str.upper()
+    return s
+
+
+def _dict_keys(values, tipo: str) -> pd.Series:
+    """Chaves como ficam no dicionário: número do MLB (-1 = vazia) ou o texto normalizado ("" = vazia)."""
+    s = pd.Series(values, copy=False)
+    if tipo != "mlb":
+        return normalize_keys(s, tipo)
+    if pd.api.types.is_integer_dtype(s.dtype) and not s.hasnans:
+        return s.astype("int64")
+    if pd.api.types.is_string_dtype(s.dtype) and not s.hasnans:
+        # caso comum (ID do Patrocinados/vendas já limpo): só dígitos, converte direto
+        tamanho = s.str.len()
+        if len(s) and s.str.isdigit().all() and tamanho.min() >= 1 and tamanho.max() <= _MLB_MAX_DIGITOS:
+            return s.astype("int64")
+    digitos = normalize_keys(s, tipo)
+    ok = digitos.str.len().between(1, _MLB_MAX_DIGITOS)
+    return digitos.where(ok, "-1").astype("int64")
+
+
+class EntityIndex:
+    """Dicionário ordenado de cada entidade ({tipo: pd.Index de chaves únicas; int64 no "mlb"})."""
+
+    def __init__(self, chaves: Optional[Dict[str, pd.Index]] = None):
+        self.chaves = {t: pd.Index([], dtype="int64" if t == "mlb" else "str") for t in TIPOS}
+        self.chaves.update(chaves or {})
+
+    def __repr__(self) -> str:
+        return "EntityIndex(" + ", ".join(f"{t}={len(i)}" for t, i in self.chaves.items()) + ")"
+
+    def codes(self, tipo: str, values) -> np.ndarray:
+        """Código de cada valor (-1 = chave vazia ou fora do índice)."""
+        chaves = _dict_keys(values, tipo)
+        cod = self.chaves[tipo].get_indexer(chaves)
+        cod[chaves.to_numpy() == _VAZIA[tipo]] = -1
+        return cod
+
+    def lookup(self, tipo: str, esquerda, direita) -> np.ndarray:
+        """
+        Para cada valor de ``esquerda``, a posição da primeira linha de ``direita``
+        com a mesma chave (-1 = sem par). Chaves fora do índice (ex.: campanha que
+        só existe no snapshot) entram num dicionário local, sem mudar o índice.
+        """
+        esq, dir_ = _dict_keys(esquerda, tipo), _dict_keys(direita, tipo)
+        dicionario = self.chaves[tipo]
+        cod_esq, cod_dir = dicionario.get_indexer(esq), dicionario.get_indexer(dir_)
+        fora_esq = (cod_esq < 0) & (esq.to_numpy() != _VAZIA[tipo])
+        fora_dir = (cod_dir < 0) & (dir_.to_numpy() != _VAZIA[tipo])
+        if fora_esq.any() or fora_dir.any():
+            # só as chaves que faltam vão para o dicionário local, depois das do índice
+            novas = pd.Index(pd.concat([esq[fora_esq], dir_[fora_dir]], ignore_index=True).unique(), dtype=dicionario.dtype)
+            cod_esq[fora_esq] = len(dicionario) + novas.get_indexer(esq[fora_esq])
+            cod_dir[fora_dir] = len(dicionario) + novas.get_indexer(dir_[fora_dir])
+            dicionario = dicionario.append(novas)
+
+        primeira = np.full(len(dicionario), -1, dtype=np.int64)
+        linhas = np.flatnonzero(cod_dir >= 0)
+        # de trás para frente: a última escrita de cada código é a primeira linha
+        primeira[cod_dir[linhas[::-1]]] = linhas[::-1]
+        return np.where(cod_esq >= 0, primeira[np.maximum(cod_esq, 0)], -1)
+
+    def unique_in(self, tipo: str, values) -> bool:
+        """As chaves não vazias de ``values`` não se repetem."""
+        chaves = _dict_keys(values, tipo)
+        chaves = chaves[chaves.to_numpy() != _VAZIA[tipo]]
+        return bool(chaves.is_unique)
+
+
+def build_entity_index(
+    org: Optional[pd.DataFrame] = None,
+    pat: Optional[pd.DataFrame] = None,
+    camp_agg: Optional[pd.DataFrame] = None,
+    estoque: Optional[pd.DataFrame] = None,
+) -> EntityIndex:
+    """Índice com as chaves de todos os relatórios da execução (os ausentes são ignorados)."""
+    fontes = {
+        "mlb": [(org, "ID"), (pat, "ID"), (estoque, "MLB_key")],
+        "sku": [(org, "SKU"), (estoque, "SKU_key")],
+        "campanha": [(camp_agg, "Nome"), (pat, "Campanha")],
+    }
+    chaves = {}
+    for tipo, cols in fontes.items():
+        partes = [_dict_keys(df[c], tipo) for df, c in cols if df is not None and c in df.columns]
+        todas = pd.concat(partes, ignore_index=True).unique() if partes else []
+        idx = pd.Index(todas, dtype="int64" if tipo == "mlb" else "str")
+        chaves[tipo] = idx[idx != _VAZIA[tipo]].sort_values()
+    return EntityIndex(chaves)
+
+
+def take_rows(serie: pd.Series, posicoes: np.ndarray) -> pd.Series:
+    """Linhas ``posicoes`` da coluna (-1 = NaN), com a promoção de tipo de um merge left."""
+    valores = take(serie.array, posicoes, allow_fill=True)
+    return pd.Series(valores, dtype=object if serie.dtype == object else None, copy=False)
+
+
+def left_join(
+    left: pd.DataFrame,
+    right: pd.DataFrame,
+    left_on: str,
+    right_on: str,
+    tipo: str,
+    entidades: Optional[EntityIndex] = None,
+    suffixes: Tuple[str, str] = ("_x", "_y"),
+    how: str = "left",
+    primeira: bool = False,
+) -> pd.DataFrame:
+    """
+    ``left.merge(right, left_on=..., right_on=..., how="left" | "inner")`` por
+    indexação: mesmas colunas, sufixos, ordem das linhas e índice novo (0..n-1).
+    Casa pela chave normalizada do ``tipo``. Com chave repetida do lado direito
+    vale a primeira linha se ``primeira`` (como um ``drop_duplicates`` antes do
+    merge); senão cai no merge, que duplica as linhas.
+    """
+    entidades = entidades or EntityIndex()
+    if not primeira and not entidades.unique_in(tipo, right[right_on]):
+        return left.merge(right, left_on=left_on, right_on=right_on, how=how, suffixes=suffixes)
+
+    pos = entidades.lookup(tipo, left[left_on], right[right_on])
+    if how == "inner":
+        manter = pos >= 0
+        left, pos = left[manter], pos[manter]
+    elif how != "left":
+        raise ValueError(f"left_join só faz how='left' ou 'inner', não {how!r}")
+
+    direita = [c for c in right.columns if not (c == right_on and right_on == left_on)]
+    comuns = set(left.columns).intersection(direita) - ({left_on} if left_on == right_on else set())
+    out = left.reset_index(drop=True)
+    out.columns = [f"{c}{suffixes[0]}" if c in comuns else c for c in out.columns]
+    novas = {f"{c}{suffixes[1]}" if c in comuns else c: take_rows(right[c], pos) for c in direita}
+    return pd.concat([out, pd.DataFrame(novas)], axis=1)
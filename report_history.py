@@ -0,0 +1,212 @@
+"""
+Histórico diário de campanhas por conta
+O relatório de campanha diário chega toda manhã cobrindo o período inteiro; em
+vez de reprocessar meses de xlsx, cada conta guarda um histórico em Parquet
+(um arquivo por mês) com chave (campanha, dia).
+
+A cada envio só os dias novos ou reexpressos (o conteúdo bruto do dia mudou)
+passam pela conversão das métricas e entram por upsert; os dias já gravados com
+o mesmo conteúdo são descartados logo após a leitura, e um arquivo já enviado
+nem é reaberto. As agregações (série diária, consolidado por campanha) leem o
+histórico.
+"""
+
+import hashlib
+import json
+import os
+import re
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+import ml_report as ml
+from excel_reader import file_bytes
+from report_cache import OBJECT_COLS_ATTR, restore_object_cols
+
+# Diretório dos históricos (persistente; uma pasta por conta)
+HISTORY_DIR_ENV = "ML_REPORT_HISTORY_DIR"
+DEFAULT_HISTORY_DIR = os.path.join(os.path.expanduser("~"), ".ml_report_history")
+
+# Chave de cada linha do histórico
+KEY_COLS = ["Nome", "Desde"]
+
+_MANIFEST = "manifest.json"
+
+
+def _safe_name(conta: str) -> str:
+    return re.sub(r"[^\w.-]+", "_", str(conta).strip()) or "padrao"
+
+
+def _day_digests(raw: pd.DataFrame, dias: pd.Series) -> Dict[str, str]:
+    """Assinatura do conteúdo bruto de cada dia (soma dos hashes das linhas, independe da ordem)."""
+    row_hash = pd.util.hash_pandas_object(raw, index=False).to_numpy(dtype=np.uint64)
+    codes, uniques = pd.factorize(dias)
+    sums = np.zeros(len(uniques), dtype=np.uint64)
+    np.add.at(sums, codes, row_hash)  # soma em uint64 (dá a volta sem perder a assinatura)
+    counts = np.bincount(codes, minlength=len(uniques))
+    return {d: f"{int(s):016x}-{int(c)}" for d, s, c in zip(uniques, sums, counts)}
+
+
+class CampaignHistory:
+    """
+    Histórico diário de campanhas de uma conta.
+
+    - ``ingest(arquivo)`` lê um relatório de campanha diário e faz upsert dos dias
+      novos/reexpressos; devolve o resumo (dias novos, atualizados, ignorados);
+    - ``frame(desde, ate)`` devolve as linhas gravadas, no formato de
+      ``ml_report.load_campanhas_diario``, ordenadas por dia e campanha;
+    - ``daily()`` e ``campaign_agg()`` são as agregações do pipeline sobre o histórico.
+    """
+
+    def __init__(self, conta: str, base_dir: Optional[str] = None):
+        self.conta = conta
+        base = base_dir or os.environ.get(HISTORY_DIR_ENV) or DEFAULT_HISTORY_DIR
+        self.dir = os.path.join(base, _safe_name(conta), "campanhas_diario")
+
+    # -------------------------
+    # Manifesto e partições
+    # -------------------------
+    def _manifest(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.dir, _MANIFEST), encoding="utf-8") as f:
+                man = json.load(f)
+        except (OSError, ValueError):
+            man = {}
+        if man.get("versao") != ml.LOADER_VERSION:
+            # loaders mudaram: as assinaturas antigas não valem, todo dia enviado é regravado
+            man = {"versao": ml.LOADER_VERSION, "dias": {}, "arquivos": []}
+        return man
+
+    def _save_manifest(self, man: Dict[str, Any]) -> None:
+        path = os.path.join(self.dir, _MANIFEST)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(man, f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp, path)
+
+    def _month_path(self, mes: str) -> str:
+        return os.path.join(self.dir, f"{mes}.parquet")
+
+    def _months(self):
+        try:
+            return sorted(n[: -len(".parquet")] for n in os.listdir(self.dir) if n.endswith(".parquet"))
+        except OSError:
+            return []
+
+    def _read_month(self, mes: str) -> Optional[pd.DataFrame]:
+        path = self._month_path(mes)
+        if not os.path.exists(path):
+            return None
+        df = pd.read_parquet(path, engine="pyarrow")
+        return restore_object_cols(df, df.attrs.pop(OBJECT_COLS_ATTR, []))
+
+    def _write_month(self, mes: str, df: pd.DataFrame) -> None:
+        path = self._month_path(mes)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        out = df.copy(deep=False)
+        out.attrs = {OBJECT_COLS_ATTR: [c for c in df.columns if df[c].dtype == object]}
+        out.to_parquet(tmp, engine="pyarrow", index=False)
+        os.replace(tmp, path)
+
+    # -------------------------
+    # Ingestão incremental
+    # -------------------------
+    def ingest(self, campanhas_file, engine: Optional[str] = None) -> Dict[str, Any]:
+        t0 = time.perf_counter()
+        info = {"dias_novos": 0, "dias_atualizados": 0, "dias_ignorados": 0, "linhas_gravadas": 0,
+                "linhas_sem_data": 0, "arquivo_repetido": False, "tempo_s": 0.0}
+        os.makedirs(self.dir, exist_ok=True)
+        man = self._manifest()
+
+        file_hash = hashlib.sha256(file_bytes(campanhas_file)).hexdigest()
+        if file_hash in man["arquivos"]:
+            info["arquivo_repetido"] = True
+            info["tempo_s"] = time.perf_counter() - t0
+            return info
+
+        raw = ml.read_campanhas_diario_raw(campanhas_file, engine=engine)
+        missing = [c for c in KEY_COLS if c not in raw.columns]
+        if missing:
+            raise ValueError(f"Relatório de campanha sem as colunas {missing}: não é o relatório diário.")
+        com_data = raw["Desde"].notna()
+        info["linhas_sem_data"] = int((~com_data).sum())
+        raw = raw[com_data]
+        dias = raw["Desde"].dt.strftime("%Y-%m-%d")
+
+        digests = _day_digests(raw, dias)
+        novos = {d for d in digests if d not in man["dias"]}
+        mudaram = {d for d in digests if d in man["dias"] and man["dias"][d] != digests[d]}
+        info["dias_novos"], info["dias_atualizados"] = len(novos), len(mudaram)
+        info["dias_ignorados"] = len(digests) - len(novos) - len(mudaram)
+
+        alvo = novos | mudaram
+        if alvo:
+            # só as linhas dos dias que vão ser gravados passam pela conversão das métricas
+            sel = dias.isin(alvo).to_numpy()
+            camp = ml._coerce_campaign_numeric(raw[sel].copy())
+            camp = camp.drop_duplicates(subset=KEY_COLS, keep="last")
+            meses = camp["Desde"].dt.strftime("%Y-%m")
+            for mes, novas in camp.groupby(meses.to_numpy(), sort=True):
+                self._upsert_month(mes, novas, alvo)
+            info["linhas_gravadas"] = int(len(camp))
+            for d in alvo:
+                man["dias"][d] = digests[d]
+
+        man["arquivos"].append(file_hash)
+        self._save_manifest(man)
+        info["tempo_s"] = time.perf_counter() - t0
+        return info
+
+    def _upsert_month(self, mes: str, novas: pd.DataFrame, dias) -> None:
+        atual = self._read_month(mes)
+        if atual is not None and not atual.empty:
+            # o dia reexpresso substitui o dia gravado inteiro: campanha que sumiu ou
+            # mudou de nome na nova versão não fica no histórico
+            manter = ~atual["Desde"].dt.strftime("%Y-%m-%d").isin(dias)
+            novas = pd.concat([atual[manter], novas], ignore_index=True)
+        self._write_month(mes, novas.sort_values(KEY_COLS, kind="stable").reset_index(drop=True))
+
+    # -------------------------
+    # Leitura
+    # -------------------------
+    def days(self):
+        return sorted(self._manifest()["dias"])
+
+    def frame(self, desde=None, ate=None) -> pd.DataFrame:
+        """Linhas gravadas entre ``desde`` e ``ate`` (inclusive); lê só os meses do intervalo."""
+        desde = pd.Timestamp(desde) if desde is not None else None
+        ate = pd.Timestamp(ate) if ate is not None else None
+        parts = []
+        for mes in self._months():
+            inicio = pd.Timestamp(f"{mes}-01")
+            if (ate is not None and inicio > ate) or (desde is not None and inicio + pd.offsets.MonthEnd(0) < desde.normalize()):
+                continue
+            parts.append(self._read_month(mes))
+        if not parts:
+            return pd.DataFrame(columns=KEY_COLS)
+        df = pd.concat(parts, ignore_index=True) if len(parts) > 1 else parts[0]
+        if desde is not None:
+            df = df[df["Desde"] >= desde]
+        if ate is not None:
+            df = df[df["Desde"] <= ate]
+        return df.sort_values(KEY_COLS, kind="stable").reset_index(drop=True)
+
+    def daily(self, desde=None, ate=None) -> pd.DataFrame:
+        """Série diária (``ml_report.build_daily_from_diario``) a partir do histórico."""
+        df = self.frame(desde, ate)
+        return ml.build_daily_from_diario(df) if not df.empty else df
+
+    def campaign_agg(self, desde=None, ate=None) -> pd.DataFrame:
+        """Consolidado por campanha (``build_campaign_agg(modo="diario")``) a partir do histórico."""
+        df = self.frame(desde, ate)
+        return ml.build_campaign_agg(df, modo="diario") if not df.empty else df
+
+    def clear(self) -> None:
+        for mes in self._months():
+            os.remove(self._month_path(mes))
+        try:
+            os.remove(os.path.join(self.dir, _MANIFEST))
+        except OSError:
+            pass
@@ -0,0 +1,269 @@
+"""
+Ingestão paralela dos relatórios enviados
+Os arquivos não dependem uns dos outros, então cada um é lido em um processo
+separado (a leitura do xlsx é CPU-bound e segura o GIL). Tempo, origem e erro
+ficam registrados por arquivo; uma falha não interrompe a leitura dos demais.
+
+Quando um processo morre (em geral falta de memória num arquivo enorme), o pool
+inteiro cai e não dá para saber qual arquivo o derrubou: cada arquivo afetado é
+lido de novo sozinho num pool novo. Só o que derruba o processo outra vez pode
+ser lido no servidor do Streamlit, e só se a estimativa do ``report_memory``
+couber no orçamento; senão ele fica com o erro.
+"""
+
+import logging
+import multiprocessing
+import os
+import pickle
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple, Union
+
+import report_cache
+import report_copies
+import report_shared
+from excel_reader import file_bytes
+
+# Processos do pool de leitura (o lote do Mercado Livre tem no máximo 5 arquivos)
+_CPUS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+MAX_WORKERS = max(1, min(4, _CPUS))
+
+# Abaixo desse volume a leitura roda no próprio processo: abrir/usar o pool custa mais que ler
+PARALLEL_MIN_MB = 1.0
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+logger = logging.getLogger(__name__)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    # Pool persistente entre os reruns do Streamlit; "spawn" evita fork de um
+    # processo com threads (servidor do Streamlit); cada processo liga o copy-on-write
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=MAX_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=report_copies.enable_copy_on_write,
+        )
+    return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+    _pool = None
+
+
+def _upload(name: str, data: bytes) -> BytesIO:
+    buf = BytesIO(data)
+    buf.name = name
+    return buf
+
+
+def _run_loader(loader: Callable, name: str, data: bytes, kwargs: Dict[str, Any]):
+    """Executa um loader sobre os bytes do upload (roda dentro do processo do pool)."""
+    t0 = time.perf_counter()
+    out = loader(_upload(name, data), **kwargs)
+    return out, time.perf_counter() - t0
+
+
+def _picklable(fn: Callable) -> bool:
+    # Loaders definidos no script do Streamlit (__main__) não chegam aos processos
+    try:
+        pickle.dumps(fn)
+    except Exception:
+        return False
+    return True
+
+
+def _error_text(exc: BaseException) -> str:
+    return f"{type(exc).__name__}: {exc}"
+
+
+def _local_fallback_error(key, name: str, data: bytes, kwargs: Dict[str, Any]) -> Optional[str]:
+    """Motivo para não ler no próprio processo o arquivo que derrubou o processo do pool (None = pode ler)."""
+    import report_memory  # report_memory importa este módulo
+
+    orcamento = report_memory.budget_mb()
+    if orcamento is None:
+        return None
+    try:
+        est = report_memory.estimate_file(str(key), _upload(name, data))
+    except Exception as e:
+        logger.warning("leitura de %s: sem estimativa de memória para a leitura local (%s)", key, _error_text(e))
+        return None
+    leitura = est["leitura_mb"]
+    if kwargs.get("streaming") and est["leitura_streaming_mb"] is not None:
+        leitura = est["leitura_streaming_mb"]
+    necessario = report_memory.current_rss_mb() + leitura
+    logger.warning(
+        "leitura de %s: processo do pool encerrado duas vezes; leitura local estimada em %.0f MB (orçamento %.0f MB)",
+        key, necessario, orcamento,
+    )
+    if necessario <= orcamento:
+        return None
+    return (
+        f"O processo de leitura foi encerrado (provavelmente falta de memória) e ler o arquivo no servidor "
+        f"precisaria de cerca de {necessario:.0f} MB, acima do orçamento de {orcamento:.0f} MB. "
+        f"Exporte um período menor ou menos anúncios."
+    )
+
+
+def should_parallelize(n_files: int, total_bytes: int) -> bool:
+    """Vale usar o pool: mais de um arquivo, volume a partir de ``PARALLEL_MIN_MB`` e mais de uma CPU."""
+    return n_files > 1 and total_bytes / 1e6 >= PARALLEL_MIN_MB and MAX_WORKERS > 1
+
+
+def load_reports(
+    tasks: Union[Dict[Any, tuple], Iterable[Tuple[Any, tuple]]],
+    cache: Optional[report_cache.ReportCache] = None,
+    cache_keys: Optional[Iterable[Any]] = None,
+    parallel: Optional[bool] = None,
+    shared: Optional[report_shared.SharedFrameStore] = None,
+    holder: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Lê um lote de relatórios.
+
+    ``tasks``: {chave: (loader, arquivo)} ou {chave: (loader, arquivo, kwargs)};
+    arquivos None são ignorados. Também aceita um iterável de pares (chave, tarefa):
+    com ``parallel=True`` cada arquivo vai para o pool assim que é lido, então a
+    leitura dos bytes (ex.: descompactar um .zip) corre junto com o parse.
+    ``cache_keys`` limita quais chaves passam pelo cache em disco (padrão: todas).
+    ``parallel=None`` usa o pool quando ``should_parallelize`` aprova o lote.
+    Com ``shared`` e ``holder`` (id da sessão), as mesmas chaves procuram antes o
+    DataFrame já publicado por outra sessão (``report_shared``).
+
+    Retorna {"dados", "tempos", "origem", "erros", "chaves", "tempo_total"};
+    ``origem`` é "compartilhado", "cache", "processo" ou "local", ``erros`` guarda a
+    mensagem de cada falha e ``chaves`` a chave de compartilhamento de cada arquivo.
+    """
+    t_start = time.perf_counter()
+    result: Dict[str, Any] = {"dados": {}, "tempos": {}, "origem": {}, "erros": {}, "chaves": {}, "tempo_total": 0.0}
+    cache_keys = None if cache_keys is None else set(cache_keys)
+    items = tasks.items() if isinstance(tasks, dict) else tasks
+
+    pending: Dict[Any, tuple] = {}
+    futures: Dict[Any, Any] = {}
+    pool_ok = True
+
+    def _submit(key) -> None:
+        nonlocal pool_ok
+        loader, name, data, kwargs, _ = pending[key]
+        if not pool_ok or not _picklable(loader):
+            return
+        try:
+            futures[key] = _get_pool().submit(_run_loader, loader, name, data, kwargs)
+        except Exception:
+            # pool indisponível: o que falta roda localmente
+            _reset_pool()
+            pool_ok = False
+
+    for key, spec in items:
+        loader, file = spec[0], spec[1]
+        kwargs = dict(spec[2]) if len(spec) > 2 and spec[2] else {}
+        if file is None:
+            continue
+        t0 = time.perf_counter()
+        try:
+            data = file_bytes(file)
+        except Exception as e:
+            result["erros"][key] = _error_text(e)
+            continue
+
+        if shared is not None and holder and (cache_keys is None or key in cache_keys):
+            result["chaves"][key] = shared.key(data, loader, kwargs)
+            df = shared.get(result["chaves"][key], holder)
+            if df is not None:
+                result["dados"][key] = df
+                result["tempos"][key] = time.perf_counter() - t0
+                result["origem"][key] = "compartilhado"
+                continue
+
+        cache_key = None
+        if cache is not None and (cache_keys is None or key in cache_keys):
+            cache_key = cache.key(data, loader, kwargs)
+            df = cache.get(cache_key)
+            if df is not None:
+                result["dados"][key] = df
+                result["tempos"][key] = time.perf_counter() - t0
+                result["origem"][key] = "cache"
+                continue
+
+        name = getattr(file, "name", key) or key
+        pending[key] = (loader, str(name), data, kwargs, cache_key)
+        if parallel:
+            _submit(key)
+
+    if parallel is None:
+        parallel = should_parallelize(len(pending), sum(len(p[2]) for p in pending.values()))
+        if parallel:
+            for key in pending:
+                _submit(key)
+
+    def _store(key, out, dt, origem):
+        result["dados"][key] = out
+        result["tempos"][key] = dt
+        result["origem"][key] = origem
+        cache_key = pending[key][4]
+        if cache is not None and cache_key is not None:
+            cache.put(cache_key, out)
+
+    remaining = list(pending)
+    quebrados = []
+    for key, fut in futures.items():
+        remaining.remove(key)
+        try:
+            out, dt = fut.result()
+        except (BrokenProcessPool, CancelledError):
+            # um processo morreu (ex.: falta de memória) e levou o pool junto
+            _reset_pool()
+            quebrados.append(key)
+            continue
+        except Exception as e:
+            result["erros"][key] = _error_text(e)
+            continue
+        _store(key, out, dt, "processo")
+
+    # Cada arquivo do pool que caiu é lido de novo sozinho num pool novo: os que
+    # não derrubaram o processo passam; o culpado só roda aqui se couber no orçamento
+    if quebrados:
+        logger.warning("leitura: processo do pool encerrado; relendo um a um: %s", ", ".join(map(str, quebrados)))
+    for key in quebrados:
+        loader, name, data, kwargs, _ = pending[key]
+        try:
+            fut = _get_pool().submit(_run_loader, loader, name, data, kwargs)
+        except Exception:
+            _reset_pool()
+            remaining.append(key)
+            continue
+        try:
+            out, dt = fut.result()
+        except (BrokenProcessPool, CancelledError):
+            _reset_pool()
+            motivo = _local_fallback_error(key, name, data, kwargs)
+            if motivo:
+                result["erros"][key] = motivo
+            else:
+                remaining.append(key)
+            continue
+        except Exception as e:
+            result["erros"][key] = _error_text(e)
+            continue
+        _store(key, out, dt, "processo")
+
+    for key in remaining:
+        loader, name, data, kwargs, _ = pending[key]
+        try:
+            out, dt = _run_loader(loader, name, data, kwargs)
+        except Exception as e:
+            result["erros"][key] = _error_text(e)
+            continue
+        _store(key, out, dt, "local")
+
+    result["tempo_total"] = time.perf_counter() - t_start
+    return result
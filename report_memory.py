@@ -0,0 +1,248 @@
+"""
+Orçamento de memória da leitura e do pipeline
+Antes do parse, o pico de memória da execução é estimado só pelos metadados dos
+arquivos: linhas e colunas da tag ``<dimension>`` de cada aba do xlsx (ou a
+contagem das tags ``<row>``), linhas do CSV e metadados do Parquet. A
+estimativa é comparada com o orçamento do processo (variável de ambiente ou
+limite do container) e decide a execução:
+
+- "normal": leitura completa, como sempre;
+- "reduzido": vendas e Patrocinados em xlsx são lidos em streaming (blocos,
+  só as colunas usadas pelo pipeline) e um arquivo por vez, sem o pool;
+- "recusado": nem a leitura reduzida cabe; o upload para com a mensagem.
+
+A decisão e a estimativa vão para o log a cada execução.
+"""
+
+import logging
+import os
+from io import BytesIO
+from typing import Any, Dict, Optional
+
+import ml_report as ml
+import report_ingest
+from excel_reader import detect_format, file_bytes, sheet_dimensions
+
+logger = logging.getLogger(__name__)
+
+# Orçamento em MB; sem a variável vale BUDGET_FRACTION do limite do container (ou da RAM)
+MEMORY_BUDGET_ENV = "ML_REPORT_MEMORY_BUDGET_MB"
+BUDGET_FRACTION = 0.8
+
+# Custos medidos (pico de RSS acima do processo já carregado, pandas 3 + calamine,
+# 30 mil e 100 mil linhas; ver ``benchmark_ml_report.py memoria``):
+# - leitura completa: ~150 bytes por célula da aba inteira (xlsx), bem menos em CSV/Parquet;
+# - streaming: ~90 bytes por célula (só as colunas mantidas viram arrays);
+# - cada processo do pool sobe com o interpretador e o pandas importados.
+READ_BASE_MB = 10.0
+READ_BYTES_PER_CELL = {"xlsx": 150, "xls": 150, "csv": 45, "parquet": 35}
+STREAMING_BYTES_PER_CELL = 90
+STREAMING_BASE_MB = 10.0
+WORKER_BASE_MB = 110.0
+
+# DataFrame devolvido pelo loader, em bytes por linha do arquivo (colunas projetadas)
+FRAME_BYTES_PER_ROW = {"vendas": 120, "patrocinados": 145, "campanha": 150, "estoque": 55}
+DEFAULT_FRAME_BYTES_PER_ROW = 150
+
+# Pico do build_tables em múltiplos dos frames de entrada (vendas + Patrocinados + campanha)
+PIPELINE_FACTOR = 38.0
+PIPELINE_REPORTS = ("vendas", "patrocinados", "campanha")
+
+# Relatórios cujo loader aceita ``streaming=True`` (só vale para xlsx)
+STREAMING_REPORTS = ("vendas", "patrocinados")
+
+# Colunas assumidas quando a aba não informa (contagem de <row>) ou o formato não permite ler
+DEFAULT_COLUMNS = 16
+
+
+def _read_int(path: str) -> Optional[int]:
+    try:
+        with open(path) as f:
+            raw = f.read().strip()
+    except OSError:
+        return None
+    return int(raw) if raw.isdigit() else None
+
+
+def _memory_limit_mb() -> Optional[float]:
+    """Limite do container (cgroup v2/v1) ou a RAM total, em MB."""
+    for path in ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"):
+        limit = _read_int(path)
+        # v1 sem limite devolve um valor perto de 2**63
+        if limit is not None and limit < 1 << 60:
+            return limit / 1e6
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) * 1024 / 1e6
+    except OSError:
+        pass
+    return None
+
+
+def budget_mb() -> Optional[float]:
+    """Orçamento configurado (``ML_REPORT_MEMORY_BUDGET_MB``) ou a fração do limite; None = sem limite conhecido."""
+    env = os.environ.get(MEMORY_BUDGET_ENV)
+    if env:
+        return float(env)
+    limit = _memory_limit_mb()
+    return limit * BUDGET_FRACTION if limit is not None else None
+
+
+def current_rss_mb() -> float:
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024 / 1e6
+    except OSError:
+        pass
+    return 0.0
+
+
+def _dimensions(report: str, data: bytes, fmt: str) -> Dict[str, Any]:
+    """Linhas/colunas do arquivo sem ler os dados."""
+    if fmt == "xlsx":
+        dims = sheet_dimensions(data)
+        sheet = None
+        if report in ml.REPORT_SHEETS:
+            sheet = ml._match_sheet(list(dims), **ml.REPORT_SHEETS[report])
+        d = dims.get(sheet) or max(dims.values(), key=lambda v: v["linhas"], default=None)
+        if d is None:
+            return {"linhas": 0, "colunas": 0, "fonte": "dimension"}
+        return {**d, "colunas": d["colunas"] or DEFAULT_COLUMNS}
+    if fmt == "csv":
+        # as linhas de título antes do cabeçalho têm uma coluna só: vale a mais larga do começo
+        head = data[:64 * 1024].split(b"\n")[:50]
+        sep = max((b";", b",", b"\t", b"|"), key=lambda c: max(line.count(c) for line in head))
+        colunas = max(line.count(sep) for line in head) + 1
+        return {"linhas": data.count(b"\n") + (not data.endswith(b"\n")), "colunas": colunas, "fonte": "csv"}
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        meta = pq.ParquetFile(BytesIO(data)).metadata
+        return {"linhas": int(meta.num_rows), "colunas": int(meta.num_columns), "fonte": "parquet"}
+    # xls: sem metadado barato; ~ 1 linha a cada 100 bytes do arquivo
+    return {"linhas": len(data) // 100, "colunas": DEFAULT_COLUMNS, "fonte": "tamanho"}
+
+
+def estimate_file(report: str, file) -> Dict[str, Any]:
+    """
+    Estimativa de memória de um arquivo enviado.
+
+    Retorna {"relatorio", "formato", "linhas", "colunas", "fonte", "arquivo_mb",
+    "leitura_mb", "leitura_streaming_mb", "streaming_padrao", "frame_mb"};
+    ``leitura_streaming_mb`` é None quando o relatório/formato não tem leitura em streaming.
+    """
+    data = file_bytes(file)
+    fmt = detect_format(data[:8])
+    dims = _dimensions(report, data, fmt)
+    cells = dims["linhas"] * dims["colunas"]
+    streaming = None
+    if fmt == "xlsx" and report in STREAMING_REPORTS:
+        streaming = STREAMING_BASE_MB + cells * STREAMING_BYTES_PER_CELL / 1e6
+    return {
+        "relatorio": report,
+        "formato": fmt,
+        **dims,
+        "arquivo_mb": len(data) / 1e6,
+        "leitura_mb": READ_BASE_MB + cells * READ_BYTES_PER_CELL.get(fmt, READ_BYTES_PER_CELL["xlsx"]) / 1e6,
+        "leitura_streaming_mb": streaming,
+        # o Patrocinados grande já sai em streaming sem ninguém pedir (ml_report.STREAMING_MIN_MB)
+        "streaming_padrao": streaming is not None and report == "patrocinados" and len(data) >= ml.STREAMING_MIN_MB * 1e6,
+        "frame_mb": dims["linhas"] * FRAME_BYTES_PER_ROW.get(report, DEFAULT_FRAME_BYTES_PER_ROW) / 1e6,
+    }
+
+
+def _streams(e: Dict[str, Any], reduzido: bool) -> bool:
+    """O arquivo é lido em streaming: por padrão (Patrocinados grande) ou no modo reduzido quando sai mais barato."""
+    if e["leitura_streaming_mb"] is None:
+        return False
+    return e["streaming_padrao"] or (reduzido and e["leitura_streaming_mb"] < e["leitura_mb"])
+
+
+def _peak_mb(estimates, reduzido: bool, parallel: bool) -> Dict[str, float]:
+    """Pico da leitura (em paralelo: tudo junto + processos; em sequência: um arquivo por vez) e do pipeline."""
+    reads = [
+        (e["leitura_streaming_mb"] if _streams(e, reduzido) else e["leitura_mb"], e["frame_mb"])
+        for e in estimates
+    ]
+    if parallel:
+        leitura = sum(r + WORKER_BASE_MB for r, _ in reads) + sum(f for _, f in reads)
+    else:
+        leitura, carregado = 0.0, 0.0
+        for r, f in reads:
+            leitura = max(leitura, carregado + r)
+            carregado += f
+    pipeline = PIPELINE_FACTOR * sum(e["frame_mb"] for e in estimates if e["relatorio"] in PIPELINE_REPORTS)
+    return {"leitura_mb": leitura, "pipeline_mb": pipeline, "pico_mb": max(leitura, pipeline)}
+
+
+def plan_ingest(
+    files: Dict[str, Any],
+    budget: Optional[float] = None,
+    parallel: Optional[bool] = None,
+) -> Dict[str, Any]:
+    """
+    Decide como ler o lote ({relatório: arquivo}) dentro do orçamento de memória.
+
+    ``budget`` em MB (padrão: ``budget_mb()``); ``parallel`` é o que a leitura usaria
+    (None = a regra do ``report_ingest.should_parallelize``). Retorna {"decisao",
+    "estimativa_mb", "estimativa_normal_mb", "orcamento_mb", "rss_mb", "arquivos",
+    "kwargs", "parallel", "mensagem"}: ``kwargs`` ({relatório: kwargs extras do
+    loader}) e ``parallel`` vão direto para o ``report_ingest.load_reports``.
+    """
+    files = {k: f for k, f in files.items() if f is not None}
+    estimates = [estimate_file(k, f) for k, f in files.items()]
+    if budget is None:
+        budget = budget_mb()
+    rss = current_rss_mb()
+    pool = parallel
+    if pool is None:
+        pool = report_ingest.should_parallelize(len(estimates), int(sum(e["arquivo_mb"] for e in estimates) * 1e6))
+
+    normal = _peak_mb(estimates, reduzido=False, parallel=pool)
+    reduzido = _peak_mb(estimates, reduzido=True, parallel=False)
+    plan: Dict[str, Any] = {
+        "decisao": "normal",
+        "estimativa_mb": rss + normal["pico_mb"],
+        "estimativa_normal_mb": rss + normal["pico_mb"],
+        "orcamento_mb": budget,
+        "rss_mb": rss,
+        "arquivos": estimates,
+        "kwargs": {},
+        "parallel": parallel,
+        "mensagem": "",
+    }
+
+    if budget is not None and rss + normal["pico_mb"] > budget:
+        if rss + reduzido["pico_mb"] <= budget:
+            plan["decisao"] = "reduzido"
+            plan["estimativa_mb"] = rss + reduzido["pico_mb"]
+            plan["parallel"] = False
+            plan["kwargs"] = {e["relatorio"]: {"streaming": True} for e in estimates if _streams(e, reduzido=True)}
+            plan["mensagem"] = (
+                f"Arquivos grandes para a memória disponível (estimativa {plan['estimativa_normal_mb']:.0f} MB, "
+                f"orçamento {budget:.0f} MB): leitura em blocos, um arquivo por vez (mais lenta)."
+            )
+        else:
+            plan["decisao"] = "recusado"
+            plan["estimativa_mb"] = rss + reduzido["pico_mb"]
+            maior = max(estimates, key=lambda e: e["frame_mb"])
+            plan["mensagem"] = (
+                f"Os arquivos não cabem na memória deste servidor: a execução precisaria de cerca de "
+                f"{plan['estimativa_mb']:.0f} MB e o orçamento é {budget:.0f} MB. O maior é o relatório "
+                f"{maior['relatorio']} ({maior['linhas']} linhas); exporte um período menor ou menos anúncios."
+            )
+
+    logger.info(
+        "orcamento de memoria: decisao=%s estimativa=%.0f MB (normal %.0f MB) orcamento=%s rss=%.0f MB arquivos=%s",
+        plan["decisao"],
+        plan["estimativa_mb"],
+        plan["estimativa_normal_mb"],
+        f"{budget:.0f} MB" if budget is not None else "sem limite",
+        rss,
+        ", ".join(f"{e['relatorio']}={e['linhas']}x{e['colunas']} ({e['fonte']})" for e in estimates),
+    )
+    return plan
@@ -0,0 +1,606 @@
+"""
+Tabelas de regras de decisão
+As decisões do relatório (quadrante/motivo/ação da campanha, diagnóstico do
+anúncio, refino campanha x anúncio e recomendações da Shopee) são tabelas
+declarativas em vez de if/elif por linha. Cada tabela é avaliada de uma vez
+sobre as colunas inteiras: as condições viram máscaras e as saídas saem de um
+``np.select`` na ordem de prioridade.
+
+Formato (dicts e strings, o mesmo em JSON):
+
+- conjunto: {"definicoes": {nome: expressão}, "tabelas": {nome: tabela}};
+  as tabelas rodam na ordem e as saídas de uma já são colunas para a seguinte;
+- tabela: {"modo": "primeira" | "todas", "padrao": {saída: valor}, "regras": [...]};
+  "primeira" = a regra de menor prioridade que casa define as saídas da linha
+  (sem regra, vale o "padrao"); "todas" = cada regra é independente (listas de
+  recomendação) e devolve só a máscara;
+- regra: {"nome", "prioridade", "quando": expressão, "saidas": {saída: valor}}.
+
+As expressões são Python restrito: colunas e parâmetros pelo nome, números,
+textos, ``and``/``or``/``not``, comparações (inclusive encadeadas), + - * / e as
+funções de ``FUNCOES``. Nulos seguem as regras antigas por linha: NaN não passa
+em nenhuma comparação, coluna ausente vale 0 (texto ausente vale ""). Só valem
+os nomes de ``ENTRADAS`` (parâmetros e colunas de cada conjunto), as definições e
+as saídas das tabelas anteriores; qualquer outro nome é recusado na carga.
+
+Regras por cliente sem mexer no código: um JSON no mesmo formato em
+``ML_REPORT_RULES_FILE`` (ou o argumento ``regras``) é mesclado às tabelas
+padrão: regra com o mesmo nome substitui a padrão, ``{"nome": ..., "remover":
+true}`` tira a regra, nomes novos entram na posição da sua prioridade.
+"""
+
+import ast
+import copy
+import json
+import operator
+import os
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# Arquivo JSON com as regras do cliente (mescladas às padrão)
+RULES_FILE_ENV = "ML_REPORT_RULES_FILE"
+
+# -------------------------
+# Tabelas padrão (as regras do relatório)
+# -------------------------
+DEFAULT_RULES: Dict[str, Any] = {
+    # ml_report.add_strategy_fields; parâmetros: os limiares da função + receita_relevante
+    "campanha": {
+        "definicoes": {
+            # Competitividade (Rank) com trava de elasticidade; cliques/vendas truncados como int()
+            "volume_ok": "Investimento >= comp_invest_min and (trunc(Cliques) >= comp_clicks_min or trunc(Vendas) >= comp_sales_min)",
+            "competitivo": "Receita >= receita_relevante and Perdidas_Class >= lost_rank_gigante and volume_ok and ROAS_Objetivo > 0",
+            "acos_acima": "ACOS_Objetivo_N > 0 and ACOS_Real > ACOS_Objetivo_N * (1.0 + acos_over_pct)",
+            "hemorragia": "0 < ROAS_Real < roas_hemorragia or acos_acima",
+            "escala": "ROAS_Real >= roas_mina and Perdidas_Orc >= lost_budget_mina",
+        },
+        "tabelas": {
+            # Confiança de dado (não muda o cálculo, apenas blinda a recomendação)
+            "confianca": {
+                "modo": "primeira",
+                "padrao": {"Confianca_Dado": "BAIXA"},
+                "regras": [
+                    {"nome": "alta", "prioridade": 10, "quando": "Investimento >= 300.0 or Cliques >= 200 or Vendas >= 5",
+                     "saidas": {"Confianca_Dado": "ALTA"}},
+                    {"nome": "media", "prioridade": 20, "quando": "Investimento >= 100.0 or Cliques >= 80 or Vendas >= 2",
+                     "saidas": {"Confianca_Dado": "MEDIA"}},
+                ],
+            },
+            "quadrante": {
+                "modo": "primeira",
+                "padrao": {"Quadrante": "ESTAVEL"},
+                "regras": [
+                    {"nome": "escala", "prioridade": 10, "quando": "escala", "saidas": {"Quadrante": "ESCALA_ORCAMENTO"}},
+                    # hiper eficiente vs objetivo: manter estável
+                    {"nome": "competitivo_hiper_eficiente", "prioridade": 20,
+                     "quando": "competitivo and ROAS_Real > ROAS_Objetivo * hiper_roas_mult", "saidas": {"Quadrante": "ESTAVEL"}},
+                    {"nome": "competitivo", "prioridade": 30, "quando": "competitivo", "saidas": {"Quadrante": "COMPETITIVIDADE"}},
+                    {"nome": "hemorragia", "prioridade": 40, "quando": "hemorragia", "saidas": {"Quadrante": "HEMORRAGIA"}},
+                ],
+            },
+            "motivo": {
+                "modo": "primeira",
+                "padrao": {"Motivo": "Sem sinal claro de escala ou risco"},
+                "regras": [
+                    {"nome": "baixa_confianca", "prioridade": 10, "quando": "Confianca_Dado == 'BAIXA'",
+                     "saidas": {"Motivo": "Baixo volume, manter coletando dado"}},
+                    {"nome": "escala", "prioridade": 20, "quando": "Quadrante == 'ESCALA_ORCAMENTO'",
+                     "saidas": {"Motivo": "ROAS forte com perda por orcamento alta"}},
+                    {"nome": "competitividade", "prioridade": 30, "quando": "Quadrante == 'COMPETITIVIDADE'",
+                     "saidas": {"Motivo": "Receita relevante com perda por classificacao alta e ROAS perto do objetivo"}},
+                    {"nome": "hemorragia_acos", "prioridade": 40, "quando": "Quadrante == 'HEMORRAGIA' and acos_acima",
+                     "saidas": {"Motivo": "ACOS real acima do objetivo"}},
+                    {"nome": "hemorragia", "prioridade": 50, "quando": "Quadrante == 'HEMORRAGIA'",
+                     "saidas": {"Motivo": "ROAS abaixo do minimo"}},
+                ],
+            },
+            # Baixa confiança nunca empurra ajuste: fica como lista de atenção
+            "acao": {
+                "modo": "primeira",
+                "padrao": {"Acao_Recomendada": "🔵 Manter"},
+                "regras": [
+                    {"nome": "baixa_confianca", "prioridade": 10, "quando": "Confianca_Dado == 'BAIXA'",
+                     "saidas": {"Acao_Recomendada": "🔵 Manter"}},
+                    {"nome": "escala", "prioridade": 20, "quando": "Quadrante == 'ESCALA_ORCAMENTO'",
+                     "saidas": {"Acao_Recomendada": "🟢 Aumentar orcamento"}},
+                    {"nome": "competitividade", "prioridade": 30, "quando": "Quadrante == 'COMPETITIVIDADE'",
+                     "saidas": {"Acao_Recomendada": "🟡 Baixar ROAS objetivo"}},
+                    {"nome": "hemorragia", "prioridade": 40, "quando": "Quadrante == 'HEMORRAGIA'",
+                     "saidas": {"Acao_Recomendada": "🔴 Revisar/pausar"}},
+                ],
+            },
+        },
+    },
+    # ml_report.build_ads_panel; parâmetros: os limiares ads_* da função (já em percentual)
+    "anuncio": {
+        "definicoes": {
+            "gasto": "Investimento >= ads_pause_invest_min",
+            "cvr_baixo_camp": "CVR_Campanha_pct > 0 and CVR_pct < CVR_Campanha_pct * 0.75",
+            "cvr_alvo": "maior(ads_cvr_min, CVR_Campanha_pct)",
+        },
+        "tabelas": {
+            "diagnostico": {
+                "modo": "primeira",
+                "padrao": {
+                    "Status_Anuncio": "Neutro",
+                    "Acao_Anuncio": "Manter",
+                    "Confianca_Anuncio": "MEDIA",
+                    "Motivo_Anuncio": "Dentro do esperado, monitorar",
+                },
+                "regras": [
+                    {"nome": "pouco_volume", "prioridade": 10, "quando": "Impressoes < ads_min_imp or Cliques < ads_min_clk",
+                     "saidas": {"Status_Anuncio": "Neutro", "Acao_Anuncio": "Manter", "Confianca_Anuncio": "BAIXA",
+                                "Motivo_Anuncio": "Pouco volume, coletar mais dados"}},
+                    {"nome": "gasto_sem_retorno", "prioridade": 20, "quando": "gasto and Receita <= 0",
+                     "saidas": {"Status_Anuncio": "Prejudicial", "Acao_Anuncio": "Pausar anúncio", "Confianca_Anuncio": "ALTA",
+                                "Motivo_Anuncio": "Gasto sem retorno"}},
+                    {"nome": "roas_abaixo_alvo_relevante", "prioridade": 30,
+                     "quando": "gasto and ROAS_Ref > 0 and ROAS_Real < ROAS_Ref * roas_bad_mult"
+                               " and Pct_Invest_Campanha >= share_prejudicial_min * 100",
+                     "saidas": {"Status_Anuncio": "Prejudicial", "Acao_Anuncio": "Pausar anúncio", "Confianca_Anuncio": "ALTA",
+                                "Motivo_Anuncio": "ROAS abaixo do alvo da campanha"}},
+                    {"nome": "roas_abaixo_alvo", "prioridade": 31,
+                     "quando": "gasto and ROAS_Ref > 0 and ROAS_Real < ROAS_Ref * roas_bad_mult",
+                     "saidas": {"Status_Anuncio": "Prejudicial", "Acao_Anuncio": "Pausar anúncio", "Confianca_Anuncio": "MEDIA",
+                                "Motivo_Anuncio": "ROAS abaixo do alvo da campanha"}},
+                    {"nome": "ctr_baixo", "prioridade": 40, "quando": "CTR_pct < ads_ctr_min_abs",
+                     "saidas": {"Status_Anuncio": "Neutro", "Acao_Anuncio": "Revisar Fotos e Clips", "Confianca_Anuncio": "MEDIA",
+                                "Motivo_Anuncio": "Baixa atratividade, revisar Fotos e Clips"}},
+                    {"nome": "trafego_desalinhado", "prioridade": 50,
+                     "quando": "CVR_pct < ads_cvr_min and cvr_baixo_camp and CTR_pct < ads_ctr_min_abs * 2",
+                     "saidas": {"Status_Anuncio": "Neutro", "Acao_Anuncio": "Otimizar Palavras-chave", "Confianca_Anuncio": "MEDIA",
+                                "Motivo_Anuncio": "Tráfego desalinhado, otimizar palavras-chave"}},
+                    {"nome": "oferta", "prioridade": 60, "quando": "CVR_pct < ads_cvr_min and cvr_baixo_camp",
+                     "saidas": {"Status_Anuncio": "Neutro", "Acao_Anuncio": "Revisar Oferta", "Confianca_Anuncio": "MEDIA",
+                                "Motivo_Anuncio": "Oferta pouco competitiva ou possível movimento de concorrência"}},
+                    {"nome": "cvr_baixo", "prioridade": 70, "quando": "CVR_pct < ads_cvr_min",
+                     "saidas": {"Status_Anuncio": "Neutro", "Acao_Anuncio": "Manter", "Confianca_Anuncio": "MEDIA",
+                                "Motivo_Anuncio": "Conversão baixa no contexto da campanha, monitorar"}},
+                    {"nome": "vencedor", "prioridade": 80, "quando": "ROAS_Ref > 0 and ROAS_Real >= ROAS_Ref and CVR_pct >= cvr_alvo",
+                     "saidas": {"Status_Anuncio": "Vencedor", "Acao_Anuncio": "Manter", "Confianca_Anuncio": "ALTA",
+                                "Motivo_Anuncio": "Acima do alvo da campanha, preservar"}},
+                ],
+            },
+            # Refino cruzado campanha x anúncio
+            "refino": {
+                "modo": "primeira",
+                "padrao": {"Refino_Campanha": ""},
+                "regras": [
+                    {"nome": "escala_com_prejudicial", "prioridade": 10,
+                     "quando": "contem(Quadrante_Campanha, 'ESCALA') and (Status_Anuncio == 'Prejudicial' or Acao_Anuncio == 'Pausar anúncio')",
+                     "saidas": {"Refino_Campanha": "Pausar anúncio, preservar campanha para escala"}},
+                    {"nome": "hemorragia_com_vencedor", "prioridade": 20,
+                     "quando": "(contem(Quadrante_Campanha, 'HEMORRAGIA') or contem(Quadrante_Campanha, 'PAUSAR')) and Status_Anuncio == 'Vencedor'",
+                     "saidas": {"Refino_Campanha": "Preservar vencedor, revisar fracos antes de pausar campanha"}},
+                ],
+            },
+        },
+    },
+    # shopee_report.gerar_recomendacoes_shopee: cada regra é uma lista de recomendações;
+    # "campos" = dados da campanha copiados para a recomendação
+    "shopee": {
+        "definicoes": {},
+        "tabelas": {
+            "recomendacoes": {
+                "modo": "todas",
+                "regras": [
+                    {"nome": "ativar_protecao", "prioridade": 10, "quando": "0 < ROAS < 2.5 and Despesas > 50",
+                     "campos": ["roas_atual", "despesas"],
+                     "saidas": {"motivo": "ROAS abaixo da meta com investimento significativo"}},
+                    {"nome": "otimizar_roas", "prioridade": 20, "quando": "0 < ROAS < 3.0 and Conversões >= 5",
+                     "campos": ["roas_atual", "conversoes"],
+                     "saidas": {"motivo": "ROAS baixo mas com volume de conversões"}},
+                    {"nome": "escalar_gmv", "prioridade": 30, "quando": "ROAS >= 4.0 and GMV > 0",
+                     "campos": ["roas_atual", "gmv"],
+                     "saidas": {"motivo": "ROAS forte - oportunidade de escalar"}},
+                    {"nome": "pausar_revisar", "prioridade": 40, "quando": "Despesas > 100 and (ROAS < 1.5 or Conversões == 0)",
+                     "campos": ["roas_atual", "despesas", "conversoes"],
+                     "saidas": {"motivo": "Alto investimento com retorno insatisfatório"}},
+                ],
+            },
+        },
+    },
+}
+
+# Nomes que as expressões de cada conjunto podem ler além das definições e das
+# saídas das tabelas anteriores: os parâmetros passados pelo chamador e as colunas
+# do frame avaliado. Qualquer outro nome é erro na carga (validate_rules).
+ENTRADAS: Dict[str, Dict[str, Tuple[str, ...]]] = {
+    # ml_report.add_strategy_fields (consolidado de campanhas + métricas derivadas)
+    "campanha": {
+        "parametros": (
+            "acos_over_pct", "roas_mina", "lost_budget_mina", "lost_rank_gigante", "roas_hemorragia",
+            "comp_invest_min", "comp_clicks_min", "comp_sales_min", "hiper_roas_mult", "receita_relevante",
+        ),
+        "colunas": (
+            "Nome", "Status", "Orçamento", "Impressões", "Cliques", "Receita", "Investimento", "Vendas",
+            "ROAS", "CVR", "Perdidas_Orc", "Perdidas_Class", "ROAS_Real", "ACOS_Real", "ACOS_Objetivo_N",
+            "ROAS_Objetivo", "CPI_Share", "CPI_Cum", "CPI_80",
+        ),
+    },
+    # ml_report.classify_ads_panel (base do painel de anúncios)
+    "anuncio": {
+        "parametros": (
+            "ads_min_imp", "ads_min_clk", "ads_ctr_min_abs", "ads_cvr_min", "ads_pause_invest_min",
+            "share_prejudicial_min", "roas_bad_mult",
+        ),
+        "colunas": (
+            "ID", "Campanha", "Codigo_MLB", "Titulo", "Status", "Impressoes", "Cliques", "Receita",
+            "Investimento", "Vendas", "CTR_pct", "CVR_pct", "ROAS_Real", "ACOS_Real_pct",
+            "Invest_Campanha", "Receita_Campanha", "Cliques_Campanha", "Vendas_Campanha", "ROAS_Campanha",
+            "CVR_Campanha_pct", "Pct_Invest_Campanha", "ROAS_Objetivo_Campanha", "Quadrante_Campanha",
+            "Acao_Campanha", "ROAS_Ref",
+        ),
+    },
+    # shopee_report.gerar_recomendacoes_shopee (dados gerais limpos)
+    "shopee": {
+        "parametros": (),
+        "colunas": (
+            "Impressões", "Cliques", "CTR", "Conversões", "GMV", "Despesas", "ROAS", "ACOS",
+        ),
+    },
+}
+
+
+# -------------------------
+# Compilação das expressões
+# -------------------------
+def _maior(a, b):
+    # max(a, b) do Python: NaN em b nunca é maior, fica a
+    return np.where(b > a, b, a)
+
+
+def _menor(a, b):
+    return np.where(b < a, b, a)
+
+
+def _contem(texto, trecho):
+    # poucos valores distintos (quadrantes, status): testa cada um uma vez
+    texto = np.asarray(texto, dtype=object)
+    codes, valores = pd.factorize(texto.ravel())
+    casa = np.array([trecho in str(v) for v in valores] + [False], dtype=bool)
+    return casa[codes].reshape(texto.shape)
+
+
+# nome: (modo de cada argumento, função); "texto" = coluna como texto, "num" = número
+FUNCOES: Dict[str, Tuple[Tuple[str, ...], Callable]] = {
+    "trunc": (("num",), np.trunc),
+    "abs": (("num",), np.abs),
+    "maior": (("num", "num"), _maior),
+    "menor": (("num", "num"), _menor),
+    "contem": (("texto", "num"), _contem),
+}
+
+_COMPARA = {
+    ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt, ast.GtE: operator.ge,
+    ast.Eq: operator.eq, ast.NotEq: operator.ne,
+}
+_ARITMETICA = {ast.Add: operator.add, ast.Sub: operator.sub, ast.Mult: operator.mul, ast.Div: operator.truediv}
+
+
+class _Contexto:
+    """
+    Valores de uma avaliação: parâmetros, definições (sob demanda), saídas das
+    tabelas já avaliadas e colunas do frame. Parâmetros podem ser arrays que fazem
+    broadcast com as linhas (varredura de limiares): ``shape`` é o das máscaras.
+    """
+
+    def __init__(self, df: pd.DataFrame, params: Dict[str, Any], definicoes: Dict[str, str], colunas=()):
+        self.df = df
+        self.params = params
+        self.definicoes = definicoes
+        # colunas de entrada documentadas (ENTRADAS): só estas valem 0/"" quando faltam
+        self.colunas = frozenset(colunas)
+        self.shape = np.broadcast_shapes((len(df),), *(np.shape(v) for v in params.values()))
+        self._saidas: Dict[str, Tuple[List[Any], np.ndarray]] = {}
+        self._cache: Dict[Tuple[str, str], Any] = {}
+
+    def valor(self, nome: str, modo: str):
+        if nome in self.params:
+            return self.params[nome]
+        key = (nome, "def" if nome in self.definicoes else modo)
+        if key not in self._cache:
+            if nome in self.definicoes:
+                self._cache[key] = compile_expr(self.definicoes[nome])(self)
+            elif nome in self._saidas:
+                valores, vencedora = self._saidas[nome]
+                if modo == "texto":
+                    tabela = np.array(["" if pd.isna(v) else str(v) for v in valores], dtype=object)
+                else:
+                    tabela = pd.to_numeric(pd.Series(valores, dtype=object), errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+                self._cache[key] = tabela[vencedora]
+            elif nome not in self.df.columns and nome not in self.colunas:
+                raise ValueError(f"regra: nome {nome!r} desconhecido (não é parâmetro, definição, saída nem coluna)")
+            elif modo == "texto":
+                if nome in self.df.columns:
+                    s = self.df[nome].astype(object)
+                    self._cache[key] = s.where(s.notna(), "").astype(str).to_numpy(dtype=object)
+                else:
+                    self._cache[key] = np.full(len(self.df), "", dtype=object)
+            elif nome in self.df.columns:
+                self._cache[key] = pd.to_numeric(self.df[nome], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+            else:
+                self._cache[key] = np.zeros(len(self.df), dtype="float64")
+        return self._cache[key]
+
+    def definir_saida(self, nome: str, valores: List[Any], vencedora: np.ndarray) -> None:
+        """Saída de uma tabela: as tabelas seguintes leem ``valores[vencedora]`` no lugar da coluna."""
+        self._saidas[nome] = (valores, vencedora)
+        for key in [k for k in self._cache if k[0] == nome]:
+            del self._cache[key]
+
+
+def _compile_node(node: ast.AST, modo: str, expr: str) -> Callable[[_Contexto], Any]:
+    if isinstance(node, ast.Expression):
+        return _compile_node(node.body, modo, expr)
+    if isinstance(node, ast.BoolOp):
+        partes = [_compile_node(v, "num", expr) for v in node.values]
+        junta = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+
+        def _bool(ctx):
+            out = partes[0](ctx)
+            for p in partes[1:]:
+                out = junta(out, p(ctx))
+            return out
+        return _bool
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.Not, ast.USub)):
+        arg = _compile_node(node.operand, modo, expr)
+        op = np.logical_not if isinstance(node.op, ast.Not) else operator.neg
+        return lambda ctx: op(arg(ctx))
+    if isinstance(node, ast.Compare) and all(type(o) in _COMPARA for o in node.ops):
+        termos = [node.left] + list(node.comparators)
+        # comparação com texto: as colunas do lado de lá são lidas como texto
+        m = "texto" if any(isinstance(t, ast.Constant) and isinstance(t.value, str) for t in termos) else "num"
+        fns = [_compile_node(t, m, expr) for t in termos]
+        ops = [_COMPARA[type(o)] for o in node.ops]
+
+        def _compare(ctx):
+            vals = [f(ctx) for f in fns]
+            out = ops[0](vals[0], vals[1])
+            for i in range(1, len(ops)):
+                out = np.logical_and(out, ops[i](vals[i], vals[i + 1]))
+            return out
+        return _compare
+    if isinstance(node, ast.BinOp) and type(node.op) in _ARITMETICA:
+        esq, dir_ = _compile_node(node.left, "num", expr), _compile_node(node.right, "num", expr)
+        op = _ARITMETICA[type(node.op)]
+
+        def _arit(ctx):
+            with np.errstate(divide="ignore", invalid="ignore"):
+                return op(esq(ctx), dir_(ctx))
+        return _arit
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in FUNCOES and not node.keywords:
+        modos, fn = FUNCOES[node.func.id]
+        if len(node.args) != len(modos):
+            raise ValueError(f"regra {expr!r}: {node.func.id}() recebe {len(modos)} argumento(s)")
+        args = [_compile_node(a, m, expr) for a, m in zip(node.args, modos)]
+        return lambda ctx: fn(*[a(ctx) for a in args])
+    if isinstance(node, ast.Name):
+        nome = node.id
+        return lambda ctx: ctx.valor(nome, modo)
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float, str, bool)):
+        valor = node.value
+        return lambda ctx: valor
+    raise ValueError(f"regra {expr!r}: trecho não permitido: {ast.dump(node)[:80]}")
+
+
+@lru_cache(maxsize=None)
+def compile_expr(expr: str) -> Callable[[_Contexto], Any]:
+    """Expressão de regra -> função do contexto (compilada uma vez por texto)."""
+    try:
+        tree = ast.parse(expr.strip(), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"regra {expr!r}: {e.msg}") from None
+    return _compile_node(tree, "num", expr)
+
+
+@lru_cache(maxsize=None)
+def _expr_names(expr: str) -> Tuple[str, ...]:
+    """Nomes lidos pela expressão (colunas, parâmetros, definições e saídas; sem as funções)."""
+    compile_expr(expr)
+    tree = ast.parse(expr.strip(), mode="eval")
+    funcoes = {id(n.func) for n in ast.walk(tree) if isinstance(n, ast.Call)}
+    return tuple(dict.fromkeys(n.id for n in ast.walk(tree) if isinstance(n, ast.Name) and id(n) not in funcoes))
+
+
+def _mask(fn: Callable[[_Contexto], Any], ctx: _Contexto) -> np.ndarray:
+    # expressão só de parâmetros devolve escalar: vale para todas as linhas
+    return np.broadcast_to(np.asarray(fn(ctx), dtype=bool), ctx.shape)
+
+
+# -------------------------
+# Carga e mescla das regras
+# -------------------------
+def _sorted_rules(tabela: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return sorted(tabela.get("regras", []), key=lambda r: r.get("prioridade", 0))
+
+
+def merge_rules(base: Dict[str, Any], extra: Dict[str, Any]) -> Dict[str, Any]:
+    """Mescla ``extra`` (mesmo formato, parcial) em uma cópia de ``base``."""
+    out = copy.deepcopy(base)
+    for nome_conj, conj in (extra or {}).items():
+        alvo = out.setdefault(nome_conj, {"definicoes": {}, "tabelas": {}})
+        alvo.setdefault("definicoes", {}).update(conj.get("definicoes", {}))
+        for nome_tab, tab in conj.get("tabelas", {}).items():
+            destino = alvo.setdefault("tabelas", {}).setdefault(nome_tab, {"modo": tab.get("modo", "primeira"), "regras": []})
+            if "modo" in tab:
+                destino["modo"] = tab["modo"]
+            destino.setdefault("padrao", {}).update(tab.get("padrao", {}))
+            regras = destino.setdefault("regras", [])
+            for regra in tab.get("regras", []):
+                pos = next((i for i, r in enumerate(regras) if r.get("nome") == regra.get("nome")), None)
+                if regra.get("remover"):
+                    if pos is not None:
+                        regras.pop(pos)
+                elif pos is not None:
+                    regras[pos] = {**regras[pos], **regra}
+                else:
+                    regras.append(dict(regra))
+    return out
+
+
+def _check_names(expr: str, definicoes: Dict[str, str], permitidos, onde: str, caminho: Tuple[str, ...] = ()) -> None:
+    # definições são seguidas até o fim: o que elas leem também precisa existir neste ponto
+    for nome in _expr_names(expr):
+        if nome in definicoes:
+            if nome in caminho:
+                raise ValueError(f"{onde}: definição {nome!r} depende de si mesma ({' -> '.join(caminho + (nome,))})")
+            _check_names(definicoes[nome], definicoes, permitidos, onde, caminho + (nome,))
+        elif nome not in permitidos:
+            raise ValueError(
+                f"{onde}: nome {nome!r} desconhecido (não é parâmetro, definição, saída de tabela anterior "
+                f"nem coluna de entrada)"
+            )
+
+
+def _table_outputs(tab: Dict[str, Any]) -> List[str]:
+    if tab.get("modo", "primeira") != "primeira":
+        return []
+    saidas = list(tab.get("padrao", {}))
+    for r in tab.get("regras", []):
+        saidas += [c for c in r.get("saidas", {}) if c not in saidas]
+    return saidas
+
+
+def validate_rules(regras: Dict[str, Any]) -> None:
+    """
+    Compila todas as expressões e confere os nomes lidos (erro de digitação no JSON
+    aparece na carga, não como 0 silencioso no meio do relatório). Cada nome precisa
+    ser parâmetro ou coluna do conjunto (``ENTRADAS``), definição ou saída de uma
+    tabela anterior.
+    """
+    for nome_conj, conj in regras.items():
+        if nome_conj not in ENTRADAS:
+            raise ValueError(f"conjunto {nome_conj!r} desconhecido (conhecidos: {', '.join(ENTRADAS)})")
+        entradas = set(ENTRADAS[nome_conj]["parametros"]) | set(ENTRADAS[nome_conj]["colunas"])
+        definicoes = conj.get("definicoes", {})
+        tabelas = conj.get("tabelas", {})
+        # definição avulsa: basta existir em algum ponto; o uso em cada regra é conferido abaixo
+        todas_saidas = {c for tab in tabelas.values() for c in _table_outputs(tab)}
+        for nome_def, expr in definicoes.items():
+            _check_names(expr, definicoes, entradas | todas_saidas, f"definição {nome_conj}.{nome_def}", (nome_def,))
+        anteriores: set = set()
+        for nome_tab, tab in tabelas.items():
+            if tab.get("modo", "primeira") not in ("primeira", "todas"):
+                raise ValueError(f"tabela {nome_conj}.{nome_tab}: modo {tab.get('modo')!r} desconhecido")
+            for regra in tab.get("regras", []):
+                if "quando" not in regra:
+                    raise ValueError(f"tabela {nome_conj}.{nome_tab}: regra {regra.get('nome')!r} sem 'quando'")
+                _check_names(regra["quando"], definicoes, entradas | anteriores,
+                             f"tabela {nome_conj}.{nome_tab}: regra {regra.get('nome')!r}")
+            anteriores.update(_table_outputs(tab))
+
+
+@lru_cache(maxsize=16)
+def _read_rules_file(path: str, mtime_ns: int) -> Dict[str, Any]:
+    # uma leitura por versão do arquivo (caminho + mtime)
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=16)
+def _base_rules(path: Optional[str], mtime_ns: Optional[int]) -> Dict[str, Any]:
+    # padrão + JSON de ML_REPORT_RULES_FILE, mesclado e validado uma vez por versão do arquivo
+    out = DEFAULT_RULES if path is None else merge_rules(DEFAULT_RULES, _read_rules_file(path, mtime_ns))
+    validate_rules(out)
+    return out
+
+
+def load_rules(regras: Union[Dict[str, Any], str, None] = None) -> Dict[str, Any]:
+    """
+    Regras em uso: as padrão, mescladas ao JSON de ``ML_REPORT_RULES_FILE`` (se
+    houver) e depois a ``regras`` (dict no mesmo formato ou caminho de um JSON).
+    Os arquivos são lidos e validados uma vez por versão (caminho + mtime); o
+    resultado é compartilhado entre chamadas e não deve ser alterado.
+    """
+    path = os.environ.get(RULES_FILE_ENV) or None
+    out = _base_rules(path, os.stat(path).st_mtime_ns if path else None)
+    if regras is None:
+        return out
+    if isinstance(regras, str):
+        regras = _read_rules_file(regras, os.stat(regras).st_mtime_ns)
+    out = merge_rules(out, regras)
+    validate_rules(out)
+    return out
+
+
+# -------------------------
+# Avaliação
+# -------------------------
+def _first_match(conj: Dict[str, Any], ctx: _Contexto, ate: Optional[str] = None):
+    """(coluna, valores, índice da regra vencedora) de cada saída das tabelas "primeira", na ordem."""
+    for nome_tab, tab in conj["tabelas"].items():
+        if tab.get("modo", "primeira") == "primeira":
+            ordem = _sorted_rules(tab)
+            padrao = tab.get("padrao", {})
+            saidas = list(padrao)
+            for r in ordem:
+                saidas += [c for c in r.get("saidas", {}) if c not in saidas]
+            masks = [_mask(compile_expr(r["quando"]), ctx) for r in ordem]
+            # índice da regra vencedora de cada linha (len(ordem) = nenhuma, vale o padrão)
+            vencedora = np.select(masks, np.arange(len(ordem)), len(ordem)) if masks else np.zeros(ctx.shape, dtype=int)
+            for col in saidas:
+                valores = [r.get("saidas", {}).get(col, padrao.get(col, "")) for r in ordem] + [padrao.get(col, "")]
+                ctx.definir_saida(col, valores, vencedora)
+                yield col, valores, vencedora
+        if nome_tab == ate:
+            return
+
+
+def apply_rules(
+    df: pd.DataFrame,
+    conjunto: str,
+    params: Optional[Dict[str, Any]] = None,
+    regras: Union[Dict[str, Any], str, None] = None,
+) -> pd.DataFrame:
+    """
+    Avalia as tabelas "primeira" do ``conjunto`` sobre ``df`` e grava as saídas
+    como colunas do próprio ``df`` (texto), na ordem das tabelas. Devolve ``df``.
+    """
+    conj = load_rules(regras)[conjunto]
+    ctx = _Contexto(df, params or {}, conj.get("definicoes", {}), ENTRADAS[conjunto]["colunas"])
+    for col, valores, vencedora in _first_match(conj, ctx):
+        if all(isinstance(v, str) for v in valores):
+            # texto: os valores viram colunas por take (sem converter um texto por linha)
+            df[col] = pd.Series(pd.array(valores, dtype=str).take(vencedora), index=df.index)
+        else:
+            df[col] = pd.Series(np.array(valores, dtype=object)[vencedora], index=df.index)
+    return df
+
+
+def evaluate_rules(
+    df: pd.DataFrame,
+    conjunto: str,
+    params: Optional[Dict[str, Any]] = None,
+    regras: Union[Dict[str, Any], str, None] = None,
+    ate: Optional[str] = None,
+) -> Dict[str, Tuple[List[Any], np.ndarray]]:
+    """
+    Saídas das tabelas "primeira" sem gravar no frame: {coluna: (valores, índice)},
+    com a saída de cada linha em ``valores[índice]``; ``ate`` para depois dessa tabela.
+    Parâmetros em arrays de forma (k, 1) avaliam k cenários de uma vez (índices (k, linhas)).
+    """
+    conj = load_rules(regras)[conjunto]
+    ctx = _Contexto(df, params or {}, conj.get("definicoes", {}), ENTRADAS[conjunto]["colunas"])
+    return {col: (valores, vencedora) for col, valores, vencedora in _first_match(conj, ctx, ate=ate)}
+
+
+def match_rules(
+    df: pd.DataFrame,
+    conjunto: str,
+    params: Optional[Dict[str, Any]] = None,
+    regras: Union[Dict[str, Any], str, None] = None,
+) -> List[Tuple[Dict[str, Any], np.ndarray]]:
+    """Regras das tabelas "todas" do ``conjunto``, em ordem de prioridade, com a máscara das linhas que casam."""
+    conj = load_rules(regras)[conjunto]
+    ctx = _Contexto(df, params or {}, conj.get("definicoes", {}), ENTRADAS[conjunto]["colunas"])
+    out = []
+    for tab in conj["tabelas"].values():
+        if tab.get("modo", "primeira") != "todas":
+            continue
+        for r in _sorted_rules(tab):
+            out.append((r, _mask(compile_expr(r["quando"]), ctx)))
+    return out
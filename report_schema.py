@@ -0,0 +1,239 @@
+"""
+Registro de colunas dos relatórios (Mercado Livre e Shopee)
+Cada relatório declara as suas colunas (nome canônico, aliases, tipo e se o
+pipeline usa a coluna). O registro é compilado uma vez na importação em um
+índice chave normalizada -> coluna canônica, então resolver um cabeçalho é
+uma consulta a dicionário, sem regex.
+"""
+
+import unicodedata
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+# tipo: "texto" | "numero" (convertido pelo parser pt-BR) | "data"
+# pipeline: True quando o motor de estratégia, o snapshot ou as telas usam a coluna
+REPORT_SCHEMAS = {
+    "mercado_livre": {
+        "vendas": [
+            {"nome": "ID", "aliases": ["ID do anúncio"], "tipo": "texto", "pipeline": True},
+            {"nome": "Titulo", "aliases": ["Anúncio"], "tipo": "texto", "pipeline": True},
+            {"nome": "Status", "aliases": ["Status atual"], "tipo": "texto", "pipeline": True},
+            {"nome": "Variacao", "aliases": ["Variação"], "tipo": "texto", "pipeline": False},
+            {"nome": "SKU", "aliases": [], "tipo": "texto", "pipeline": False},
+            {"nome": "Visitas", "aliases": ["Visitas únicas"], "tipo": "numero", "pipeline": True},
+            {"nome": "Qtd_Vendas", "aliases": ["Quantidade de vendas"], "tipo": "numero", "pipeline": True},
+            {"nome": "Compradores", "aliases": ["Compradores únicos"], "tipo": "numero", "pipeline": False},
+            {"nome": "Unidades", "aliases": ["Unidades vendidas"], "tipo": "numero", "pipeline": False},
+            {"nome": "Vendas_Brutas", "aliases": ["Vendas brutas (BRL)"], "tipo": "numero", "pipeline": True},
+            {"nome": "Participacao", "aliases": ["% de participação"], "tipo": "numero", "pipeline": False},
+            {"nome": "Conv_Visitas_Vendas", "aliases": ["Conversão de visitas em vendas"], "tipo": "numero", "pipeline": True},
+            {"nome": "Conv_Visitas_Compradores", "aliases": ["Conversão de visitas em compradores"], "tipo": "numero", "pipeline": False},
+        ],
+        "patrocinados": [
+            {"nome": "Código do anúncio", "aliases": [], "tipo": "texto", "pipeline": True},
+            {"nome": "Título do anúncio patrocinado", "aliases": [], "tipo": "texto", "pipeline": True},
+            {"nome": "Campanha", "aliases": ["Nome da campanha"], "tipo": "texto", "pipeline": True},
+            {"nome": "Status", "aliases": ["Status atual"], "tipo": "texto", "pipeline": True},
+            {"nome": "Impressões", "aliases": ["Impressoes", "Impressions"], "tipo": "numero", "pipeline": True},
+            {"nome": "Cliques", "aliases": ["Clicks"], "tipo": "numero", "pipeline": True},
+            {"nome": "CPC \n(Custo por clique)", "aliases": ["CPC (Custo por clique)", "CPC"], "tipo": "numero", "pipeline": False},
+            {"nome": "CTR\n(Click Through Rate)", "aliases": ["CTR (Click Through Rate)", "CTR"], "tipo": "numero", "pipeline": False},
+            {"nome": "CVR\n(Conversion rate)", "aliases": ["CVR (Conversion rate)", "CVR"], "tipo": "numero", "pipeline": False},
+            {"nome": "Receita\n(Moeda local)", "aliases": ["Receita (Moeda local)", "Receita"], "tipo": "numero", "pipeline": True},
+            {"nome": "Investimento\n(Moeda local)", "aliases": ["Investimento (Moeda local)", "Investimento"], "tipo": "numero", "pipeline": True},
+            {"nome": "ACOS\n (Investimento / Receitas)", "aliases": ["ACOS (Investimento / Receitas)", "ACOS"], "tipo": "numero", "pipeline": False},
+            {"nome": "ROAS\n(Receitas / Investimento)", "aliases": ["ROAS (Receitas / Investimento)", "ROAS"], "tipo": "numero", "pipeline": False},
+            {"nome": "Vendas diretas", "aliases": [], "tipo": "numero", "pipeline": False},
+            {"nome": "Vendas indiretas", "aliases": [], "tipo": "numero", "pipeline": False},
+            {
+                "nome": "Vendas por publicidade\n(Diretas + Indiretas)",
+                "aliases": ["Vendas por publicidade (Diretas + Indiretas)", "Vendas por publicidade"],
+                "tipo": "numero",
+                "pipeline": True,
+            },
+        ],
+        "campanha": [
+            {"nome": "Nome", "aliases": ["Nome da campanha", "Campanha", "Campaign"], "tipo": "texto", "pipeline": True},
+            {"nome": "Status", "aliases": ["Status atual"], "tipo": "texto", "pipeline": True},
+            {
+                "nome": "Orçamento",
+                "aliases": ["Orcamento", "Orçamento diário", "Orcamento diario", "Orçamento (Moeda local)", "Orcamento (Moeda local)"],
+                "tipo": "numero",
+                "pipeline": True,
+            },
+            {"nome": "ACOS Objetivo", "aliases": ["ACOS objetivo", "ACOS alvo", "ACOS target"], "tipo": "numero", "pipeline": True},
+            {"nome": "Impressões", "aliases": ["Impressoes", "Impressions"], "tipo": "numero", "pipeline": True},
+            {"nome": "Cliques", "aliases": ["Clicks"], "tipo": "numero", "pipeline": True},
+            {
+                "nome": "Receita\n(Moeda local)",
+                "aliases": ["Receita (Moeda local)", "Receita (moeda local)", "Receita"],
+                "tipo": "numero",
+                "pipeline": True,
+            },
+            {
+                "nome": "Investimento\n(Moeda local)",
+                "aliases": ["Investimento (Moeda local)", "Investimento (moeda local)", "Gasto", "Spend", "Investimento"],
+                "tipo": "numero",
+                "pipeline": True,
+            },
+            {
+                "nome": "Vendas por publicidade\n(Diretas + Indiretas)",
+                "aliases": ["Vendas por publicidade (Diretas + Indiretas)", "Vendas por publicidade", "Vendas por ads", "Sales from ads"],
+                "tipo": "numero",
+                "pipeline": True,
+            },
+            {"nome": "ROAS\n(Receitas / Investimento)", "aliases": ["ROAS (Receitas / Investimento)", "ROAS"], "tipo": "numero", "pipeline": True},
+            {"nome": "CVR\n(Conversion rate)", "aliases": ["CVR (Conversion rate)", "CVR", "Taxa de conversão"], "tipo": "numero", "pipeline": True},
+            {
+                "nome": "% de impressões perdidas por orçamento",
+                "aliases": ["% de impressoes perdidas por orcamento", "% de impressões perdidas por orçamento (IS lost budget)"],
+                "tipo": "numero",
+                "pipeline": True,
+            },
+            {
+                "nome": "% de impressões perdidas por classificação",
+                "aliases": ["% de impressoes perdidas por classificacao", "% de impressões perdidas por classificação (IS lost rank)"],
+                "tipo": "numero",
+                "pipeline": True,
+            },
+            {"nome": "Desde", "aliases": ["Data", "Date"], "tipo": "data", "pipeline": True},
+        ],
+        "estoque": [
+            {"nome": "ITEM_ID", "aliases": [], "tipo": "texto", "pipeline": True},
+            {"nome": "SKU", "aliases": [], "tipo": "texto", "pipeline": True},
+            {"nome": "QUANTITY", "aliases": [], "tipo": "numero", "pipeline": True},
+        ],
+    },
+    "shopee": {
+        "dados_gerais": [
+            {"nome": "Nome do Anúncio", "aliases": [], "tipo": "texto", "pipeline": True},
+            {"nome": "Impressões", "aliases": [], "tipo": "numero", "pipeline": True},
+            {"nome": "Cliques", "aliases": [], "tipo": "numero", "pipeline": True},
+            {"nome": "CTR", "aliases": [], "tipo": "numero", "pipeline": False},
+            {"nome": "Conversões", "aliases": [], "tipo": "numero", "pipeline": True},
+            {"nome": "Conversões Diretas", "aliases": [], "tipo": "numero", "pipeline": True},
+            {"nome": "Taxa de Conversão", "aliases": [], "tipo": "numero", "pipeline": False},
+            {"nome": "Taxa de Conversão Direta", "aliases": [], "tipo": "numero", "pipeline": False},
+            {"nome": "Custo por Conversão", "aliases": [], "tipo": "numero", "pipeline": False},
+            {"nome": "Custo por Conversão Direta", "aliases": [], "tipo": "numero", "pipeline": False},
+            {"nome": "Itens Vendidos", "aliases": [], "tipo": "numero", "pipeline": True},
+            {"nome": "Itens Vendidos Diretos", "aliases": [], "tipo": "numero", "pipeline": True},
+            {"nome": "GMV", "aliases": [], "tipo": "numero", "pipeline": True},
+            {"nome": "Receita direta", "aliases": [], "tipo": "numero", "pipeline": True},
+            {"nome": "Despesas", "aliases": [], "tipo": "numero", "pipeline": True},
+            {"nome": "ROAS", "aliases": [], "tipo": "numero", "pipeline": True},
+            {"nome": "ROAS Direto", "aliases": [], "tipo": "numero", "pipeline": True},
+            {"nome": "ACOS", "aliases": [], "tipo": "numero", "pipeline": False},
+            {"nome": "ACOS Direto", "aliases": [], "tipo": "numero", "pipeline": False},
+            {"nome": "Impressões do Produto", "aliases": [], "tipo": "numero", "pipeline": False},
+            {"nome": "Cliques de Produtos", "aliases": [], "tipo": "numero", "pipeline": False},
+            {"nome": "CTR do Produto", "aliases": [], "tipo": "numero", "pipeline": False},
+        ],
+    },
+}
+
+
+# -------------------------
+# Normalização de cabeçalho (sem regex)
+# -------------------------
+_KEY_CHARS = frozenset("abcdefghijklmnopqrstuvwxyz0123456789")
+
+
+@lru_cache(maxsize=8192)
+def _norm_text(s: str) -> str:
+    s = unicodedata.normalize("NFKD", s.strip().lower())
+    # Tudo que não é [a-z0-9] vira separador; sequências colapsam em um "_"
+    return "_".join("".join(ch if ch in _KEY_CHARS else " " for ch in s if not unicodedata.combining(ch)).split())
+
+
+def norm_key(s: Any) -> str:
+    """Chave normalizada: minúsculas, sem acentos, separadores viram "_" ("Impressões\\n" -> "impressoes")."""
+    return _norm_text("" if s is None else str(s))
+
+
+class ReportSchema:
+    """Colunas de um relatório compiladas em índices de consulta direta."""
+
+    def __init__(self, marketplace: str, report: str, columns: List[Dict[str, Any]]):
+        self.marketplace = marketplace
+        self.report = report
+        self.columns = columns
+        self._by_name: Dict[str, Dict[str, Any]] = {c["nome"]: c for c in columns}
+        # texto exato -> (canônico, prioridade) e chave normalizada -> (canônico, prioridade)
+        self._raw: Dict[str, Tuple[str, int]] = {}
+        self._index: Dict[str, Tuple[str, int]] = {}
+        for col in columns:
+            for prio, alias in enumerate([col["nome"], *col["aliases"]]):
+                key = norm_key(alias)
+                owner = self._index.get(key)
+                if owner is not None and owner[0] != col["nome"]:
+                    raise ValueError(
+                        f"Alias {alias!r} ambíguo em {marketplace}/{report}: {owner[0]!r} e {col['nome']!r}"
+                    )
+                self._index.setdefault(key, (col["nome"], prio))
+                self._raw.setdefault(alias, (col["nome"], prio))
+
+    def _lookup(self, header: Any) -> Optional[Tuple[str, int]]:
+        hit = self._raw.get(header) if isinstance(header, str) else None
+        return hit if hit is not None else self._index.get(norm_key(header))
+
+    def resolve(self, header: Any) -> Optional[str]:
+        """Nome canônico do cabeçalho (ou None se a coluna não é conhecida)."""
+        hit = self._lookup(header)
+        return hit[0] if hit is not None else None
+
+    def keys(self, name: str) -> List[str]:
+        """Nome canônico + aliases da coluna (para localizar a linha de cabeçalho)."""
+        col = self._by_name[name]
+        return [col["nome"], *col["aliases"]]
+
+    def names(self, tipo: Optional[str] = None, pipeline: Optional[bool] = None) -> List[str]:
+        return [
+            c["nome"]
+            for c in self.columns
+            if (tipo is None or c["tipo"] == tipo) and (pipeline is None or c["pipeline"] == pipeline)
+        ]
+
+    def rename_map(self, headers: Iterable[Any]) -> Dict[Any, str]:
+        """
+        Cabeçalho -> nome canônico. Se mais de um cabeçalho cai na mesma coluna,
+        vence o alias declarado primeiro (nome canônico antes dos aliases).
+        """
+        by_key = {norm_key(h): h for h in headers}
+        best: Dict[str, Tuple[int, Any]] = {}
+        for key, header in by_key.items():
+            hit = self._index.get(key)
+            if hit is None:
+                continue
+            name, prio = hit
+            if name not in best or prio < best[name][0]:
+                best[name] = (prio, header)
+        return {header: name for name, (_, header) in best.items()}
+
+    def standardize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Renomeia as colunas conhecidas de ``df`` para o nome canônico."""
+        if df is None or df.empty:
+            return df
+        ren = {h: n for h, n in self.rename_map(df.columns).items() if h != n}
+        return df.rename(columns=ren) if ren else df
+
+
+def _compile(registry: Dict[str, Dict[str, List[Dict[str, Any]]]]) -> Dict[Tuple[str, str], ReportSchema]:
+    return {
+        (marketplace, report): ReportSchema(marketplace, report, columns)
+        for marketplace, reports in registry.items()
+        for report, columns in reports.items()
+    }
+
+
+# Compilado uma vez na importação
+SCHEMAS = _compile(REPORT_SCHEMAS)
+
+
+def get_schema(marketplace: str, report: str) -> ReportSchema:
+    try:
+        return SCHEMAS[(marketplace, report)]
+    except KeyError:
+        raise ValueError(f"Relatório sem schema registrado: {marketplace}/{report}") from None
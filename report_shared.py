@@ -0,0 +1,301 @@
+"""
+Relatórios compartilhados entre as sessões do Streamlit
+Cada DataFrame já lido (com os tipos compactos) é gravado uma única vez como
+arquivo Arrow IPC e aberto por memory-map, somente leitura, por todas as
+sessões e processos: as colunas apontam direto para as páginas do arquivo, sem
+cópia, então a RAM do servidor não cresce com o número de analistas abrindo os
+mesmos relatórios.
+
+Cada sessão que usa um arquivo deixa uma marca em ``refs/<chave>/<sessão>``
+(renovada a cada rerun). Quando a última marca sai ou expira, o arquivo é
+apagado; quem ainda tem o mapa aberto continua lendo normalmente.
+"""
+
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+import pandas as pd
+
+from report_cache import OBJECT_COLS_ATTR, arrow_frame, content_key, restore_object_cols
+
+logger = logging.getLogger(__name__)
+
+# Diretório dos arquivos compartilhados; /dev/shm (memória) quando existe
+SHARED_DIR_ENV = "ML_REPORT_SHARED_DIR"
+DEFAULT_SHARED_DIR = os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "ml_report_shared")
+
+# Sessão sem rerun há mais que isso deixa de segurar os arquivos (fechou a aba)
+SESSION_TTL_ENV = "ML_REPORT_SESSION_TTL_MIN"
+DEFAULT_SESSION_TTL_MIN = 120.0
+
+# Folga sobre o tamanho da tabela Arrow ao conferir o espaço livre (metadados do arquivo IPC
+# e o que outras sessões gravam ao mesmo tempo); o /dev/shm do Docker tem só 64 MB por padrão
+FREE_SPACE_MARGIN = 1.25
+
+
+def _arrow_available() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class SharedFrameStore:
+    """
+    DataFrames em Arrow IPC mapeados em memória, com contagem de referências por sessão.
+
+    - ``get(chave, sessao)`` abre o arquivo já publicado (ou None) e registra a sessão;
+    - ``publish(chave, df, sessao)`` grava o arquivo se ainda não existe e devolve a
+      versão mapeada (só publica o que o Arrow representa, ver
+      ``report_cache.arrow_frame``, e se couber no espaço livre do diretório);
+    - ``release_holder(sessao, keep)`` solta os arquivos que a sessão não usa mais e
+      apaga os que ficaram sem nenhuma sessão.
+
+    A chave é calculada como a do cache em disco (``report_cache.content_key``). Qualquer
+    falha devolve o DataFrame original: o compartilhamento nunca impede o relatório.
+    """
+
+    def __init__(self, base_dir: Optional[str] = None, ttl_min: Optional[float] = None, version: Any = None):
+        self.base_dir = base_dir or os.environ.get(SHARED_DIR_ENV) or DEFAULT_SHARED_DIR
+        if ttl_min is None:
+            ttl_min = float(os.environ.get(SESSION_TTL_ENV) or DEFAULT_SESSION_TTL_MIN)
+        self.ttl_s = ttl_min * 60
+        self.version = version
+        self.enabled = _arrow_available()
+        self.stats: Dict[str, int] = {"hits": 0, "publicados": 0, "ignorados": 0, "sem_espaco": 0, "removidos": 0}
+        # Frames já mapeados neste processo (as sessões do Streamlit são threads do mesmo processo)
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._lock = threading.RLock()
+
+    def key(self, data: bytes, loader: Callable, kwargs: Optional[Dict[str, Any]] = None) -> str:
+        return content_key(data, loader, kwargs, self.version)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.base_dir, f"{key}.arrow")
+
+    def _refs_dir(self, key: str) -> str:
+        return os.path.join(self.base_dir, "refs", key)
+
+    # -------------------------
+    # Arquivo Arrow
+    # -------------------------
+    def _map(self, path: str) -> pd.DataFrame:
+        import pyarrow as pa
+
+        source = pa.memory_map(path, "r")
+        table = pa.ipc.open_file(source).read_all()
+        # split_blocks: cada coluna numérica vira uma view do buffer mapeado (sem consolidar blocos)
+        df = table.to_pandas(split_blocks=True)
+        cols = df.attrs.pop(OBJECT_COLS_ATTR, [])
+        return restore_object_cols(df, cols)
+
+    def _write(self, key: str, df: pd.DataFrame) -> Optional[pd.DataFrame]:
+        import pyarrow as pa
+
+        out = arrow_frame(df)
+        if out is None:
+            self.stats["ignorados"] += 1
+            return None
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.base_dir, exist_ok=True)
+            table = pa.Table.from_pandas(out)
+            livre = shutil.disk_usage(self.base_dir).free
+            if table.nbytes * FREE_SPACE_MARGIN > livre:
+                # Sem espaço: a sessão fica com o frame privado (gravar pela metade derrubaria o /dev/shm)
+                logger.warning(
+                    "compartilhamento: %s precisa de %.1f MB e %s tem %.1f MB livres; mantido só nesta sessão",
+                    key[:12], table.nbytes / 1e6, self.base_dir, livre / 1e6,
+                )
+                self.stats["sem_espaco"] += 1
+                return None
+            with pa.OSFile(tmp, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table)
+            os.replace(tmp, path)
+        except Exception:
+            self.stats["ignorados"] += 1
+            self._remove(tmp)
+            return None
+        self.stats["publicados"] += 1
+        return self._map(path)
+
+    # -------------------------
+    # Referências por sessão
+    # -------------------------
+    def acquire(self, key: str, holder: str) -> None:
+        refs = self._refs_dir(key)
+        os.makedirs(refs, exist_ok=True)
+        marker = os.path.join(refs, holder)
+        with open(marker, "a"):
+            pass
+        os.utime(marker)  # renova a marca a cada uso
+
+    def _live_holders(self, key: str):
+        refs = self._refs_dir(key)
+        try:
+            names = os.listdir(refs)
+        except OSError:
+            return []
+        now, live = time.time(), []
+        for n in names:
+            p = os.path.join(refs, n)
+            try:
+                expired = now - os.stat(p).st_mtime > self.ttl_s
+            except OSError:
+                continue
+            if expired:
+                self._remove(p)
+            else:
+                live.append(n)
+        return live
+
+    def _collect(self, key: str) -> bool:
+        """Apaga o arquivo da chave se nenhuma sessão o segura mais."""
+        if self._live_holders(key):
+            return False
+        self._frames.pop(key, None)
+        removed = self._remove(self._path(key))
+        try:
+            os.rmdir(self._refs_dir(key))
+        except OSError:
+            pass
+        if removed:
+            self.stats["removidos"] += 1
+        return removed
+
+    def release(self, key: str, holder: str) -> None:
+        with self._lock:
+            self._remove(os.path.join(self._refs_dir(key), holder))
+            self._collect(key)
+
+    def release_holder(self, holder: str, keep: Iterable[str] = ()) -> None:
+        """Solta todos os arquivos da sessão, menos os de ``keep``."""
+        keep = set(keep)
+        for key in self._keys_with_refs():
+            if key not in keep and os.path.exists(os.path.join(self._refs_dir(key), holder)):
+                self.release(key, holder)
+
+    def renew(self, holder: str) -> None:
+        """Renova as marcas da sessão (chamado a cada rerun) e limpa o que expirou."""
+        for key in self._keys_with_refs():
+            marker = os.path.join(self._refs_dir(key), holder)
+            try:
+                os.utime(marker)
+            except OSError:
+                pass
+        self.sweep()
+
+    def _keys_with_refs(self):
+        try:
+            return os.listdir(os.path.join(self.base_dir, "refs"))
+        except OSError:
+            return []
+
+    # -------------------------
+    # API
+    # -------------------------
+    def get(self, key: str, holder: str) -> Optional[pd.DataFrame]:
+        """DataFrame mapeado da chave (registra ``holder``); None se ainda não foi publicado."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            df = self._frames.get(key)
+            if df is None and os.path.exists(self._path(key)):
+                try:
+                    df = self._map(self._path(key))
+                except Exception:
+                    self._remove(self._path(key))
+                    return None
+                self._frames[key] = df
+            if df is None:
+                return None
+            self.acquire(key, holder)
+            self.stats["hits"] += 1
+            return df
+
+    def publish(self, key: str, df: Any, holder: str) -> Any:
+        """Versão compartilhada de ``df`` (grava na primeira vez); devolve ``df`` se não der para compartilhar."""
+        if not self.enabled or not isinstance(df, pd.DataFrame):
+            return df
+        with self._lock:
+            shared = self.get(key, holder)
+            if shared is not None:
+                return shared
+            shared = self._write(key, df)
+            if shared is None:
+                return df
+            self._frames[key] = shared
+            self.acquire(key, holder)
+            return shared
+
+    def publish_frames(self, frames: Dict[str, Any], keys: Dict[str, str], holder: str) -> Dict[str, Any]:
+        """``publish`` de cada frame do lote que tem chave (``load_reports(...)["chaves"]``)."""
+        return {k: self.publish(keys[k], df, holder) if k in keys else df for k, df in frames.items()}
+
+    def _remove(self, path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except OSError:
+            return False
+
+    def sweep(self) -> int:
+        """Apaga os arquivos sem sessão viva (marcas expiradas) e sobras de gravação."""
+        with self._lock:
+            try:
+                names = os.listdir(self.base_dir)
+            except OSError:
+                return 0
+            removed = 0
+            for n in names:
+                if n.endswith(".arrow"):
+                    removed += int(self._collect(n[: -len(".arrow")]))
+                elif n.endswith(".tmp"):
+                    p = os.path.join(self.base_dir, n)
+                    try:
+                        if time.time() - os.stat(p).st_mtime > self.ttl_s:
+                            self._remove(p)
+                    except OSError:
+                        pass
+            return removed
+
+    def summary(self) -> Dict[str, Any]:
+        try:
+            files = [os.path.join(self.base_dir, n) for n in os.listdir(self.base_dir) if n.endswith(".arrow")]
+        except OSError:
+            files = []
+        sizes = []
+        for p in files:
+            try:
+                sizes.append(os.stat(p).st_size)
+            except OSError:
+                pass
+        holders = {h for key in self._keys_with_refs() for h in self._live_holders(key)}
+        return {
+            **self.stats,
+            "arquivos": len(sizes),
+            "tamanho_mb": sum(sizes) / 1e6,
+            "sessoes": len(holders),
+            "diretorio": self.base_dir,
+        }
+
+
+_default_store: Optional[SharedFrameStore] = None
+
+
+def get_store() -> SharedFrameStore:
+    """Store padrão do processo (o mesmo para todas as sessões do Streamlit)."""
+    global _default_store
+    if _default_store is None:
+        import ml_report
+
+        _default_store = SharedFrameStore(version=ml_report.LOADER_VERSION)
+    return _default_store
@@ -0,0 +1,229 @@
+"""
+Validação rápida dos relatórios enviados
+Antes da leitura completa, cada arquivo é conferido só pelas linhas iniciais:
+formato, linha de cabeçalho, colunas obrigatórias, taxa de números válidos nas
+métricas e chave sem repetição. As checagens são vetorizadas sobre uma amostra
+de poucas centenas de linhas (milissegundos), então um arquivo trocado (ex.:
+estoque no lugar do relatório de campanha) para antes do parse pesado e do
+build_tables, com o motivo por arquivo.
+"""
+
+import time
+from io import BytesIO
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import ml_report as ml
+import report_bundle
+from excel_reader import StreamingWorkbook, TableSession, WorkbookSession, detect_format, file_bytes
+from report_schema import get_schema
+
+# Linhas de dados conferidas depois do cabeçalho
+SAMPLE_ROWS = 200
+
+# Trecho lido de um CSV para a amostra
+CSV_SAMPLE_BYTES = 512 * 1024
+
+# Fração mínima das células preenchidas de uma métrica que precisa virar número
+MIN_NUMERIC_RATE = 0.9
+
+# Regras por relatório:
+# - "obrigatorias": colunas canônicas (report_schema) sem as quais o pipeline não roda;
+# - "numericas": "schema" = todas as colunas numéricas do registro presentes no arquivo;
+# - "chave": colunas que não podem se repetir (None = sem checagem);
+# - "dica_chave": complemento da mensagem quando a chave se repete.
+VALIDATION_RULES = {
+    ("mercado_livre", "vendas"): {
+        "obrigatorias": ["ID", "Titulo", "Status", "Visitas", "Qtd_Vendas", "Vendas_Brutas"],
+        "numericas": "schema",
+        "chave": None,
+    },
+    ("mercado_livre", "patrocinados"): {
+        "obrigatorias": [
+            "Código do anúncio", "Campanha", "Impressões", "Cliques",
+            "Receita\n(Moeda local)", "Investimento\n(Moeda local)", "Vendas por publicidade\n(Diretas + Indiretas)",
+        ],
+        "numericas": "schema",
+        "chave": ["Código do anúncio", "Campanha"],
+    },
+    ("mercado_livre", "campanha"): {
+        "obrigatorias": [
+            "Nome", "Status", "Impressões", "Cliques",
+            "Receita\n(Moeda local)", "Investimento\n(Moeda local)", "Vendas por publicidade\n(Diretas + Indiretas)",
+        ],
+        "numericas": "schema",
+        "chave": ["Nome"],
+        "dica_chave": "envie o relatório de campanha consolidado (uma linha por campanha), não o diário",
+    },
+    ("mercado_livre", "estoque"): {
+        "obrigatorias": ["ITEM_ID", "SKU", "QUANTITY"],
+        "numericas": "schema",
+        "chave": None,
+    },
+    ("shopee", "dados_gerais"): {
+        "obrigatorias": ["Nome do Anúncio", "Impressões", "Cliques", "Despesas", "GMV"],
+        "numericas": [],  # números da Shopee têm limpeza própria (shopee_report)
+        "chave": None,
+    },
+    ("shopee", "palavras_chave"): {
+        "obrigatorias": ["Impressões", "Cliques", "Despesas"],
+        "numericas": [],
+        "chave": None,
+    },
+}
+
+# Relatório do registro de colunas usado por cada slot
+_SCHEMA_OF = {("shopee", "palavras_chave"): ("shopee", "dados_gerais")}
+
+
+def _col_text(c: str) -> str:
+    return repr(c.replace("\n", " "))
+
+
+def _open_sample(data: bytes, fmt: str):
+    """Leitor só do começo do arquivo (o mesmo tipo de leitor que a identificação do .zip usa)."""
+    if fmt == "csv":
+        return TableSession(data[:CSV_SAMPLE_BYTES], fmt="csv")
+    if fmt == "parquet":
+        return TableSession(BytesIO(data), fmt="parquet")
+    if fmt == "xlsx":
+        return StreamingWorkbook(BytesIO(data))
+    return WorkbookSession.open(BytesIO(data))
+
+
+def _pick_sample_sheet(book, fmt: str, report: str) -> str:
+    if fmt in ("xlsx", "xls") and report in ml.REPORT_SHEETS:
+        return ml._match_sheet(book.sheet_names, **ml.REPORT_SHEETS[report]) or book.sheet_names[0]
+    return book.sheet_names[0]
+
+
+def _find_header(rows: List[List[Any]], schema, required: List[str]) -> Tuple[Optional[int], Dict[int, str]]:
+    """Linha (entre as iniciais) com mais colunas obrigatórias reconhecidas e o mapa posição -> coluna."""
+    best, best_cols, best_hits = None, {}, 0
+    wanted = set(required)
+    for i, row in enumerate(rows[: report_bundle.HEADER_SCAN_ROWS]):
+        cols = {}
+        for j, v in enumerate(row):
+            name = schema.resolve(v) if isinstance(v, str) and v.strip() else None
+            if name is not None and name not in cols.values():
+                cols[j] = name
+        hits = len(wanted.intersection(cols.values()))
+        if hits > best_hits:
+            best, best_cols, best_hits = i, cols, hits
+    return best, best_cols
+
+
+def _label(marketplace: str, report: str) -> str:
+    import marketplace_config as mkt
+
+    for r in mkt.get_required_reports(marketplace) + mkt.get_optional_reports(marketplace):
+        if r["key"] == report:
+            return r["label"]
+    return report
+
+
+def _sample_frame(rows: List[List[Any]], header: int, cols: Dict[int, str]) -> pd.DataFrame:
+    body = rows[header + 1: header + 1 + SAMPLE_ROWS]
+    width = max(cols) + 1 if cols else 0
+    grid = np.array([(list(r) + [""] * width)[:width] for r in body], dtype=object).reshape(len(body), width)
+    # tudo como texto sem espaços nas pontas ("" = vazio), igual para xlsx, CSV e Parquet
+    df = pd.DataFrame({name: pd.Series(grid[:, j], dtype=object).fillna("").astype(str).str.strip() for j, name in cols.items()})
+    if df.empty:
+        return df
+    # linhas vazias e repetições do cabeçalho (o relatório de vendas tem duas linhas de título)
+    header_like = np.column_stack([df[c].eq(c).to_numpy() for c in df.columns]).any(axis=1)
+    return df[df.ne("").any(axis=1).to_numpy() & ~header_like]
+
+
+def validate_upload(report: str, file, marketplace: str = "mercado_livre") -> Dict[str, Any]:
+    """
+    Confere as linhas iniciais do arquivo enviado para o relatório ``report``.
+
+    Retorna {"relatorio", "ok", "erros", "formato", "linhas_amostra", "tempo_ms"};
+    ``erros`` tem uma mensagem por problema encontrado (vazio quando ``ok``).
+    """
+    t0 = time.perf_counter()
+    out: Dict[str, Any] = {"relatorio": report, "ok": True, "erros": [], "formato": None, "linhas_amostra": 0, "tempo_ms": 0.0}
+
+    def _done():
+        out["ok"] = not out["erros"]
+        out["tempo_ms"] = (time.perf_counter() - t0) * 1000
+        return out
+
+    rule = VALIDATION_RULES.get((marketplace, report))
+    if rule is None or file is None:
+        return _done()
+
+    data = file_bytes(file)
+    if not data:
+        out["erros"].append("arquivo vazio")
+        return _done()
+    fmt = out["formato"] = detect_format(data[:8])
+    try:
+        book = _open_sample(data, fmt)
+    except Exception as e:
+        out["erros"].append(f"não foi possível abrir o arquivo como {fmt}: {type(e).__name__}: {e}")
+        return _done()
+
+    try:
+        sheet = _pick_sample_sheet(book, fmt, report)
+        rows = book.cells(sheet, max_rows=report_bundle.HEADER_SCAN_ROWS + SAMPLE_ROWS + 1)
+        schema = get_schema(*_SCHEMA_OF.get((marketplace, report), (marketplace, report)))
+        header, cols = _find_header(rows, schema, rule["obrigatorias"])
+
+        missing = [c for c in rule["obrigatorias"] if c not in cols.values()]
+        if missing:
+            found_mkt, found_rel = report_bundle.identify_book(book, fmt)
+            if header is None:
+                msg = "cabeçalho do relatório não encontrado nas primeiras linhas"
+            else:
+                msg = "faltam as colunas " + ", ".join(_col_text(c) for c in missing) + f" (cabeçalho na linha {header + 1})"
+            if found_rel is not None and (found_mkt, found_rel) != (marketplace, report):
+                msg += f"; o arquivo parece ser: {_label(found_mkt, found_rel)}"
+            out["erros"].append(msg)
+            return _done()
+
+        sample = _sample_frame(rows, header, cols)
+        out["linhas_amostra"] = int(len(sample))
+        if sample.empty:
+            out["erros"].append(f"nenhuma linha de dados depois do cabeçalho (linha {header + 1})")
+            return _done()
+
+        numeric = schema.names(tipo="numero") if rule["numericas"] == "schema" else rule["numericas"]
+        for c in numeric:
+            if c not in sample.columns:
+                continue
+            s = sample[c]
+            s = s[s.ne("")]
+            if s.empty:
+                continue
+            parsed = ml._coerce_series_numeric_ptbr(s.astype(object))
+            ok = pd.to_numeric(parsed, errors="coerce").notna()
+            rate = float(ok.mean())
+            if rate < MIN_NUMERIC_RATE:
+                exemplo = s[~ok.to_numpy()].iloc[0]
+                out["erros"].append(
+                    f"coluna {_col_text(c)}: só {rate:.0%} das {len(s)} primeiras células são números (ex.: {exemplo!r})"
+                )
+
+        key = rule.get("chave")
+        if key and all(k in sample.columns for k in key):
+            keys = sample[key]
+            dup = keys.duplicated(keep=False)
+            if dup.any():
+                exemplo = " / ".join(keys[dup].iloc[0])
+                msg = f"chave {' + '.join(key)} repetida em {int(dup.sum())} das {len(sample)} primeiras linhas (ex.: {exemplo!r})"
+                if rule.get("dica_chave"):
+                    msg += f"; {rule['dica_chave']}"
+                out["erros"].append(msg)
+    finally:
+        if isinstance(book, StreamingWorkbook):
+            book.close()
+    return _done()
+
+
+def validate_uploads(files: Dict[str, Any], marketplace: str = "mercado_livre") -> Dict[str, Dict[str, Any]]:
+    """``validate_upload`` de cada arquivo enviado ({relatório: arquivo}); arquivos None são ignorados."""
+    return {k: validate_upload(k, f, marketplace) for k, f in files.items() if f is not None}
@@ -6,6 +6,11 @@ Processa relatórios CSV e calcula métricas específicas do GMV Max
 import pandas as pd
 import numpy as np
 
+import report_rules as rrules
+from report_schema import get_schema
+
+_SCHEMA_DADOS_GERAIS = get_schema("shopee", "dados_gerais")
+
 
 def load_shopee_csv(file, skiprows=7):
     """
@@ -38,16 +43,9 @@ def clean_shopee_data(df):
     # Remove linhas completamente vazias
     df = df.dropna(how='all')
     
-    # Converte colunas numéricas
-    numeric_cols = [
-        'Impressões', 'Cliques', 'CTR', 'Conversões', 'Conversões Diretas',
-        'Taxa de Conversão', 'Taxa de Conversão Direta',
-        'Custo por Conversão', 'Custo por Conversão Direta',
-        'Itens Vendidos', 'Itens Vendidos Diretos',
-        'GMV', 'Receita direta', 'Despesas',
-        'ROAS', 'ROAS Direto', 'ACOS', 'ACOS Direto',
-        'Impressões do Produto', 'Cliques de Produtos', 'CTR do Produto'
-    ]
+    # Nomes e tipos vêm do registro de colunas (report_schema)
+    df = _SCHEMA_DADOS_GERAIS.standardize(df)
+    numeric_cols = _SCHEMA_DADOS_GERAIS.names(tipo="numero")
     
     for col in numeric_cols:
         if col in df.columns:
@@ -56,6 +54,19 @@ def clean_shopee_data(df):
     return df
 
 
+def load_dados_gerais(file):
+    """
+    Lê e limpa um CSV de anúncios da Shopee (Dados Gerais ou Palavras-chave)
+    
+    Args:
+        file: Arquivo CSV
+    
+    Returns:
+        DataFrame limpo
+    """
+    return clean_shopee_data(load_shopee_csv(file))
+
+
 def calcular_kpis_shopee(df):
     """
     Calcula KPIs agregados da Shopee
@@ -227,78 +238,59 @@ def analisar_conversoes_diretas(df):
     return df_analise
 
 
-def gerar_recomendacoes_shopee(df, kpis):
+# Campo da recomendação -> coluna do relatório (os "campos" das regras do conjunto
+# "shopee" em report_rules; nome fora do mapa é usado como coluna)
+_CAMPOS_RECOMENDACAO = {
+    "roas_atual": "ROAS",
+    "gmv": "GMV",
+    "despesas": "Despesas",
+    "conversoes": "Conversões",
+}
+
+
+def gerar_recomendacoes_shopee(df, kpis, regras=None):
     """
     Gera recomendações automáticas para campanhas Shopee
     
     Args:
         df: DataFrame com dados de campanhas
         kpis: Dict com KPIs agregados
+        regras: ajustes do cliente às regras padrão (report_rules.load_rules)
     
     Returns:
-        dict com listas de recomendações
+        dict com listas de recomendações (uma por regra do conjunto "shopee")
     """
-    recomendacoes = {
-        "ativar_protecao": [],
-        "otimizar_roas": [],
-        "escalar_gmv": [],
-        "pausar_revisar": []
-    }
-    
-    for idx, row in df.iterrows():
-        nome = row.get('Nome do Anúncio', f'Campanha {idx+1}')
-        roas = row.get('ROAS', 0)
-        gmv = row.get('GMV', 0)
-        despesas = row.get('Despesas', 0)
-        conversoes = row.get('Conversões', 0)
-        
-        # Ativar Proteção de ROAS
-        if roas > 0 and roas < 2.5 and despesas > 50:
-            recomendacoes["ativar_protecao"].append({
-                "campanha": nome,
-                "roas_atual": roas,
-                "despesas": despesas,
-                "motivo": "ROAS abaixo da meta com investimento significativo"
-            })
-        
-        # Otimizar ROAS
-        if roas > 0 and roas < 3.0 and conversoes >= 5:
-            recomendacoes["otimizar_roas"].append({
-                "campanha": nome,
-                "roas_atual": roas,
-                "conversoes": conversoes,
-                "motivo": "ROAS baixo mas com volume de conversões"
-            })
-        
-        # Escalar GMV
-        if roas >= 4.0 and gmv > 0:
-            recomendacoes["escalar_gmv"].append({
-                "campanha": nome,
-                "roas_atual": roas,
-                "gmv": gmv,
-                "motivo": "ROAS forte - oportunidade de escalar"
-            })
-        
-        # Pausar/Revisar
-        if despesas > 100 and (roas < 1.5 or conversoes == 0):
-            recomendacoes["pausar_revisar"].append({
-                "campanha": nome,
-                "roas_atual": roas,
-                "despesas": despesas,
-                "conversoes": conversoes,
-                "motivo": "Alto investimento com retorno insatisfatório"
-            })
+    casadas = rrules.match_rules(df, "shopee", regras=regras)
+    recomendacoes = {regra["nome"]: [] for regra, _ in casadas}
+
+    if 'Nome do Anúncio' in df.columns:
+        nomes = df['Nome do Anúncio'].to_numpy(dtype=object)
+    else:
+        nomes = np.array([f'Campanha {idx+1}' for idx in df.index], dtype=object)
+
+    for regra, mask in casadas:
+        if not mask.any():
+            continue
+        linhas = {"campanha": nomes[mask].tolist()}
+        for campo in regra.get("campos", []):
+            col = _CAMPOS_RECOMENDACAO.get(campo, campo)
+            linhas[campo] = df[col].to_numpy()[mask].tolist() if col in df.columns else [0] * int(mask.sum())
+        fixos = regra.get("saidas", {})
+        recomendacoes[regra["nome"]].extend(
+            {**dict(zip(linhas, valores)), **fixos} for valores in zip(*linhas.values())
+        )
     
     return recomendacoes
 
 
-def processar_relatorio_shopee(dados_gerais_file, palavras_chave_file=None):
+def processar_relatorio_shopee(dados_gerais_file, palavras_chave_file=None, regras=None):
     """
     Processa relatórios da Shopee e retorna análise completa
     
     Args:
         dados_gerais_file: Arquivo CSV de dados gerais
         palavras_chave_file: Arquivo CSV de palavras-chave (opcional)
+        regras: ajustes do cliente às regras padrão (report_rules.load_rules)
     
     Returns:
         dict com DataFrames e análises
@@ -317,7 +309,7 @@ def processar_relatorio_shopee(dados_gerais_file, palavras_chave_file=None):
     df_conversoes = analisar_conversoes_diretas(df_geral)
     
     # Gera recomendações
-    recomendacoes = gerar_recomendacoes_shopee(df_geral, kpis)
+    recomendacoes = gerar_recomendacoes_shopee(df_geral, kpis, regras=regras)
     
     # Calcula crédito total de proteção
     credito_total = df_protecao[df_protecao['Elegível Proteção']]['Crédito Potencial (R$)'].sum()
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+"""Configuracao comum dos testes."""
+
+import report_copies
+
+# O pipeline conta com copy-on-write (no pandas 2 a opcao e ligada pelo ponto de entrada)
+report_copies.enable_copy_on_write()
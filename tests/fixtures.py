@@ -0,0 +1,427 @@
+# -*- coding: utf-8 -*-
+"""
+Dados sinteticos compartilhados pelos testes e pelo benchmark_ml_report.
+
+Arquivos no layout dos relatorios do Mercado Livre e da Shopee (xlsx, CSV e
+Parquet), frames ja lidos no formato de cada etapa do pipeline e os auxiliares
+que comparam as saidas do build_tables.
+"""
+
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+
+import ml_report as ml
+
+
+# -------------------------
+# Parser numerico pt-BR
+# -------------------------
+PTBR_CORPUS = [
+    "R$ 1.234,56", "R$\xa01.234,56", "1.234,56", "52,00%", "52,00 %", " 3.144 ", "3.144",
+    "0,5", ",5", "-12,30", "+7", "-", "+", "", "   ", "nan", "NaN", "None", "<NA>", "n/a",
+    "abc", "1.2.3", "1,2,3", "12e3", "R$ -0,00", "100%", "\xa0", "1\xa0234,5", "²3",
+    "١٢", "Ação 12", "12,5 un", "--1", "1-", "999999999999999999999", "0,1", "0,30000000000000004",
+    None, pd.NA, np.nan, float("nan"), 0, 1, -5, 3.5, True, False, 10 ** 6,
+    np.int64(7), np.float64(2.25), np.float32(0.1), pd.NaT,
+]
+
+
+# -------------------------
+# Arquivos sinteticos no layout dos relatorios do Mercado Livre
+# -------------------------
+def _brl(v: float) -> str:
+    return f"{v:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+def _write_xlsx(sheet_name: str, preamble: list, header: list, rows: list, fmt: str = "xlsx") -> BytesIO:
+    """Relatorio sintetico em xlsx, CSV (";" e pt-BR, como o armazem exporta) ou Parquet (sem as linhas de titulo)."""
+    if fmt == "parquet":
+        out = BytesIO()
+        pd.DataFrame(rows, columns=header).to_parquet(out, index=False)
+        out.seek(0)
+        return out
+    if fmt == "csv":
+        import csv
+        import io
+
+        txt = io.StringIO()
+        writer = csv.writer(txt, delimiter=";", lineterminator="\r\n")
+        writer.writerows(preamble + [header])
+        writer.writerows([["" if v is None else v for v in row] for row in rows])
+        return BytesIO(txt.getvalue().encode("utf-8-sig"))
+
+    import xlsxwriter
+
+    out = BytesIO()
+    wb = xlsxwriter.Workbook(out, {"constant_memory": True})
+    ws = wb.add_worksheet(sheet_name)
+    r = 0
+    for line in preamble:
+        ws.write_row(r, 0, line)
+        r += 1
+    ws.write_row(r, 0, header)
+    r += 1
+    for row in rows:
+        ws.write_row(r, 0, ["" if v is None else v for v in row])
+        r += 1
+    wb.close()
+    out.seek(0)
+    return out
+
+
+def _extra_cols(i: int, extra_cols: int) -> list:
+    # colunas que o pipeline nao usa (exportacoes "largas")
+    return [f"Info {i}-{k}" if k % 2 else i * 0.5 + k for k in range(extra_cols)]
+
+
+def make_patrocinados_xlsx(n: int, n_campanhas: int = 50, seed: int = 0, extra_cols: int = 0, fmt: str = "xlsx") -> BytesIO:
+    rng = np.random.default_rng(seed)
+    header = [
+        "Código do anúncio", "Título do anúncio patrocinado", "Campanha", "Status",
+        "Impressões", "Cliques", "CPC \n(Custo por clique)", "CTR\n(Click Through Rate)",
+        "CVR\n(Conversion rate)", "Receita\n(Moeda local)", "Investimento\n(Moeda local)",
+        "ACOS\n (Investimento / Receitas)", "ROAS\n(Receitas / Investimento)",
+        "Vendas diretas", "Vendas indiretas", "Vendas por publicidade\n(Diretas + Indiretas)",
+    ] + [f"Coluna extra {k}" for k in range(extra_cols)]
+    rows = []
+    for i in range(n):
+        imp = int(rng.integers(0, 20_000))
+        clk = int(rng.integers(0, max(1, imp // 20 + 1)))
+        vd, vi = int(rng.integers(0, 10)), int(rng.integers(0, 5))
+        inv = float(rng.uniform(0, 300))
+        rec = float(rng.uniform(0, 3000)) if vd + vi else 0.0
+        rows.append([
+            f"MLB{3_000_000_000 + i}", f"Produto sintetico {i}", f"Campanha {i % n_campanhas:03d}",
+            "Ativo" if i % 7 else "Pausado", imp, clk, _brl(inv / clk if clk else 0.0),
+            f"{_brl(clk / imp * 100 if imp else 0.0)}%", f"{_brl((vd + vi) / clk * 100 if clk else 0.0)}%",
+            _brl(rec), _brl(inv), f"{_brl(inv / rec * 100 if rec else 0.0)}%", _brl(rec / inv if inv else 0.0),
+            vd, vi, vd + vi,
+        ] + _extra_cols(i, extra_cols))
+    return _write_xlsx("Relatório Anúncios patrocinados", [["Relatório de anúncios patrocinados"]], header, rows, fmt)
+
+
+def make_organico_xlsx(n: int, seed: int = 0, extra_cols: int = 0, fmt: str = "xlsx") -> BytesIO:
+    rng = np.random.default_rng(seed)
+    header = [
+        "ID do anúncio", "Anúncio", "Status atual", "Variação", "SKU", "Visitas únicas",
+        "Quantidade de vendas", "Compradores únicos", "Unidades vendidas", "Vendas brutas (BRL)",
+        "% de participação", "Conversão de visitas em vendas", "Conversão de visitas em compradores",
+    ] + [f"Coluna extra {k}" for k in range(extra_cols)]
+    preamble = [["Relatório de desempenho"], ["Período: últimos 30 dias"], [], []]
+    rows = []
+    for i in range(n):
+        vis = int(rng.integers(0, 5_000))
+        qtd = int(rng.integers(0, max(1, vis // 15 + 1)))
+        bruto = float(rng.uniform(0, 20_000))
+        rows.append([
+            f"MLB{3_000_000_000 + i}", f"Produto sintetico {i}", "Ativo" if i % 5 else "Inativo", "",
+            f"SKU-{i:06d}", vis, qtd, qtd, qtd, _brl(bruto) if i % 3 else f"{bruto:.3f}",
+            f"{_brl(rng.uniform(0, 2))}%", f"{_brl(qtd / vis * 100 if vis else 0.0)}%",
+            f"{_brl(qtd / vis * 100 if vis else 0.0)}%",
+        ] + _extra_cols(i, extra_cols))
+    return _write_xlsx("Relatório", preamble, header, rows, fmt)
+
+
+def make_campanha_xlsx(n: int, seed: int = 0, fmt: str = "xlsx") -> BytesIO:
+    rng = np.random.default_rng(seed)
+    header = [
+        "Nome", "Status", "Orçamento", "ACOS Objetivo", "Impressões", "Cliques",
+        "Receita\n(Moeda local)", "Investimento\n(Moeda local)",
+        "Vendas por publicidade\n(Diretas + Indiretas)", "ROAS\n(Receitas / Investimento)",
+        "CVR\n(Conversion rate)", "% de impressões perdidas por orçamento",
+        "% de impressões perdidas por classificação",
+    ]
+    rows = []
+    for i in range(n):
+        inv = float(rng.uniform(0, 2_000))
+        rec = float(rng.uniform(0, 20_000))
+        clk = int(rng.integers(0, 3_000))
+        ven = int(rng.integers(0, 60))
+        rows.append([
+            f"Campanha {i:03d}", "Ativa" if i % 6 else "Pausada", _brl(rng.uniform(10, 500)),
+            f"{_brl(rng.uniform(5, 40))}%", int(rng.integers(0, 200_000)), clk, _brl(rec), _brl(inv), ven,
+            _brl(rec / inv if inv else 0.0), f"{_brl(ven / clk * 100 if clk else 0.0)}%",
+            f"{_brl(rng.uniform(0, 90))}%", f"{_brl(rng.uniform(0, 90))}%",
+        ])
+    return _write_xlsx("Relatório de campanha", [["Relatório de campanha"]], header, rows, fmt)
+
+
+def make_campanha_diario_xlsx(
+    n_campanhas: int, dias: int, inicio: str = "2026-01-01", seed: int = 0, reexpressos=(), fmt: str = "xlsx"
+) -> BytesIO:
+    """
+    Relatorio de campanha diario: uma linha por (campanha, dia) a partir de ``inicio``.
+
+    Cada dia tem numeros proprios (mesmo dia = mesmas linhas em exports diferentes);
+    os dias em ``reexpressos`` ("AAAA-MM-DD") saem com numeros revisados.
+    """
+    header = [
+        "Desde", "Nome", "Status", "Orçamento", "ACOS Objetivo", "Impressões", "Cliques",
+        "Receita\n(Moeda local)", "Investimento\n(Moeda local)",
+        "Vendas por publicidade\n(Diretas + Indiretas)", "ROAS\n(Receitas / Investimento)",
+        "CVR\n(Conversion rate)", "% de impressões perdidas por orçamento",
+        "% de impressões perdidas por classificação",
+    ]
+    rows = []
+    for dia in pd.date_range(inicio, periods=dias, freq="D"):
+        rng = np.random.default_rng([seed, dia.toordinal(), int(dia.strftime("%Y-%m-%d") in reexpressos)])
+        for i in range(n_campanhas):
+            inv = float(rng.uniform(0, 200))
+            rec = float(rng.uniform(0, 2_000))
+            clk = int(rng.integers(0, 300))
+            ven = int(rng.integers(0, 8))
+            rows.append([
+                dia.strftime("%Y-%m-%d"), f"Campanha {i:03d}", "Ativa" if i % 6 else "Pausada", _brl(rng.uniform(10, 500)),
+                f"{_brl(rng.uniform(5, 40))}%", int(rng.integers(0, 20_000)), clk, _brl(rec), _brl(inv), ven,
+                _brl(rec / inv if inv else 0.0), f"{_brl(ven / clk * 100 if clk else 0.0)}%",
+                f"{_brl(rng.uniform(0, 90))}%", f"{_brl(rng.uniform(0, 90))}%",
+            ])
+    return _write_xlsx("Relatório de campanha", [["Relatório de campanha"]], header, rows, fmt)
+
+
+def make_estoque_xlsx(n: int, seed: int = 0) -> BytesIO:
+    rng = np.random.default_rng(seed)
+    header = ["", "ITEM_ID", "TITLE", "SKU", "PRICE", "STATUS", "QUANTITY"]
+    preamble = [["Anúncios"], ["Instruções de preenchimento"], [], []]
+    rows = [
+        ["", f"MLB{3_000_000_000 + i}", f"Produto sintetico {i}", f"SKU-{i:06d}", 99.9, "active",
+         int(rng.integers(0, 50))]
+        for i in range(n)
+    ]
+    return _write_xlsx("Anúncios", preamble, header, rows)
+
+
+def make_shopee_csv(n: int, seed: int = 0, palavras_chave: bool = False) -> BytesIO:
+    """CSV de anuncios da Shopee (7 linhas de titulo antes do cabecalho, como o export)."""
+    import csv
+    import io
+
+    rng = np.random.default_rng(seed)
+    header = ["Nome do Anúncio"] + (["Palavra-chave/Localização"] if palavras_chave else []) + [
+        "Impressões", "Cliques", "Conversões", "Conversões Diretas", "Itens Vendidos",
+        "Itens Vendidos Diretos", "GMV", "Receita direta", "Despesas", "ROAS", "ROAS Direto",
+    ]
+    txt = io.StringIO()
+    writer = csv.writer(txt)
+    writer.writerows([["Relatório de Anúncios"], ["Loja sintetica"], ["Período", "01/01 - 30/01"], [], [], [], []])
+    writer.writerow(header)
+    for i in range(n):
+        imp, clk = int(rng.integers(0, 50_000)), int(rng.integers(0, 800))
+        conv = int(rng.integers(0, 40))
+        gmv, desp = round(float(rng.uniform(0, 8_000)), 2), round(float(rng.uniform(1, 900)), 2)
+        writer.writerow(
+            [f"Anuncio {i}"] + ([f"palavra {i % 30}"] if palavras_chave else [])
+            + [imp, clk, conv, conv // 2, conv, conv // 2, gmv, gmv / 2, desp, round(gmv / desp, 2), round(gmv / desp / 2, 2)]
+        )
+    return BytesIO(txt.getvalue().encode("utf-8"))
+
+
+def make_bundle(n: int) -> BytesIO:
+    """Pacote .zip com duas contas (xlsx, CSV e Parquet misturados), Shopee e um arquivo estranho."""
+    import zipfile
+
+    membros = {
+        "conta_a/desempenho.xlsx": make_organico_xlsx(n),
+        "conta_a/anuncios.csv": make_patrocinados_xlsx(n, fmt="csv"),
+        "conta_a/campanhas.parquet": make_campanha_xlsx(max(n // 50, 10), fmt="parquet"),
+        "conta_a/estoque.xlsx": make_estoque_xlsx(n),
+        "conta_b/export_1.xlsx": make_organico_xlsx(n, seed=1),
+        "conta_b/export_2.xlsx": make_patrocinados_xlsx(n, seed=1),
+        "conta_b/export_3.xlsx": make_campanha_xlsx(max(n // 50, 10), seed=1),
+        "shopee/anuncios.csv": make_shopee_csv(n // 10),
+        "shopee/palavras.csv": make_shopee_csv(n // 10, palavras_chave=True),
+        "leia-me.txt": BytesIO(b"sem relatorio"),
+    }
+    buf = BytesIO()
+    with zipfile.ZipFile(buf, "w", zipfile.ZIP_DEFLATED) as z:
+        for nome, arquivo in membros.items():
+            z.writestr(nome, arquivo.getvalue())
+    buf.seek(0)
+    return buf
+
+
+# -------------------------
+# Frames ja lidos (entrada de cada etapa)
+# -------------------------
+def make_campaign_table(n: int, seed: int = 0, acos_objetivo: bool = True) -> pd.DataFrame:
+    """Tabela de campanhas no formato do build_campaign_agg, com zeros, nulos e valores de fronteira."""
+    rng = np.random.default_rng(seed)
+    invest = rng.choice([0.0, 99.99, 100.0, 200.0, 300.0, 1_000.0], n) * rng.choice([1.0, 0.5, 3.7], n)
+    receita = invest * rng.choice([0.0, 1.0, 2.9, 3.0, 6.99, 7.0, 15.0], n) + rng.choice([0.0, 250.0, 5_000.0], n)
+    df = pd.DataFrame({
+        "Nome": [f"Campanha {i}" for i in range(n)],
+        "Status": rng.choice(["Ativa", "Pausada"], n),
+        "Orçamento": rng.choice([50.0, 100.0, np.nan], n),
+        "ACOS Objetivo": rng.choice([0.0, 0.1, 0.25, 14.0, 30.0, np.nan], n),
+        "Impressões": rng.integers(0, 100_000, n).astype(float),
+        "Cliques": rng.choice([0, 79, 80, 99, 100, 199, 200, 500], n).astype(float) + rng.choice([0.0, 0.5], n),
+        "Receita": receita,
+        "Investimento": invest,
+        "Vendas": rng.choice([0, 1, 2, 4, 5, 12], n).astype(float),
+        "ROAS": rng.uniform(0, 20, n),
+        "CVR": rng.uniform(0, 10, n),
+        "Perdidas_Orc": rng.choice([0.0, 10.0, 39.9, 40.0, 60.0, 95.0, np.nan], n),
+        "Perdidas_Class": rng.choice([0.0, 49.9, 50.0, 80.0, np.nan], n),
+    })
+    df.loc[rng.random(n) < 0.02, "Receita"] = np.nan
+    if not acos_objetivo:
+        df = df.drop(columns=["ACOS Objetivo"])
+    return df
+
+
+def make_ads_frame(n: int, n_campanhas: int = 200, seed: int = 0) -> pd.DataFrame:
+    """Patrocinados ja lido (formato do load_patrocinados), com anuncios repetidos, zeros e linhas sem campanha."""
+    rng = np.random.default_rng(seed)
+    ids = rng.integers(3_000_000_000, 3_000_000_000 + int(n * 0.9), n).astype(str)
+    imp = rng.choice([0, 300, 499, 500, 2_000, 20_000], n).astype(float)
+    clk = np.floor(imp * rng.choice([0.0, 0.001, 0.006, 0.02, 0.05], n))
+    vendas = np.floor(clk * rng.choice([0.0, 0.005, 0.01, 0.03, 0.1], n))
+    inv = rng.choice([0.0, 5.0, 19.99, 20.0, 80.0, 400.0], n)
+    rec = np.where(vendas > 0, inv * rng.choice([0.5, 2.0, 4.0, 10.0], n), rng.choice([0.0, 0.0, 30.0], n))
+    campanha = pd.Series([f"Campanha {k:03d}" for k in rng.integers(0, n_campanhas, n)], dtype=object)
+    campanha[rng.random(n) < 0.01] = np.nan
+    return pd.DataFrame({
+        "Código do anúncio": "MLB" + pd.Series(ids),
+        "Título do anúncio patrocinado": "Produto " + pd.Series(ids),
+        "Campanha": campanha.astype(str).where(campanha.notna()),
+        "Status": rng.choice(["Ativo", "Pausado"], n),
+        "Impressões": imp,
+        "Cliques": clk,
+        "Receita\n(Moeda local)": rec,
+        "Investimento\n(Moeda local)": inv,
+        "Vendas por publicidade\n(Diretas + Indiretas)": vendas,
+        "ID": ids,
+    })
+
+
+def make_ads_camp_strat(n_campanhas: int = 200, seed: int = 0) -> pd.DataFrame:
+    camp = make_campaign_table(n_campanhas, seed)
+    camp["Nome"] = [f"Campanha {k:03d}" for k in range(n_campanhas)]
+    return ml.add_strategy_fields(camp)
+
+
+COLS_CAMPANHA = [
+    "Invest_Campanha", "Receita_Campanha", "Cliques_Campanha", "Vendas_Campanha", "ROAS_Campanha",
+    "CVR_Campanha_pct", "Pct_Invest_Campanha", "ROAS_Objetivo_Campanha", "Quadrante_Campanha", "Acao_Campanha",
+]
+
+
+def sem_campanha(pat: pd.DataFrame) -> pd.DataFrame:
+    """Painel antes do consolidado por campanha (mesma base dos dois lados)."""
+    return ml._ads_panel_base(pat).drop(columns=COLS_CAMPANHA + ["ROAS_Ref"])
+
+
+def make_estoque_para(painel: pd.DataFrame, seed: int = 0) -> pd.DataFrame:
+    """Estoque com parte dos anuncios do painel, SKUs repetidos e vazios."""
+    rng = np.random.default_rng(seed)
+    amostra = painel.sample(frac=0.7, random_state=seed)
+    sku = pd.Series([f" sku-{k:05d} " for k in rng.integers(0, len(painel), len(amostra))])
+    sku[rng.random(len(amostra)) < 0.1] = ""
+    estoque = pd.DataFrame({
+        "MLB_key": amostra["ID"].to_numpy(),
+        "SKU_key": sku.map(ml._norm_sku).to_numpy(),
+        "Estoque": rng.integers(0, 60, len(amostra)),
+    })
+    # SKU de anuncio que nao esta no estoque pelo MLB: fallback pelo SKU
+    extra = pd.DataFrame({"MLB_key": "999" + pd.Series(np.arange(200)).astype(str), "SKU_key": [f"SKU-{k:05d}" for k in range(200)], "Estoque": 7})
+    return pd.concat([estoque, extra], ignore_index=True)
+
+
+def make_painel_com_sku(n: int, seed: int = 0) -> pd.DataFrame:
+    painel = ml._ads_panel_base(make_ads_frame(n, seed=seed), make_ads_camp_strat())
+    rng = np.random.default_rng(seed + 1)
+    painel["SKU"] = [f"sku-{k:05d}" for k in rng.integers(0, n, len(painel))]
+    return painel
+
+
+def make_shopee_frame(n: int, seed: int = 0) -> pd.DataFrame:
+    """Dados gerais da Shopee ja limpos (clean_shopee_data), com valores nas fronteiras das regras."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "Nome do Anúncio": [f"Anuncio {k}" for k in range(n)],
+        "Despesas": rng.choice([0.0, 50.0, 50.01, 100.0, 180.0, 900.0], n) * rng.choice([1.0, 1.3], n),
+        "GMV": rng.choice([0.0, 10.0, 800.0, 5_000.0], n),
+        "ROAS": rng.choice([0.0, 1.2, 1.5, 2.5, 2.9, 3.0, 4.0, 7.5], n),
+        "Conversões": rng.choice([0, 1, 5, 12], n),
+    })
+
+
+def make_catalogo_fora_ads(n: int, seed: int = 0) -> pd.DataFrame:
+    """Anuncios organicos ativos fora de Ads (o ``org_fora_ads`` do prepare_tables), com empates e NaN."""
+    rng = np.random.default_rng(seed)
+    visitas = rng.integers(0, 2_000, n)
+    vendas = rng.binomial(visitas, 0.03)
+    conv = np.round(np.where(visitas > 0, vendas / np.maximum(visitas, 1) * 100, np.nan), 1)
+    return pd.DataFrame({
+        "ID": pd.Series(np.arange(3_000_000_000, 3_000_000_000 + n)).astype(str),
+        "Titulo": [f"Produto {i}" for i in range(n)],
+        "Visitas": visitas,
+        "Qtd_Vendas": vendas,
+        "Vendas_Brutas": vendas * rng.uniform(20, 400, n).round(2),
+        "Conv_Visitas_Vendas": conv,
+    })
+
+
+# -------------------------
+# Loaders e saidas do build_tables
+# -------------------------
+def report_loaders(n: int):
+    import app
+
+    return {
+        "organico": (make_organico_xlsx(n), ml.load_organico),
+        "patrocinados": (make_patrocinados_xlsx(n), lambda f, engine: ml.load_patrocinados(f, streaming=False, engine=engine)),
+        "campanha": (make_campanha_xlsx(max(n // 50, 10)), ml.load_campanhas_consolidado),
+        "estoque": (make_estoque_xlsx(n), app.load_stock_file),
+    }
+
+
+FORMAT_LOADERS = [
+    ("load_organico", make_organico_xlsx, ml.load_organico),
+    ("load_patrocinados", make_patrocinados_xlsx, ml.load_patrocinados),
+    ("load_campanhas_consolidado", make_campanha_xlsx, ml.load_campanhas_consolidado),
+    ("load_campanhas_diario", make_campanha_xlsx, ml.load_campanhas_diario),
+]
+
+
+LIMIARES = [
+    {},
+    {"pause_invest_min": 20.0, "pause_cvr_max": 1.5, "enter_conv_min": 3.0, "ads_cvr_min": 0.5, "ads_ctr_min_abs": 0.01},
+    {"enter_visitas_min": 0, "ads_min_imp": 0, "ads_min_clk": 0, "ads_pause_invest_min": 0.0},
+    {"pause_invest_min": 1e9, "ads_min_imp": 10**9, "ads_cvr_min": 0.02},
+]
+
+
+def build_tables_from(org, pat, camp):
+    # as 12 saidas calculadas (o ReportTables so calcula no acesso)
+    return tuple(ml.build_tables(org=org, camp_agg=ml.build_campaign_agg(camp, modo="consolidado"), pat=pat))
+
+
+def assert_same_outputs(novo, antigo, label: str):
+    for i, (a, b) in enumerate(zip(novo, antigo)):
+        if isinstance(a, dict):
+            if a != b:
+                raise AssertionError(f"[{label}] saida {i} diferente")
+        else:
+            pd.testing.assert_frame_equal(a, b, check_exact=True, obj=f"{label} saida {i}")
+
+
+def tabelas_catalogo(org_fora_ads: pd.DataFrame, **kw) -> "ml.ReportTables":
+    base = {"kpis": {}, "camp_strat": pd.DataFrame(), "org_fora_ads": org_fora_ads, "ads_base": pd.DataFrame(), "regras": None}
+    return ml.apply_thresholds(base, enter_visitas_min=50, enter_conv_min=1.0, **kw)
+
+
+def pipeline_completo(org, pat, camp_agg, daily=None):
+    """build_tables com as 12 saidas e as tabelas derivadas das campanhas (o que a app monta)."""
+    tabelas = tuple(ml.build_tables(org=org, camp_agg=camp_agg, pat=pat))
+    camp_strat, ads_panel = tabelas[5], tabelas[6]
+    return tabelas + (
+        ml.build_executive_diagnosis(camp_strat, daily),
+        ml.build_opportunity_highlights(camp_strat),
+        ml.build_15_day_plan(camp_strat),
+        ml.build_control_panel(camp_strat),
+        ml.compare_snapshots_campanha(camp_strat, camp_strat.head(20)),
+        ml.compare_snapshots_anuncio(ads_panel, ads_panel.head(20)),
+    )
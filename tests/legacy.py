@@ -0,0 +1,544 @@
+# -*- coding: utf-8 -*-
+"""
+Implementacoes anteriores do ml_report e do shopee_report, mantidas como referencia.
+
+Os testes de equivalencia comparam as versoes atuais com estas, e o
+benchmark_ml_report mede o ganho sobre elas. Nao mudar o comportamento daqui.
+"""
+
+import pandas as pd
+
+import ml_report as ml
+
+
+# -------------------------
+# Parser numerico pt-BR (apply por celula)
+# -------------------------
+def ptbr_reference(series: pd.Series) -> pd.Series:
+    return series.apply(ml._to_number_ptbr)
+
+
+# -------------------------
+# Quadrante das campanhas (apply por linha)
+# -------------------------
+def add_strategy_fields_linha(
+    camp_agg: pd.DataFrame,
+    acos_over_pct: float = 0.30,
+    roas_mina: float = 7.0,
+    lost_budget_mina: float = 40.0,
+    lost_rank_gigante: float = 50.0,
+    roas_hemorragia: float = 3.0,
+    # Travas incrementais
+    comp_invest_min: float = 200.0,
+    comp_clicks_min: int = 100,
+    comp_sales_min: int = 2,
+    hiper_roas_mult: float = 1.50,
+    impacto_factor: float = 0.30,
+) -> pd.DataFrame:
+    df = camp_agg.copy()
+
+    def _reorder_action_block(d: pd.DataFrame) -> pd.DataFrame:
+        """Padroniza leitura: Acao_Recomendada antes de Confianca_Dado e Motivo.
+        Mantem o restante na ordem original.
+        """
+        if d is None or d.empty:
+            return d
+
+        block = [c for c in ["Acao_Recomendada", "Confianca_Dado", "Motivo", "Impacto_Estimado_R$"] if c in d.columns]
+        if not block:
+            return d
+
+        # Remove o bloco e reinsere no ponto ideal
+        cols = [c for c in d.columns if c not in block]
+
+        # Insere o bloco no ponto de decisao: logo apos Perdidas (diagnostico), antes de campos auxiliares
+        anchor = None
+        for a in ["Perdidas_Class", "Perdidas_Orc", "ROAS_Real", "ROAS_Objetivo"]:
+            if a in cols:
+                anchor = a
+                break
+
+        if anchor is None:
+            return d[cols + block]
+
+        idx = cols.index(anchor) + 1
+        cols = cols[:idx] + block + cols[idx:]
+        return d[cols]
+
+    for c in [
+        "Receita","Investimento","Vendas","Cliques","Impressões","ROAS","CVR",
+        "Perdidas_Orc","Perdidas_Class","ACOS Objetivo","Orçamento"
+    ]:
+        if c in df.columns:
+            df[c] = ml._coerce_series_numeric_ptbr(df[c])
+
+    df["ROAS_Real"] = df.apply(lambda r: ml._safe_div(r.get("Receita", 0), r.get("Investimento", 0)), axis=1)
+    df["ACOS_Real"] = df.apply(lambda r: ml._safe_div(r.get("Investimento", 0), r.get("Receita", 0)), axis=1)
+
+    if "ACOS Objetivo" in df.columns:
+        df["ACOS_Objetivo_N"] = df["ACOS Objetivo"].copy()
+        df.loc[df["ACOS_Objetivo_N"] > 1.5, "ACOS_Objetivo_N"] = df.loc[
+            df["ACOS_Objetivo_N"] > 1.5, "ACOS_Objetivo_N"
+        ] / 100.0
+    else:
+        df["ACOS_Objetivo_N"] = pd.NA
+
+    def _roas_obj(acos_obj_n):
+        try:
+            if pd.notna(acos_obj_n) and float(acos_obj_n) > 0:
+                return 1.0 / float(acos_obj_n)
+        except Exception:
+            pass
+        return pd.NA
+
+    df["ROAS_Objetivo"] = df["ACOS_Objetivo_N"].map(_roas_obj)
+
+    total_receita = float(pd.to_numeric(df.get("Receita"), errors="coerce").fillna(0).sum())
+    receita_relevante = max(500.0, total_receita * 0.05)
+
+    df = df.sort_values("Receita", ascending=False).reset_index(drop=True)
+    df["Receita"] = pd.to_numeric(df.get("Receita"), errors="coerce").fillna(0)
+    df["CPI_Share"] = df["Receita"] / total_receita if total_receita else 0.0
+    df["CPI_Cum"] = df["CPI_Share"].cumsum()
+    df["CPI_80"] = df["CPI_Cum"] <= 0.80
+
+    # Confianca de dado (nao muda o calculo, apenas blinda recomendacao)
+    def _confidence(row):
+        invest = float(row.get("Investimento", 0) or 0)
+        clicks = float(row.get("Cliques", 0) or 0)
+        sales = float(row.get("Vendas", 0) or 0)
+        if (invest >= 300.0) or (clicks >= 200) or (sales >= 5):
+            return "ALTA"
+        if (invest >= 100.0) or (clicks >= 80) or (sales >= 2):
+            return "MEDIA"
+        return "BAIXA"
+
+    df["Confianca_Dado"] = df.apply(_confidence, axis=1)
+
+    def _impacto_estimado(row):
+        receita = float(row.get("Receita", 0) or 0)
+        lost_b = float(row.get("Perdidas_Orc", 0) or 0)
+        if lost_b <= 0:
+            return 0.0
+        return receita * (lost_b / 100.0) * float(impacto_factor)
+
+    df["Impacto_Estimado_R$"] = df.apply(_impacto_estimado, axis=1)
+
+    def classify(row):
+        roas = float(row.get("ROAS_Real", 0) or 0)
+        lost_b = float(row.get("Perdidas_Orc", 0) or 0)
+        lost_r = float(row.get("Perdidas_Class", 0) or 0)
+        receita = float(row.get("Receita", 0) or 0)
+        acos_real = float(row.get("ACOS_Real", 0) or 0)
+        roas_obj = row.get("ROAS_Objetivo", pd.NA)
+        invest = float(row.get("Investimento", 0) or 0)
+        clicks = int(float(row.get("Cliques", 0) or 0))
+        sales = int(float(row.get("Vendas", 0) or 0))
+
+        if (roas >= roas_mina) and (lost_b >= lost_budget_mina):
+            return "ESCALA_ORCAMENTO"
+
+        # Competitividade (Rank) com trava de elasticidade
+        if (receita >= receita_relevante) and (lost_r >= lost_rank_gigante):
+            volume_ok = (invest >= comp_invest_min) and ((clicks >= comp_clicks_min) or (sales >= comp_sales_min))
+            if volume_ok and pd.notna(roas_obj) and float(roas_obj) > 0:
+                # Se estiver hiper eficiente vs objetivo, manter estavel
+                if roas > (float(roas_obj) * float(hiper_roas_mult)):
+                    return "ESTAVEL"
+                return "COMPETITIVIDADE"
+
+        hem = (roas > 0 and roas < roas_hemorragia)
+        acos_obj_n = row.get("ACOS_Objetivo_N", pd.NA)
+        if pd.notna(acos_obj_n) and acos_obj_n and float(acos_obj_n) > 0:
+            if acos_real > (float(acos_obj_n) * (1.0 + acos_over_pct)):
+                hem = True
+        if hem:
+            return "HEMORRAGIA"
+
+        return "ESTAVEL"
+
+    df["Quadrante"] = df.apply(classify, axis=1)
+
+    def motivo(row):
+        q = row.get("Quadrante")
+        if q == "ESCALA_ORCAMENTO":
+            return "ROAS forte com perda por orcamento alta"
+        if q == "COMPETITIVIDADE":
+            return "Receita relevante com perda por classificacao alta e ROAS perto do objetivo"
+        if q == "HEMORRAGIA":
+            acos_obj_n = row.get("ACOS_Objetivo_N", pd.NA)
+            acos_real = float(row.get("ACOS_Real", 0) or 0)
+            if pd.notna(acos_obj_n) and float(acos_obj_n) > 0 and acos_real > (float(acos_obj_n) * (1.0 + acos_over_pct)):
+                return "ACOS real acima do objetivo"
+            return "ROAS abaixo do minimo"
+        return "Sem sinal claro de escala ou risco"
+
+    df["Motivo"] = df.apply(motivo, axis=1)
+
+    def action(row):
+        q = row.get("Quadrante")
+        conf = row.get("Confianca_Dado")
+
+        # Baixa confianca, nunca empurra ajuste. Mantem como lista de atencao.
+        if conf == "BAIXA":
+            return f"{ml.EMOJI_BLUE} Manter"
+
+        if q == "ESCALA_ORCAMENTO":
+            return f"{ml.EMOJI_GREEN} Aumentar orcamento"
+        if q == "COMPETITIVIDADE":
+            return f"{ml.EMOJI_YELLOW} Baixar ROAS objetivo"
+        if q == "HEMORRAGIA":
+            return f"{ml.EMOJI_RED} Revisar/pausar"
+        return f"{ml.EMOJI_BLUE} Manter"
+
+    df["Acao_Recomendada"] = df.apply(action, axis=1)
+
+    # Se confianca baixa, registra motivo claro
+    df.loc[df["Confianca_Dado"] == "BAIXA", "Motivo"] = "Baixo volume, manter coletando dado"
+
+    # Garante ordem de leitura em todas as visoes que usam camp_strat
+    df = _reorder_action_block(df)
+    return df
+
+
+# -------------------------
+# Painel por anuncio (apply por metrica e por anuncio)
+# -------------------------
+def build_ads_panel_linha(
+    pat: pd.DataFrame,
+    camp_strat: pd.DataFrame | None = None,
+    ads_min_imp: int = 500,
+    ads_min_clk: int = 10,
+    ads_ctr_min_abs: float = 0.60,
+    ads_cvr_min: float = 1.00,
+    ads_pause_invest_min: float = 20.0,
+    share_prejudicial_min: float = 0.25,
+    roas_bad_mult: float = 0.70,
+) -> pd.DataFrame:
+    """Painel tático por anúncio (patrocinados).
+
+    Ideia:
+    - Campanha continua sendo unidade de controle.
+    - Anúncio vira unidade de diagnóstico e refinamento da ação.
+    - Sem CPC como alavanca (não é controlável no ML).
+    """
+
+    # Normalização de limiares: aceita valores em fração (0.022) ou em percentual (2.2)
+    # Internamente, CTR_pct e CVR_pct estão em percentual (0 a 100).
+    if 0 < ads_ctr_min_abs < 0.05:
+        ads_ctr_min_abs *= 100
+    if 0 < ads_cvr_min < 0.05:
+        ads_cvr_min *= 100
+
+    if pat is None or pat.empty:
+        return pd.DataFrame()
+
+    df = ml.restore_frame(pat).copy()
+
+    # cria Codigo_MLB e Titulo se existirem colunas conhecidas
+    if "Codigo_MLB" not in df.columns:
+        df["Codigo_MLB"] = "MLB" + df["ID"].astype(str)
+
+    if "Título do anúncio patrocinado" in df.columns and "Titulo" not in df.columns:
+        df["Titulo"] = df["Título do anúncio patrocinado"]
+    elif "Titulo" not in df.columns:
+        df["Titulo"] = pd.NA
+
+    # camp
+    if "Campanha" not in df.columns:
+        cand = None
+        for c in df.columns:
+            ck = ml._norm_col_key(c)
+            if "campanha" in ck:
+                cand = c
+                break
+        df["Campanha"] = df[cand] if cand else pd.NA
+
+    if "Status" not in df.columns:
+        df["Status"] = pd.NA
+
+    # agregação (tolerante a nomes com \n)
+    agg_map = {
+        "Impressões": "sum",
+        "Cliques": "sum",
+        "Receita\n(Moeda local)": "sum",
+        "Investimento\n(Moeda local)": "sum",
+        "Vendas por publicidade\n(Diretas + Indiretas)": "sum",
+    }
+
+    agg_dict = {}
+    for c in ["Campanha", "Codigo_MLB", "Titulo", "Status"]:
+        if c in df.columns:
+            agg_dict[c] = "first"
+    for c, fn in agg_map.items():
+        if c in df.columns:
+            agg_dict[c] = fn
+
+    out = df.groupby(["ID"], as_index=False).agg(agg_dict)
+
+    out = out.rename(columns={
+        "Impressões": "Impressoes",
+        "Receita\n(Moeda local)": "Receita",
+        "Investimento\n(Moeda local)": "Investimento",
+        "Vendas por publicidade\n(Diretas + Indiretas)": "Vendas",
+    })
+
+    for c in ["Impressoes", "Cliques", "Receita", "Investimento", "Vendas"]:
+        if c not in out.columns:
+            out[c] = 0.0
+        out[c] = pd.to_numeric(out[c], errors="coerce").fillna(0.0)
+
+    # métricas por anúncio
+    out["CTR_pct"] = out.apply(lambda r: (r["Cliques"] / r["Impressoes"] * 100) if r["Impressoes"] else 0.0, axis=1)
+    out["CVR_pct"] = out.apply(lambda r: (r["Vendas"] / r["Cliques"] * 100) if r["Cliques"] else 0.0, axis=1)
+    out["ROAS_Real"] = out.apply(lambda r: (r["Receita"] / r["Investimento"]) if r["Investimento"] else 0.0, axis=1)
+    out["ACOS_Real_pct"] = out.apply(lambda r: (r["Investimento"] / r["Receita"] * 100) if r["Receita"] else 0.0, axis=1)
+
+    # métricas por campanha a partir do próprio patrocinado
+    camp_base = out.groupby("Campanha", as_index=False).agg(
+        Invest_Campanha=("Investimento", "sum"),
+        Receita_Campanha=("Receita", "sum"),
+        Cliques_Campanha=("Cliques", "sum"),
+        Vendas_Campanha=("Vendas", "sum"),
+    )
+    camp_base["ROAS_Campanha"] = camp_base.apply(
+        lambda r: (r["Receita_Campanha"] / r["Invest_Campanha"]) if r["Invest_Campanha"] else 0.0, axis=1
+    )
+    camp_base["CVR_Campanha_pct"] = camp_base.apply(
+        lambda r: (r["Vendas_Campanha"] / r["Cliques_Campanha"] * 100) if r["Cliques_Campanha"] else 0.0, axis=1
+    )
+
+    out = out.merge(camp_base, on="Campanha", how="left")
+    out["Pct_Invest_Campanha"] = out.apply(
+        lambda r: (r["Investimento"] / r["Invest_Campanha"]) if r.get("Invest_Campanha") else 0.0, axis=1
+    ) * 100.0
+
+    # puxa ROAS objetivo da campanha (se disponível)
+    out["ROAS_Objetivo_Campanha"] = pd.NA
+    out["Quadrante_Campanha"] = pd.NA
+    out["Acao_Campanha"] = pd.NA
+
+    if camp_strat is not None and not camp_strat.empty:
+        cols_need = [c for c in ["Nome", "ROAS_Objetivo", "Quadrante", "Acao_Recomendada"] if c in camp_strat.columns]
+        if "Nome" in cols_need:
+            camp_pick = camp_strat[cols_need].copy()
+            camp_pick = camp_pick.rename(columns={
+                "Nome": "Campanha",
+                "ROAS_Objetivo": "ROAS_Objetivo_Campanha",
+                "Quadrante": "Quadrante_Campanha",
+                "Acao_Recomendada": "Acao_Campanha",
+            })
+            out = out.merge(camp_pick, on="Campanha", how="left")
+
+    # fallback do objetivo: se não tem objetivo, usa o ROAS real da campanha como referência
+    def _roas_ref(r):
+        ro = r.get("ROAS_Objetivo_Campanha")
+        try:
+            if pd.notna(ro) and float(ro) > 0:
+                return float(ro)
+        except Exception:
+            pass
+        return float(r.get("ROAS_Campanha") or 0.0)
+
+    out["ROAS_Ref"] = out.apply(_roas_ref, axis=1)
+
+    def _classificar(r):
+        imp = float(r.get("Impressoes") or 0)
+        clk = float(r.get("Cliques") or 0)
+        inv = float(r.get("Investimento") or 0)
+        rec = float(r.get("Receita") or 0)
+        roas = float(r.get("ROAS_Real") or 0)
+        ctr = float(r.get("CTR_pct") or 0)
+        cvr = float(r.get("CVR_pct") or 0)
+        cvr_camp = float(r.get("CVR_Campanha_pct") or 0)
+        share = float(r.get("Pct_Invest_Campanha") or 0)
+        roas_ref = float(r.get("ROAS_Ref") or 0)
+
+        if imp < ads_min_imp or clk < ads_min_clk:
+            return "Neutro", "Manter", "BAIXA", "Pouco volume, coletar mais dados"
+
+        if inv >= ads_pause_invest_min and rec <= 0:
+            return "Prejudicial", "Pausar anúncio", "ALTA", "Gasto sem retorno"
+
+        if inv >= ads_pause_invest_min and roas_ref > 0 and roas < (roas_ref * roas_bad_mult):
+            conf = "ALTA" if share >= (share_prejudicial_min * 100) else "MEDIA"
+            return "Prejudicial", "Pausar anúncio", conf, "ROAS abaixo do alvo da campanha"
+
+        if ctr < ads_ctr_min_abs:
+            return "Neutro", "Revisar Fotos e Clips", "MEDIA", "Baixa atratividade, revisar Fotos e Clips"
+
+        if cvr < ads_cvr_min:
+            if cvr_camp > 0 and cvr < (cvr_camp * 0.75):
+                if ctr < (ads_ctr_min_abs * 2):
+                    return "Neutro", "Otimizar Palavras-chave", "MEDIA", "Tráfego desalinhado, otimizar palavras-chave"
+                return "Neutro", "Revisar Oferta", "MEDIA", "Oferta pouco competitiva ou possível movimento de concorrência"
+            return "Neutro", "Manter", "MEDIA", "Conversão baixa no contexto da campanha, monitorar"
+
+        if roas_ref > 0 and roas >= roas_ref and cvr >= max(ads_cvr_min, cvr_camp):
+            return "Vencedor", "Manter", "ALTA", "Acima do alvo da campanha, preservar"
+
+        return "Neutro", "Manter", "MEDIA", "Dentro do esperado, monitorar"
+
+    tmp = out.apply(lambda r: pd.Series(_classificar(r), index=["Status_Anuncio", "Acao_Anuncio", "Confianca_Anuncio", "Motivo_Anuncio"]), axis=1)
+    out = pd.concat([out, tmp], axis=1)
+
+    def _acao_cruzada(r):
+        quad = str(r.get("Quadrante_Campanha") or "")
+        status = str(r.get("Status_Anuncio") or "")
+        acao = str(r.get("Acao_Anuncio") or "")
+
+        if ("ESCALA" in quad) and (status == "Prejudicial" or acao == "Pausar anúncio"):
+            return "Pausar anúncio, preservar campanha para escala"
+
+        if (("HEMORRAGIA" in quad) or ("PAUSAR" in quad)) and (status == "Vencedor"):
+            return "Preservar vencedor, revisar fracos antes de pausar campanha"
+
+        return ""
+
+    out["Refino_Campanha"] = out.apply(_acao_cruzada, axis=1)
+
+    out = out.sort_values(["Status_Anuncio", "Investimento"], ascending=[True, False]).reset_index(drop=True)
+    return out
+
+
+def campanha_por_merge(sem: pd.DataFrame, camp_strat) -> pd.DataFrame:
+    """Referencia: groupby por nome da campanha + merge de volta + merge do camp_strat (o _ads_panel_base anterior)."""
+    out = sem
+    camp_base = out.groupby("Campanha", as_index=False).agg(
+        Invest_Campanha=("Investimento", "sum"),
+        Receita_Campanha=("Receita", "sum"),
+        Cliques_Campanha=("Cliques", "sum"),
+        Vendas_Campanha=("Vendas", "sum"),
+    )
+    camp_base["ROAS_Campanha"] = ml._safe_div_cols(ml._num_col(camp_base, "Receita_Campanha"), ml._num_col(camp_base, "Invest_Campanha"))
+    camp_base["CVR_Campanha_pct"] = ml._safe_div_cols(ml._num_col(camp_base, "Vendas_Campanha"), ml._num_col(camp_base, "Cliques_Campanha")) * 100
+    out = out.merge(camp_base, on="Campanha", how="left")
+    out["Pct_Invest_Campanha"] = ml._safe_div_cols(ml._num_col(out, "Investimento"), ml._num_col(out, "Invest_Campanha")) * 100.0
+    for c in ["ROAS_Objetivo_Campanha", "Quadrante_Campanha", "Acao_Campanha"]:
+        out[c] = pd.NA
+    if camp_strat is not None and not camp_strat.empty:
+        cols_need = [c for c in ["Nome", "ROAS_Objetivo", "Quadrante", "Acao_Recomendada"] if c in camp_strat.columns]
+        if "Nome" in cols_need:
+            camp_pick = camp_strat[cols_need].rename(columns={
+                "Nome": "Campanha",
+                "ROAS_Objetivo": "ROAS_Objetivo_Campanha",
+                "Quadrante": "Quadrante_Campanha",
+                "Acao_Recomendada": "Acao_Campanha",
+            })
+            out = out.merge(camp_pick, on="Campanha", how="left")
+    return out
+
+
+# -------------------------
+# Estoque por chave de texto
+# -------------------------
+def enrich_with_stock_merge(df: pd.DataFrame, stock_df: pd.DataFrame) -> pd.DataFrame:
+    """Referencia: app.enrich_with_stock anterior (chaves por regex linha a linha + merge + map)."""
+    out = df.copy()
+    if "Codigo_MLB" in out.columns:
+        out["MLB_key"] = out["Codigo_MLB"].map(ml._digits_only)
+    else:
+        out["MLB_key"] = out["ID"].map(ml._digits_only)
+    out["SKU_key"] = out["SKU"].map(ml._norm_sku) if "SKU" in out.columns else ""
+    out = out.merge(stock_df[["MLB_key", "Estoque"]].drop_duplicates("MLB_key"), how="left", on="MLB_key", suffixes=("", "_stk"))
+    miss = out["Estoque"].isna()
+    if miss.any():
+        sku_map = (
+            stock_df[stock_df["SKU_key"].astype(str).str.len() > 0]
+            .drop_duplicates(subset=["SKU_key"])
+            .set_index("SKU_key")["Estoque"]
+        )
+        out.loc[miss, "Estoque"] = out.loc[miss, "SKU_key"].map(sku_map)
+    out["Estoque"] = pd.to_numeric(out["Estoque"], errors="coerce")
+    return out
+
+
+# -------------------------
+# Recomendacoes da Shopee (loop por linha)
+# -------------------------
+def gerar_recomendacoes_shopee_linha(df, kpis):
+    recomendacoes = {"ativar_protecao": [], "otimizar_roas": [], "escalar_gmv": [], "pausar_revisar": []}
+    for idx, row in df.iterrows():
+        nome = row.get('Nome do Anúncio', f'Campanha {idx+1}')
+        roas = row.get('ROAS', 0)
+        gmv = row.get('GMV', 0)
+        despesas = row.get('Despesas', 0)
+        conversoes = row.get('Conversões', 0)
+        if roas > 0 and roas < 2.5 and despesas > 50:
+            recomendacoes["ativar_protecao"].append({
+                "campanha": nome, "roas_atual": roas, "despesas": despesas,
+                "motivo": "ROAS abaixo da meta com investimento significativo"})
+        if roas > 0 and roas < 3.0 and conversoes >= 5:
+            recomendacoes["otimizar_roas"].append({
+                "campanha": nome, "roas_atual": roas, "conversoes": conversoes,
+                "motivo": "ROAS baixo mas com volume de conversões"})
+        if roas >= 4.0 and gmv > 0:
+            recomendacoes["escalar_gmv"].append({
+                "campanha": nome, "roas_atual": roas, "gmv": gmv,
+                "motivo": "ROAS forte - oportunidade de escalar"})
+        if despesas > 100 and (roas < 1.5 or conversoes == 0):
+            recomendacoes["pausar_revisar"].append({
+                "campanha": nome, "roas_atual": roas, "despesas": despesas, "conversoes": conversoes,
+                "motivo": "Alto investimento com retorno insatisfatório"})
+    return recomendacoes
+
+
+# -------------------------
+# Limiares com as 12 saidas calculadas na hora
+# -------------------------
+def apply_thresholds_tupla(
+    base, enter_visitas_min=50, enter_conv_min=0.05, pause_invest_min=100.0, pause_cvr_max=0.01, **kwargs
+):
+    """Referencia: apply_thresholds anterior (tudo calculado na hora, um filtro booleano por subconjunto)."""
+    kpis, camp_strat = dict(base["kpis"]), base["camp_strat"]
+
+    pause = camp_strat[
+        (camp_strat["Investimento"] > pause_invest_min) &
+        ((camp_strat["Vendas"] <= 0) | (camp_strat["CVR"] < pause_cvr_max) | (camp_strat["Quadrante"] == "HEMORRAGIA"))
+    ].copy()
+    pause["Ação"] = "PAUSAR/REVISAR"
+    pause = pause.sort_values("Investimento", ascending=False)
+
+    org_fora_ads = base["org_fora_ads"]
+    enter = org_fora_ads[
+        (org_fora_ads["Visitas"] >= enter_visitas_min) &
+        (org_fora_ads["Conv_Visitas_Vendas"] > enter_conv_min)
+    ].copy()
+    enter["Codigo_MLB"] = "MLB" + enter["ID"].astype(str)
+    enter["Ação"] = "INSERIR EM ADS"
+    enter = enter.sort_values(["Conv_Visitas_Vendas","Visitas"], ascending=[False, False])
+    enter = enter[["ID","Codigo_MLB","Titulo","Conv_Visitas_Vendas","Visitas","Qtd_Vendas","Vendas_Brutas","Ação"]]
+
+    scale = camp_strat[camp_strat["Quadrante"] == "ESCALA_ORCAMENTO"].copy()
+    scale["Ação"] = "AUMENTAR ORCAMENTO"
+    if "Impacto_Estimado_R$" in scale.columns:
+        scale = scale.sort_values(["Impacto_Estimado_R$","Perdidas_Orc"], ascending=[False, False])
+    elif "Perdidas_Orc" in scale.columns:
+        scale = scale.sort_values("Perdidas_Orc", ascending=False)
+
+    acos = camp_strat[camp_strat["Quadrante"] == "COMPETITIVIDADE"].copy()
+    acos["Ação"] = "BAIXAR ROAS OBJETIVO"
+    if "Perdidas_Class" in acos.columns:
+        acos = acos.sort_values(["Perdidas_Class","Receita"], ascending=[False, False])
+
+    ads_panel = ml.classify_ads_panel(
+        base["ads_base"],
+        ads_min_imp=int(kwargs.get("ads_min_imp", 500)),
+        ads_min_clk=int(kwargs.get("ads_min_clk", 10)),
+        ads_ctr_min_abs=float(kwargs.get("ads_ctr_min_abs", 0.60)),
+        ads_cvr_min=float(kwargs.get("ads_cvr_min", 1.00)),
+        ads_pause_invest_min=float(kwargs.get("ads_pause_invest_min", 20.0)),
+        regras=kwargs.get("regras", base["regras"]),
+    )
+
+    ads_pausar = ads_vencedores = ads_otim_fotos = ads_otim_keywords = ads_otim_oferta = pd.DataFrame()
+    if ads_panel is not None and not ads_panel.empty:
+        if "Acao_Anuncio" in ads_panel.columns:
+            ads_pausar = ads_panel[ads_panel["Acao_Anuncio"] == "Pausar anúncio"].copy()
+            ads_otim_fotos = ads_panel[ads_panel["Acao_Anuncio"] == "Revisar Fotos e Clips"].copy()
+            ads_otim_keywords = ads_panel[ads_panel["Acao_Anuncio"] == "Otimizar Palavras-chave"].copy()
+            ads_otim_oferta = ads_panel[ads_panel["Acao_Anuncio"] == "Revisar Oferta"].copy()
+        if "Status_Anuncio" in ads_panel.columns:
+            ads_vencedores = ads_panel[ads_panel["Status_Anuncio"] == "Vencedor"].copy()
+
+    return kpis, pause, enter, scale, acos, camp_strat.copy(), ads_panel, ads_pausar, ads_vencedores, ads_otim_fotos, ads_otim_keywords, ads_otim_oferta
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""Painel por anuncio: build_ads_panel vetorizado e consolidado por campanha."""
+
+import pandas as pd
+import pytest
+
+import ml_report as ml
+from tests import legacy
+from tests.fixtures import make_ads_camp_strat, make_ads_frame, sem_campanha
+
+N = 5_000
+
+# dados da campanha que o merge por nome de antes deixava em _x (vazias) / _y
+DESTINOS = ["ROAS_Objetivo_Campanha", "Quadrante_Campanha", "Acao_Campanha"]
+# colunas que dependem do ROAS_Ref ou do quadrante da campanha
+DEPENDENTES = ["ROAS_Ref", "Status_Anuncio", "Acao_Anuncio", "Confianca_Anuncio", "Motivo_Anuncio", "Refino_Campanha"]
+
+
+def _campanha_corrigida(sem: pd.DataFrame, camp_strat) -> pd.DataFrame:
+    """Referencia do consolidado atual: o merge de antes com os valores de _y nas colunas vazias (_x)."""
+    out = legacy.campanha_por_merge(sem, camp_strat)
+    for c in DESTINOS:
+        if f"{c}_y" in out.columns:
+            out = out.rename(columns={f"{c}_x": c})
+            out[c] = out.pop(f"{c}_y")
+    return out
+
+
+def _assert_painel_corrigido(novo: pd.DataFrame, antigo: pd.DataFrame):
+    """
+    Painel atual x painel linha a linha de antes (merge com _x/_y): so mudam as saidas que
+    dependem dos dados da campanha, e do jeito esperado.
+    """
+    novo = novo.sort_values("ID", ignore_index=True)
+    antigo = antigo.sort_values("ID", ignore_index=True)
+    comuns = [c for c in novo.columns if c not in DESTINOS + DEPENDENTES]
+    pd.testing.assert_frame_equal(novo[comuns], antigo[comuns], check_exact=True, obj="painel")
+    assert not any(c.endswith(("_x", "_y")) for c in novo.columns)
+    for c in DESTINOS:
+        if f"{c}_y" in antigo.columns:
+            pd.testing.assert_series_equal(novo[c], antigo[f"{c}_y"], check_names=False, obj=c)
+    # ROAS_Ref: objetivo da campanha quando > 0, senao o ROAS real dela
+    obj = pd.to_numeric(novo.get("ROAS_Objetivo_Campanha"), errors="coerce")
+    esperado = obj.where(obj > 0, novo["ROAS_Campanha"]) if obj is not None else novo["ROAS_Campanha"]
+    pd.testing.assert_series_equal(novo["ROAS_Ref"], esperado, check_names=False, check_dtype=False, obj="ROAS_Ref")
+    # diagnostico do anuncio so muda onde o ROAS_Ref mudou
+    ref_mudou = novo["ROAS_Ref"].ne(antigo["ROAS_Ref"]) & novo["ROAS_Ref"].notna()
+    for c in ["Status_Anuncio", "Acao_Anuncio", "Confianca_Anuncio", "Motivo_Anuncio"]:
+        assert not (novo[c].ne(antigo[c]) & ~ref_mudou).any(), c
+    # refino pelo quadrante da campanha
+    quad = novo["Quadrante_Campanha"].fillna("").astype(str)
+    pausar = (novo["Status_Anuncio"] == "Prejudicial") | (novo["Acao_Anuncio"] == "Pausar anúncio")
+    refino = pd.Series("", index=novo.index, dtype=object)
+    refino[(quad.str.contains("HEMORRAGIA") | quad.str.contains("PAUSAR")) & (novo["Status_Anuncio"] == "Vencedor")] = (
+        "Preservar vencedor, revisar fracos antes de pausar campanha")
+    refino[quad.str.contains("ESCALA") & pausar] = "Pausar anúncio, preservar campanha para escala"
+    assert novo["Refino_Campanha"].tolist() == refino.tolist()
+
+
+@pytest.fixture(scope="module")
+def camp_strats():
+    camp_strat = make_ads_camp_strat()
+    return {
+        "completo": camp_strat,
+        "so_quadrante": camp_strat[["Nome", "Quadrante"]],
+        "nome_repetido": pd.concat([camp_strat, camp_strat.head(5).assign(Quadrante="HEMORRAGIA")], ignore_index=True),
+        "sem": None,
+    }
+
+
+def _sem_nome(n: int, seed: int) -> pd.DataFrame:
+    return make_ads_frame(n, seed=seed).assign(Campanha=pd.Series([None] * n, dtype="str"))
+
+
+def _nome_vazio(n: int, seed: int) -> pd.DataFrame:
+    pat = make_ads_frame(n, seed=seed)
+    pat["Campanha"] = pat["Campanha"].where(pat.index % 7 != 0, "")
+    return pat
+
+
+@pytest.mark.parametrize("pat_kw, camp, kw", [
+    ({"n": N, "seed": 0}, "completo", {}),
+    ({"n": N, "seed": 1}, "completo", {}),
+    ({"n": N, "seed": 2}, "completo", {}),
+    ({"n": N, "seed": 5}, "completo",
+     {"ads_ctr_min_abs": 0.01, "ads_cvr_min": 2.0, "ads_min_imp": 0, "ads_min_clk": 0, "roas_bad_mult": 1.0}),
+    ({"n": N, "seed": 6}, "so_quadrante", {}),
+    ({"n": 50, "seed": 7}, "completo", {}),
+    # campanhas com poucos anuncios: participacao alta no investimento (confianca ALTA)
+    ({"n": 3_000, "n_campanhas": 1_500, "seed": 8}, "completo", {}),
+])
+def test_ads_panel_equivalence(camp_strats, pat_kw, camp, kw):
+    pat = make_ads_frame(**pat_kw)
+    novo = ml.build_ads_panel(pat, camp_strats[camp], **kw)
+    antigo = legacy.build_ads_panel_linha(pat, camp_strats[camp], **kw)
+    _assert_painel_corrigido(novo, antigo)
+
+
+@pytest.mark.parametrize("make_pat, camp", [
+    (lambda: make_ads_frame(N, seed=1), "completo"),
+    (lambda: make_ads_frame(N, seed=2), "so_quadrante"),
+    (lambda: make_ads_frame(N, seed=3), "nome_repetido"),
+    (lambda: make_ads_frame(N, seed=4), "sem"),
+    (lambda: make_ads_frame(3_000, n_campanhas=1_500, seed=8), "completo"),
+    (lambda: _sem_nome(200, seed=9), "completo"),
+    (lambda: _nome_vazio(2_000, seed=10), "completo"),
+], ids=["completo", "so_quadrante", "nome_repetido", "sem_camp_strat", "poucos_anuncios", "sem_campanha", "nome_vazio"])
+def test_campaign_rollup(camp_strats, make_pat, camp):
+    sem = sem_campanha(make_pat())
+    cs = camp_strats[camp]
+    pd.testing.assert_frame_equal(ml._campaign_rollup(sem, cs), _campanha_corrigida(sem, cs), check_exact=True, obj="consolidado")
+
+
+def test_objetivo_e_quadrante_da_campanha_chegam_ao_anuncio(camp_strats):
+    # o objetivo da campanha passa a ser o ROAS de referencia e o quadrante dispara o refino
+    pat = make_ads_frame(N, seed=0)
+    novo = ml.build_ads_panel(pat, camp_strats["completo"])
+    antigo = legacy.build_ads_panel_linha(pat, camp_strats["completo"])
+    assert (novo["ROAS_Ref"].ne(antigo["ROAS_Ref"]) & novo["ROAS_Ref"].notna()).any()
+    assert (novo["Refino_Campanha"] != "").any() and (antigo["Refino_Campanha"] == "").all()
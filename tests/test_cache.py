@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""Cache em disco dos loaders: o hit devolve o mesmo DataFrame da leitura."""
+
+import pandas as pd
+import pytest
+
+import ml_report as ml
+import report_cache
+from tests.fixtures import make_campanha_xlsx, make_organico_xlsx, make_patrocinados_xlsx
+
+
+@pytest.mark.parametrize("make, loader", [
+    (lambda: make_organico_xlsx(2_000), ml.load_organico),
+    (lambda: make_patrocinados_xlsx(2_000), ml.load_patrocinados),
+    (lambda: make_campanha_xlsx(40), ml.load_campanhas_consolidado),
+], ids=["organico", "patrocinados", "campanha"])
+def test_cache_round_trip(tmp_path, make, loader):
+    cache = report_cache.ReportCache(cache_dir=str(tmp_path), version=ml.LOADER_VERSION)
+    arq = make()
+    novo = cache.load(loader, arq)
+    hit = cache.load(loader, arq)
+    assert cache.summary()["arquivos"] == 1
+    novo.attrs, hit.attrs = {}, {}
+    pd.testing.assert_frame_equal(hit, novo, check_exact=True, obj=loader.__name__)
+
+
+def _loader_misturado(file):
+    # coluna object com int e texto: o Parquet devolveria tudo como texto
+    return pd.DataFrame({"ID": pd.Series([1, "MLB2", None], dtype=object), "Valor": [1.0, 2.0, 3.0]})
+
+
+def test_cache_ignora_coluna_que_nao_volta_igual(tmp_path):
+    cache = report_cache.ReportCache(cache_dir=str(tmp_path))
+    df = cache.load(_loader_misturado, b"arquivo")
+    assert df["ID"].tolist() == [1, "MLB2", None]
+    assert cache.summary()["arquivos"] == 0
+    assert cache.stats["ignorados"] == 1
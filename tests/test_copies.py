@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+"""Copy-on-write sem copias defensivas (report_copies)."""
+
+import pandas as pd
+
+import ml_report as ml
+import report_copies
+from tests.fixtures import make_campanha_xlsx, make_organico_xlsx, make_patrocinados_xlsx, pipeline_completo
+
+
+def test_copy_free():
+    n = 4_000
+    org = ml.load_organico(make_organico_xlsx(n))
+    pat = ml.load_patrocinados(make_patrocinados_xlsx(n))
+    camp_agg = ml.build_campaign_agg(ml.load_campanhas_consolidado(make_campanha_xlsx(120)), modo="consolidado")
+    entradas = {"org": org, "pat": pat, "camp_agg": camp_agg}
+    antes = {k: v.copy() for k, v in entradas.items()}
+    original = pd.DataFrame.copy
+
+    with report_copies.track_copies():
+        saidas = pipeline_completo(org, pat, camp_agg)
+    assert pd.DataFrame.copy is original
+    # sem copias defensivas as entradas continuam intactas (o copy-on-write protege)
+    for k, v in entradas.items():
+        pd.testing.assert_frame_equal(v, antes[k], check_exact=True, obj=f"entrada {k}")
+    # escrever numa saida nao chega nas outras tabelas nem na entrada
+    tabelas = ml.build_tables(org=org, camp_agg=camp_agg, pat=pat)
+    tabelas.camp_strat["Quadrante"] = "HEMORRAGIA"
+    tabelas.ads_panel["Acao_Anuncio"] = "Pausar anúncio"
+    pd.testing.assert_frame_equal(tabelas.pause, saidas[1], check_exact=True, obj="pause depois da escrita")
+    pd.testing.assert_frame_equal(tabelas.ads_pausar, saidas[7], check_exact=True, obj="ads_pausar depois da escrita")
+    pd.testing.assert_frame_equal(camp_agg, antes["camp_agg"], check_exact=True, obj="camp_agg depois da escrita")
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Tipos compactos apos a leitura: restauracao exata e mesmas saidas do build_tables."""
+
+import ml_report as ml
+import report_dtypes
+from tests.fixtures import (
+    assert_same_outputs,
+    build_tables_from,
+    make_campanha_xlsx,
+    make_organico_xlsx,
+    make_patrocinados_xlsx,
+)
+
+
+def test_compact_equivalence():
+    n = 3_000
+    frames = {
+        "vendas": ml.load_organico(make_organico_xlsx(n)),
+        "patrocinados": ml.load_patrocinados(make_patrocinados_xlsx(n)),
+        "campanha": ml.load_campanhas_consolidado(make_campanha_xlsx(80)),
+    }
+    compactos, _ = report_dtypes.compact_frames(frames)
+    for k, df in frames.items():
+        assert report_dtypes.restore_frame(compactos[k]).equals(df), k
+    assert_same_outputs(
+        build_tables_from(compactos["vendas"], compactos["patrocinados"], compactos["campanha"]),
+        build_tables_from(frames["vendas"], frames["patrocinados"], frames["campanha"]),
+        "tipos compactos",
+    )
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Indice de entidades (report_entities): juncoes por codigo inteiro iguais as juncoes por texto."""
+
+from io import BytesIO
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+import ml_report as ml
+import report_entities
+from tests import legacy
+from tests.fixtures import (
+    make_campanha_xlsx,
+    make_estoque_para,
+    make_organico_xlsx,
+    make_painel_com_sku,
+    make_patrocinados_xlsx,
+)
+
+
+@pytest.fixture(scope="module")
+def base():
+    org = ml.load_organico(make_organico_xlsx(2_000))
+    pat = ml.load_patrocinados(make_patrocinados_xlsx(2_000))
+    camp_agg = ml.build_campaign_agg(ml.load_campanhas_consolidado(make_campanha_xlsx(60)), modo="consolidado")
+    return org, pat, ml.prepare_tables(org, camp_agg, pat)
+
+
+@pytest.fixture(scope="module")
+def painel():
+    return make_painel_com_sku(10_000)
+
+
+def test_org_fora_ads(base):
+    org, pat, etapa = base
+    ativos = org[org["Status"].map(ml._is_active_status)]
+    esperado = ativos[~ativos["ID"].astype(str).isin(set(pat["ID"].dropna().astype(str).unique()))]
+    esperado = esperado[[c for c in esperado.columns if c in ml.ORG_ENTER_COLS]]
+    pd.testing.assert_frame_equal(etapa["org_fora_ads"], esperado, check_exact=True, obj="org_fora_ads")
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_enrich_with_stock(painel, seed):
+    entidades = report_entities.build_entity_index(pat=painel, estoque=make_estoque_para(painel))
+    estoque = make_estoque_para(painel, seed)
+    for tabela in (painel, painel.sample(frac=0.3, random_state=seed), painel.drop(columns=["Codigo_MLB"])):
+        pd.testing.assert_frame_equal(
+            app.enrich_with_stock(tabela, estoque, entidades), legacy.enrich_with_stock_merge(tabela, estoque),
+            check_exact=True, obj=f"estoque seed {seed}",
+        )
+
+
+def test_snapshots(base, painel):
+    _, _, etapa = base
+    # snapshot gravado e lido de volta (IDs viram numero no Excel)
+    camp_strat = etapa["camp_strat"]
+    buf = BytesIO()
+    ml.save_snapshot_v2(camp_strat.head(40), painel.sample(frac=0.5, random_state=1), buf)
+    buf.seek(0)
+    camp_snap, anuncio_snap, _ = ml.load_snapshot_v2(buf)
+    snap_ren = anuncio_snap.rename(columns={"Investimento": "Investimento_Snap", "Receita": "Receita_Snap", "ROAS_Real": "ROAS_Real_Snap",
+                                            "Status_Anuncio": "Status_Anuncio_Snap", "Acao_Anuncio": "Acao_Anuncio_Snap"})
+    antigo = painel.assign(ID=painel["ID"].astype(str).str.strip()).merge(
+        snap_ren.assign(ID=snap_ren["ID"].astype(str).str.strip()), on="ID", how="left", suffixes=("_Atual", "_Snap"))
+    novo = ml.compare_snapshots_anuncio(painel, anuncio_snap, etapa["entidades"])
+    pd.testing.assert_frame_equal(novo[antigo.columns.drop("ID")], antigo.drop(columns="ID"), check_exact=True, obj="snapshot anuncio")
+    camp_ren = camp_snap.rename(columns={"Investimento": "Investimento_Snap", "Receita": "Receita_Snap", "ROAS_Real": "ROAS_Real_Snap",
+                                         "Quadrante": "Quadrante_Snap", "Acao_Recomendada": "Acao_Recomendada_Snap"})
+    antigo = camp_strat.merge(camp_ren, on="Nome", how="left", suffixes=("_Atual", "_Snap"))
+    novo = ml.compare_snapshots_campanha(camp_strat, camp_snap, etapa["entidades"])
+    pd.testing.assert_frame_equal(novo[antigo.columns], antigo, check_exact=True, obj="snapshot campanha")
+    antigo = ml.compare_snapshots(camp_strat, camp_snap)
+    pd.testing.assert_frame_equal(ml.compare_snapshots(camp_strat, camp_snap, etapa["entidades"]), antigo, check_exact=True, obj="compare_snapshots")
+
+
+
+def _normalize(valores, tipo):
+    return report_entities.normalize_keys(valores, tipo).tolist()
+
+
+@pytest.mark.parametrize("infer_string", [True, False])
+def test_normalize_keys_nulos_ficam_vazios(infer_string):
+    # infer_string=False: o astype("str") do pandas 2 (NaN vira "nan", None vira "None")
+    valores = pd.Series(["MLB123.0", " sku-1 ", "nan", np.nan, None], dtype=object)
+    with pd.option_context("future.infer_string", infer_string):
+        assert _normalize(valores, "mlb") == ["123", "1", "", "", ""]
+        assert _normalize(valores, "sku") == ["MLB123.0", "SKU-1", "NAN", "", ""]
+        assert _normalize(valores, "sku") == [ml._norm_sku(v) for v in valores]
+        assert _normalize(valores, "campanha") == ["MLB123.0", " sku-1 ", "nan", "", ""]
+        # SKU vazio nao casa com nada, nem com um SKU "NAN" de verdade
+        estoque = pd.DataFrame({"MLB_key": ["1", "2"], "SKU_key": ["NAN", None], "Estoque": [3, 4]})
+        entidades = report_entities.build_entity_index(estoque=estoque)
+        assert entidades.codes("sku", pd.Series([np.nan, "nan"], dtype=object)).tolist() == [-1, 0]
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""Historico diario incremental: igual a releitura do periodo inteiro."""
+
+from io import BytesIO
+
+import pandas as pd
+
+import ml_report as ml
+import report_history
+from tests.fixtures import make_campanha_diario_xlsx
+
+
+def test_history_equivalence(tmp_path):
+    n_campanhas = 40
+    ontem = make_campanha_diario_xlsx(n_campanhas, 30, "2026-01-20")
+    # export de hoje: janela andou um dia e o dia 18/02 foi revisado
+    hoje = make_campanha_diario_xlsx(n_campanhas, 30, "2026-01-21", reexpressos=("2026-02-18",))
+    hist = report_history.CampaignHistory("conta teste", base_dir=str(tmp_path))
+    hist.ingest(ontem)
+    info = hist.ingest(hoje)
+    assert (info["dias_novos"], info["dias_atualizados"], info["dias_ignorados"]) == (1, 1, 28), info
+    assert hist.ingest(hoje)["arquivo_repetido"]
+
+    a, b = ml.load_campanhas_diario(ontem), ml.load_campanhas_diario(hoje)
+    esperado = pd.concat([a[a["Desde"] < b["Desde"].min()], b], ignore_index=True)
+    esperado = esperado.sort_values(report_history.KEY_COLS, kind="stable").reset_index(drop=True)
+    pd.testing.assert_frame_equal(hist.frame(), esperado, check_exact=True)
+    pd.testing.assert_frame_equal(hist.daily(), ml.build_daily_from_diario(esperado), check_exact=True)
+    pd.testing.assert_frame_equal(hist.campaign_agg(), ml.build_campaign_agg(esperado, modo="diario"), check_exact=True)
+
+
+def _dia_parquet(nomes, receita: float) -> BytesIO:
+    base = pd.read_parquet(make_campanha_diario_xlsx(len(nomes), 1, "2026-10-01", fmt="parquet"))
+    base["Nome"] = nomes
+    base["Receita\n(Moeda local)"] = f"{receita:.2f}".replace(".", ",")
+    out = BytesIO()
+    base.to_parquet(out, index=False)
+    out.seek(0)
+    return out
+
+
+def test_history_dia_reexpresso_substitui_o_dia_inteiro(tmp_path):
+    # a versao nova do dia nao tem mais a campanha B (sumiu ou mudou de nome para B2)
+    hist = report_history.CampaignHistory("conta teste", base_dir=str(tmp_path))
+    hist.ingest(_dia_parquet(["A", "B"], 100.0))
+    info = hist.ingest(_dia_parquet(["A", "B2"], 250.0))
+    assert info["dias_atualizados"] == 1, info
+    gravado = hist.frame()
+    assert sorted(gravado["Nome"]) == ["A", "B2"]
+    pd.testing.assert_frame_equal(hist.daily(), ml.build_daily_from_diario(ml.load_campanhas_diario(_dia_parquet(["A", "B2"], 250.0))), check_exact=True)
+    assert len(hist.campaign_agg()) == 2
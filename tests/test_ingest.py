@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""Leitura paralela do lote e pacote .zip: mesmos DataFrames da leitura sequencial."""
+
+import multiprocessing
+import os
+
+import pandas as pd
+
+import ml_report as ml
+import report_bundle
+import report_ingest
+import report_memory
+import shopee_report as shopee
+from tests.fixtures import (
+    make_bundle,
+    make_campanha_xlsx,
+    make_estoque_xlsx,
+    make_organico_xlsx,
+    make_patrocinados_xlsx,
+    make_shopee_csv,
+)
+
+
+def _load_patrocinados_morre_no_pool(file, **kwargs):
+    """Loader que derruba o processo do pool (como falta de memória) e lê normalmente no processo principal."""
+    if multiprocessing.parent_process() is not None:
+        os._exit(1)
+    return ml.load_patrocinados(file, **kwargs)
+
+
+def test_ingest_parallel_equivalence():
+    n = 2_000
+    tasks = {
+        "vendas": (ml.load_organico, make_organico_xlsx(n)),
+        "patrocinados": (ml.load_patrocinados, make_patrocinados_xlsx(n)),
+        "campanha": (ml.load_campanhas_consolidado, make_campanha_xlsx(40)),
+        "estoque": (ml.load_estoque, make_estoque_xlsx(n)),
+    }
+    seq = report_ingest.load_reports(tasks, parallel=False)
+    par = report_ingest.load_reports(tasks, parallel=True)
+    assert not seq["erros"] and not par["erros"], (seq["erros"], par["erros"])
+    for k in tasks:
+        pd.testing.assert_frame_equal(par["dados"][k], seq["dados"][k], check_exact=True, obj=k)
+
+
+def test_ingest_worker_death(monkeypatch):
+    n = 2_000
+    tasks = {
+        "vendas": (ml.load_organico, make_organico_xlsx(n)),
+        "patrocinados": (_load_patrocinados_morre_no_pool, make_patrocinados_xlsx(n)),
+        "campanha": (ml.load_campanhas_consolidado, make_campanha_xlsx(20)),
+    }
+    esperado = report_ingest.load_reports(tasks, parallel=False)
+
+    # cabe no orcamento: so o arquivo que derrubou o processo e lido localmente
+    monkeypatch.setenv(report_memory.MEMORY_BUDGET_ENV, "1000000")
+    out = report_ingest.load_reports(tasks, parallel=True)
+    assert not out["erros"], out["erros"]
+    assert out["origem"] == {"vendas": "processo", "patrocinados": "local", "campanha": "processo"}, out["origem"]
+    for k in tasks:
+        pd.testing.assert_frame_equal(out["dados"][k], esperado["dados"][k], check_exact=True, obj=k)
+
+    # nao cabe: o arquivo fica com o erro e os outros continuam lidos pelo pool
+    monkeypatch.setenv(report_memory.MEMORY_BUDGET_ENV, "1")
+    out = report_ingest.load_reports(tasks, parallel=True)
+    assert list(out["erros"]) == ["patrocinados"] and "orçamento" in out["erros"]["patrocinados"], out["erros"]
+    assert out["origem"] == {"vendas": "processo", "campanha": "processo"}, out["origem"]
+
+
+def test_bundle_equivalence():
+    n = 2_000
+    esperado = {
+        "conta_a/desempenho.xlsx": ("vendas", ml.load_organico, make_organico_xlsx(n)),
+        "conta_a/anuncios.csv": ("patrocinados", ml.load_patrocinados, make_patrocinados_xlsx(n)),
+        "conta_a/campanhas.parquet": ("campanha", ml.load_campanhas_consolidado, make_campanha_xlsx(max(n // 50, 10))),
+        "conta_a/estoque.xlsx": ("estoque", ml.load_estoque, make_estoque_xlsx(n)),
+        "conta_b/export_1.xlsx": ("vendas", ml.load_organico, make_organico_xlsx(n, seed=1)),
+        "conta_b/export_2.xlsx": ("patrocinados", ml.load_patrocinados, make_patrocinados_xlsx(n, seed=1)),
+        "conta_b/export_3.xlsx": ("campanha", ml.load_campanhas_consolidado, make_campanha_xlsx(max(n // 50, 10), seed=1)),
+        "shopee/anuncios.csv": ("dados_gerais", shopee.load_dados_gerais, make_shopee_csv(n // 10)),
+        "shopee/palavras.csv": ("palavras_chave", shopee.load_dados_gerais, make_shopee_csv(n // 10, palavras_chave=True)),
+        "leia-me.txt": (None, None, None),
+    }
+    out = report_bundle.load_bundle(make_bundle(n), parallel=False)
+    assert not out["ingestao"]["erros"], out["ingestao"]["erros"]
+    assert sorted(row["arquivo"] for row in out["arquivos"]) == sorted(esperado)
+    for row in out["arquivos"]:
+        rel, loader, arquivo = esperado[row["arquivo"]]
+        assert row["relatorio"] == rel, (row["arquivo"], row["relatorio"], rel)
+        if loader is None:
+            continue
+        pd.testing.assert_frame_equal(
+            out["contas"][row["conta"]][row["marketplace"]][rel], loader(arquivo), check_exact=True, obj=row["arquivo"]
+        )
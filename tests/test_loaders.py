@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+"""Loaders: streaming, backends do xlsx, projecao de colunas e entrada em CSV/Parquet."""
+
+import pandas as pd
+import pytest
+
+import excel_reader
+import ml_report as ml
+from tests.fixtures import (
+    FORMAT_LOADERS,
+    assert_same_outputs,
+    build_tables_from,
+    make_campanha_xlsx,
+    make_organico_xlsx,
+    make_patrocinados_xlsx,
+    report_loaders,
+)
+
+
+@pytest.mark.parametrize("chunk_rows", [1_000, 5_000, 50_000])
+def test_streaming_equivalence(chunk_rows):
+    arq = make_patrocinados_xlsx(6_789)
+    normal = ml.load_patrocinados(arq, streaming=False)
+    arq.seek(0)
+    stream = ml.load_patrocinados(ml.StreamingWorkbook(arq, chunk_rows=chunk_rows))
+    pd.testing.assert_frame_equal(stream, normal, check_exact=True, obj=f"streaming chunk={chunk_rows}")
+
+
+def test_backend_equivalence():
+    engines = excel_reader.available_engines()
+    if len(engines) < 2:
+        pytest.skip(f"Apenas {engines} instalado(s)")
+    for nome, (arq, loader) in report_loaders(2_000).items():
+        base = loader(arq, engine=engines[-1])
+        for engine in engines[:-1]:
+            pd.testing.assert_frame_equal(loader(arq, engine=engine), base, check_exact=True, obj=f"{nome} [{engine}]")
+
+
+def test_projection_equivalence():
+    n = 3_000
+    org_f, pat_f, camp_f = make_organico_xlsx(n, extra_cols=6), make_patrocinados_xlsx(n, extra_cols=6), make_campanha_xlsx(80)
+    bruto = build_tables_from(
+        ml.load_organico(org_f, keep_raw=True),
+        ml.load_patrocinados(pat_f, keep_raw=True),
+        ml.load_campanhas_consolidado(camp_f, keep_raw=True),
+    )
+    for streaming in (False, True):
+        projetado = build_tables_from(
+            ml.load_organico(org_f),
+            ml.load_patrocinados(pat_f, streaming=streaming),
+            ml.load_campanhas_consolidado(camp_f),
+        )
+        assert_same_outputs(projetado, bruto, f"projecao streaming={streaming}")
+
+
+@pytest.mark.parametrize("nome, make, loader", FORMAT_LOADERS, ids=[f[0] for f in FORMAT_LOADERS])
+def test_format_equivalence(nome, make, loader):
+    n = 2_000
+    ref = loader(make(n))
+    for fmt in ("csv", "parquet"):
+        arq = make(n, fmt=fmt)
+        assert excel_reader.detect_format(arq) == fmt, (nome, fmt)
+        novo = loader(arq)
+        ref.attrs, novo.attrs = {}, {}
+        pd.testing.assert_frame_equal(novo, ref, check_exact=True, obj=f"{nome} {fmt}")
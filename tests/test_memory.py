@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Orcamento de memoria: estimativa antes do parse e decisao normal/reduzido/recusado."""
+
+import pandas as pd
+import pytest
+
+import ml_report as ml
+import report_memory
+from tests.fixtures import make_campanha_xlsx, make_estoque_xlsx, make_organico_xlsx, make_patrocinados_xlsx
+
+N = 3_000
+
+
+@pytest.fixture(scope="module")
+def arquivos():
+    return {
+        "vendas": make_organico_xlsx(N), "patrocinados": make_patrocinados_xlsx(N),
+        "campanha": make_campanha_xlsx(80), "estoque": make_estoque_xlsx(N),
+    }
+
+
+@pytest.mark.parametrize("fmt", ["xlsx", "csv", "parquet"])
+def test_estimate_file_linhas(arquivos, fmt):
+    # linhas pela tag <dimension> / metadados = linhas do arquivo (dados + titulo/cabecalho)
+    arq = make_patrocinados_xlsx(N, fmt=fmt) if fmt != "xlsx" else arquivos["patrocinados"]
+    est = report_memory.estimate_file("patrocinados", arq)
+    assert 0 <= est["linhas"] - len(ml.load_patrocinados(arq)) <= 40 and est["colunas"] >= 10, (fmt, est)
+
+
+def test_plan_ingest(arquivos, monkeypatch):
+    assert report_memory.plan_ingest(arquivos, budget=1e6)["decisao"] == "normal"
+    assert report_memory.plan_ingest(arquivos, budget=1.0)["decisao"] == "recusado"
+
+    # so a leitura (sem o pipeline nem a base do openpyxl, que so compensa em arquivos grandes)
+    # e RSS fixo: um orcamento entre a leitura reduzida e a completa
+    monkeypatch.setattr(report_memory, "PIPELINE_FACTOR", 0.0)
+    monkeypatch.setattr(report_memory, "STREAMING_BASE_MB", 0.0)
+    monkeypatch.setattr(report_memory, "current_rss_mb", lambda: 100.0)
+    normal = report_memory.plan_ingest(arquivos, budget=1e6)
+    reduzido = report_memory.plan_ingest(arquivos, budget=0.0)
+    plano = report_memory.plan_ingest(arquivos, budget=(normal["estimativa_mb"] + reduzido["estimativa_mb"]) / 2)
+    assert plano["decisao"] == "reduzido" and plano["parallel"] is False, plano
+    assert plano["kwargs"] == {"vendas": {"streaming": True}, "patrocinados": {"streaming": True}}, plano["kwargs"]
+
+    # leitura reduzida devolve os mesmos DataFrames
+    for rel, loader in (("vendas", ml.load_organico), ("patrocinados", ml.load_patrocinados)):
+        a = loader(arquivos[rel], **plano["kwargs"][rel])
+        a.attrs.pop("leitura", None)
+        pd.testing.assert_frame_equal(a, loader(arquivos[rel], streaming=False), check_exact=True, obj=f"{rel} reduzido")
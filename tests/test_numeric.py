@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""Parser numerico pt-BR vetorizado x parser original por celula."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ml_report as ml
+from tests import legacy
+from tests.fixtures import PTBR_CORPUS
+
+
+def _assert_same_series(novo: pd.Series, antigo: pd.Series, label: str):
+    if novo.dtype != antigo.dtype:
+        raise AssertionError(f"[{label}] dtype diferente: {novo.dtype} != {antigo.dtype}")
+    if novo.dtype == object:
+        if list(novo) != list(antigo) or not novo.index.equals(antigo.index):
+            raise AssertionError(f"[{label}] valores diferentes")
+        return
+    pd.testing.assert_series_equal(novo, antigo, check_exact=True, obj=label)
+
+
+@pytest.mark.parametrize("label, s", [
+    ("corpus_misto", pd.Series(PTBR_CORPUS, dtype=object)),
+    ("corpus_texto", pd.Series([v for v in PTBR_CORPUS if isinstance(v, str)], dtype=object)),
+    ("somente_nulos", pd.Series([None, "", "nan", pd.NA], dtype=object)),
+    ("vazio", pd.Series([], dtype=object)),
+    ("float64", pd.Series([1.5, np.nan, -2.0])),
+    ("int64", pd.Series([1, 2, 3], index=[10, 20, 30], name="x")),
+    ("str_dtype", pd.Series(["1.234,56", None, "7%"], dtype=str)),
+])
+def test_numeric_equivalence(label, s):
+    _assert_same_series(ml._coerce_series_numeric_ptbr(s), legacy.ptbr_reference(s), label)
+
+
+def test_numeric_amostra_aleatoria():
+    rng = np.random.default_rng(42)
+    amostra = pd.Series(rng.choice(np.array(PTBR_CORPUS, dtype=object), size=5_000))
+    _assert_same_series(ml._coerce_series_numeric_ptbr(amostra), legacy.ptbr_reference(amostra), "amostra_aleatoria")
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Tabelas de regras (report_rules): equivalencia, regras do cliente e validacao na carga."""
+
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import ml_report as ml
+import report_rules
+import shopee_report as shopee
+from tests import legacy
+from tests.fixtures import make_ads_camp_strat, make_ads_frame, make_campaign_table, make_shopee_frame
+
+CLIENTE = {
+    "anuncio": {"tabelas": {"diagnostico": {"regras": [
+        {"nome": "gasto_sem_retorno", "remover": True},
+        {"nome": "ctr_muito_baixo", "prioridade": 35, "quando": "CTR_pct < 0.2 and Investimento > 0",
+         "saidas": {"Status_Anuncio": "Prejudicial", "Acao_Anuncio": "Pausar anúncio", "Confianca_Anuncio": "MEDIA",
+                    "Motivo_Anuncio": "CTR muito baixo com gasto"}},
+    ]}}},
+    "shopee": {"tabelas": {"recomendacoes": {"regras": [
+        {"nome": "sem_conversao", "prioridade": 50, "quando": "Despesas > 0 and Conversões == 0",
+         "campos": ["despesas"], "saidas": {"motivo": "Gasto sem conversão"}},
+    ]}}},
+}
+
+
+def _grava(path, regras):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(regras, f, ensure_ascii=False)
+
+
+@pytest.mark.parametrize("df", [
+    make_shopee_frame(3_000, 0), make_shopee_frame(3_000, 1), make_shopee_frame(3_000, 2),
+    make_shopee_frame(200, 4).drop(columns=["Nome do Anúncio"]), make_shopee_frame(0, 5),
+], ids=["seed0", "seed1", "seed2", "sem_nome", "vazio"])
+def test_shopee_equivalence(df):
+    assert shopee.gerar_recomendacoes_shopee(df, {}) == legacy.gerar_recomendacoes_shopee_linha(df, {})
+
+
+def test_regra_do_cliente_igual_aos_limiares():
+    # trocar a regra de escala equivale a mudar os limiares da funcao
+    camp = make_campaign_table(3_000, 11)
+    regras = {"campanha": {"definicoes": {"escala": "ROAS_Real >= 5.0 and Perdidas_Orc >= 10.0"}}}
+    pd.testing.assert_frame_equal(
+        ml.add_strategy_fields(camp, regras=regras),
+        ml.add_strategy_fields(camp, roas_mina=5.0, lost_budget_mina=10.0),
+        check_exact=True, obj="regra de escala do cliente",
+    )
+
+
+def test_regras_do_json(tmp_path, monkeypatch):
+    # regra nova e remocao vindas do JSON do cliente (ML_REPORT_RULES_FILE)
+    path = tmp_path / "cliente.json"
+    _grava(path, CLIENTE)
+    monkeypatch.setenv(report_rules.RULES_FILE_ENV, str(path))
+    shopee_df = make_shopee_frame(3_000)
+    painel = ml.build_ads_panel(make_ads_frame(3_000, seed=3), make_ads_camp_strat())
+    shop = shopee.gerar_recomendacoes_shopee(shopee_df, {})
+    assert (painel["Motivo_Anuncio"] == "Gasto sem retorno").sum() == 0
+    assert (painel["Motivo_Anuncio"] == "CTR muito baixo com gasto").sum() > 0
+    esperado = int(((shopee_df["Despesas"] > 0) & (shopee_df["Conversões"] == 0)).sum())
+    assert list(shop) == ["ativar_protecao", "otimizar_roas", "escalar_gmv", "pausar_revisar", "sem_conversao"]
+    assert len(shop["sem_conversao"]) == esperado
+
+
+@pytest.mark.parametrize("extra", [
+    {"campanha": {"definicoes": {"escala": "ROAS_Real >= __import__('os')"}}},
+    # nome desconhecido (erro de digitacao, saida de tabela posterior)
+    {"campanha": {"definicoes": {"escala": "ROAS_Rel >= roas_mina"}}},
+    {"campanha": {"definicoes": {"escala": "ROAS_Real >= roas_minima"}}},
+    {"campanha": {"tabelas": {"confianca": {"regras": [{"nome": "alta", "quando": "Quadrante == 'ESCALA_ORCAMENTO'"}]}}}},
+    {"campanha": {"definicoes": {"a": "b > 0", "b": "a"}}},
+    {"anuncio": {"tabelas": {"refino": {"regras": [{"nome": "nova", "quando": "Status_Campanha == 'x'"}]}}}},
+    {"shopee": {"tabelas": {"recomendacoes": {"regras": [{"nome": "nova", "quando": "Despesa > 0"}]}}}},
+    {"campanhas": {"definicoes": {}}},
+])
+def test_regra_recusada_na_carga(extra):
+    with pytest.raises(ValueError):
+        report_rules.load_rules(extra)
+
+
+@pytest.mark.parametrize("extra", [
+    {"campanha": {"definicoes": {"escala": "ROAS_Real >= roas_mina and CPI_80"}}},
+    {"campanha": {"tabelas": {"acao": {"regras": [{"nome": "nova", "prioridade": 5, "quando": "Motivo == 'x' and escala",
+                                                      "saidas": {"Acao_Recomendada": "x"}}]}}}},
+])
+def test_regra_aceita(extra):
+    report_rules.load_rules(extra)
+
+
+def test_json_relido_so_quando_muda(tmp_path, monkeypatch):
+    # JSON do ambiente lido uma vez por versao do arquivo (caminho + mtime)
+    path = tmp_path / "cliente.json"
+    cliente = json.loads(json.dumps(CLIENTE))
+    _grava(path, cliente)
+    monkeypatch.setenv(report_rules.RULES_FILE_ENV, str(path))
+    primeira = report_rules.load_rules()
+    assert report_rules.load_rules() is primeira
+    cliente["shopee"]["tabelas"]["recomendacoes"]["regras"][0]["quando"] = "Despesas > 0"
+    _grava(path, cliente)
+    os.utime(path, ns=(os.stat(path).st_mtime_ns + 1_000_000_000,) * 2)
+    nova = report_rules.load_rules()
+    assert nova is not primeira
+    assert nova["shopee"]["tabelas"]["recomendacoes"]["regras"][-1]["quando"] == "Despesas > 0"
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Relatorios compartilhados entre sessoes (Arrow IPC mapeado)."""
+
+import pandas as pd
+
+import ml_report as ml
+import report_dtypes
+import report_shared
+from tests.fixtures import (
+    assert_same_outputs,
+    build_tables_from,
+    make_campanha_xlsx,
+    make_organico_xlsx,
+    make_patrocinados_xlsx,
+)
+
+
+def test_shared_equivalence(tmp_path):
+    n = 3_000
+    frames = {
+        "vendas": ml.load_organico(make_organico_xlsx(n)),
+        "patrocinados": ml.load_patrocinados(make_patrocinados_xlsx(n)),
+        "campanha": ml.load_campanhas_consolidado(make_campanha_xlsx(80)),
+    }
+    compactos, _ = report_dtypes.compact_frames(frames)
+    store = report_shared.SharedFrameStore(base_dir=str(tmp_path))
+    chaves = {k: f"teste_{k}" for k in compactos}
+    mapeados = store.publish_frames(compactos, chaves, "sessao_a")
+    # outra sessao (outro processo) ve o mesmo arquivo
+    outro = report_shared.SharedFrameStore(base_dir=str(tmp_path))
+    for k, df in compactos.items():
+        pd.testing.assert_frame_equal(mapeados[k], df, check_exact=True, obj=k)
+        pd.testing.assert_frame_equal(outro.get(chaves[k], "sessao_b"), df, check_exact=True, obj=k)
+    assert_same_outputs(
+        build_tables_from(mapeados["vendas"], mapeados["patrocinados"], mapeados["campanha"]),
+        build_tables_from(frames["vendas"], frames["patrocinados"], frames["campanha"]),
+        "compartilhado",
+    )
+    # contagem de referencias: o arquivo so sai quando a ultima sessao solta
+    store.release_holder("sessao_a")
+    assert store.summary()["arquivos"] == 3
+    outro.release_holder("sessao_b")
+    assert outro.summary()["arquivos"] == 0
+
+
+def test_shared_sem_espaco_fica_com_o_frame_privado(tmp_path, monkeypatch):
+    df = ml.load_organico(make_organico_xlsx(500))
+    livre = report_shared.shutil.disk_usage(str(tmp_path))._replace(free=1_000)
+    monkeypatch.setattr(report_shared.shutil, "disk_usage", lambda path: livre)
+    store = report_shared.SharedFrameStore(base_dir=str(tmp_path))
+    assert store.publish("teste_vendas", df, "sessao_a") is df
+    assert store.stats["sem_espaco"] == 1
+    assert store.summary()["arquivos"] == 0
+    assert list(tmp_path.glob("*.tmp")) == []
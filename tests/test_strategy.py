@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""Quadrante das campanhas: add_strategy_fields e strategy_sweep."""
+
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ml_report as ml
+from tests import legacy
+from tests.fixtures import make_campaign_table
+
+CASOS = [(make_campaign_table(2_000, seed), {}) for seed in range(5)] + [
+    (make_campaign_table(2_000, 7, acos_objetivo=False), {}),
+    (make_campaign_table(2_000, 8), {"roas_mina": 5.0, "lost_budget_mina": 10.0, "comp_clicks_min": 0, "hiper_roas_mult": 1.0}),
+    (make_campaign_table(1, 9), {}),
+]
+
+
+@pytest.mark.parametrize("i", range(len(CASOS)))
+def test_strategy_equivalence(i):
+    camp, kw = CASOS[i]
+    novo = ml.add_strategy_fields(camp, **kw)
+    antigo = legacy.add_strategy_fields_linha(camp, **kw)
+    pd.testing.assert_frame_equal(novo, antigo, check_exact=True, obj=f"add_strategy_fields caso {i}")
+
+
+@pytest.mark.parametrize("fixos, regras", [
+    ({}, None),
+    ({"comp_clicks_min": 0, "hiper_roas_mult": 1.2}, None),
+    ({}, {"campanha": {"definicoes": {"hemorragia": "0 < ROAS_Real < roas_hemorragia"}}}),
+])
+def test_strategy_sweep(fixos, regras):
+    n = 1_000
+    camp = make_campaign_table(n, 21)
+    grade = {
+        "roas_mina": [3.0, 5.0, 7.0, 12.0],
+        "lost_budget_mina": [0.0, 25.0, 40.0],
+        "lost_rank_gigante": [10.0, 50.0, 80.0],
+        "roas_hemorragia": [1.0, 3.0, 4.5],
+    }
+    camp_strat = ml.add_strategy_fields(camp, regras=regras, **fixos)
+    # blocos pequenos para passar pela costura entre blocos
+    res = ml.strategy_sweep(camp_strat, grade, regras=regras, max_celulas=7 * n, **fixos)
+    for pos in itertools.product(*[range(len(v)) for v in grade.values()]):
+        kw = {k: grade[k][p] for k, p in zip(grade, pos)}
+        ref = ml.add_strategy_fields(camp, regras=regras, **fixos, **kw)
+        inv = pd.to_numeric(ref["Investimento"], errors="coerce").fillna(0)
+        for q, quad in enumerate(res["quadrantes"]):
+            sel = (ref["Quadrante"] == quad).to_numpy()
+            assert res["contagem"][pos + (q,)] == sel.sum(), (kw, quad)
+            assert np.isclose(res["investimento"][pos + (q,)], inv[sel].sum(), rtol=1e-9, atol=1e-6), (kw, quad)
+        assert sum(res["contagem"][pos]) == len(ref)
+        assert np.isclose(res["investimento_em_risco"][pos], inv[(ref["Quadrante"] == "HEMORRAGIA").to_numpy()].sum(), rtol=1e-9, atol=1e-6)
+    assert len(ml.sweep_frame(res)) == res["cenarios"] == 4 * 3 * 3 * 3
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""Etapa sem limiares + limiares (prepare_tables / apply_thresholds), ReportTables e listas top-k."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import ml_report as ml
+from tests import legacy
+from tests.fixtures import (
+    LIMIARES,
+    assert_same_outputs,
+    make_campaign_table,
+    make_campanha_xlsx,
+    make_catalogo_fora_ads,
+    make_organico_xlsx,
+    make_patrocinados_xlsx,
+    tabelas_catalogo,
+)
+
+
+@pytest.fixture(scope="module")
+def entradas():
+    n = 5_000
+    org = ml.load_organico(make_organico_xlsx(n))
+    pat = ml.load_patrocinados(make_patrocinados_xlsx(n))
+    camp_agg = ml.build_campaign_agg(ml.load_campanhas_consolidado(make_campanha_xlsx(120)), modo="consolidado")
+    return org, pat, camp_agg, ml.prepare_tables(org, camp_agg, pat)
+
+
+@pytest.mark.parametrize("kw", LIMIARES)
+def test_threshold_stage(entradas, kw):
+    org, pat, camp_agg, base = entradas
+    # a mesma etapa base serve a todos os limiares (nada dela e alterado)
+    assert_same_outputs(ml.apply_thresholds(base, **kw), ml.build_tables(org=org, camp_agg=camp_agg, pat=pat, **kw), "limiares")
+
+
+@pytest.mark.parametrize("kw", LIMIARES)
+def test_lazy_tables(entradas, kw):
+    base = entradas[3]
+    tabelas = ml.apply_thresholds(base, **kw)
+    assert tabelas.calculadas() == [], tabelas.calculadas()
+    # acesso avulso calcula so o que foi pedido
+    tabelas.ads_otim_oferta
+    assert tabelas.calculadas() == ["ads_otim_oferta"], tabelas.calculadas()
+    assert tabelas.ads_otim_oferta is tabelas[11]
+    assert_same_outputs(tuple(tabelas), legacy.apply_thresholds_tupla(base, **kw), "tabelas")
+    assert len(tabelas) == 12 and len(tabelas[:5]) == 5
+
+
+def _frame_top_k(n: int) -> pd.DataFrame:
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame({
+        "a": rng.integers(0, 30, n).astype(float),
+        "b": rng.integers(0, 5, n),
+        "c": rng.normal(size=n),
+        "t": rng.choice(["x", "y", "z"], n),
+    })
+    df.loc[rng.random(n) < 0.05, "a"] = np.nan
+    df.index = rng.permutation(n) * 3
+    return df
+
+
+@pytest.mark.parametrize("by, asc", [("a", False), ("a", True), (["a", "b"], [False, True]), (["b", "c"], [True, False]), (["t", "a"], [False, False])])
+def test_top_k(by, asc):
+    n = 10_000
+    df = _frame_top_k(n)
+    esperado_todo = df.sort_values(by, ascending=asc, kind="stable")
+    for k in (0, 1, 5, 37, 1_000, n - 1, n, n + 10, None):
+        esperado = esperado_todo if k is None else esperado_todo.head(k)
+        pd.testing.assert_frame_equal(ml._top_k(df, by, asc, k), esperado, obj=f"_top_k {by} k={k}")
+
+
+def test_top_k_poucos_validos():
+    # poucos validos: os NaN completam a lista no fim, como no sort_values
+    df = _frame_top_k(10_000)
+    poucos = df.assign(a=np.where(np.arange(len(df)) < 3, 1.0, np.nan))
+    pd.testing.assert_frame_equal(ml._top_k(poucos, "a", k=10), poucos.sort_values("a", ascending=False, kind="stable").head(10))
+
+
+def test_enter_limitado():
+    org = make_catalogo_fora_ads(10_000)
+    completo = tabelas_catalogo(org).enter
+    referencia = org[(org["Visitas"] >= 50) & (org["Conv_Visitas_Vendas"] > 1.0)].sort_values(["Conv_Visitas_Vendas", "Visitas"], ascending=[False, False])
+    pd.testing.assert_index_equal(completo.index, referencia.index)
+    for limite in (1, 50, 500, len(completo) + 1):
+        tabelas = tabelas_catalogo(org, enter_limite=limite)
+        pd.testing.assert_frame_equal(tabelas.enter, completo.head(limite), obj=f"enter limite {limite}")
+        assert "enter_completo" not in tabelas.__dict__, "ranking completo calculado sem exportacao"
+        pd.testing.assert_frame_equal(tabelas.enter_completo, completo, obj="enter_completo")
+
+
+def test_destaques_e_painel_de_controle():
+    rng = np.random.default_rng(7)
+    camp = ml.add_strategy_fields(make_campaign_table(3_000))
+    camp["CPI_80"] = rng.random(len(camp)) < 0.5
+    for nome, lista in ml.build_opportunity_highlights(camp).items():
+        assert len(lista) <= 5, nome
+    loc = camp[(camp["CPI_80"] == True) & (camp["Quadrante"] == "COMPETITIVIDADE")].sort_values("Receita", ascending=False, kind="stable").head(5)
+    pd.testing.assert_frame_equal(ml.build_opportunity_highlights(camp)["Locomotivas"], loc)
+    painel = ml.build_control_panel(camp)
+    antigo = camp[[c for c in painel.columns]].join(camp[["Nome", "Receita"]].set_index("Nome"), on="Nome")
+    antigo = antigo.sort_values("Receita", ascending=False, kind="stable").drop(columns=["Receita"])
+    pd.testing.assert_frame_equal(painel, antigo, obj="build_control_panel")
+    pd.testing.assert_frame_equal(ml.build_control_panel(camp, limite=20), antigo.head(20), obj="build_control_panel limite")
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Validacao rapida dos uploads: arquivos corretos aceitos, trocados recusados com o motivo."""
+
+from io import BytesIO
+
+import pytest
+
+import report_validation
+from tests.fixtures import (
+    make_campanha_diario_xlsx,
+    make_campanha_xlsx,
+    make_estoque_xlsx,
+    make_organico_xlsx,
+    make_patrocinados_xlsx,
+    make_shopee_csv,
+)
+
+
+@pytest.mark.parametrize("fmt", ["xlsx", "csv", "parquet"])
+def test_validation_aceita(fmt):
+    n = 2_000
+    validos = [
+        ("vendas", make_organico_xlsx(n, fmt=fmt)), ("patrocinados", make_patrocinados_xlsx(n, fmt=fmt)),
+        ("campanha", make_campanha_xlsx(80, fmt=fmt)),
+    ]
+    if fmt == "xlsx":
+        validos.append(("estoque", make_estoque_xlsx(n)))
+    for rel, arq in validos:
+        r = report_validation.validate_upload(rel, arq)
+        assert r["ok"], (rel, r["formato"], r["erros"])
+
+
+def test_validation_shopee():
+    assert report_validation.validate_upload("dados_gerais", make_shopee_csv(300), "shopee")["ok"]
+
+
+@pytest.mark.parametrize("rel, make, trecho", [
+    ("campanha", lambda: make_estoque_xlsx(2_000), "parece ser"),
+    ("vendas", lambda: make_patrocinados_xlsx(2_000), "parece ser"),
+    ("campanha", lambda: make_campanha_diario_xlsx(20, 5), "consolidado"),
+    ("patrocinados", lambda: BytesIO(b"qualquer coisa\n1;2;3\n"), "cabeçalho"),
+])
+def test_validation_recusa(rel, make, trecho):
+    r = report_validation.validate_upload(rel, make())
+    assert not r["ok"] and trecho in r["erros"][0], (rel, r["erros"])